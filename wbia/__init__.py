@@ -2,105 +2,204 @@
 """
 IBEIS: main package init
 
-TODO: LAZY IMPORTS?
-    http://code.activestate.com/recipes/473888-lazy-module-imports/
+Lazy import mode:
+    Set ``WBIA_LAZY_IMPORT=1`` (or pass ``--lazy-import``) to make ``import
+    wbia`` cheap. The package namespace is then populated on demand by the
+    module ``__getattr__``, which imports the submodule that defines a name
+    the first time it is accessed. The depcache preprocessors and controller
+    plugins are registered when the first controller is created.
+
+    python -X importtime -c "import wbia"
+    WBIA_LAZY_IMPORT=1 python -X importtime -c "import wbia"
 """
 # flake8: noqa
+import os
+import sys
 
 try:
     from wbia._version import __version__
 except ImportError:
     __version__ = '0.0.0'
 
-try:
+LAZY_IMPORT = '--lazy-import' in sys.argv or os.environ.get(
+    'WBIA_LAZY_IMPORT', ''
+).lower() in ('1', 'true', 'on', 'yes')
+
+# Public names of the package namespace mapped to the module that defines them
+# and the attribute of that module (None for the module itself)
+_LAZY_ATTRS = {
+    'ut': ('utool', None),
+    'dtool': ('wbia.dtool', None),
+    'constants': ('wbia.constants', None),
+    'const': ('wbia.constants', None),
+    'params': ('wbia.params', None),
+    'entry_points': ('wbia.entry_points', None),
+    'other': ('wbia.other', None),
+    'sysres': ('wbia.init.sysres', None),
+    'control': ('wbia.control', None),
+    'dbio': ('wbia.dbio', None),
+    'main': ('wbia.entry_points', 'main'),
+    '_preload': ('wbia.entry_points', '_preload'),
+    '_init_numpy': ('wbia.entry_points', '_init_numpy'),
+    'main_loop': ('wbia.entry_points', 'main_loop'),
+    'opendb': ('wbia.entry_points', 'opendb'),
+    'opendb_in_background': ('wbia.entry_points', 'opendb_in_background'),
+    'opendb_with_web': ('wbia.entry_points', 'opendb_with_web'),
+    'IBEISController': ('wbia.control.IBEISControl', 'IBEISController'),
+    'QueryRequest': ('wbia.algo.hots.query_request', 'QueryRequest'),
+    'ChipMatch': ('wbia.algo.hots.chip_match', 'ChipMatch'),
+    'AnnotMatch': ('wbia.algo.hots.chip_match', 'AnnotMatch'),
+    'AnnotInference': ('wbia.algo.graph.core', 'AnnotInference'),
+    'get_workdir': ('wbia.init.sysres', 'get_workdir'),
+    'set_workdir': ('wbia.init.sysres', 'set_workdir'),
+    'ensure_pz_mtest': ('wbia.init.sysres', 'ensure_pz_mtest'),
+    'ensure_nauts': ('wbia.init.sysres', 'ensure_nauts'),
+    'ensure_wilddogs': ('wbia.init.sysres', 'ensure_wilddogs'),
+    'list_dbs': ('wbia.init.sysres', 'list_dbs'),
+    'main_helpers': ('wbia.init.main_helpers', None),
+    'algo': ('wbia.algo', None),
+    'research': ('wbia.research', None),
+    'expt': ('wbia.expt', None),
+    'templates': ('wbia.templates', None),
+    'generate_notebook': ('wbia.templates.generate_notebook', None),
+    'register_preprocs': ('wbia.control.controller_inject', 'register_preprocs'),
+    'core_annots': ('wbia.core_annots', None),
+    'core_images': ('wbia.core_images', None),
+    'postdoc': ('wbia.scripts.postdoc', None),
+    'testdata_cm': ('wbia.init.main_helpers', 'testdata_cm'),
+    'testdata_cmlist': ('wbia.init.main_helpers', 'testdata_cmlist'),
+    'testdata_qreq_': ('wbia.init.main_helpers', 'testdata_qreq_'),
+    'testdata_pipecfg': ('wbia.init.main_helpers', 'testdata_pipecfg'),
+    'testdata_filtcfg': ('wbia.init.main_helpers', 'testdata_filtcfg'),
+    'testdata_expts': ('wbia.init.main_helpers', 'testdata_expts'),
+    'testdata_expanded_aids': ('wbia.init.main_helpers', 'testdata_expanded_aids'),
+    'testdata_aids': ('wbia.init.main_helpers', 'testdata_aids'),
+}
+
+
+# Names that ut.inject2 defines, which lazy import mode defers to first access
+_INJECTED_ATTRS = ('print', 'rrr', 'profile')
+
+
+def _inject2():
+    global print, rrr, profile
     import utool as ut
-    from wbia import dtool
-except ImportError as ex:
-    print('[wbia !!!] ERROR: Unable to load all core utility modules.')
-    print('[wbia !!!] Perhaps try super_setup.py pull')
-    raise
-
-ut.noinject(__name__, '[wbia.__init__]')
-if ut.VERBOSE:
-    print('[wbia] importing wbia __init__')
-
-
-if ut.is_developer():
-    standard_visualization_functions = [
-        'show_image',
-        'show_chip',
-        'show_chipmatch',
-        'show_chipmatches',
-        'show_vocabulary',
-        #'show_vocabulary',
-    ]
-
-# If we dont initialize plottool before <something>
-# then it causes a crash in windows. Its so freaking weird.
-# something is not guitool, wbia.viz
-# has to be before control, can be after constants, params, and entry_points
-# import wbia.plottool
 
+    print, rrr, profile = ut.inject2(__name__)
 
-ENABLE_WILDBOOK_SIGNAL = False
 
+def __getattr__(name):
+    """Imports the names of the package namespace on first access"""
+    import importlib
 
-try:
-    from wbia import constants
-    from wbia import constants as const
-    from wbia import params
-    from wbia import entry_points
-    from wbia import other
-    from wbia.init import sysres
-
-    # entry_points._preload()
-
-    from wbia import control
-    from wbia import dbio
-
-    # from wbia import web
-
-    from wbia.init import sysres
-    from wbia.entry_points import (
-        main,
-        _preload,
-        _init_numpy,
-        main_loop,
-        opendb,
-        opendb_in_background,
-        opendb_with_web,
-    )
-    from wbia.control.IBEISControl import IBEISController
-    from wbia.algo.hots.query_request import QueryRequest
-    from wbia.algo.hots.chip_match import ChipMatch, AnnotMatch
-    from wbia.algo.graph.core import AnnotInference
-    from wbia.init.sysres import (
-        get_workdir,
-        set_workdir,
-        ensure_pz_mtest,
-        ensure_nauts,
-        ensure_wilddogs,
-        list_dbs,
-    )
-    from wbia.init import main_helpers
+    if name in _INJECTED_ATTRS:
+        _inject2()
+        return globals()[name]
+    elif name in _LAZY_ATTRS:
+        modname, attr = _LAZY_ATTRS[name]
+        value = importlib.import_module(modname)
+        if attr is not None:
+            value = getattr(value, attr)
+    elif not name.startswith('_') and importlib.util.find_spec(__name__ + '.' + name):
+        value = importlib.import_module(__name__ + '.' + name)
+    else:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    globals()[name] = value
+    return value
 
-    from wbia import algo
-    from wbia import research
 
-    from wbia import expt
-    from wbia import templates
-    from wbia.templates import generate_notebook
-    from wbia.control.controller_inject import register_preprocs
-    from wbia import core_annots
-    from wbia import core_images
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS) | set(_INJECTED_ATTRS))
+
+
+ENABLE_WILDBOOK_SIGNAL = False
+
+
+if not LAZY_IMPORT:
+    try:
+        import utool as ut
+        from wbia import dtool
+    except ImportError as ex:
+        print('[wbia !!!] ERROR: Unable to load all core utility modules.')
+        print('[wbia !!!] Perhaps try super_setup.py pull')
+        raise
+
+    ut.noinject(__name__, '[wbia.__init__]')
+    if ut.VERBOSE:
+        print('[wbia] importing wbia __init__')
+
+    if ut.is_developer():
+        standard_visualization_functions = [
+            'show_image',
+            'show_chip',
+            'show_chipmatch',
+            'show_chipmatches',
+            'show_vocabulary',
+            #'show_vocabulary',
+        ]
+
+    # If we dont initialize plottool before <something>
+    # then it causes a crash in windows. Its so freaking weird.
+    # something is not guitool, wbia.viz
+    # has to be before control, can be after constants, params, and entry_points
+    # import wbia.plottool
 
     try:
-        from wbia.scripts import postdoc
-    except ImportError:
-        pass
-except Exception as ex:
-    ut.printex(ex, 'Error when importing wbia', tb=True)
-    raise
+        from wbia import constants
+        from wbia import constants as const
+        from wbia import params
+        from wbia import entry_points
+        from wbia import other
+        from wbia.init import sysres
+
+        # entry_points._preload()
+
+        from wbia import control
+        from wbia import dbio
+
+        # from wbia import web
+
+        from wbia.init import sysres
+        from wbia.entry_points import (
+            main,
+            _preload,
+            _init_numpy,
+            main_loop,
+            opendb,
+            opendb_in_background,
+            opendb_with_web,
+        )
+        from wbia.control.IBEISControl import IBEISController
+        from wbia.algo.hots.query_request import QueryRequest
+        from wbia.algo.hots.chip_match import ChipMatch, AnnotMatch
+        from wbia.algo.graph.core import AnnotInference
+        from wbia.init.sysres import (
+            get_workdir,
+            set_workdir,
+            ensure_pz_mtest,
+            ensure_nauts,
+            ensure_wilddogs,
+            list_dbs,
+        )
+        from wbia.init import main_helpers
+
+        from wbia import algo
+        from wbia import research
+
+        from wbia import expt
+        from wbia import templates
+        from wbia.templates import generate_notebook
+        from wbia.control.controller_inject import register_preprocs
+        from wbia import core_annots
+        from wbia import core_images
+
+        try:
+            from wbia.scripts import postdoc
+        except ImportError:
+            pass
+    except Exception as ex:
+        ut.printex(ex, 'Error when importing wbia', tb=True)
+        raise
 
 
 def import_subs():
@@ -163,6 +262,8 @@ def run_experiment(
         >>> ut.show_if_requested()
     """
     import functools
+    import utool as ut
+    from wbia.init import main_helpers
 
     def find_expt_func(e):
         import utool as ut
@@ -300,11 +401,6 @@ def run_experiment(
         return testres
 
 
-def testdata_expts(*args, **kwargs):
-    ibs, testres = main_helpers.testdata_expts(*args, **kwargs)
-    return testres
-
-
 # import_subs()
 # from wbia import gui
 # from wbia import algo
@@ -336,24 +432,39 @@ def testdata_expts(*args, **kwargs):
 # )
 
 import logging
-from wbia.init import main_helpers
-
-testdata_cm = main_helpers.testdata_cm
-testdata_cmlist = main_helpers.testdata_cmlist
-testdata_qreq_ = main_helpers.testdata_qreq_
-testdata_pipecfg = main_helpers.testdata_pipecfg
-testdata_filtcfg = main_helpers.testdata_filtcfg
-testdata_expts = main_helpers.testdata_expts
-testdata_expanded_aids = main_helpers.testdata_expanded_aids
-testdata_aids = main_helpers.testdata_aids
-
-# Utool generated init makeinit.py
-print, rrr, profile = ut.inject2(__name__)
+
+if not LAZY_IMPORT:
+    from wbia.init import main_helpers
+
+    testdata_cm = main_helpers.testdata_cm
+    testdata_cmlist = main_helpers.testdata_cmlist
+    testdata_qreq_ = main_helpers.testdata_qreq_
+    testdata_pipecfg = main_helpers.testdata_pipecfg
+    testdata_filtcfg = main_helpers.testdata_filtcfg
+    testdata_expts = main_helpers.testdata_expts
+    testdata_expanded_aids = main_helpers.testdata_expanded_aids
+    testdata_aids = main_helpers.testdata_aids
+
+    # Utool generated init makeinit.py
+    _inject2()
 logger = logging.getLogger('wbia')
 
 
 def reload_subs(verbose=True):
     """Reloads wbia and submodules"""
+    if LAZY_IMPORT:
+        # Bind the names used below, which are only imported on first access
+        for name in [
+            'rrr',
+            'constants',
+            'entry_points',
+            'params',
+            'other',
+            'dbio',
+            'algo',
+            'control',
+        ]:
+            __getattr__(name)
     import_subs()
     rrr(verbose=verbose)
     getattr(constants, 'rrr', lambda verbose: None)(verbose=verbose)
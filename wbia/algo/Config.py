@@ -239,10 +239,15 @@ class NNConfig(ConfigBase):
         #    nn_cfg.checks = 800
         # number of annots before a new multi-indexer is built
         nn_cfg.min_reindex_thresh = 200
+        # stack the descriptors of all queries into a few large knn calls
+        nn_cfg.batch_knn = False
+        # the incremental indexer compacts its delta segment once it holds this
+        # fraction of the main index
+        nn_cfg.delta_compact_ratio = 0.1
         # number of annots before a new multi-indexer is built
         # nn_cfg.max_subindexers = 2
         # nn_cfg.valid_index_methods = ['single', 'multi', 'name']
-        nn_cfg.valid_index_methods = ['single']
+        nn_cfg.valid_index_methods = ['single', 'incremental']
         nn_cfg.update(**kwargs)
 
     def make_feasible(nn_cfg):
@@ -296,6 +301,10 @@ class SpatialVerifyConfig(ConfigBase):
         sv_cfg.refine_method = 'homog'
         # weight feature scores with sver errors
         sv_cfg.weight_inliers = True
+        # run spatial verification in a 'thread' or 'process' pool
+        sv_cfg.sver_executor = None
+        # number of pool workers (defaults to the number of cpus)
+        sv_cfg.sver_workers = None
         sv_cfg.update(**kwargs)
 
     def get_cfgstr_list(sv_cfg, **kwargs):
@@ -28,6 +28,9 @@ if not ut.get_argflag('--no-lightnet'):
 
 VERBOSE_LN = ut.get_argflag('--verbln') or ut.VERBOSE
 
+# Networks loaded by preload_network, keyed by their config and weight paths
+NETWORK_CACHE = {}
+
 
 CONFIG_URL_DICT = {
     'hammerhead': 'https://wildbookiarepository.azureedge.net/models/detect.lightnet.shark_hammerhead.py',
@@ -108,6 +111,52 @@ def _parse_weights_from_cfg(url):
     return url.replace('.py', '.weights')
 
 
+def _resolve_model_filepaths(config_filepath, weight_filepath):
+    """Resolve shorthand model tags into downloaded config and weight paths."""
+    # Get correct weight if specified with shorthand
+    config_url = None
+    if config_filepath in CONFIG_URL_DICT:
+        config_url = CONFIG_URL_DICT[config_filepath]
+        config_filepath = ut.grab_file_url(
+            config_url, appname='lightnet', check_hash=True
+        )
+
+    # Get correct weights if specified with shorthand
+    if weight_filepath in CONFIG_URL_DICT:
+        if weight_filepath is None and config_url is not None:
+            config_url_ = config_url
+        else:
+            config_url_ = CONFIG_URL_DICT[weight_filepath]
+        weight_url = _parse_weights_from_cfg(config_url_)
+        weight_filepath = ut.grab_file_url(
+            weight_url, appname='lightnet', check_hash=True
+        )
+
+    assert exists(config_filepath)
+    config_filepath = ut.truepath(config_filepath)
+    assert exists(weight_filepath)
+    weight_filepath = ut.truepath(weight_filepath)
+    return config_filepath, weight_filepath
+
+
+def preload_network(config_filepath=None, weight_filepath=None):
+    """
+    Loads a network onto the CPU and keeps it for every later detection.
+
+    Used by the job engine so that forked workers share one copy of the
+    weights instead of reading them from disk for every job.
+    """
+    config_filepath, weight_filepath = _resolve_model_filepaths(
+        config_filepath, weight_filepath
+    )
+    key = (config_filepath, weight_filepath)
+    if key not in NETWORK_CACHE:
+        params = ln.engine.HyperParameters.from_file(config_filepath)
+        params.load(weight_filepath)
+        NETWORK_CACHE[key] = params
+    return NETWORK_CACHE[key]
+
+
 def _parse_class_list(config_filepath):
     # Load classes from file into the class list
     params = ln.engine.HyperParameters.from_file(config_filepath)
@@ -167,8 +216,10 @@ def _create_network(
     else:
         logger.info('[lightnet] CUDA not available')
 
-    params = ln.engine.HyperParameters.from_file(config_filepath)
-    params.load(weight_filepath)
+    params = NETWORK_CACHE.get((config_filepath, weight_filepath), None)
+    if params is None or multi:
+        params = ln.engine.HyperParameters.from_file(config_filepath)
+        params.load(weight_filepath)
     params.device = device
 
     # Update conf_thresh and nms_thresh in postpsocess
@@ -265,29 +316,9 @@ def detect(
     Returns:
         iter
     """
-    # Get correct weight if specified with shorthand
-    config_url = None
-    if config_filepath in CONFIG_URL_DICT:
-        config_url = CONFIG_URL_DICT[config_filepath]
-        config_filepath = ut.grab_file_url(
-            config_url, appname='lightnet', check_hash=True
-        )
-
-    # Get correct weights if specified with shorthand
-    if weight_filepath in CONFIG_URL_DICT:
-        if weight_filepath is None and config_url is not None:
-            config_url_ = config_url
-        else:
-            config_url_ = CONFIG_URL_DICT[weight_filepath]
-        weight_url = _parse_weights_from_cfg(config_url_)
-        weight_filepath = ut.grab_file_url(
-            weight_url, appname='lightnet', check_hash=True
-        )
-
-    assert exists(config_filepath)
-    config_filepath = ut.truepath(config_filepath)
-    assert exists(weight_filepath)
-    weight_filepath = ut.truepath(weight_filepath)
+    config_filepath, weight_filepath = _resolve_model_filepaths(
+        config_filepath, weight_filepath
+    )
 
     conf_thresh = sensitivity
     nms_thresh = 1.0  # Turn off NMS
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized non-maximum suppression over the detections of many images and
+classes at once.
+
+The detections are given as flat arrays. Detections only suppress each other
+when they belong to the same group, i.e. the same image (see ``offsets``) and
+the same class (see ``groups``). The candidate pairs of all groups are scored in
+blocks of matrix operations and the greedy suppression is resolved in rounds
+over each block, which gives the same result as running :func:`py_cpu_nms` on
+every group separately. The number of pairs grows with the square of the
+detections per group, so the blocks hold at most ``PAIR_BLOCK_SIZE`` pairs to
+bound the memory used.
+"""
+import logging
+import utool as ut
+import numpy as np
+
+(print, rrr, profile) = ut.inject2(__name__)
+logger = logging.getLogger('wbia')
+
+# Maximum number of candidate pairs that are scored at once
+PAIR_BLOCK_SIZE = ut.get_argval('--nms-pair-block-size', type_=int, default=2 ** 18)
+
+
+def rotated_box_corners(bboxes, thetas):
+    r"""
+    Corners of boxes rotated by ``thetas`` (radians) around their centers, in
+    the same convention as :func:`vtool.rotation_around_bbox_mat3x3`.
+
+    Args:
+        bboxes (ndarray): (N, 4) boxes as (xtl, ytl, width, height)
+        thetas (ndarray): (N,) rotations
+
+    Returns:
+        ndarray: (N, 4, 2) corners
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.detect.nms.batched_nms import *  # NOQA
+        >>> bboxes = np.array([[0, 0, 4, 2]])
+        >>> corners = rotated_box_corners(bboxes, np.array([np.pi / 2]))
+        >>> print(np.round(corners[0]).astype(int).tolist())
+        [[3, -1], [3, 3], [1, 3], [1, -1]]
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    xtl, ytl, w, h = bboxes.T
+    offsets = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float64) - 0.5
+    # Relative to the centers
+    rel = offsets[None, :, :] * np.stack([w, h], axis=1)[:, None, :]
+    cos_ = np.cos(thetas)[:, None]
+    sin_ = np.sin(thetas)[:, None]
+    corners = np.empty(rel.shape)
+    corners[..., 0] = cos_ * rel[..., 0] - sin_ * rel[..., 1] + (xtl + w / 2)[:, None]
+    corners[..., 1] = sin_ * rel[..., 0] + cos_ * rel[..., 1] + (ytl + h / 2)[:, None]
+    return corners
+
+
+def _cross(u, v):
+    return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+
+def _inside_convex(pts, poly):
+    """Flags points ``(P, K, 2)`` inside the convex quadrilaterals ``(P, 4, 2)``"""
+    edges = np.roll(poly, -1, axis=1) - poly
+    rel = pts[:, :, None, :] - poly[:, None, :, :]
+    sides = _cross(edges[:, None, :, :], rel)
+    eps = 1e-9
+    return np.all(sides >= -eps, axis=2) | np.all(sides <= eps, axis=2)
+
+
+def _polygon_area(pts):
+    return np.abs(_cross(pts, np.roll(pts, -1, axis=1)).sum(axis=1)) / 2
+
+
+def rotated_pair_intersection(corners1, corners2):
+    r"""
+    Intersection areas of pairs of convex quadrilaterals
+
+    The intersection polygon consists of the corners of each box that lie in
+    the other one and the crossings of their edges. The points are ordered by
+    their angle around the centroid and measured with the shoelace formula.
+
+    Args:
+        corners1 (ndarray): (P, 4, 2) corners of the first boxes
+        corners2 (ndarray): (P, 4, 2) corners of the second boxes
+
+    Returns:
+        ndarray: (P,) areas
+    """
+    num = len(corners1)
+    in1 = _inside_convex(corners1, corners2)
+    in2 = _inside_convex(corners2, corners1)
+    # Edge crossings of all 4 x 4 edge pairs
+    p = corners1[:, :, None, :]
+    r = (np.roll(corners1, -1, axis=1) - corners1)[:, :, None, :]
+    q = corners2[:, None, :, :]
+    s = (np.roll(corners2, -1, axis=1) - corners2)[:, None, :, :]
+    denom = _cross(r, s)
+    parallel = np.abs(denom) < 1e-12
+    denom = np.where(parallel, 1.0, denom)
+    qp = q - p
+    t = _cross(qp, s) / denom
+    u = _cross(qp, r) / denom
+    crosses = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    cross_pts = p + t[..., None] * r
+
+    pts = np.concatenate([corners1, corners2, cross_pts.reshape(num, 16, 2)], axis=1)
+    valid = np.concatenate([in1, in2, crosses.reshape(num, 16)], axis=1)
+    count = valid.sum(axis=1)
+    center = (pts * valid[..., None]).sum(axis=1) / np.maximum(count, 1)[:, None]
+    rel = pts - center[:, None, :]
+    angles = np.where(valid, np.arctan2(rel[..., 1], rel[..., 0]), np.inf)
+    sortx = np.argsort(angles, axis=1)
+    pts = np.take_along_axis(pts, sortx[..., None], axis=1)
+    # Repeat the last valid point over the invalid ones, which adds no area
+    takex = np.minimum(
+        np.arange(pts.shape[1])[None, :], np.maximum(count, 1)[:, None] - 1
+    )
+    pts = np.take_along_axis(pts, takex[..., None], axis=1)
+    areas = _polygon_area(pts)
+    areas[count < 3] = 0
+    return areas
+
+
+def pair_overlaps(bboxes, thetas, idx1, idx2, chunksize=65536):
+    r"""
+    Intersection over union of the detection pairs ``(idx1, idx2)``.
+
+    Like :func:`py_cpu_nms`, a box (xtl, ytl, w, h) covers ``w + 1`` by
+    ``h + 1`` pixels. Pairs of boxes that are both axis aligned are computed
+    directly, the others with :func:`rotated_pair_intersection`.
+
+    Args:
+        bboxes (ndarray): (N, 4) boxes as (xtl, ytl, width, height)
+        thetas (ndarray): (N,) rotations or None
+        idx1 (ndarray): (P,) indices of the first detection of each pair
+        idx2 (ndarray): (P,) indices of the second detection of each pair
+
+    Returns:
+        ndarray: (P,) overlaps
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.detect.nms.batched_nms import *  # NOQA
+        >>> bboxes = np.array([[0, 0, 9, 9], [5, 0, 9, 9], [0, 0, 9, 9]])
+        >>> thetas = np.array([0, 0, np.pi / 4])
+        >>> ious = pair_overlaps(bboxes, thetas, np.array([0, 0]), np.array([1, 2]))
+        >>> print(np.round(ious, 3).tolist())
+        [0.333, 0.707]
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    sizes = bboxes[:, 2:4] + 1
+    x1, y1 = bboxes[:, 0], bboxes[:, 1]
+    x2, y2 = x1 + sizes[:, 0], y1 + sizes[:, 1]
+    areas = sizes[:, 0] * sizes[:, 1]
+
+    inter = np.zeros(len(idx1))
+    if thetas is None:
+        rotated = np.zeros(len(idx1), dtype=bool)
+    else:
+        thetas = np.asarray(thetas, dtype=np.float64)
+        rotated = (thetas[idx1] != 0) | (thetas[idx2] != 0)
+
+    axis_idx1, axis_idx2 = idx1[~rotated], idx2[~rotated]
+    w = np.minimum(x2[axis_idx1], x2[axis_idx2]) - np.maximum(
+        x1[axis_idx1], x1[axis_idx2]
+    )
+    h = np.minimum(y2[axis_idx1], y2[axis_idx2]) - np.maximum(
+        y1[axis_idx1], y1[axis_idx2]
+    )
+    inter[~rotated] = np.maximum(0.0, w) * np.maximum(0.0, h)
+
+    if np.any(rotated):
+        boxes = np.hstack([bboxes[:, 0:2], sizes])
+        corners = rotated_box_corners(boxes, thetas)
+        # Only rotated boxes with overlapping extents can intersect
+        lo, hi = corners.min(axis=1), corners.max(axis=1)
+        rot_pairx = np.where(rotated)[0]
+        rot_idx1, rot_idx2 = idx1[rot_pairx], idx2[rot_pairx]
+        flags = np.all(
+            (lo[rot_idx1] < hi[rot_idx2]) & (lo[rot_idx2] < hi[rot_idx1]), axis=1
+        )
+        rot_pairx = rot_pairx[flags]
+        for chunk in ut.ichunks(rot_pairx, chunksize):
+            chunk = np.array(chunk)
+            inter[chunk] = rotated_pair_intersection(
+                corners[idx1[chunk]], corners[idx2[chunk]]
+            )
+    union = areas[idx1] + areas[idx2] - inter
+    return inter / union
+
+
+def _group_ends(group_offsets):
+    group_offsets = np.asarray(group_offsets)
+    return np.repeat(group_offsets[1:], np.diff(group_offsets))
+
+
+def group_pairs(group_offsets, start=0, stop=None):
+    r"""
+    All index pairs ``i < j`` within the same group, where ``i`` is in
+    ``start:stop``
+
+    Args:
+        group_offsets (ndarray): (G + 1,) group ``g`` spans
+            ``group_offsets[g]:group_offsets[g + 1]``
+        start (int): first index ``i`` of the pairs
+        stop (int): end of the indices ``i`` of the pairs (defaults to all)
+
+    Returns:
+        tuple: (idx1, idx2)
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.detect.nms.batched_nms import *  # NOQA
+        >>> idx1, idx2 = group_pairs(np.array([0, 3, 3, 5]))
+        >>> print(list(zip(idx1.tolist(), idx2.tolist())))
+        [(0, 1), (0, 2), (1, 2), (3, 4)]
+        >>> idx1, idx2 = group_pairs(np.array([0, 3, 3, 5]), 1, 4)
+        >>> print(list(zip(idx1.tolist(), idx2.tolist())))
+        [(1, 2), (3, 4)]
+    """
+    ends = _group_ends(group_offsets)
+    if stop is None:
+        stop = len(ends)
+    idxs = np.arange(start, stop)
+    counts = ends[start:stop] - idxs - 1
+    idx1 = np.repeat(idxs, counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    idx2 = idx1 + 1 + (np.arange(len(idx1)) - starts)
+    return idx1, idx2
+
+
+def pair_blocks(group_offsets, block_size=None):
+    r"""
+    Splits the indices into consecutive blocks ``start:stop``, such that the
+    pairs of each block (see :func:`group_pairs`) number at most
+    ``block_size`` (unless a block is a single index).
+
+    Returns:
+        list: (start, stop) of each block
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.detect.nms.batched_nms import *  # NOQA
+        >>> print(pair_blocks(np.array([0, 4, 6]), block_size=3))
+        [(0, 1), (1, 4), (4, 6)]
+    """
+    if block_size is None:
+        block_size = PAIR_BLOCK_SIZE
+    ends = _group_ends(group_offsets)
+    num = len(ends)
+    cum_counts = np.cumsum(ends - np.arange(num) - 1)
+    blocks = []
+    start = 0
+    while start < num:
+        before = cum_counts[start - 1] if start > 0 else 0
+        stop = np.searchsorted(cum_counts, before + block_size, side='right')
+        stop = max(int(stop), start + 1)
+        blocks.append((start, stop))
+        start = stop
+    return blocks
+
+
+def greedy_suppression(num, idx1, idx2, removed=None):
+    r"""
+    Resolves greedy non-maximum suppression given the suppressing pairs.
+
+    Each pair ``(i, j)`` means that ``i`` is ranked before ``j`` and suppresses
+    it if kept. A detection is kept when none of its suppressors is kept, which
+    is resolved in rounds over all pairs at once.
+
+    Args:
+        removed (ndarray): (num,) flags of detections that are already
+            suppressed (e.g. by detections of an earlier block)
+
+    Returns:
+        ndarray: (num,) flags of kept detections
+    """
+    UNDECIDED, KEPT, REMOVED = 0, 1, 2
+    state = np.zeros(num, dtype=np.uint8)
+    if removed is not None:
+        state[removed] = REMOVED
+    while True:
+        suppressed = np.zeros(num, dtype=bool)
+        suppressed[idx2[state[idx1] == KEPT]] = True
+        state[suppressed] = REMOVED
+        blocked = np.zeros(num, dtype=bool)
+        blocked[idx2[state[idx1] != REMOVED]] = True
+        newly_kept = (state == UNDECIDED) & ~blocked
+        if not np.any(newly_kept):
+            break
+        state[newly_kept] = KEPT
+        # Only pairs that can still change anything
+        flags = state[idx2] == UNDECIDED
+        idx1, idx2 = idx1[flags], idx2[flags]
+    assert not np.any(state == UNDECIDED)
+    return state == KEPT
+
+
+def batched_nms(
+    bboxes, confs, thresh, offsets=None, groups=None, thetas=None, block_size=None
+):
+    r"""
+    Non-maximum suppression of the detections of many images and classes
+
+    Args:
+        bboxes (ndarray): (N, 4) boxes as (xtl, ytl, width, height)
+        confs (ndarray): (N,) detection confidences
+        thresh (float): detections that overlap a better detection of their
+            group by more than this are removed
+        offsets (ndarray): (M + 1,) the detections of image ``m`` are
+            ``offsets[m]:offsets[m + 1]``. Defaults to a single image.
+        groups (ndarray): (N,) labels, only detections with the same label
+            suppress each other (e.g. classes). Defaults to a single group.
+        thetas (ndarray): (N,) rotations of the boxes in radians
+        block_size (int): maximum number of pairs scored at once
+            (defaults to ``PAIR_BLOCK_SIZE``)
+
+    Returns:
+        ndarray: (N,) flags of the kept detections
+
+    CommandLine:
+        python -m wbia.algo.detect.nms.batched_nms batched_nms
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.detect.nms.batched_nms import *  # NOQA
+        >>> from wbia.algo.detect.nms.py_cpu_nms import py_cpu_nms
+        >>> rng = np.random.RandomState(0)
+        >>> num = 300
+        >>> xy = rng.randint(0, 100, (num, 2))
+        >>> bboxes = np.hstack([xy, rng.randint(10, 40, (num, 2))])
+        >>> confs = rng.rand(num)
+        >>> offsets = np.array([0, 100, 100, 250, 300])
+        >>> groups = rng.randint(0, 3, num)
+        >>> keep = batched_nms(bboxes, confs, 0.3, offsets, groups)
+        >>> # Same as the pure python baseline on every image and class
+        >>> keep_ = np.zeros(num, dtype=bool)
+        >>> for start, stop in zip(offsets[:-1], offsets[1:]):
+        >>>     for group in range(3):
+        >>>         idxs = np.where(groups[start:stop] == group)[0] + start
+        >>>         if len(idxs) > 0:
+        >>>             x1, y1 = bboxes[idxs, 0], bboxes[idxs, 1]
+        >>>             dets = np.stack([x1, y1, x1 + bboxes[idxs, 2], y1 + bboxes[idxs, 3]], 1)
+        >>>             keep_[idxs[py_cpu_nms(dets, confs[idxs], 0.3)]] = True
+        >>> assert np.all(keep == keep_)
+        >>> # Scoring the pairs in small blocks gives the same result
+        >>> keep2 = batched_nms(bboxes, confs, 0.3, offsets, groups, block_size=100)
+        >>> assert np.all(keep == keep2)
+        >>> # The same thin box rotated by 90 degrees only overlaps in the middle
+        >>> bboxes = np.array([[0, 45, 99, 9], [0, 45, 99, 9]])
+        >>> confs = np.array([0.9, 0.8])
+        >>> print(batched_nms(bboxes, confs, 0.3).tolist())
+        [True, False]
+        >>> print(batched_nms(bboxes, confs, 0.3, thetas=[0, np.pi / 2]).tolist())
+        [True, True]
+    """
+    bboxes = np.asarray(bboxes).reshape(-1, 4)
+    confs = np.asarray(confs)
+    num = len(bboxes)
+    if num == 0:
+        return np.zeros(0, dtype=bool)
+    if offsets is None:
+        offsets = np.array([0, num])
+    image_labels = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    if groups is None:
+        group_labels = np.zeros(num, dtype=np.int64)
+    else:
+        group_labels = np.unique(groups, return_inverse=True)[1]
+    # Sort by group and then by decreasing confidence
+    sortx = np.lexsort((-np.arange(num), -confs, group_labels, image_labels))
+    keys = np.stack([image_labels[sortx], group_labels[sortx]], axis=1)
+    is_start = np.r_[True, np.any(keys[1:] != keys[:-1], axis=1)]
+    group_offsets = np.r_[np.where(is_start)[0], num]
+
+    bboxes = bboxes[sortx]
+    thetas = None if thetas is None else np.asarray(thetas)[sortx]
+    # The overlap is at most the ratio of the smaller and the larger area
+    areas = (bboxes[:, 2] + 1) * (bboxes[:, 3] + 1)
+    keep_sorted = np.zeros(num, dtype=bool)
+    removed = np.zeros(num, dtype=bool)
+    for start, stop in pair_blocks(group_offsets, block_size):
+        idx1, idx2 = group_pairs(group_offsets, start, stop)
+        area1, area2 = areas[idx1], areas[idx2]
+        flags = np.minimum(area1, area2) > thresh * np.maximum(area1, area2)
+        idx1, idx2 = idx1[flags], idx2[flags]
+        flags = pair_overlaps(bboxes, thetas, idx1, idx2) > thresh
+        idx1, idx2 = idx1[flags], idx2[flags]
+        # Every suppressor of a detection in the block is either in the block
+        # or in an earlier one, which already removed it
+        inner = idx2 < stop
+        keep_sorted[start:stop] = greedy_suppression(
+            stop - start,
+            idx1[inner] - start,
+            idx2[inner] - start,
+            removed=removed[start:stop],
+        )
+        # The kept detections of the block suppress the later ones
+        removed[idx2[~inner & keep_sorted[idx1]]] = True
+    keep = np.zeros(num, dtype=bool)
+    keep[sortx] = keep_sorted
+    return keep
@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
+import heapq
 import logging
 import utool as ut
 import networkx as nx
-import itertools as it
 from wbia.algo.graph.nx_utils import edges_inside, e_
 
 print, rrr, profile = ut.inject2(__name__)
@@ -34,86 +34,49 @@ class NiceGraph(nx.Graph, GraphHelperMixin):
     pass
 
 
-class nx_UnionFind(object):
+class _Component(set):
     """
-    Based of nx code
+    The set of nodes in a connected component and its label (the min node).
+    Also keeps a heap of its nodes, which may still hold nodes that left it,
+    so the min node can be found again without scanning the whole component.
     """
 
-    def __init__(self, elements=None):
-        if elements is None:
-            elements = ()
-        self.parents = {}
-        self.weights = {}
-        self.add_elements(elements)
-
-    def clear(self):
-        self.parents = {}
-        self.weights = {}
-
-    def __getitem__(self, element):
-        # check for previously unknown element
-        if self.add_element(element):
-            return element
-        # find path of objects leading to the root
-        path = [element]
-        root = self.parents[element]
-        while root != path[-1]:
-            path.append(root)
-            root = self.parents[root]
-        # compress the path and return
-        for ancestor in path:
-            self.parents[ancestor] = root
-        return root
-
-    def __iter__(self):
-        return iter(self.parents)
-
-    def rebalance(self, elements=None):
-        if elements is None:
-            elements = list(self.parents.keys())
-        # Make sure only one operation is needed to lookup any node
-        for x in elements:
-            parent = self[x]
-            self.parents[x] = parent
-            self.weights[x] = 1
-
-    def to_sets(self):
-        yield from it.groups(self.parents).values()
-
-    def union(self, *objects):
-        """Find the sets containing the objects and merge them all."""
-        roots = [self[x] for x in objects]
-        # HACK: use the lowest node number to preserve
-        # node labels through cuts. (has some runtime penalty)
-        if False:
-            # Find the best root with the maximum weight
-            best = max(roots, key=lambda r: self.weights[r])
+    __slots__ = ('label', '_heap')
+
+    def __init__(self, nodes=()):
+        super(_Component, self).__init__(nodes)
+        self._heap = list(self)
+        heapq.heapify(self._heap)
+        self.label = self._heap[0] if self._heap else None
+
+    def merge(self, other):
+        """Adds the nodes of another component"""
+        self.update(other)
+        if len(self._heap) + len(other) > 2 * len(self):
+            # Drop the nodes that left instead of growing the heap further
+            self._heap = list(self)
+            heapq.heapify(self._heap)
         else:
-            best = min(roots)
-        for r in roots:
-            if r != best:
-                self.weights[best] += self.weights[r]
-                self.parents[r] = best
-
-    def remove_entire_cc(self, elements):
-        # NOTE: this will not work in general. This only
-        # works if all elements are a unique component.
-        for x in elements:
-            del self.weights[x]
-            del self.parents[x]
-
-    def add_element(self, x):
-        if x not in self.parents:
-            self.weights[x] = 1
-            self.parents[x] = x
-            return True
-        return False
-
-    def add_elements(self, elements):
-        for x in elements:
-            if x not in self.parents:
-                self.weights[x] = 1
-                self.parents[x] = x
+            for n in other:
+                heapq.heappush(self._heap, n)
+
+    def min_node(self):
+        heap = self._heap
+        while heap[0] not in self:
+            heapq.heappop(heap)
+        return heap[0]
+
+
+class _NodeLabels(object):
+    """
+    Read-only node to component label lookup of a DynConnGraph
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, node):
+        return self.graph.node_label(node)
 
 
 class DynConnGraph(nx.Graph, GraphHelperMixin):
@@ -129,10 +92,20 @@ class DynConnGraph(nx.Graph, GraphHelperMixin):
     -----------------------------------------------------
     * UnionFind        | lg(n)     |    n     |  No
     * UnionFind2       |    n*     |    n     |  1
+    * SpanningForest   | lg(n)*    |    k     |  1
     * EulerTourForest  | lg^2(n)   | lg^2(n)  |  lg(n) / lglg(n) - - Ammortized
 
     * it seems to be very quick
 
+    This class uses a SpanningForest. Each component is an explicit node set
+    and insertions merge the smaller set into the larger one. A spanning forest
+    of the components is kept next to the graph, so deleting a non-forest edge
+    is constant time.  Deleting a forest edge searches both sides of the cut
+    in lockstep, stopping when the smaller side is exhausted, and then looks
+    for a replacement edge leaving the smaller side (as in HDT, but without
+    levels).  Here k is the size of the smaller side plus its degree, rather
+    than the size of the whole component.
+
     References:
         https://courses.csail.mit.edu/6.851/spring14/lectures/L20.pdf
         https://courses.csail.mit.edu/6.851/spring14/lectures/L20.html
@@ -169,14 +142,19 @@ class DynConnGraph(nx.Graph, GraphHelperMixin):
 
     def __init__(self, *args, **kwargs):
         # raise NotImplementedError('unfinished')
+        # component label -> component
         self._ccs = {}
-        self._union_find = nx_UnionFind()
+        # node -> component
+        self._node_to_cc = {}
+        # adjacency of the spanning forest
+        self._forest = {}
         super(DynConnGraph, self).__init__(*args, **kwargs)
 
     def clear(self):
         super(DynConnGraph, self).clear()
         self._ccs = {}
-        self._union_find.clear()
+        self._node_to_cc = {}
+        self._forest = {}
 
     def __nice__(self):
         return 'nNodes={}, nEdges={}, nCCs={}'.format(
@@ -192,7 +170,7 @@ class DynConnGraph(nx.Graph, GraphHelperMixin):
     component_nodes = component
 
     def connected_to(self, node):
-        return self._ccs[self._union_find[node]]
+        return self._node_to_cc[node]
 
     def node_label(self, node):
         """
@@ -204,10 +182,17 @@ class DynConnGraph(nx.Graph, GraphHelperMixin):
             >>> assert self.node_label(2) == self.node_label(1)
             >>> assert self.node_label(2) != self.node_label(4)
         """
-        return self._union_find[node]
+        cc = self._node_to_cc.get(node)
+        return node if cc is None else cc.label
 
     def node_labels(self, *nodes):
-        return [self._union_find[node] for node in nodes]
+        return [self.node_label(node) for node in nodes]
+
+    def node_to_label(self):
+        """
+        Returns a lookup from each node to its component label
+        """
+        return _NodeLabels(self)
 
     def are_nodes_connected(self, u, v):
         return ut.allsame(self.node_labels(u, v))
@@ -231,49 +216,113 @@ class DynConnGraph(nx.Graph, GraphHelperMixin):
 
     # -----
 
+    def _search_cut(self, u, v):
+        """
+        Searches the two spanning forest trees containing u and v in lockstep,
+        one forest edge at a time. Returns a replacement edge as soon as a
+        graph edge joins the searched parts of both trees, and otherwise
+        returns the nodes of the smaller tree once it is exhausted. Either way
+        this takes time proportional to the smaller tree and its degree.
+        """
+        forest = self._forest
+        adj = self.adj
+        seen_u, stack_u = {u}, [iter(forest[u])]
+        seen_v, stack_v = {v}, [iter(forest[v])]
+
+        def _step(seen, stack, other):
+            # Advances a depth first search by one edge
+            while stack:
+                for x in stack[-1]:
+                    if x not in seen:
+                        seen.add(x)
+                        stack.append(iter(forest[x]))
+                        for y in adj[x]:
+                            if y in other:
+                                return (x, y)
+                        return True
+                stack.pop()
+            return False
+
+        searches = [(seen_u, stack_u, seen_v), (seen_v, stack_v, seen_u)]
+        while True:
+            for seen, stack, other in searches:
+                found = _step(seen, stack, other)
+                if found is False:
+                    return seen, None
+                if found is not True:
+                    return None, found
+
     def _cut(self, u, v):
-        """Decremental connectivity (slow)"""
-        old_nid1 = self._union_find[u]
-        old_nid2 = self._union_find[v]
-        if old_nid1 != old_nid2:
+        """Decremental connectivity (fast unless a large component splits)"""
+        forest = self._forest
+        if v not in forest.get(u, ()):
+            # Removing a non-forest edge never changes connectivity
             return
-        # Need to break appart entire component and then reconstruct it
-        old_cc = self._ccs[old_nid1]
-        del self._ccs[old_nid1]
-        self._union_find.remove_entire_cc(old_cc)
-        # Might be faster to just do DFS to find the CC
-        internal_edges = edges_inside(self, old_cc)
-        # Add nodes in case there are no edges to it
-        for n in old_cc:
-            self._add_node(n)
-        for edge in internal_edges:
-            self._union(*edge)
+        forest[u].remove(v)
+        forest[v].remove(u)
+        side, edge = self._search_cut(u, v)
+        if edge is None:
+            # Reconnect the two trees if any remaining edge leaves the smaller one
+            for x in side:
+                for y in self.adj[x]:
+                    if y not in side:
+                        edge = (x, y)
+                        break
+                if edge is not None:
+                    break
+        if edge is not None:
+            x, y = edge
+            forest[x].add(y)
+            forest[y].add(x)
+            return
+        # Otherwise the smaller side splits off into its own component
+        old_cc = self._node_to_cc[u]
+        del self._ccs[old_cc.label]
+        old_cc.difference_update(side)
+        new_cc = _Component(side)
+        for n in side:
+            self._node_to_cc[n] = new_cc
+        if old_cc.label in side:
+            old_cc.label = old_cc.min_node()
+        self._ccs[old_cc.label] = old_cc
+        self._ccs[new_cc.label] = new_cc
 
     def _union(self, u, v):
         """Incremental connectivity (fast)"""
         # logger.info('Union ({})'.format((u, v)))
         self._add_node(u)
         self._add_node(v)
-        old_nid1 = self._union_find[u]
-        old_nid2 = self._union_find[v]
-        self._union_find.union(u, v)
-        new_nid = self._union_find[u]
-        for old_nid in [old_nid1, old_nid2]:
-            if new_nid != old_nid:
-                parts = self._ccs.pop(old_nid)
-                # FIXME: this step can be quite bad for time complexity.
-                # An Euler Tour Tree might solve the issue
-                self._ccs[new_nid].update(parts)
+        cc1 = self._node_to_cc[u]
+        cc2 = self._node_to_cc[v]
+        if cc1 is cc2:
+            return
+        self._forest[u].add(v)
+        self._forest[v].add(u)
+        # Merge the smaller component into the larger one
+        if len(cc1) < len(cc2):
+            cc1, cc2 = cc2, cc1
+        del self._ccs[cc1.label]
+        del self._ccs[cc2.label]
+        cc1.merge(cc2)
+        for n in cc2:
+            self._node_to_cc[n] = cc1
+        # Use the lowest node number to preserve node labels through cuts
+        cc1.label = min(cc1.label, cc2.label)
+        self._ccs[cc1.label] = cc1
 
     def _add_node(self, n):
-        if self._union_find.add_element(n):
+        if n not in self._node_to_cc:
             # logger.info('Add ({})'.format((n)))
-            self._ccs[n] = {n}
+            cc = _Component((n,))
+            self._ccs[n] = cc
+            self._node_to_cc[n] = cc
+            self._forest[n] = set()
 
     def _remove_node(self, n):
-        if n in self._union_find.parents:
-            del self._union_find.weights[n]
-            del self._union_find.parents[n]
+        # NOTE: this only works once all edges of n are removed
+        if n in self._node_to_cc:
+            del self._node_to_cc[n]
+            del self._forest[n]
             del self._ccs[n]
 
     def add_edge(self, u, v, **attr):
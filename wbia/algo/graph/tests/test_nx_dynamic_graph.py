@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import logging
+import random
+import sys  # noqa
+
+import networkx as nx
+import pytest
+import utool as ut
+
+from wbia.algo.graph.nx_dynamic_graph import DynConnGraph
+
+(print, rrr, profile) = ut.inject2(__name__)
+logger = logging.getLogger('wbia')
+
+
+def _mixed_workload(num_nodes, num_ops, rng, width=4):
+    """
+    Random edge insertions and deletions on a band graph, which is initially
+    one large component
+    """
+    edges = [(u, u + k) for u in range(num_nodes - width) for k in range(1, width)]
+    edge_set = set(edges)
+    ops = [('add', edge) for edge in edges]
+    for _ in range(num_ops):
+        if edges and rng.random() < 0.4:
+            # Remove a random edge by swapping it to the end of the list
+            idx = rng.randrange(len(edges))
+            edges[idx], edges[-1] = edges[-1], edges[idx]
+            edge = edges.pop()
+            edge_set.remove(edge)
+            ops.append(('remove', edge))
+        else:
+            u = rng.randrange(num_nodes)
+            v = (u + rng.randrange(1, 2 * width)) % num_nodes
+            edge = (min(u, v), max(u, v))
+            if edge not in edge_set:
+                edges.append(edge)
+                edge_set.add(edge)
+            ops.append(('add', edge))
+    return ops
+
+
+def _check_components(graph):
+    expected = {min(cc): cc for cc in nx.connected_components(nx.Graph(graph))}
+    assert graph._ccs == expected
+    for label, cc in graph._ccs.items():
+        assert all(graph.node_label(n) == label for n in cc)
+
+
+def test_dyn_conn_graph_mixed_workload():
+    rng = random.Random(0)
+    graph = DynConnGraph()
+    graph.add_nodes_from(range(60))
+    for count, (op, edge) in enumerate(_mixed_workload(60, 2000, rng, width=2)):
+        if op == 'add':
+            graph.add_edge(*edge)
+        else:
+            graph.remove_edge(*edge)
+        if count % 10 == 0:
+            _check_components(graph)
+    _check_components(graph)
+
+    # Bulk removals and node removals keep the components consistent
+    edges = list(graph.edges())
+    graph.remove_edges_from(rng.sample(edges, len(edges) // 2))
+    _check_components(graph)
+    graph.remove_nodes_from(rng.sample(sorted(graph.nodes()), 20))
+    _check_components(graph)
+
+
+@pytest.mark.skipif("'--slow' not in sys.argv")
+def test_dyn_conn_graph_benchmark():
+    """Micro-benchmark of a mixed add/remove workload on large components"""
+    ops = _mixed_workload(2000, 5000, random.Random(0))
+
+    def run_dynamic():
+        graph = DynConnGraph()
+        labels = []
+        for op, edge in ops:
+            if op == 'add':
+                graph.add_edge(*edge)
+            else:
+                graph.remove_edge(*edge)
+                labels.append(graph.node_label(edge[0]))
+        return labels
+
+    def run_rebuild():
+        # Recompute the component of the cut edge after each deletion
+        graph = nx.Graph()
+        labels = []
+        for op, edge in ops:
+            if op == 'add':
+                graph.add_edge(*edge)
+            else:
+                graph.remove_edge(*edge)
+                labels.append(min(nx.node_connected_component(graph, edge[0])))
+        return labels
+
+    with ut.Timer(verbose=False) as dynamic_timer:
+        dynamic_labels = run_dynamic()
+    with ut.Timer(verbose=False) as rebuild_timer:
+        rebuild_labels = run_rebuild()
+    logger.info(
+        'DynConnGraph: %.4fs, rebuild: %.4fs'
+        % (dynamic_timer.ellapsed, rebuild_timer.ellapsed)
+    )
+    assert dynamic_labels == rebuild_labels
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar append-only storage of chip matches.
+
+Every bulk write adds one immutable segment directory to the store. The feature
+matches, feature score vectors, feature ranks and database annotation ids of
+all chip matches in a segment are concatenated into single arrays that are
+indexed by offsets, so reading cached results back is a few memory mapped
+loads per segment instead of one pickle per query. The remaining state of each
+chip match is small and pickled separately, which lets single chip matches be
+materialized lazily.
+
+Segment layout::
+
+    keys.json            # query keys in segment order
+    qx2_ax_offset.npy    # (Q + 1) offsets of each query into the annot arrays
+    ax2_daid.npy         # (A) database annotation ids
+    ax2_fx_offset.npy    # (A + 1) offsets of each annot into the feature arrays
+    fm.npy               # (F, 2) feature matches
+    fsv.npy              # (F, C) feature score vectors
+    fk.npy               # (F) feature ranks
+    qx2_meta_offset.npy  # (Q + 1) byte offsets into meta.bin
+    meta.bin             # pickled remaining state of each chip match
+
+Keys written later shadow the same keys in older segments. Writes compact the
+store once it has too many segments or too many shadowed entries, which merges
+the segments and drops the shadowed entries (see :func:`ChipMatchStore.compact`).
+"""
+import logging
+import os
+import pickle
+import time
+import uuid
+import numpy as np
+import utool as ut
+from functools import partial
+from os.path import exists, join
+from wbia.algo.hots import chip_match
+
+(print, rrr, profile) = ut.inject2(__name__)
+logger = logging.getLogger('wbia')
+
+
+COLUMNAR_KEYS = ['daid_list', 'fm_list', 'fsv_list', 'fk_list']
+# Writes compact the store when it has more segments than this
+MAX_SEGMENTS = ut.get_argval('--cmstore-max-segments', type_=int, default=16)
+# or when more than this fraction of the stored entries are shadowed
+MAX_STALE_RATIO = 0.5
+
+
+def _is_columnar(cm):
+    return all(getattr(cm, key, None) is not None for key in COLUMNAR_KEYS)
+
+
+def _fsv_ncols(cm):
+    if not _is_columnar(cm) or len(cm.fsv_list) == 0:
+        return None
+    return np.shape(cm.fsv_list[0])[1]
+
+
+def _offsets(lens):
+    offsets = np.zeros(len(lens) + 1, dtype=np.int64)
+    np.cumsum(lens, out=offsets[1:])
+    return offsets
+
+
+class ChipMatchSegment(ut.NiceRepr):
+    """
+    Read only view of one segment of a :class:`ChipMatchStore`. The column
+    arrays are memory mapped on first access.
+    """
+
+    array_names = [
+        'qx2_ax_offset',
+        'ax2_daid',
+        'ax2_fx_offset',
+        'fm',
+        'fsv',
+        'fk',
+        'qx2_meta_offset',
+    ]
+
+    def __init__(seg, dpath):
+        seg.dpath = dpath
+        seg.key_list = ut.load_json(join(dpath, 'keys.json'))
+        seg._arrays = None
+
+    def __nice__(seg):
+        return '%d matches' % (len(seg.key_list),)
+
+    def __len__(seg):
+        return len(seg.key_list)
+
+    @property
+    def arrays(seg):
+        if seg._arrays is None:
+            arrays = {
+                name: np.load(join(seg.dpath, name + '.npy'), mmap_mode='c')
+                for name in seg.array_names
+            }
+            arrays['meta'] = np.memmap(join(seg.dpath, 'meta.bin'), mode='r')
+            seg._arrays = arrays
+        return seg._arrays
+
+    def load(seg, qx):
+        """Materializes the chip match of the ``qx``-th query of the segment"""
+        arrays = seg.arrays
+        meta_offset = arrays['qx2_meta_offset']
+        state = pickle.loads(arrays['meta'][meta_offset[qx] : meta_offset[qx + 1]])
+        if state.pop('_columnar'):
+            ax0, ax1 = arrays['qx2_ax_offset'][qx : qx + 2]
+            fx_offset = arrays['ax2_fx_offset'][ax0 : ax1 + 1]
+            fx0, fx1 = fx_offset[0], fx_offset[-1]
+            splitx = fx_offset[1:-1] - fx0
+            state['daid_list'] = np.array(arrays['ax2_daid'][ax0:ax1])
+            for key, name in [('fm_list', 'fm'), ('fsv_list', 'fsv'), ('fk_list', 'fk')]:
+                if ax0 == ax1:
+                    state[key] = []
+                else:
+                    state[key] = np.split(arrays[name][fx0:fx1], splitx)
+        cm = chip_match.ChipMatch()
+        cm.__setstate__(state)
+        return cm
+
+
+def write_segment(dpath, key_list, cm_list):
+    r"""
+    Writes chip matches with the same number of feature score columns as a new
+    segment directory. The segment is written to a temporary directory first
+    and then renamed into place, so readers never see partial segments.
+    """
+    columnar_cms = [cm for cm in cm_list if _is_columnar(cm)]
+    fm_list = ut.flatten([cm.fm_list for cm in columnar_cms])
+    fsv_list = ut.flatten([cm.fsv_list for cm in columnar_cms])
+    fk_list = ut.flatten([cm.fk_list for cm in columnar_cms])
+    daid_list = [cm.daid_list for cm in columnar_cms]
+    ncols = ut.filter_Nones(map(_fsv_ncols, columnar_cms))
+    ncols = ncols[0] if len(ncols) > 0 else 0
+
+    annot_lens = [len(cm.daid_list) if _is_columnar(cm) else 0 for cm in cm_list]
+    arrays = {
+        'qx2_ax_offset': _offsets(annot_lens),
+        'ax2_daid': np.hstack(daid_list + [np.empty(0, dtype=np.int32)]).astype(np.int32),
+        'ax2_fx_offset': _offsets(list(map(len, fm_list))),
+        'fm': np.vstack(fm_list + [np.empty((0, 2), dtype=np.int32)]),
+        'fsv': np.vstack(fsv_list + [np.empty((0, ncols))]),
+        'fk': np.hstack(fk_list + [np.empty(0, dtype=np.int32)]),
+    }
+    meta_list = []
+    for cm in cm_list:
+        columnar = _is_columnar(cm)
+        state = cm.__getstate__().copy()
+        if columnar:
+            for key in COLUMNAR_KEYS:
+                del state[key]
+        state['_columnar'] = columnar
+        meta_list.append(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+    arrays['qx2_meta_offset'] = _offsets(list(map(len, meta_list)))
+
+    temp_dpath = dpath + '.tmp'
+    ut.ensuredir(temp_dpath)
+    for name, arr in arrays.items():
+        np.save(join(temp_dpath, name + '.npy'), arr)
+    with open(join(temp_dpath, 'meta.bin'), 'wb') as file_:
+        for meta in meta_list:
+            file_.write(meta)
+    ut.save_json(join(temp_dpath, 'keys.json'), list(key_list))
+    os.rename(temp_dpath, dpath)
+
+
+class ChipMatchStore(ut.NiceRepr):
+    r"""
+    Columnar append-only store of the chip matches of one query configuration
+
+    Args:
+        dpath (str): directory of the store
+
+    CommandLine:
+        python -m wbia.algo.hots.chip_match_store ChipMatchStore
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.hots.chip_match_store import *  # NOQA
+        >>> from wbia.algo.hots import _pipeline_helpers as plh
+        >>> ibs, qreq_, cm_list = plh.testdata_pre_sver('PZ_MTEST', qaid_list=[18, 19])
+        >>> dpath = ut.ensure_app_resource_dir('wbia', 'tmp_cmstore')
+        >>> ut.delete(dpath)
+        >>> store = ChipMatchStore(dpath)
+        >>> key_list = ['q18', 'q19']
+        >>> store.write(key_list, cm_list)
+        >>> assert store.load_many(key_list + ['q20'])[0:2] == cm_list
+        >>> assert store.load_many(['q20']) == [None]
+        >>> # Rewriting a key shadows the old entry until the store is compacted
+        >>> store.write(['q19'], cm_list[1:2])
+        >>> assert len(store.segments) == 2
+        >>> store.compact()
+        >>> assert len(store.segments) == 1 and len(store) == 2
+        >>> lazy = store.lazy_load(key_list)
+        >>> assert lazy['q18'] == cm_list[0]
+        >>> ut.delete(dpath)
+    """
+
+    def __init__(store, dpath):
+        store.dpath = dpath
+        store.segments = ut.odict()
+        store.key_to_loc = {}
+        # Number of entries in all segments, including shadowed ones
+        store.num_entries = 0
+        store.refresh()
+
+    def __nice__(store):
+        return '%d matches in %d segments' % (len(store), len(store.segments))
+
+    def __len__(store):
+        return len(store.key_to_loc)
+
+    def __contains__(store, key):
+        return key in store.key_to_loc
+
+    def refresh(store):
+        """Picks up segments written or compacted away by other processes"""
+        if not exists(store.dpath):
+            seg_names = []
+        else:
+            # Segments being written or deleted have an extension
+            seg_names = sorted(
+                name
+                for name in os.listdir(store.dpath)
+                if name.startswith('seg_') and '.' not in name
+            )
+        if seg_names == list(store.segments.keys()):
+            return
+        segments = ut.odict()
+        for name in seg_names:
+            seg = store.segments.get(name, None)
+            if seg is None:
+                try:
+                    seg = ChipMatchSegment(join(store.dpath, name))
+                except IOError:
+                    # Compacted away by another process since it was listed
+                    continue
+            segments[name] = seg
+        store.segments = segments
+        store._update_key_index()
+
+    def _update_key_index(store):
+        key_to_loc = {}
+        for name, seg in store.segments.items():
+            for qx, key in enumerate(seg.key_list):
+                key_to_loc[key] = (name, qx)
+        store.key_to_loc = key_to_loc
+        store.num_entries = sum(map(len, store.segments.values()))
+
+    def _new_segment_dpath(store, after=None):
+        if after is None:
+            # Sortable by write time and unique across processes
+            name = 'seg_%020d_%s' % (time.time() * 1e6, uuid.uuid4().hex[0:8])
+        else:
+            # Sorts right after the segment ``after`` and before any segment
+            # written after it
+            name = '%s_%s' % (after, uuid.uuid4().hex[0:8])
+        return join(store.dpath, name)
+
+    def needs_compaction(store):
+        """
+        True if the store has more than ``MAX_SEGMENTS`` segments or more than
+        ``MAX_STALE_RATIO`` of its entries are shadowed
+        """
+        if len(store.segments) <= 1:
+            return False
+        num_stale = store.num_entries - len(store.key_to_loc)
+        return (
+            len(store.segments) > MAX_SEGMENTS
+            or num_stale > MAX_STALE_RATIO * store.num_entries
+        )
+
+    def write(store, key_list, cm_list, verbose=ut.VERBOSE, autocompact=True):
+        r"""
+        Appends the chip matches of a whole batch of queries to the store
+
+        Args:
+            key_list (list): unique keys of the queries (e.g. the query uuids)
+            cm_list (list): chip matches aligned with ``key_list``
+            autocompact (bool): compact the store afterwards if it
+                :func:`needs_compaction` (default: True)
+        """
+        assert len(key_list) == len(cm_list), 'not aligned'
+        if len(cm_list) == 0:
+            return
+        store._write(key_list, cm_list, verbose=verbose)
+        store.refresh()
+        if autocompact and store.needs_compaction():
+            store.compact(verbose=verbose)
+
+    def _write(store, key_list, cm_list, verbose=ut.VERBOSE, after=None):
+        ut.ensuredir(store.dpath)
+        # Feature score vectors are concatenated so the number of columns of
+        # a segment must agree
+        ncols_list = [_fsv_ncols(cm) for cm in cm_list]
+        groupxs = ut.group_items(list(range(len(cm_list))), ncols_list)
+        anyxs = groupxs.pop(None, [])
+        if len(groupxs) == 0:
+            groupxs[None] = anyxs
+        else:
+            groupxs[next(iter(groupxs))].extend(anyxs)
+        for idxs in groupxs.values():
+            dpath = store._new_segment_dpath(after=after)
+            if verbose:
+                logger.info('[cmstore] writing %d matches to %s' % (len(idxs), dpath))
+            write_segment(dpath, ut.take(key_list, idxs), ut.take(cm_list, idxs))
+
+    def load(store, key):
+        """Returns the chip match of ``key`` or None if it is not stored"""
+        loc = store.key_to_loc.get(key, None)
+        if loc is None:
+            return None
+        try:
+            return store.segments[loc[0]].load(loc[1])
+        except chip_match.NeedRecomputeError:
+            return None
+        except IOError:
+            # The segment was compacted away by another process before it was
+            # mapped. Its entries are in the segment that replaced it.
+            store.refresh()
+            loc_ = store.key_to_loc.get(key, None)
+            if loc_ is None or loc_ == loc:
+                raise
+            return store.load(key)
+
+    def load_many(store, key_list):
+        store.refresh()
+        return [store.load(key) for key in key_list]
+
+    def lazy_load(store, key_list):
+        """
+        Returns a dictionary of the stored keys that only materializes a chip
+        match when it is accessed
+        """
+        store.refresh()
+        return ut.LazyDict(
+            {key: partial(store.load, key) for key in key_list if key in store.key_to_loc}
+        )
+
+    def compact(store, verbose=ut.VERBOSE):
+        """
+        Rewrites the live entries into a single segment.
+
+        The new segment sorts right after the merged ones, so segments that
+        other processes write in the meantime still shadow it. The merged
+        segments are only deleted once it is in place, and are renamed out of
+        the store first, so other processes either see them whole or not at
+        all. Other processes that were about to lazily load from a deleted
+        segment reload the entry from the new segment.
+        """
+        store.refresh()
+        if len(store.segments) <= 1:
+            return
+        key_list = list(store.key_to_loc.keys())
+        cm_list = [store.load(key) for key in key_list]
+        flags = [cm is not None for cm in cm_list]
+        old_names = list(store.segments.keys())
+        store._write(
+            ut.compress(key_list, flags),
+            ut.compress(cm_list, flags),
+            verbose=verbose,
+            after=old_names[-1],
+        )
+        for name in old_names:
+            dpath = join(store.dpath, name)
+            try:
+                os.rename(dpath, dpath + '.del')
+            except OSError:
+                # Already deleted by a concurrent compaction
+                continue
+            ut.delete(dpath + '.del', verbose=False)
+        store.refresh()
+        if verbose:
+            logger.info('[cmstore] compacted to %r' % (store,))
+
+    def delete(store):
+        ut.delete(store.dpath, verbose=False)
+        store.segments = ut.odict()
+        store.key_to_loc = {}
+        store.num_entries = 0
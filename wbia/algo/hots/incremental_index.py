@@ -0,0 +1,539 @@
+# -*- coding: utf-8 -*-
+"""
+Long lived neighbor indexer that absorbs changes to the database annotations
+as deltas instead of rebuilding the FLANN index.
+
+An :class:`IncrementalIndexer` owns a main :class:`NeighborIndex` plus
+
+    * a delta segment with the descriptors of annotations added since the main
+      index was built, which is searched by brute force, and
+    * the annotations of the main index that were removed since, which are
+      skipped when searching.
+
+Each request returns an immutable :class:`DeltaNeighborIndex` snapshot that
+searches both segments and merges the results, so a query keeps a consistent
+view while the indexer changes. Once the delta grows past a fraction of the
+main index, a new main index is compacted in a background thread and swapped
+in when it is ready.
+
+Enabled with the ``index_method='incremental'`` query parameter.
+"""
+import logging
+import threading
+import numpy as np
+import utool as ut
+from wbia.algo.hots import requery_knn
+from wbia.algo.hots.neighbor_index import NeighborIndex, get_support_data, invert_index
+from wbia.algo.hots import neighbor_index_cache
+
+(print, rrr, profile) = ut.inject2(__name__)
+logger = logging.getLogger('wbia')
+
+# Number of incremental indexers (e.g. one per species) kept per configuration
+MAX_INCREMENTAL_INDEXERS = ut.get_argval(
+    '--max-incremental-indexers', type_=int, default=2
+)
+# Live incremental indexers keyed by their flann cache and index configuration
+INCREMENTAL_INDEXERS = ut.ddict(list)
+
+
+def brute_force_knn(qfx2_vec, idx2_vec, K, chunksize=1024):
+    r"""
+    Exact nearest neighbors by squared euclidean distance
+
+    Args:
+        qfx2_vec (ndarray): (N x D) query vectors
+        idx2_vec (ndarray): (M x D) data vectors
+        K (int): number of neighbors, at most M
+
+    Returns:
+        tuple: (qfx2_idx, qfx2_rawdist) each (N x K)
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.hots.incremental_index import *  # NOQA
+        >>> rng = np.random.RandomState(0)
+        >>> idx2_vec = rng.randint(0, 255, (20, 8)).astype(np.uint8)
+        >>> qfx2_vec = idx2_vec[[3, 7]]
+        >>> qfx2_idx, qfx2_rawdist = brute_force_knn(qfx2_vec, idx2_vec, 2, chunksize=1)
+        >>> print(qfx2_idx[:, 0])
+        [3 7]
+        >>> print(qfx2_rawdist[:, 0])
+        [0. 0.]
+    """
+    num_vecs = len(qfx2_vec)
+    qfx2_idx = np.empty((num_vecs, K), dtype=np.int32)
+    qfx2_rawdist = np.empty((num_vecs, K), dtype=np.float64)
+    data = idx2_vec.astype(np.float64)
+    data_sqrd = (data ** 2).sum(axis=1)
+    for sl_ in ut.ichunk_slices(num_vecs, chunksize):
+        query = qfx2_vec[sl_].astype(np.float64)
+        dists = (query ** 2).sum(axis=1)[:, None] + data_sqrd[None, :]
+        dists -= 2 * query.dot(data.T)
+        np.maximum(dists, 0, out=dists)
+        if K < dists.shape[1]:
+            part_idx = np.argpartition(dists, K - 1, axis=1)[:, 0:K]
+        else:
+            part_idx = np.tile(np.arange(dists.shape[1]), (len(dists), 1))
+        part_dists = np.take_along_axis(dists, part_idx, axis=1)
+        sortx = np.argsort(part_dists, axis=1, kind='stable')
+        qfx2_idx[sl_] = np.take_along_axis(part_idx, sortx, axis=1)
+        qfx2_rawdist[sl_] = np.take_along_axis(part_dists, sortx, axis=1)
+    return qfx2_idx, qfx2_rawdist
+
+
+class DeltaNeighborIndex(NeighborIndex, ut.NiceRepr):
+    r"""
+    Read-only view of a main :class:`NeighborIndex`, a brute force delta
+    segment and a set of removed annotations.
+
+    Indices ``idx < num_main`` refer to the main index and the rest to the
+    delta segment. The delta annotations are appended after the main ones in
+    ``ax2_aid``.
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.hots.incremental_index import *  # NOQA
+        >>> nnindexer, qreq_, ibs = neighbor_index_cache.testdata_nnindexer()
+        >>> main_aids = nnindexer.ax2_aid
+        >>> new_aids = [main_aids[-1]]
+        >>> support = get_support_data(qreq_, new_aids)
+        >>> delta = DeltaNeighborIndex(nnindexer, new_aids, support, [main_aids[-1]])
+        >>> qfx2_vec = support[0][0][0:10]
+        >>> qfx2_idx, qfx2_dist = delta.knn(qfx2_vec, 2)
+        >>> # the query vectors now only match the delta copy of the annotation
+        >>> assert np.all(qfx2_idx[:, 0] >= delta.num_main)
+        >>> assert np.all(delta.get_nn_aids(qfx2_idx[:, 0]) == main_aids[-1])
+    """
+
+    def __init__(
+        indexer,
+        main,
+        delta_aids,
+        delta_support,
+        removed_aids,
+        cfgstr=None,
+        main_ax2_nvecs=None,
+    ):
+        super(DeltaNeighborIndex, indexer).__init__(main.flann_params, cfgstr)
+        indexer.main = main
+        indexer.flann = main.flann
+        indexer.flann_fpath = main.flann_fpath
+        indexer.checks = main.checks
+        indexer.cores = main.cores
+        indexer.max_distance_sqrd = main.max_distance_sqrd
+        indexer.num_main = main.num_indexed
+
+        num_main_annots = len(main.ax2_aid)
+        delta_aids = np.array(delta_aids, dtype=main.ax2_aid.dtype)
+        delta_axs = np.arange(num_main_annots, num_main_annots + len(delta_aids))
+        vecs_list, fgws_list, fxs_list = delta_support
+        if sum(map(len, vecs_list)) > 0:
+            tup = invert_index(vecs_list, fgws_list, delta_axs, fxs_list, verbose=False)
+            indexer.delta_idx2_vec = tup[0]
+            indexer.delta_idx2_fgw = tup[1]
+            indexer.delta_idx2_ax = tup[2]
+            indexer.delta_idx2_fx = tup[3]
+        else:
+            dim = main.idx2_vec.shape[1]
+            indexer.delta_idx2_vec = np.empty((0, dim), dtype=main.get_dtype())
+            indexer.delta_idx2_fgw = None
+            if main.idx2_fgw is not None:
+                indexer.delta_idx2_fgw = np.empty(0, dtype=main.idx2_fgw.dtype)
+            indexer.delta_idx2_ax = np.empty(0, dtype=np.int32)
+            indexer.delta_idx2_fx = np.empty(0, dtype=np.int32)
+
+        indexer.ax2_aid = np.hstack([main.ax2_aid, delta_aids])
+        indexer.aid2_ax = ut.make_index_lookup(indexer.ax2_aid)
+        indexer.removed_axs = np.array(
+            ut.take(indexer.aid2_ax, removed_aids), dtype=np.int32
+        )
+        indexer.num_delta = len(indexer.delta_idx2_vec)
+        indexer.num_indexed = indexer.num_main + indexer.num_delta
+
+        if main_ax2_nvecs is None:
+            main_ax2_nvecs = np.bincount(main.idx2_ax, minlength=num_main_annots)
+        indexer.num_removed = int(main_ax2_nvecs[indexer.removed_axs].sum())
+        indexer.num_live = indexer.num_indexed - indexer.num_removed
+
+    def __nice__(indexer):
+        return ' nMain=%r nDelta=%r nRemovedAnnots=%r' % (
+            indexer.num_main,
+            indexer.num_delta,
+            len(indexer.removed_axs),
+        )
+
+    def _take(indexer, main_arr, delta_arr, qfx2_nnidx):
+        qfx2_nnidx = np.asarray(qfx2_nnidx)
+        if indexer.num_delta == 0:
+            return main_arr.take(qfx2_nnidx, axis=0)
+        is_main = qfx2_nnidx < indexer.num_main
+        shape = qfx2_nnidx.shape + main_arr.shape[1:]
+        out = np.empty(shape, dtype=np.result_type(main_arr, delta_arr))
+        out[is_main] = main_arr.take(qfx2_nnidx[is_main], axis=0)
+        out[~is_main] = delta_arr.take(qfx2_nnidx[~is_main] - indexer.num_main, axis=0)
+        return out
+
+    def _get_neighbors(indexer, qfx2_vec, K):
+        """Merged neighbors with raw distances from the main and delta segments"""
+        main_K = min(K, indexer.num_main)
+        qfx2_idx, qfx2_rawdist = indexer.main.flann.nn_index(
+            qfx2_vec, main_K, checks=indexer.checks, cores=indexer.cores
+        )
+        qfx2_idx = qfx2_idx.reshape(len(qfx2_vec), main_K)
+        qfx2_rawdist = qfx2_rawdist.reshape(len(qfx2_vec), main_K)
+        delta_K = min(K, indexer.num_delta)
+        if delta_K > 0:
+            delta_idx, delta_rawdist = brute_force_knn(
+                qfx2_vec, indexer.delta_idx2_vec, delta_K
+            )
+            qfx2_idx = np.hstack([qfx2_idx, delta_idx + indexer.num_main])
+            qfx2_rawdist = np.hstack([qfx2_rawdist, delta_rawdist])
+            sortx = np.argsort(qfx2_rawdist, axis=1, kind='stable')[:, 0:K]
+            qfx2_idx = np.take_along_axis(qfx2_idx, sortx, axis=1)
+            qfx2_rawdist = np.take_along_axis(qfx2_rawdist, sortx, axis=1)
+        return qfx2_idx, qfx2_rawdist
+
+    def _get_live_neighbors(indexer, qfx2_vec, K):
+        """
+        Merged neighbors that skip the removed annotations. Unlike impossible
+        matches, removed annotations are never used to fill up a result.
+        """
+        if indexer.num_removed == 0:
+            return indexer._get_neighbors(qfx2_vec, K)
+        K = min(K, indexer.num_live)
+        qfx2_idx, qfx2_rawdist = requery_knn.requery_knn(
+            indexer._get_neighbors,
+            indexer.get_nn_axs,
+            qfx2_vec,
+            num_neighbs=K,
+            pad=0,
+            invalid_axs=indexer.removed_axs,
+            limit=2,
+            recover=False,
+        )
+        # Rows left unresolved by the requery are marked with -1. Searching
+        # past every removed vector always finds K live neighbors for them.
+        missing = np.where(qfx2_idx[:, 0] < 0)[0]
+        if len(missing) > 0:
+            idxs, rawdists = indexer._get_neighbors(
+                qfx2_vec[missing], K + indexer.num_removed
+            )
+            is_removed = np.isin(indexer.get_nn_axs(idxs), indexer.removed_axs)
+            sortx = np.argsort(is_removed, axis=1, kind='stable')[:, 0:K]
+            qfx2_idx[missing] = np.take_along_axis(idxs, sortx, axis=1)
+            qfx2_rawdist[missing] = np.take_along_axis(rawdists, sortx, axis=1)
+        return qfx2_idx, qfx2_rawdist
+
+    def _search(indexer, qfx2_vec, K, pad, impossible_axs, recover=True):
+        if K == 0:
+            return indexer.empty_neighbors(len(qfx2_vec), 0)
+        elif K > indexer.num_live:
+            return indexer.empty_neighbors(len(qfx2_vec), 0)
+        elif len(qfx2_vec) == 0:
+            return indexer.empty_neighbors(0, K)
+        if len(impossible_axs) == 0:
+            qfx2_idx, qfx2_rawdist = indexer._get_live_neighbors(qfx2_vec, K)
+        else:
+            # Only the impossible matches may be recovered
+            qfx2_idx, qfx2_rawdist = requery_knn.requery_knn(
+                indexer._get_live_neighbors,
+                indexer.get_nn_axs,
+                qfx2_vec,
+                num_neighbs=K,
+                pad=pad,
+                invalid_axs=impossible_axs,
+                limit=3,
+                recover=recover,
+            )
+        if indexer.max_distance_sqrd is not None:
+            qfx2_dist = np.divide(qfx2_rawdist, indexer.max_distance_sqrd)
+        else:
+            qfx2_dist = qfx2_rawdist
+        return qfx2_idx, qfx2_dist
+
+    def knn(indexer, qfx2_vec, K):
+        return indexer._search(qfx2_vec, K, K, [])
+
+    def requery_knn(indexer, qfx2_vec, K, pad, impossible_aids, recover=True):
+        impossible_axs = np.array(ut.take(indexer.aid2_ax, impossible_aids))
+        return indexer._search(qfx2_vec, K, pad, impossible_axs, recover=recover)
+
+    def batch_requery_knn(
+        indexer, vecs, K, pad, impossible_aids_list, groups, recover=True
+    ):
+        idxs = np.empty((len(vecs), K), dtype=np.int32)
+        dists = np.empty((len(vecs), K), dtype=np.float64)
+        for group in np.unique(groups):
+            flags = groups == group
+            idxs[flags], dists[flags] = indexer.requery_knn(
+                vecs[flags], K, pad, impossible_aids_list[group], recover=recover
+            )
+        return idxs, dists
+
+    def get_dtype(indexer):
+        return indexer.main.get_dtype()
+
+    def num_indexed_vecs(indexer):
+        return indexer.num_live
+
+    def num_indexed_annots(indexer):
+        return len(indexer.ax2_aid) - len(indexer.removed_axs)
+
+    def get_indexed_aids(indexer):
+        return np.delete(indexer.ax2_aid, indexer.removed_axs)
+
+    def get_nn_vecs(indexer, qfx2_nnidx):
+        return indexer._take(indexer.main.idx2_vec, indexer.delta_idx2_vec, qfx2_nnidx)
+
+    def get_nn_axs(indexer, qfx2_nnidx):
+        return indexer._take(indexer.main.idx2_ax, indexer.delta_idx2_ax, qfx2_nnidx)
+
+    def get_nn_aids(indexer, qfx2_nnidx):
+        return indexer.ax2_aid.take(indexer.get_nn_axs(qfx2_nnidx))
+
+    def get_nn_featxs(indexer, qfx2_nnidx):
+        return indexer._take(indexer.main.idx2_fx, indexer.delta_idx2_fx, qfx2_nnidx)
+
+    def get_nn_fgws(indexer, qfx2_nnidx):
+        if indexer.main.idx2_fgw is None:
+            return np.ones(np.shape(qfx2_nnidx))
+        return indexer._take(indexer.main.idx2_fgw, indexer.delta_idx2_fgw, qfx2_nnidx)
+
+    def get_live_support(indexer, aid_list):
+        """
+        Returns the support data of indexed annotations without recomputing it
+        """
+        main = indexer.main
+        ax2_nvecs = np.bincount(main.idx2_ax, minlength=len(main.ax2_aid))
+        ax2_offset = np.hstack([[0], np.cumsum(ax2_nvecs)])
+        delta_ax2_nvecs = np.bincount(
+            indexer.delta_idx2_ax - len(main.ax2_aid),
+            minlength=len(indexer.ax2_aid) - len(main.ax2_aid),
+        )
+        delta_ax2_offset = np.hstack([[0], np.cumsum(delta_ax2_nvecs)])
+        vecs_list, fgws_list, fxs_list = [], [], []
+        for aid in aid_list:
+            ax = indexer.aid2_ax[aid]
+            if ax < len(main.ax2_aid):
+                arrs = (main.idx2_vec, main.idx2_fgw, main.idx2_fx)
+                sl_ = slice(ax2_offset[ax], ax2_offset[ax + 1])
+            else:
+                dax = ax - len(main.ax2_aid)
+                arrs = (
+                    indexer.delta_idx2_vec,
+                    indexer.delta_idx2_fgw,
+                    indexer.delta_idx2_fx,
+                )
+                sl_ = slice(delta_ax2_offset[dax], delta_ax2_offset[dax + 1])
+            vecs_list.append(arrs[0][sl_])
+            fgws_list.append(None if arrs[1] is None else arrs[1][sl_])
+            fxs_list.append(arrs[2][sl_])
+        if main.idx2_fgw is None:
+            fgws_list = None
+        return vecs_list, fgws_list, fxs_list
+
+
+class IncrementalIndexer(ut.NiceRepr):
+    r"""
+    Keeps a main neighbor index up to date with the requested annotations
+
+    Args:
+        flann_params (dict): parameters of the main FLANN index
+        cachedir (str): flann cache directory
+        compact_ratio (float): a new main index is compacted once the delta
+            segment or the removed vectors exceed this fraction of the main
+            index
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.hots.incremental_index import *  # NOQA
+        >>> import wbia
+        >>> qreq_ = wbia.testdata_qreq_(defaultdb='testdb1', p='default:fg_on=False')
+        >>> daid_list = list(qreq_.daids)
+        >>> flann_params = qreq_.qparams.flann_params
+        >>> cachedir = qreq_.ibs.get_flann_cachedir()
+        >>> inc = IncrementalIndexer(flann_params, cachedir, compact_ratio=10.0)
+        >>> indexer1 = inc.update(qreq_, daid_list[:-2])
+        >>> indexer2 = inc.update(qreq_, daid_list[1:])
+        >>> print(indexer2)
+        >>> assert indexer2.main is indexer1.main
+        >>> assert sorted(indexer2.get_indexed_aids()) == sorted(daid_list[1:])
+        >>> inc.compact(qreq_, daid_list[1:], background=False)
+        >>> indexer3 = inc.update(qreq_, daid_list[1:])
+        >>> assert indexer3.num_delta == 0 and len(indexer3.removed_axs) == 0
+        >>> assert sorted(indexer3.get_indexed_aids()) == sorted(daid_list[1:])
+    """
+
+    def __init__(inc, flann_params, cachedir, compact_ratio=0.1):
+        inc.flann_params = flann_params
+        inc.cachedir = cachedir
+        inc.compact_ratio = compact_ratio
+        inc.main = None
+        inc.main_ax2_nvecs = None
+        inc.delta = ut.odict()  # aid -> (vecs, fgws, fxs) of annots not in main
+        inc.removed = set()  # aids of main that are no longer indexed
+        inc.snapshot = None
+        inc._lock = threading.RLock()
+        inc._compact_thread = None
+
+    def __nice__(inc):
+        return ' nDeltaAnnots=%r nRemovedAnnots=%r compacting=%r' % (
+            len(inc.delta),
+            len(inc.removed),
+            inc.is_compacting(),
+        )
+
+    def is_compacting(inc):
+        return inc._compact_thread is not None and inc._compact_thread.is_alive()
+
+    def get_live_aids(inc):
+        main_aids = set() if inc.main is None else set(inc.main.ax2_aid)
+        return (main_aids - inc.removed) | set(inc.delta.keys())
+
+    def _set_main(inc, main):
+        inc.main = main
+        inc.main_ax2_nvecs = np.bincount(main.idx2_ax, minlength=len(main.ax2_aid))
+        inc.snapshot = None
+
+    def _make_snapshot(inc):
+        delta_aids = list(inc.delta.keys())
+        delta_support = tuple(zip(*inc.delta.values())) or ([], [], [])
+        vecs_list, fgws_list, fxs_list = map(list, delta_support)
+        if inc.main.idx2_fgw is None:
+            fgws_list = None
+        return DeltaNeighborIndex(
+            inc.main,
+            delta_aids,
+            (vecs_list, fgws_list, fxs_list),
+            sorted(inc.removed),
+            main_ax2_nvecs=inc.main_ax2_nvecs,
+        )
+
+    def overlap(inc, daid_list):
+        """Fraction of the requested annotations that are already indexed"""
+        if len(daid_list) == 0:
+            return 0.0
+        return len(inc.get_live_aids() & set(daid_list)) / len(daid_list)
+
+    def update(inc, qreq_, daid_list, verbose=ut.NOT_QUIET):
+        r"""
+        Absorbs the difference between the indexed and requested annotations
+        into the delta segment
+
+        Returns:
+            DeltaNeighborIndex: snapshot indexing exactly ``daid_list``
+        """
+        with inc._lock:
+            if inc.main is None:
+                main = neighbor_index_cache.request_diskcached_wbia_nnindexer(
+                    qreq_, daid_list, verbose=verbose
+                )
+                inc._set_main(main)
+            live_aids = inc.get_live_aids()
+            daid_set = set(daid_list)
+            add_aids = [aid for aid in daid_list if aid not in live_aids]
+            remove_aids = live_aids - daid_set
+            if len(add_aids) > 0 or len(remove_aids) > 0:
+                if verbose:
+                    logger.info(
+                        '[incindex] Adding %d and removing %d annots'
+                        % (len(add_aids), len(remove_aids))
+                    )
+                main_aids = set(inc.main.ax2_aid)
+                for aid in remove_aids:
+                    if aid in inc.delta:
+                        del inc.delta[aid]
+                    else:
+                        inc.removed.add(aid)
+                # Annotations of the main index come back without a delta
+                new_aids = [aid for aid in add_aids if aid not in main_aids]
+                inc.removed -= set(add_aids)
+                if len(new_aids) > 0:
+                    vecs_list, fgws_list, fxs_list = get_support_data(qreq_, new_aids)
+                    if fgws_list is None:
+                        fgws_list = [None] * len(new_aids)
+                    for tup in zip(new_aids, vecs_list, fgws_list, fxs_list):
+                        inc.delta[tup[0]] = tup[1:]
+                inc.snapshot = None
+            if inc.snapshot is None:
+                inc.snapshot = inc._make_snapshot()
+            snapshot = inc.snapshot
+            if inc.needs_compaction(snapshot) and not inc.is_compacting():
+                inc.compact(qreq_, daid_list, snapshot=snapshot)
+        return snapshot
+
+    def needs_compaction(inc, snapshot):
+        thresh = inc.compact_ratio * snapshot.num_main
+        num_removed = snapshot.num_indexed - snapshot.num_live
+        return snapshot.num_delta > thresh or num_removed > thresh
+
+    def compact(inc, qreq_, daid_list, snapshot=None, background=True):
+        r"""
+        Builds a new main index over ``daid_list`` from the descriptors that
+        are already indexed, then swaps it in.
+        """
+        if snapshot is None:
+            snapshot = inc.update(qreq_, daid_list)
+        cfgstr = neighbor_index_cache.build_nnindex_cfgstr(qreq_, daid_list)
+        daid_list = list(daid_list)
+        if background:
+            inc._compact_thread = ut.spawn_background_daemon_thread(
+                inc._compact, snapshot, daid_list, cfgstr
+            )
+        else:
+            inc._compact(snapshot, daid_list, cfgstr)
+
+    def _compact(inc, snapshot, daid_list, cfgstr):
+        logger.info('[incindex] Compacting %r' % (snapshot,))
+        support = snapshot.get_live_support(daid_list)
+        main = neighbor_index_cache.new_neighbor_index(
+            daid_list,
+            *support,
+            flann_params=inc.flann_params,
+            cachedir=inc.cachedir,
+            cfgstr=cfgstr,
+            verbose=False,
+        )
+        with inc._lock:
+            live_aids = inc.get_live_aids()
+            main_aids = set(daid_list)
+            # Changes made while compacting become the deltas of the new main
+            delta = ut.odict()
+            for aid in live_aids - main_aids:
+                if aid in inc.delta:
+                    delta[aid] = inc.delta[aid]
+                else:
+                    vecs_list, fgws_list, fxs_list = snapshot.get_live_support([aid])
+                    fgws = None if fgws_list is None else fgws_list[0]
+                    delta[aid] = (vecs_list[0], fgws, fxs_list[0])
+            inc.delta = delta
+            inc.removed = main_aids - live_aids
+            inc._set_main(main)
+        logger.info('[incindex] Finished compacting')
+
+
+def request_incremental_nnindexer(qreq_, verbose=ut.NOT_QUIET, **kwargs):
+    r"""
+    Returns a snapshot of the live incremental indexer that best covers the
+    internal database annotations of the query request.
+
+    A new incremental indexer is started when no live one covers at least half
+    of the annotations, e.g. for a different species.
+    """
+    daid_list = qreq_.get_internal_daids()
+    key = neighbor_index_cache.get_nnindexer_uuid_map_fpath(qreq_)
+    inc_list = INCREMENTAL_INDEXERS[key]
+    overlaps = [inc.overlap(daid_list) for inc in inc_list]
+    if len(overlaps) > 0 and max(overlaps) >= 0.5:
+        inc = inc_list.pop(ut.argmax(overlaps))
+    else:
+        flann_params = qreq_.qparams.flann_params
+        flann_params['checks'] = qreq_.qparams.checks
+        cachedir = qreq_.ibs.get_flann_cachedir()
+        compact_ratio = qreq_.qparams.delta_compact_ratio
+        inc = IncrementalIndexer(flann_params, cachedir, compact_ratio=compact_ratio)
+    # Keep the most recently used indexers
+    inc_list.append(inc)
+    del inc_list[:-MAX_INCREMENTAL_INDEXERS]
+    return inc.update(qreq_, daid_list, verbose=verbose)
@@ -24,6 +24,8 @@ USE_BIGCACHE = (
 )
 USE_SUPERCACHE = ut.USE_CACHE and ut.get_argflag('--supercache')
 SAVE_CACHE = not ut.get_argflag('--nocache-save')
+# Save chip matches in a columnar store instead of one pickle per query
+USE_CHIPMATCH_STORE = not ut.get_argflag('--legacy-qcache')
 MIN_BIGCACHE_BUNDLE = 64
 HOTS_BATCH_SIZE = ut.get_argval('--hots-batch-size', type_=int, default=None)
 
@@ -239,61 +241,19 @@ def execute_query_and_save_L1(
         fpath_list = ut.glob('%s/*_cm_supercache_*' % (dpath,))
         for fpath in fpath_list:
             ut.delete(fpath)
+        qreq_.get_chipmatch_store(super_qres_cache=True).delete()
 
     if use_cache:
         if verbose:
             logger.info('[mc4] cache-query is on')
         if use_supercache:
             logger.info('[mc4] supercache-query is on')
-        # Try loading as many cached results as possible
-        qaid2_cm_hit = {}
         external_qaids = qreq_.qaids
-        fpath_list = list(
-            qreq_.get_chipmatch_fpaths(external_qaids, super_qres_cache=use_supercache)
-        )
-        exists_flags = [exists(fpath) for fpath in fpath_list]
-        qaids_hit = ut.compress(external_qaids, exists_flags)
-        fpaths_hit = ut.compress(fpath_list, exists_flags)
-        fpath_iter = ut.ProgIter(
-            fpaths_hit,
-            length=len(fpaths_hit),
-            enabled=len(fpaths_hit) > 1,
-            label='loading cache hits',
-            adjust=True,
-            freq=1,
-        )
-        try:
-            cm_hit_list = [
-                chip_match.ChipMatch.load_from_fpath(fpath, verbose=False)
-                for fpath in fpath_iter
-            ]
-            assert all(
-                [qaid == cm.qaid for qaid, cm in zip(qaids_hit, cm_hit_list)]
-            ), 'inconsistent qaid and cm.qaid'
-            qaid2_cm_hit = {cm.qaid: cm for cm in cm_hit_list}
-        except chip_match.NeedRecomputeError:
-            logger.info('NeedRecomputeError: Some cached chips need to recompute')
-            fpath_iter = ut.ProgIter(
-                fpaths_hit,
-                length=len(fpaths_hit),
-                enabled=len(fpaths_hit) > 1,
-                label='checking chipmatch cache',
-                adjust=True,
-                freq=1,
-            )
-            # Recompute those that fail loading
-            qaid2_cm_hit = {}
-            for fpath in fpath_iter:
-                try:
-                    cm = chip_match.ChipMatch.load_from_fpath(fpath, verbose=False)
-                except chip_match.NeedRecomputeError:
-                    pass
-                else:
-                    qaid2_cm_hit[cm.qaid] = cm
-            logger.info(
-                '%d / %d cached matches need to be recomputed'
-                % (len(qaids_hit) - len(qaid2_cm_hit), len(qaids_hit))
-            )
+        # Try loading as many cached results as possible
+        if USE_CHIPMATCH_STORE:
+            qaid2_cm_hit = _load_stored_hits(qreq_, use_supercache)
+        else:
+            qaid2_cm_hit = _load_fpath_hits(qreq_, use_supercache)
         if len(qaid2_cm_hit) == len(external_qaids):
             return qaid2_cm_hit
         else:
@@ -317,6 +277,65 @@ def execute_query_and_save_L1(
     return qaid2_cm
 
 
+def _load_stored_hits(qreq_, use_supercache=False):
+    store = qreq_.get_chipmatch_store(super_qres_cache=use_supercache)
+    key_list = list(qreq_.get_chipmatch_keys(qreq_.qaids))
+    cm_hit_list = ut.filter_Nones(store.load_many(key_list))
+    qaid2_cm_hit = {cm.qaid: cm for cm in cm_hit_list}
+    return qaid2_cm_hit
+
+
+def _load_fpath_hits(qreq_, use_supercache=False):
+    external_qaids = qreq_.qaids
+    fpath_list = list(
+        qreq_.get_chipmatch_fpaths(external_qaids, super_qres_cache=use_supercache)
+    )
+    exists_flags = [exists(fpath) for fpath in fpath_list]
+    qaids_hit = ut.compress(external_qaids, exists_flags)
+    fpaths_hit = ut.compress(fpath_list, exists_flags)
+    fpath_iter = ut.ProgIter(
+        fpaths_hit,
+        length=len(fpaths_hit),
+        enabled=len(fpaths_hit) > 1,
+        label='loading cache hits',
+        adjust=True,
+        freq=1,
+    )
+    try:
+        cm_hit_list = [
+            chip_match.ChipMatch.load_from_fpath(fpath, verbose=False)
+            for fpath in fpath_iter
+        ]
+        assert all(
+            [qaid == cm.qaid for qaid, cm in zip(qaids_hit, cm_hit_list)]
+        ), 'inconsistent qaid and cm.qaid'
+        qaid2_cm_hit = {cm.qaid: cm for cm in cm_hit_list}
+    except chip_match.NeedRecomputeError:
+        logger.info('NeedRecomputeError: Some cached chips need to recompute')
+        fpath_iter = ut.ProgIter(
+            fpaths_hit,
+            length=len(fpaths_hit),
+            enabled=len(fpaths_hit) > 1,
+            label='checking chipmatch cache',
+            adjust=True,
+            freq=1,
+        )
+        # Recompute those that fail loading
+        qaid2_cm_hit = {}
+        for fpath in fpath_iter:
+            try:
+                cm = chip_match.ChipMatch.load_from_fpath(fpath, verbose=False)
+            except chip_match.NeedRecomputeError:
+                pass
+            else:
+                qaid2_cm_hit[cm.qaid] = cm
+        logger.info(
+            '%d / %d cached matches need to be recomputed'
+            % (len(qaids_hit) - len(qaid2_cm_hit), len(qaids_hit))
+        )
+    return qaid2_cm_hit
+
+
 @profile
 def execute_query2(qreq_, verbose, save_qcache, batch_size=None, use_supercache=False):
     """
@@ -345,6 +364,10 @@ def execute_query2(qreq_, verbose, save_qcache, batch_size=None, use_supercache=
     else:
         hots_batch_size = batch_size
     chunksize = 1 if qreq_.qparams.vsone else hots_batch_size
+    if save_qcache and USE_CHIPMATCH_STORE:
+        cm_store = qreq_.get_chipmatch_store(super_qres_cache=use_supercache)
+        # Buffer small (e.g. vsone) chunks so segments do not get too small
+        unsaved_keys, unsaved_cms = [], []
 
     # Iterate over vsone queries in chunks.
     n_total_chunks = ut.get_num_chunks(len(all_qaids), chunksize)
@@ -367,7 +390,13 @@ def execute_query2(qreq_, verbose, save_qcache, batch_size=None, use_supercache=
         assert all(
             [qaid == cm.qaid for qaid, cm in zip(sub_qreq_.qaids, sub_cm_list)]
         ), 'not corresonding'
-        if save_qcache:
+        if save_qcache and USE_CHIPMATCH_STORE:
+            unsaved_keys.extend(qreq_.get_chipmatch_keys(sub_qreq_.qaids))
+            unsaved_cms.extend(sub_cm_list)
+            if len(unsaved_cms) >= MIN_BIGCACHE_BUNDLE:
+                cm_store.write(unsaved_keys, unsaved_cms, verbose=False)
+                unsaved_keys, unsaved_cms = [], []
+        elif save_qcache:
             fpath_list = list(
                 qreq_.get_chipmatch_fpaths(
                     sub_qreq_.qaids, super_qres_cache=use_supercache
@@ -387,4 +416,6 @@ def execute_query2(qreq_, verbose, save_qcache, batch_size=None, use_supercache=
             if ut.VERBOSE:
                 logger.info('[mc4] not saving vsmany chunk')
         qaid2_cm.update({cm.qaid: cm for cm in sub_cm_list})
+    if save_qcache and USE_CHIPMATCH_STORE:
+        cm_store.write(unsaved_keys, unsaved_cms, verbose=False)
     return qaid2_cm
@@ -14,7 +14,9 @@ from vtool._pyflann_backend import pyflann as pyflann
 
 # import itertools as it
 import lockfile
-from os.path import basename
+import os
+import threading
+from os.path import basename, exists, join
 from wbia.algo.hots import hstypes
 from wbia.algo.hots import _pipeline_helpers as plh  # NOQA
 
@@ -213,6 +215,8 @@ class NeighborIndex(object):
 
     ext = '.flann'
     prefix1 = 'flann'
+    # Arrays written by save_support, in the argument order of _set_support
+    support_attrs = ['ax2_aid', 'idx2_vec', 'idx2_fgw', 'idx2_ax', 'idx2_fx']
 
     def __init__(nnindexer, flann_params, cfgstr):
         r"""
@@ -266,7 +270,9 @@ class NeighborIndex(object):
         idx2_vec, idx2_fgw, idx2_ax, idx2_fx = tup
 
         ax2_aid = np.array(aid_list)
+        indexer._set_support(ax2_aid, idx2_vec, idx2_fgw, idx2_ax, idx2_fx)
 
+    def _set_support(indexer, ax2_aid, idx2_vec, idx2_fgw, idx2_ax, idx2_fx):
         indexer.flann = pyflann.FLANN()  # Approximate search structure
         indexer.ax2_aid = ax2_aid  # (A x 1) Mapping to original annot ids
         indexer.idx2_vec = idx2_vec  # (M x D) Descriptors to index
@@ -604,6 +610,82 @@ class NeighborIndex(object):
                     load_success = True
         return load_success
 
+    def get_support_dpath(nnindexer, cachedir):
+        _args2_fpath = ut.util_cache._args2_fpath
+        prefix = nnindexer.get_prefix() + '_support'
+        dpath = _args2_fpath(cachedir, prefix, nnindexer.cfgstr, '')
+        return dpath
+
+    def save_support(nnindexer, cachedir, verbose=True):
+        r"""
+        Caches the support arrays to disk as ``.npy`` files so other processes
+        can memory map them with :func:`NeighborIndex.load_support`.
+
+        The arrays are written to a temporary directory which is renamed into
+        place, so a reader never sees a partially written support.
+        """
+        if NOSAVE_FLANN or nnindexer.cfgstr is None or nnindexer.flann_fpath is None:
+            return False
+        support_dpath = nnindexer.get_support_dpath(cachedir)
+        if exists(support_dpath):
+            return True
+        if ut.VERYVERBOSE or verbose:
+            logger.info(
+                '[nnindex] save_support(%r)' % ut.path_ndir_split(support_dpath, n=5)
+            )
+        # Unique per thread, indexes are also compacted in the background
+        temp_dpath = '%s.tmp%d_%d' % (support_dpath, os.getpid(), threading.get_ident())
+        ut.ensuredir(temp_dpath)
+        for attr in nnindexer.support_attrs:
+            arr = getattr(nnindexer, attr)
+            if arr is not None:
+                np.save(join(temp_dpath, attr + '.npy'), arr)
+        # Remember the flann file so loading does not need to hash the vectors
+        info = {'flann_fname': basename(nnindexer.flann_fpath)}
+        ut.save_json(join(temp_dpath, 'support.json'), info)
+        try:
+            os.rename(temp_dpath, support_dpath)
+        except OSError:
+            # Another process wrote the same support first
+            ut.delete(temp_dpath, verbose=False)
+        return True
+
+    def load_support(nnindexer, cachedir, verbose=True):
+        r"""
+        Memory maps the support arrays cached by :func:`NeighborIndex.save_support`
+
+        The descriptor arrays are mapped copy-on-write, so every process that
+        loads the same support shares its physical pages until it modifies
+        them (e.g. :func:`NeighborIndex.remove_support`).
+
+        Returns:
+            str: the cached flann index filepath or None when there is no
+                cached support
+        """
+        if NOCACHE_FLANN or nnindexer.cfgstr is None:
+            return None
+        support_dpath = nnindexer.get_support_dpath(cachedir)
+        info_fpath = join(support_dpath, 'support.json')
+        if not exists(info_fpath):
+            return None
+        assert nnindexer.flann is None, 'already initalized'
+        if ut.VERYVERBOSE or verbose:
+            logger.info(
+                '[nnindex] load_support(%r)' % ut.path_ndir_split(support_dpath, n=5)
+            )
+        info = ut.load_json(info_fpath)
+        support = []
+        for attr in nnindexer.support_attrs:
+            fpath = join(support_dpath, attr + '.npy')
+            if exists(fpath):
+                mmap_mode = None if attr == 'ax2_aid' else 'c'
+                support.append(np.load(fpath, mmap_mode=mmap_mode))
+            else:
+                support.append(None)
+        nnindexer._set_support(*support)
+        flann_fpath = join(cachedir, info['flann_fname'])
+        return flann_fpath
+
     def get_prefix(nnindexer):
         return nnindexer.prefix1
 
@@ -877,6 +959,74 @@ class NeighborIndex(object):
             idxs[sl_], dists[sl_] = indexer.knn(vecs[sl_], K=K)
         return idxs, dists
 
+    @profile
+    def batch_requery_knn(
+        indexer, vecs, K, pad, impossible_aids_list, groups, recover=True
+    ):
+        """
+        Works like `indexer.requery_knn` but searches the stacked vectors of
+        several queries at once. Row `i` of `vecs` belongs to the query
+        `groups[i]`, whose impossible annotations are
+        `impossible_aids_list[groups[i]]`.
+
+        Example:
+            >>> # ENABLE_DOCTEST
+            >>> from wbia.algo.hots.neighbor_index import *  # NOQA
+            >>> import wbia
+            >>> qreq_ = wbia.testdata_qreq_(defaultdb='testdb1', a='default')
+            >>> qreq_.load_indexer()
+            >>> indexer = qreq_.indexer
+            >>> qannots = qreq_.internal_qannots[0:2]
+            >>> vecs_list = qannots.vecs
+            >>> impossible_aids_list = [np.array([1, 2]), np.array([3, 4, 5])]
+            >>> vecs = np.vstack(vecs_list)
+            >>> groups = np.repeat(np.arange(2), list(map(len, vecs_list)))
+            >>> idxs, dists = indexer.batch_requery_knn(
+            >>>     vecs, 3, 1, impossible_aids_list, groups)
+            >>> idxs1, dists1 = indexer.requery_knn(
+            >>>     vecs_list[1], 3, 1, impossible_aids_list[1])
+            >>> assert np.all(idxs[groups == 1] == idxs1)
+        """
+        from wbia.algo.hots import requery_knn
+
+        if K == 0 or K > indexer.num_indexed or len(vecs) == 0:
+            return indexer.empty_neighbors(0, K)
+
+        invalid_axs_list = [
+            np.array(ut.take(indexer.aid2_ax, impossible_aids), dtype=np.int64)
+            for impossible_aids in impossible_aids_list
+        ]
+        invalid_keys = requery_knn.group_invalid_axs(invalid_axs_list)
+
+        def get_neighbors(vecs, temp_K):
+            return indexer.flann.nn_index(
+                vecs, temp_K, checks=indexer.checks, cores=indexer.cores
+            )
+
+        try:
+            (qfx2_idx, qfx2_raw_dist) = requery_knn.requery_knn(
+                get_neighbors,
+                indexer.get_nn_axs,
+                vecs,
+                num_neighbs=K,
+                pad=pad,
+                invalid_axs=invalid_keys,
+                limit=3,
+                recover=recover,
+                groups=np.asarray(groups),
+            )
+        except pyflann.FLANNException as ex:
+            ut.printex(
+                ex,
+                'probably misread the cached flann_fpath=%r' % (indexer.flann_fpath,),
+            )
+            raise
+        if indexer.max_distance_sqrd is not None:
+            qfx2_dist = np.divide(qfx2_raw_dist, indexer.max_distance_sqrd)
+        else:
+            qfx2_dist = qfx2_raw_dist
+        return qfx2_idx, qfx2_dist
+
     def debug_nnindexer(nnindexer):
         r"""
         Makes sure the indexer has valid SIFT descriptors
@@ -569,6 +569,11 @@ def request_diskcached_wbia_nnindexer(
     if prog_hook is not None:
         prog_hook.set_progress(1, 3, 'Loading support data for indexer')
     logger.info('[nnindex] Loading support data for indexer')
+    nnindexer = None
+    if not force_rebuild:
+        nnindexer = load_neighbor_index(flann_params, cachedir, cfgstr, verbose=verbose)
+    if nnindexer is not None:
+        return nnindexer
     vecs_list, fgws_list, fxs_list = get_support_data(qreq_, daid_list)
     if memtrack is not None:
         memtrack.report('[AFTER GET SUPPORT DATA]')
@@ -736,6 +741,48 @@ def new_neighbor_index(
     )
     if memtrack is not None:
         memtrack.report('AFTER LOAD OR BUILD')
+    nnindexer.save_support(cachedir, verbose=verbose)
+    return nnindexer
+
+
+def load_neighbor_index(flann_params, cachedir, cfgstr, verbose=True):
+    r"""
+    Loads a neighbor index whose support arrays were cached by
+    :func:`new_neighbor_index` without touching the annotation features.
+
+    The support arrays are memory mapped, so all processes on the host that
+    load the same index share one copy of the descriptors.
+
+    Returns:
+        NeighborIndex: nnindexer or None if the support is not cached
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.hots.neighbor_index_cache import *  # NOQA
+        >>> import wbia
+        >>> import numpy as np
+        >>> qreq_ = wbia.testdata_qreq_(defaultdb='testdb1', p='default:fg_on=False')
+        >>> daid_list = qreq_.daids
+        >>> cfgstr = build_nnindex_cfgstr(qreq_, daid_list)
+        >>> cachedir = qreq_.ibs.get_flann_cachedir()
+        >>> flann_params = qreq_.qparams.flann_params
+        >>> support = get_support_data(qreq_, daid_list)
+        >>> nnindexer1 = new_neighbor_index(daid_list, *support, flann_params=flann_params,
+        >>>                                 cachedir=cachedir, cfgstr=cfgstr)
+        >>> nnindexer2 = load_neighbor_index(flann_params, cachedir, cfgstr)
+        >>> assert isinstance(nnindexer2.idx2_vec, np.memmap)
+        >>> assert np.all(nnindexer1.idx2_vec == nnindexer2.idx2_vec)
+        >>> qfx2_vec = nnindexer1.idx2_vec[0:10]
+        >>> idxs1, dists1 = nnindexer1.knn(qfx2_vec, 4)
+        >>> idxs2, dists2 = nnindexer2.knn(qfx2_vec, 4)
+        >>> assert np.all(idxs1 == idxs2)
+    """
+    nnindexer = NeighborIndex(flann_params, cfgstr)
+    flann_fpath = nnindexer.load_support(cachedir, verbose=verbose)
+    if flann_fpath is None:
+        return None
+    if not nnindexer.load(fpath=flann_fpath, verbose=verbose):
+        return None
     return nnindexer
 
 
@@ -885,6 +932,7 @@ def background_flann_func(
     nnindexer.init_support(daid_list, vecs_list, fgws_list, fxs_list, verbose=True)
     # Load or build the indexing structure
     nnindexer.ensure_indexer(cachedir, verbose=True)
+    nnindexer.save_support(cachedir)
     if len(visual_uuid_list) > min_reindex_thresh:
         UUID_MAP_CACHE.write_uuid_map_dict(uuid_map_fpath, visual_uuid_list, daids_hashid)
     logger.info('[BG] Finished Background FLANN')
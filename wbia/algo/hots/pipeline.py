@@ -36,11 +36,8 @@ CommandLine:
     # Then run whichever configuration you like
     python main.py --query 1 --yes --noqcache -t default:codename=vsmany
     python main.py --query 1 --yes --noqcache -t default:codename=vsmany_nsum
-
-TODO:
-    * Don't preload the nn-indexer in case the nearest neighbors have already
-    been computed?
 """
+import contextlib
 import logging
 import numpy as np
 import vtool as vt
@@ -85,6 +82,11 @@ SVER_LVL = 'SVER:            '
 
 PROGKW = dict(freq=1, time_thresh=30.0, adjust=True)
 
+# Stage outputs shared by query requests while in a stage_cache context
+_STAGE_CACHE = None
+# Pipeline stages whose outputs are kept by the stage cache
+STAGES = ['nn', 'chipmatch']
+
 
 # Internal tuples denoting return types
 WeightRet_ = namedtuple(
@@ -195,44 +197,54 @@ def request_wbia_query_L0(ibs, qreq_, verbose=VERB_PIPELINE):
         if qreq_.prog_hook is not None:
             qreq_.prog_hook.initialize_subhooks(5)
 
-        # qreq_.lazy_load(verbose=(verbose and ut.NOT_QUIET))
-        qreq_.lazy_preload(verbose=(verbose and ut.NOT_QUIET))
-        impossible_daids_list, Kpad_list = build_impossible_daids_list(qreq_)
-
-        # Nearest neighbors (nns_list)
-        # a nns object is a tuple(ndarray, ndarray) - (qfx2_dx, qfx2_dist)
-        # * query descriptors assigned to database descriptors
-        # * FLANN used here
-        nns_list = nearest_neighbors(
-            qreq_, Kpad_list, impossible_daids_list, verbose=verbose
-        )
-
-        # Remove Impossible Votes
-        # a nnfilt object is an ndarray qfx2_valid
-        # * marks matches to the same image as invalid
-        nnvalid0_list = baseline_neighbor_filter(
-            qreq_, nns_list, impossible_daids_list, verbose=verbose
-        )
-
-        # Nearest neighbors weighting / scoring (filtweights_list)
-        # filtweights_list maps qaid to filtweights which is a dict
-        # that maps a filter name to that query's weights for that filter
-        weight_ret = weight_neighbors(qreq_, nns_list, nnvalid0_list, verbose=verbose)
-        filtkey_list, filtweights_list, filtvalids_list, filtnormks_list = weight_ret
+        cm_list_FILT = _get_stage_cache(qreq_, 'chipmatch')
+        if cm_list_FILT is None:
+            # qreq_.lazy_load(verbose=(verbose and ut.NOT_QUIET))
+            qreq_.lazy_preload(verbose=(verbose and ut.NOT_QUIET))
+            nn_ret = _get_stage_cache(qreq_, 'nn')
+            if nn_ret is None:
+                impossible_daids_list, Kpad_list = build_impossible_daids_list(qreq_)
+
+                # Nearest neighbors (nns_list)
+                # a nns object is a tuple(ndarray, ndarray) - (qfx2_dx, qfx2_dist)
+                # * query descriptors assigned to database descriptors
+                # * FLANN used here
+                nns_list = nearest_neighbors(
+                    qreq_, Kpad_list, impossible_daids_list, verbose=verbose
+                )
 
-        # Nearest neighbors to chip matches (cm_list)
-        # * Initial scoring occurs
-        # * vsone un-swapping occurs here
-        cm_list_FILT = build_chipmatches(
-            qreq_,
-            nns_list,
-            nnvalid0_list,
-            filtkey_list,
-            filtweights_list,
-            filtvalids_list,
-            filtnormks_list,
-            verbose=verbose,
-        )
+                # Remove Impossible Votes
+                # a nnfilt object is an ndarray qfx2_valid
+                # * marks matches to the same image as invalid
+                nnvalid0_list = baseline_neighbor_filter(
+                    qreq_, nns_list, impossible_daids_list, verbose=verbose
+                )
+                _set_stage_cache(qreq_, 'nn', (nns_list, nnvalid0_list, qreq_.indexer))
+            else:
+                # The neighbors index into the indexer that found them, which
+                # the weighting and chip match stages look them up in
+                nns_list, nnvalid0_list, qreq_.indexer = nn_ret
+
+            # Nearest neighbors weighting / scoring (filtweights_list)
+            # filtweights_list maps qaid to filtweights which is a dict
+            # that maps a filter name to that query's weights for that filter
+            weight_ret = weight_neighbors(qreq_, nns_list, nnvalid0_list, verbose=verbose)
+            filtkey_list, filtweights_list, filtvalids_list, filtnormks_list = weight_ret
+
+            # Nearest neighbors to chip matches (cm_list)
+            # * Initial scoring occurs
+            # * vsone un-swapping occurs here
+            cm_list_FILT = build_chipmatches(
+                qreq_,
+                nns_list,
+                nnvalid0_list,
+                filtkey_list,
+                filtweights_list,
+                filtvalids_list,
+                filtnormks_list,
+                verbose=verbose,
+            )
+            _set_stage_cache(qreq_, 'chipmatch', cm_list_FILT)
     else:
         logger.info('invalid pipeline root %r' % (qreq_.qparams.pipeline_root))
 
@@ -255,6 +267,156 @@ def request_wbia_query_L0(ibs, qreq_, verbose=VERB_PIPELINE):
     return cm_list
 
 
+@contextlib.contextmanager
+def stage_cache(qreq_list=None):
+    r"""
+    Caches the outputs of the pipeline stages before spatial verification
+    while in this context.  Query requests whose pipeline configs only differ
+    in later stages (e.g. sv_on, score_method or nNameShortlistSVER) reuse
+    the nearest neighbors and chip matches of the first one that ran.  Nested
+    contexts share the outer cache.
+
+    Args:
+        qreq_list (list): query requests that will run in this context
+            (default = None).  If given, outputs are only kept while one of
+            them can still use them, see :class:`StageCache`.
+
+    CommandLine:
+        python -m wbia.algo.hots.pipeline --test-stage_cache
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.hots.pipeline import *  # NOQA
+        >>> import wbia
+        >>> qreq_list = [wbia.testdata_qreq_(
+        >>>     defaultdb='testdb1', p=['default' + ut.get_cfg_lbl(cfgdict)],
+        >>>     qaid_override=[1, 2], daid_override=[1, 2, 3, 4, 5])
+        >>>     for cfgdict in [{}, dict(sv_on=False), dict(score_method='csum')]]
+        >>> expected = [request_wbia_query_L0(qreq_.ibs, qreq_) for qreq_ in qreq_list]
+        >>> with stage_cache(qreq_list) as cache:
+        >>>     cms_list = []
+        >>>     for qreq_ in qreq_list:
+        >>>         cms_list.append(request_wbia_query_L0(qreq_.ibs, qreq_))
+        >>>         # All three configs share their nearest neighbors and chip matches
+        >>>         print(sorted(ut.take_column(cache.groups.keys(), 0)))
+        >>>         cache.release(qreq_)
+        ['chipmatch', 'nn']
+        ['chipmatch', 'nn']
+        ['chipmatch', 'nn']
+        >>> # Nothing is kept once the last config has run
+        >>> print(cache.groups)
+        {}
+        >>> for cm_list1, cm_list2 in zip(expected, cms_list):
+        >>>     for cm1, cm2 in zip(cm_list1, cm_list2):
+        >>>         assert np.all(cm1.score_list == cm2.score_list)
+    """
+    global _STAGE_CACHE
+    prev_cache = _STAGE_CACHE
+    if prev_cache is None:
+        _STAGE_CACHE = StageCache()
+    try:
+        if qreq_list is not None:
+            _STAGE_CACHE.register(qreq_list)
+        yield _STAGE_CACHE
+    finally:
+        _STAGE_CACHE = prev_cache
+
+
+class StageCache(object):
+    """
+    Outputs of the pipeline stages before spatial verification (see
+    :func:`stage_cache`).
+
+    The outputs are grouped by :func:`_stage_groupkey`, i.e. by everything
+    except the query annotations, and keyed within a group by the query
+    annotations, so the query chunks of a request are cached separately.
+
+    Registered query requests are counted in each group they belong to. A
+    group is dropped as soon as all of its registered requests have been
+    released, and outputs are not stored at all if no other registered
+    request can use them. Groups without registered requests are kept until
+    the context exits.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.num_pending = {}
+
+    def register(self, qreq_list):
+        """Records query requests that will run in this context"""
+        for qreq_ in qreq_list:
+            for stage in STAGES:
+                groupkey = _stage_groupkey(qreq_, stage)
+                self.num_pending[groupkey] = self.num_pending.get(groupkey, 0) + 1
+
+    def release(self, qreq_):
+        """Marks a registered query request as finished"""
+        for stage in STAGES:
+            groupkey = _stage_groupkey(qreq_, stage)
+            if groupkey in self.num_pending:
+                self.num_pending[groupkey] -= 1
+                if self.num_pending[groupkey] <= 0:
+                    del self.num_pending[groupkey]
+                    self.groups.pop(groupkey, None)
+
+    def get(self, qreq_, stage):
+        group = self.groups.get(_stage_groupkey(qreq_, stage), {})
+        return group.get(_stage_querykey(qreq_))
+
+    def set(self, qreq_, stage, outputs):
+        groupkey = _stage_groupkey(qreq_, stage)
+        # The request that computed the outputs is still pending
+        if self.num_pending.get(groupkey, 2) > 1:
+            group = self.groups.setdefault(groupkey, {})
+            group[_stage_querykey(qreq_)] = outputs
+
+
+def _stage_groupkey(qreq_, stage):
+    """
+    The outputs of a stage are determined by the query and database
+    annotations (and their names) and by the config of the stages up to it.
+    This is the part of the key that does not depend on the query annotations.
+    """
+    qparams = qreq_.qparams
+    if stage == 'nn':
+        stage_cfgstr = qparams.nn_stage_cfgstr
+    else:
+        stage_cfgstr = qparams.chipmatch_stage_cfgstr
+    internal_daids = qreq_.get_internal_daids()
+    return (
+        stage,
+        qreq_.ibs.get_dbdir(),
+        tuple(internal_daids),
+        tuple(qreq_.get_qreq_annot_nids(internal_daids)),
+        stage_cfgstr,
+    )
+
+
+def _stage_querykey(qreq_):
+    internal_qaids = qreq_.get_internal_qaids()
+    return (tuple(internal_qaids), tuple(qreq_.get_qreq_annot_nids(internal_qaids)))
+
+
+def _get_stage_cache(qreq_, stage):
+    if _STAGE_CACHE is None:
+        return None
+    outputs = _STAGE_CACHE.get(qreq_, stage)
+    if outputs is not None:
+        logger.info('[hs] Reusing cached %s stage outputs' % (stage,))
+        if stage == 'chipmatch':
+            # Later stages score the chip matches in place
+            outputs = [cm.copy() for cm in outputs]
+    return outputs
+
+
+def _set_stage_cache(qreq_, stage, outputs):
+    if _STAGE_CACHE is None:
+        return
+    if stage == 'chipmatch':
+        outputs = [cm.copy() for cm in outputs]
+    _STAGE_CACHE.set(qreq_, stage, outputs)
+
+
 # ============================
 # 0) Nearest Neighbors
 # ============================
@@ -533,7 +695,19 @@ def cachemiss_nn_compute_fn(
             logger.info('[hs] depth(qvecs_list) = %r' % (ut.depth_profile(qvecs_list),))
     # Mark progress ane execute nearest indexer nearest neighbor code
     prog_hook = None if qreq_.prog_hook is None else qreq_.prog_hook.next_subhook()
-    if requery:
+    if qreq_.qparams.batch_knn:
+        impossible_daids_list_ = (
+            ut.compress(impossible_daids_list, flags_list) if requery else None
+        )
+        idx_dist_list = batched_nearest_neighbors(
+            qreq_.indexer,
+            qvecs_list,
+            num_neighbors_list,
+            Kpad_list,
+            impossible_daids_list_,
+            requery,
+        )
+    elif requery:
         # assert False, (
         #     'need to implement part where matches with the same name are not considered'
         # )
@@ -577,6 +751,89 @@ def cachemiss_nn_compute_fn(
     return nns_list
 
 
+@profile
+def batched_nearest_neighbors(
+    indexer,
+    qvecs_list,
+    num_neighbors_list,
+    Kpad_list,
+    impossible_daids_list=None,
+    requery=False,
+):
+    """
+    Finds the neighbors of many query annotations with a few large knn calls.
+
+    The descriptors of all queries that need the same number of neighbors
+    (and the same requery padding) are stacked into one contiguous array and
+    searched at once. The results are split back into one (idxs, dists) tuple
+    per query using the row offsets of each query in the stack, so they are
+    the same as searching every query separately. When requerying, each row
+    only rejects the impossible daids of the query it belongs to.
+
+    Args:
+        indexer (NeighborIndex):
+        qvecs_list (list): descriptors of each query annotation
+        num_neighbors_list (list): number of neighbors for each query
+        Kpad_list (list): requery padding of each query
+        impossible_daids_list (list): daids each query can not match.
+            Only used when requery is True
+        requery (bool):
+
+    Returns:
+        list: idx_dist_list - a (qfx2_idx, qfx2_dist) tuple for each query
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.hots.pipeline import *  # NOQA
+        >>> import wbia
+        >>> qreq_ = wbia.testdata_qreq_(defaultdb='testdb1', qaid_override=[1, 2, 3])
+        >>> qreq_.load_indexer()
+        >>> indexer = qreq_.indexer
+        >>> qvecs_list = qreq_.internal_qannots.vecs
+        >>> num_neighbors_list = [3, 4, 3]
+        >>> Kpad_list = [0, 1, 0]
+        >>> idx_dist_list = batched_nearest_neighbors(
+        >>>     indexer, qvecs_list, num_neighbors_list, Kpad_list)
+        >>> for qvecs, K, (idxs, dists) in zip(qvecs_list, num_neighbors_list, idx_dist_list):
+        >>>     idxs1, dists1 = indexer.knn(qvecs, K)
+        >>>     assert np.all(idxs == idxs1)
+    """
+    nQueries = len(qvecs_list)
+    idx_dist_list = [None] * nQueries
+    if requery:
+        keys = list(zip(num_neighbors_list, Kpad_list))
+    else:
+        keys = list(zip(num_neighbors_list, [None] * nQueries))
+    key_to_qxs = ut.group_items(list(range(nQueries)), keys)
+    for (num_neighbors, pad), qxs in key_to_qxs.items():
+        group_vecs_list = ut.take(qvecs_list, qxs)
+        lens = [len(qvecs) for qvecs in group_vecs_list]
+        if sum(lens) == 0 or num_neighbors == 0 or num_neighbors > indexer.num_indexed:
+            # Degenerate cases are handled by the single query functions
+            for qx in qxs:
+                if requery:
+                    idx_dist_list[qx] = indexer.requery_knn(
+                        qvecs_list[qx], num_neighbors, pad, impossible_daids_list[qx]
+                    )
+                else:
+                    idx_dist_list[qx] = indexer.knn(qvecs_list[qx], num_neighbors)
+            continue
+        vecs = np.vstack(group_vecs_list)
+        if requery:
+            groups = np.repeat(np.arange(len(qxs)), lens)
+            group_impossible_list = ut.take(impossible_daids_list, qxs)
+            idxs, dists = indexer.batch_requery_knn(
+                vecs, num_neighbors, pad, group_impossible_list, groups
+            )
+        else:
+            idxs, dists = indexer.batch_knn(vecs, num_neighbors, label=NN_LBL)
+        # Split the stacked results back into each query using offsets
+        offsets = np.cumsum([0] + lens)
+        for qx, start, stop in zip(qxs, offsets[:-1], offsets[1:]):
+            idx_dist_list[qx] = (idxs[start:stop], dists[start:stop])
+    return idx_dist_list
+
+
 @profile
 def nearest_neighbors(
     qreq_, Kpad_list, impossible_daids_list=None, verbose=VERB_PIPELINE
@@ -1341,13 +1598,241 @@ def _spatial_verification(qreq_, cm_list, verbose=VERB_PIPELINE):
         **PROGKW,
     )
 
-    cm_list_SVER = [sver_single_chipmatch(qreq_, cm) for cm in cm_progiter]
+    sver_executor = qreq_.qparams.sver_executor
+    if sver_executor is None or len(cm_shortlist) <= 1:
+        cm_list_SVER = [sver_single_chipmatch(qreq_, cm) for cm in cm_progiter]
+    else:
+        cm_list_SVER = _parallel_sver_chipmatches(
+            qreq_, cm_shortlist, cm_progiter, sver_executor
+        )
     # rescore after verification?
     return cm_list_SVER
 
 
+def _sver_params(qreq_):
+    """keyword arguments passed to vt.spatially_verify_kpts"""
+    return dict(
+        xy_thresh=qreq_.qparams.xy_thresh,
+        scale_thresh=qreq_.qparams.scale_thresh,
+        ori_thresh=qreq_.qparams.ori_thresh,
+        min_nInliers=qreq_.qparams.min_nInliers,
+        full_homog_checks=qreq_.qparams.full_homog_checks,
+        refine_method=qreq_.qparams.refine_method,
+    )
+
+
+def _sver_prefetch(qreq_, cm_list):
+    """
+    Loads the keypoints (and the other per-annotation inputs of spatial
+    verification) for every chipmatch in ``cm_list`` with one bulk call per
+    property instead of one call per chipmatch.
+
+    Returns:
+        dict: prefetch - maps property names to ``{aid: value}`` dicts
+    """
+    config2_ = qreq_.extern_query_config2
+    qaids = ut.unique([cm.qaid for cm in cm_list])
+    daids = ut.unique(ut.flatten([cm.daid_list for cm in cm_list]))
+    qkpts_list = [kpts.astype(np.float64) for kpts in qreq_.get_qreq_qannot_kpts(qaids)]
+    prefetch = {
+        'qaid2_kpts': dict(zip(qaids, qkpts_list)),
+        'daid2_kpts': dict(zip(daids, qreq_.get_qreq_dannot_kpts(daids))),
+    }
+    if qreq_.qparams.use_chip_extent:
+        dlen_sqrd_list = qreq_.ibs.get_annot_chip_dlensqrd(
+            daids, config2_=qreq_.extern_data_config2
+        )
+        prefetch['daid2_dlen_sqrd'] = dict(zip(daids, dlen_sqrd_list))
+    if qreq_.qparams.weight_inliers:
+        if config2_.get('fg_on'):
+            qweights_list = [
+                weights.astype(np.float64)
+                for weights in qreq_.ibs.get_annot_fgweights(
+                    qaids, ensure=True, config2_=config2_
+                )
+            ]
+        else:
+            num_list = qreq_.ibs.get_annot_num_feats(qaids, config2_=config2_)
+            qweights_list = [np.ones(num, np.float64) for num in num_list]
+        prefetch['qaid2_weights'] = dict(zip(qaids, qweights_list))
+    return prefetch
+
+
+def _sver_inputs(qreq_, cm, prefetch=None):
+    """
+    Gathers the arrays needed to spatially verify the shortlist of ``cm``.
+    Uses the bulk ``prefetch`` from :func:`_sver_prefetch` when given.
+
+    Returns:
+        tuple: (kpts1, kpts2_list, dlen_sqrd_list, match_weight_list)
+    """
+    qaid = cm.qaid
+    config2_ = qreq_.extern_query_config2
+    if prefetch is None:
+        kpts1 = qreq_.get_qreq_qannot_kpts(qaid).astype(np.float64)
+        kpts2_list = qreq_.get_qreq_dannot_kpts(cm.daid_list)
+    else:
+        kpts1 = prefetch['qaid2_kpts'][qaid]
+        kpts2_list = ut.take(prefetch['daid2_kpts'], cm.daid_list)
+
+    if qreq_.qparams.use_chip_extent:
+        if prefetch is None:
+            dlen_sqrd_list = qreq_.ibs.get_annot_chip_dlensqrd(
+                cm.daid_list, config2_=qreq_.extern_data_config2
+            )
+        else:
+            dlen_sqrd_list = ut.take(prefetch['daid2_dlen_sqrd'], cm.daid_list)
+    else:
+        dlen_sqrd_list = compute_matching_dlen_extent(qreq_, cm.fm_list, kpts2_list)
+
+    if qreq_.qparams.weight_inliers:
+        # Weights for inlier scoring
+        if prefetch is not None:
+            qweights = prefetch['qaid2_weights'][qaid]
+        elif config2_.get('fg_on'):
+            qweights = qreq_.ibs.get_annot_fgweights(
+                [qaid], ensure=True, config2_=config2_
+            )[0].astype(np.float64)
+        else:
+            num = qreq_.ibs.get_annot_num_feats([qaid], config2_=config2_)[0]
+            qweights = np.ones(num, np.float64)
+        match_weight_list = [qweights.take(fm.T[0]) for fm in cm.fm_list]
+    else:
+        match_weight_list = [np.ones(len(fm), dtype=np.float64) for fm in cm.fm_list]
+    return kpts1, kpts2_list, dlen_sqrd_list, match_weight_list
+
+
+def _sver_compute_svtups(
+    kpts1, kpts2_list, fm_list, dlen_sqrd_list, match_weight_list, sver_kw, verbose=False
+):
+    """
+    Runs vt.spatially_verify_kpts for each database annotation in a
+    shortlist. Only touches numpy arrays, so it is safe to call from a worker.
+
+    Returns:
+        list: svtup_list - an sver tuple (or None) for each item in the shortlist
+    """
+    _iter1 = zip(fm_list, kpts2_list, dlen_sqrd_list, match_weight_list)
+    if verbose:
+        _iter1 = ut.ProgIter(_iter1, length=len(fm_list), lbl='sver shortlist', freq=1)
+    svtup_list = []
+    for fm, kpts2, dlen_sqrd2, match_weights in _iter1:
+        if len(fm) == 0:
+            # skip results without any matches
+            sv_tup = None
+        else:
+            try:
+                # Compute homography from chip2 to chip1 returned homography
+                # maps image1 space into image2 space image1 is a query chip
+                # and image2 is a database chip
+                sv_tup = vt.spatially_verify_kpts(
+                    kpts1,
+                    kpts2,
+                    fm,
+                    dlen_sqrd2=dlen_sqrd2,
+                    match_weights=match_weights,
+                    returnAff=True,
+                    **sver_kw,
+                )
+            except Exception as ex:
+                xy_thresh = sver_kw['xy_thresh']  # NOQA
+                scale_thresh = sver_kw['scale_thresh']  # NOQA
+                min_nInliers = sver_kw['min_nInliers']  # NOQA
+                ut.printex(
+                    ex,
+                    'Unknown error in spatial verification.',
+                    keys=[
+                        'kpts1',
+                        'kpts2',
+                        'fm',
+                        'xy_thresh',
+                        'scale_thresh',
+                        'dlen_sqrd2',
+                        'min_nInliers',
+                    ],
+                )
+                sv_tup = None
+        svtup_list.append(sv_tup)
+    return svtup_list
+
+
+# Tasks shared with forked sver workers (see ``_parallel_sver_chipmatches``)
+_SVER_PROCESS_TASKS = None
+
+
+def _sver_process_worker(index):
+    """Spatially verifies one shared task inside a forked worker"""
+    return _sver_compute_svtups(*_SVER_PROCESS_TASKS[index])
+
+
+def _parallel_sver_chipmatches(qreq_, cm_shortlist, cm_progiter, sver_executor):
+    """
+    Spatially verifies each chipmatch in a worker pool.
+
+    The keypoints, chip extents and inlier weights of every annotation in the
+    shortlists are loaded up front with one bulk request per property. The
+    workers only receive these read-only numpy arrays and never touch the
+    controller. With ``sver_executor='thread'`` the arrays are shared
+    directly; with ``sver_executor='process'`` the task list is placed in a
+    module global before the pool is forked, so the workers inherit it
+    copy-on-write and only the sver tuples are sent back.
+
+    The chipmatches are rebuilt in the parent in their original order.
+    """
+    from concurrent import futures
+    import multiprocessing
+
+    global _SVER_PROCESS_TASKS
+    num_workers = qreq_.qparams.sver_workers
+    if num_workers is None:
+        num_workers = ut.num_cpus()
+    num_workers = max(1, min(num_workers, len(cm_shortlist)))
+    sver_kw = _sver_params(qreq_)
+
+    prefetch = _sver_prefetch(qreq_, cm_shortlist)
+    task_list = []
+    for cm in cm_shortlist:
+        kpts1, kpts2_list, dlen_sqrd_list, match_weight_list = _sver_inputs(
+            qreq_, cm, prefetch
+        )
+        task_list.append(
+            (kpts1, kpts2_list, cm.fm_list, dlen_sqrd_list, match_weight_list, sver_kw)
+        )
+    del prefetch
+
+    if sver_executor == 'thread':
+        executor = futures.ThreadPoolExecutor(num_workers)
+    elif sver_executor == 'process':
+        _SVER_PROCESS_TASKS = task_list
+        executor = futures.ProcessPoolExecutor(
+            num_workers, mp_context=multiprocessing.get_context('fork')
+        )
+    else:
+        raise ValueError('unknown sver_executor=%r' % (sver_executor,))
+
+    try:
+        if sver_executor == 'thread':
+            fs_list = [executor.submit(_sver_compute_svtups, *task) for task in task_list]
+        else:
+            fs_list = [
+                executor.submit(_sver_process_worker, index)
+                for index in range(len(task_list))
+            ]
+        cm_list_SVER = []
+        for cm, task, fs in zip(cm_progiter, task_list, fs_list):
+            svtup_list = fs.result()
+            dlen_sqrd_list = task[3]
+            cm_list_SVER.append(
+                _sver_build_chipmatch(qreq_, cm, svtup_list, dlen_sqrd_list)
+            )
+    finally:
+        executor.shutdown(wait=True)
+        _SVER_PROCESS_TASKS = None
+    return cm_list_SVER
+
+
 # @profile
-def sver_single_chipmatch(qreq_, cm, verbose=False):
+def sver_single_chipmatch(qreq_, cm, verbose=False, prefetch=None):
     r"""
     Spatially verifies a shortlist of a single chipmatch
 
@@ -1358,6 +1843,8 @@ def sver_single_chipmatch(qreq_, cm, verbose=False):
     Args:
         qreq_ (QueryRequest):  query request object with hyper-parameters
         cm (ChipMatch):
+        verbose (bool):
+        prefetch (dict): bulk loaded inputs from _sver_prefetch (default = None)
 
     Returns:
         wbia.ChipMatch: cmSV
@@ -1410,6 +1897,7 @@ def sver_single_chipmatch(qreq_, cm, verbose=False):
         >>> #locals_ = ut.exec_func_src(sver_single_chipmatch, key_list=['svtup_list'], sentinal='# <SENTINAL>')
         >>> #svtup_list1, = locals_
         >>> verbose = True
+        >>> prefetch = None
         >>> source = ut.get_func_sourcecode(sver_single_chipmatch, stripdef=True, strip_docstr=True)
         >>> source = ut.replace_between_tags(source, '', '# <SENTINAL>', '# </SENTINAL>')
         >>> globals_ = globals().copy()
@@ -1451,111 +1939,33 @@ def sver_single_chipmatch(qreq_, cm, verbose=False):
         >>>                    refine_method=refine_method)
         >>> ut.show_if_requested()
     """
-    qaid = cm.qaid
-    use_chip_extent = qreq_.qparams.use_chip_extent
-    xy_thresh = qreq_.qparams.xy_thresh
-    scale_thresh = qreq_.qparams.scale_thresh
-    ori_thresh = qreq_.qparams.ori_thresh
-    min_nInliers = qreq_.qparams.min_nInliers
-    full_homog_checks = qreq_.qparams.full_homog_checks
-    refine_method = qreq_.qparams.refine_method
-    sver_output_weighting = qreq_.qparams.sver_output_weighting
+    sver_kw = _sver_params(qreq_)
     # Precompute sver cmtup_old
-    kpts1 = qreq_.get_qreq_qannot_kpts(qaid).astype(np.float64)
-    kpts2_list = qreq_.get_qreq_dannot_kpts(cm.daid_list)
-
-    if use_chip_extent:
-        top_dlen_sqrd_list = qreq_.ibs.get_annot_chip_dlensqrd(
-            cm.daid_list, config2_=qreq_.extern_data_config2
-        )
-    else:
-        top_dlen_sqrd_list = compute_matching_dlen_extent(qreq_, cm.fm_list, kpts2_list)
-    config2_ = qreq_.extern_query_config2
-    if qreq_.qparams.weight_inliers:
-        # Weights for inlier scoring
-        if config2_.get('fg_on'):
-            qweights = qreq_.ibs.get_annot_fgweights(
-                [qaid], ensure=True, config2_=config2_
-            )[0].astype(np.float64)
-        else:
-            num = qreq_.ibs.get_annot_num_feats([qaid], config2_=config2_)[0]
-            qweights = np.ones(num, np.float64)
-        match_weight_list = [qweights.take(fm.T[0]) for fm in cm.fm_list]
-    else:
-        match_weight_list = [np.ones(len(fm), dtype=np.float64) for fm in cm.fm_list]
-
+    kpts1, kpts2_list, top_dlen_sqrd_list, match_weight_list = _sver_inputs(
+        qreq_, cm, prefetch
+    )
     # Make an svtup for every daid in the shortlist
-    _iter1 = zip(
-        cm.daid_list,
-        cm.fm_list,
-        cm.fsv_list,
+    svtup_list = _sver_compute_svtups(
+        kpts1,
         kpts2_list,
+        cm.fm_list,
         top_dlen_sqrd_list,
         match_weight_list,
+        sver_kw,
+        verbose=verbose,
     )
-    if verbose:
-        _iter1 = ut.ProgIter(
-            _iter1, length=len(cm.daid_list), lbl='sver shortlist', freq=1
-        )
-    svtup_list = []
-    for daid, fm, fsv, kpts2, dlen_sqrd2, match_weights in _iter1:
-        if len(fm) == 0:
-            # skip results without any matches
-            sv_tup = None
-        else:
+    # <SENTINAL>
+    cmSV = _sver_build_chipmatch(qreq_, cm, svtup_list, top_dlen_sqrd_list)
+    return cmSV
 
-            # sver_testdata = dict(
-            #     kpts1=kpts1,
-            #     kpts2=kpts2,
-            #     fm=fm,
-            #     xy_thresh=xy_thresh,
-            #     scale_thresh=scale_thresh,
-            #     ori_thresh=ori_thresh,
-            #     dlen_sqrd2=dlen_sqrd2,
-            #     min_nInliers=min_nInliers,
-            #     match_weights=match_weights,
-            #     full_homog_checks=full_homog_checks,
-            #     refine_method=refine_method
-            # )
-
-            # locals().update(ut.load_data('sver_testdata.pkl'))
 
-            try:
-                # Compute homography from chip2 to chip1 returned homography
-                # maps image1 space into image2 space image1 is a query chip
-                # and image2 is a database chip
-                sv_tup = vt.spatially_verify_kpts(
-                    kpts1,
-                    kpts2,
-                    fm,
-                    xy_thresh,
-                    scale_thresh,
-                    ori_thresh,
-                    dlen_sqrd2,
-                    min_nInliers,
-                    match_weights=match_weights,
-                    full_homog_checks=full_homog_checks,
-                    refine_method=refine_method,
-                    returnAff=True,
-                )
-            except Exception as ex:
-                ut.printex(
-                    ex,
-                    'Unknown error in spatial verification.',
-                    keys=[
-                        'kpts1',
-                        'kpts2',
-                        'fm',
-                        'xy_thresh',
-                        'scale_thresh',
-                        'dlen_sqrd2',
-                        'min_nInliers',
-                    ],
-                )
-                sv_tup = None
-        svtup_list.append(sv_tup)
-
-    # <SENTINAL>
+def _sver_build_chipmatch(qreq_, cm, svtup_list, dlen_sqrd_list):
+    """
+    Builds the spatially verified chipmatch from the sver tuples of each
+    database annotation in the shortlist of ``cm``.
+    """
+    xy_thresh = qreq_.qparams.xy_thresh
+    sver_output_weighting = qreq_.qparams.sver_output_weighting
 
     # New way
     inliers_list = []
@@ -1578,6 +1988,8 @@ def sver_single_chipmatch(qreq_, cm, verbose=False):
 
     if sver_output_weighting:
         homog_err_weight_list = []
+        # Uses the extent of the last item in the shortlist
+        dlen_sqrd2 = dlen_sqrd_list[-1]
         xy_thresh_sqrd = dlen_sqrd2 * xy_thresh
         for sv_tup in svtup_list_:
             (homog_inliers, homog_errors) = sv_tup[0:2]
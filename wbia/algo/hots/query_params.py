@@ -86,6 +86,15 @@ class QueryParams(Mapping):
         qparams.sv_cfgstr = query_cfg.sv_cfg.get_cfgstr()
         qparams.flann_cfgstr = query_cfg.flann_cfg.get_cfgstr()
         qparams.query_cfgstr = query_cfg.get_cfgstr()
+        # Configs that determine the outputs of the pipeline stages before
+        # spatial verification (see pipeline.stage_cache)
+        qparams.chipmatch_stage_cfgstr = query_cfg.get_cfgstr(use_sv=False, use_agg=False)
+        qparams.nn_stage_cfgstr = query_cfg.get_cfgstr(
+            use_nnweight=False, use_sv=False, use_agg=False
+        ) + '_Impossible(sameimg=%s,samename=%s)' % (
+            query_cfg.nnweight_cfg.can_match_sameimg,
+            query_cfg.nnweight_cfg.can_match_samename,
+        )
 
     def hack_lnbnn_config_trail(qparams):
         query_cfg = Config.QueryConfig()
@@ -15,12 +15,14 @@ import vtool as vt
 import utool as ut
 import numpy as np
 from wbia.algo.hots import neighbor_index_cache
+from wbia.algo.hots import incremental_index
 
 # from wbia.algo.hots import multi_index
 # from wbia.algo.hots import scorenorm
 # from wbia.algo.hots import distinctiveness_normalizer
 from wbia.algo.hots import query_params
 from wbia.algo.hots import chip_match
+from wbia.algo.hots import chip_match_store
 from wbia.algo.hots import _pipeline_helpers as plh  # NOQA
 import wbia.constants as const
 
@@ -1248,6 +1250,12 @@ class QueryRequest(ut.NiceRepr):
                     prog_hook=prog_hook,
                     **qreq_._indexer_request_params,
                 )
+            elif index_method == 'incremental':
+                if ut.VERYVERBOSE or verbose:
+                    logger.info('[qreq] loading incremental indexer')
+                indexer = incremental_index.request_incremental_nnindexer(
+                    qreq_, verbose=verbose
+                )
             # elif index_method == 'multi':
             #    if ut.VERYVERBOSE or verbose:
             #        logger.info('[qreq] loading multi indexer normalizer')
@@ -1289,6 +1297,26 @@ class QueryRequest(ut.NiceRepr):
             fpath = join(dpath, fname)
             yield fpath
 
+    def get_chipmatch_store(qreq_, super_qres_cache=False):
+        r"""
+        Returns the columnar chipmatch store of the query configuration
+        """
+        if super_qres_cache:
+            cfgstr = 'supercache'
+        else:
+            cfgstr = qreq_.get_cfgstr(with_input=False, with_data=True, with_pipe=True)
+            cfgstr = ut.hashstr27(cfgstr)
+        dpath = join(qreq_.get_qresdir(), 'cmstore_' + cfgstr)
+        return chip_match_store.ChipMatchStore(dpath)
+
+    def get_chipmatch_keys(qreq_, qaid_list):
+        r"""
+        Generates the keys of the query annotations in the chipmatch store
+        """
+        qauuid_list = qreq_.get_qreq_pcc_uuids(qaid_list)
+        for qaid, qauuid in zip(qaid_list, qauuid_list):
+            yield 'qaid=%d_quuid=%s' % (qaid, qauuid)
+
     def execute(
         qreq_,
         qaids=None,
@@ -31,7 +31,7 @@ class FinalResults(ut.NiceRepr):
 class TempQuery(ut.NiceRepr):
     """queries that are incomplete"""
 
-    def __init__(query, vecs, invalid_axs, get_neighbors, get_axs):
+    def __init__(query, vecs, invalid_axs, get_neighbors, get_axs, groups=None):
         # Static attributes
         query.invalid_axs = invalid_axs
         query.get_neighbors = get_neighbors
@@ -39,6 +39,8 @@ class TempQuery(ut.NiceRepr):
         # Dynamic attributes
         query.index = np.arange(len(vecs))
         query.vecs = vecs
+        # When given, each vector belongs to the group with its own invalid axs
+        query.groups = groups
 
     def __nice__(query):
         return str(query.index)
@@ -48,7 +50,13 @@ class TempQuery(ut.NiceRepr):
         idxs = vt.atleast_nd(_idxs, 2)
         dists = vt.atleast_nd(_dists, 2)
         # Flag any neighbors that are invalid
-        validflags = ~in1d_shape(query.get_axs(idxs), query.invalid_axs)
+        if query.groups is None:
+            validflags = ~in1d_shape(query.get_axs(idxs), query.invalid_axs)
+        else:
+            validflags = ~in1d_shape(
+                group_keys(query.groups[:, None], query.get_axs(idxs)),
+                query.invalid_axs,
+            )
         # Store results in an object
         cand = TempResults(query.index, idxs, dists, validflags)
         return cand
@@ -56,6 +64,8 @@ class TempQuery(ut.NiceRepr):
     def compress_inplace(query, flags):
         query.index = query.index.compress(flags, axis=0)
         query.vecs = query.vecs.compress(flags, axis=0)
+        if query.groups is not None:
+            query.groups = query.groups.compress(flags, axis=0)
 
 
 class TempResults(ut.NiceRepr):
@@ -114,6 +124,37 @@ def in1d_shape(arr1, arr2):
     return np.in1d(arr1, arr2).reshape(arr1.shape)
 
 
+def group_keys(groups, axs):
+    """
+    Combines group indices and annotation indices into a single integer key,
+    so a single np.in1d can check per-group invalid annotations.
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.hots.requery_knn import *  # NOQA
+        >>> keys = group_keys(np.array([[0], [1]]), np.array([[3, 4], [3, 5]]))
+        >>> invalid_keys = group_keys(np.array([1]), np.array([3]))
+        >>> print(in1d_shape(keys, invalid_keys))
+        [[False False]
+         [ True False]]
+    """
+    return (np.asarray(groups, dtype=np.int64) << 32) | np.asarray(axs, dtype=np.int64)
+
+
+def group_invalid_axs(invalid_axs_list):
+    """
+    Builds the key set used by ``requery_knn`` when each group of query
+    vectors has its own list of invalid annotation indices.
+    """
+    key_list = [
+        group_keys(np.full(len(invalid_axs), groupx), invalid_axs)
+        for groupx, invalid_axs in enumerate(invalid_axs_list)
+    ]
+    if len(key_list) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.hstack(key_list)
+
+
 def requery_knn(
     get_neighbors,
     get_axs,
@@ -123,11 +164,16 @@ def requery_knn(
     pad=2,
     limit=4,
     recover=True,
+    groups=None,
 ):
     """
     Searches for `num_neighbs`, while ignoring certain matches.  K is
     increassed until enough valid neighbors are found or a limit is reached.
 
+    If `groups` is given, the vectors of several queries are searched at once.
+    Row `i` of `qfx2_vec` belongs to query `groups[i]` and `invalid_axs` must
+    be the keys built by `group_invalid_axs` from one array per query.
+
     Example:
         >>> # ENABLE_DOCTEST
         >>> from wbia.algo.hots.neighbor_index import *  # NOQA
@@ -193,7 +239,7 @@ def requery_knn(
     # Alloc space for final results
     shape = (len(qfx2_vec), num_neighbs)
     final = FinalResults(shape)  # NOQA
-    query = TempQuery(qfx2_vec, invalid_axs, get_neighbors, get_axs)
+    query = TempQuery(qfx2_vec, invalid_axs, get_neighbors, get_axs, groups=groups)
 
     temp_K = num_neighbs + pad
     assert limit > 0, 'must have at least one iteration'
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import logging
 import os
-from os.path import splitext, basename, isabs
+import threading
+from os.path import splitext, basename, exists
 import warnings
 import vtool.exif as vtexif
 import utool as ut
@@ -34,123 +35,107 @@ def get_standard_ext(gpath):
     return '.jpg' if ext == '.jpeg' else ext
 
 
-@profile
-def parse_imageinfo(gpath, cleanup=False):
-    """Worker function: gpath must be in UNIX-PATH format!
+# Concurrency of the image ingestion pipeline (see parse_imageinfo_stream)
+INGEST_FETCH_WORKERS = ut.get_argval('--ingest-fetch-workers', type_=int, default=16)
+INGEST_PARSE_WORKERS = ut.get_argval('--ingest-parse-workers', type_=int, default=None)
+# Smaller batches are parsed in threads, which avoids starting the processes
+INGEST_PROCESS_MIN = ut.get_argval('--ingest-process-min', type_=int, default=256)
 
-    Args:
-        gpath (str): image path
+URL_PROTOS = ['https://', 'http://']
+S3_PROTOS = ['s3://']
+HOUSTON_PROTOS = ['houston+']
+REMOTE_PROTOS = S3_PROTOS + URL_PROTOS + HOUSTON_PROTOS
 
-    Returns:
-        tuple: param_tup -
-            if successful returns a tuple of image parameters which are values
-            for SQL columns on else returns None
 
-    CommandLine:
-        python -m wbia.algo.preproc.preproc_image --exec-parse_imageinfo
+def _isproto(gpath, valid_protos):
+    return any(gpath.startswith(proto) for proto in valid_protos)
 
-    Doctest:
-        >>> from wbia.algo.preproc.preproc_image import *  # NOQA
-        >>> gpath = ut.grab_test_imgpath('patsy.jpg')
-        >>> gpath_, param_tup = parse_imageinfo(gpath)
-        >>> result = ('param_tup = %s' % (str(param_tup),))
-        >>> print(result)
-        >>> uuid = param_tup[0]
-        >>> assert str(uuid) == '16008058-788c-2d48-cd50-f6029f726cbf'
+
+def _remove_temp_file(temp_filepath):
+    if temp_filepath is not None and exists(temp_filepath):
+        os.unlink(temp_filepath)
+
+
+def fetch_image(gpath):
+    """Worker function: caches a remote (URL, S3 or Houston) image to a
+    temporary file. Local paths are returned as they are.
+
+    Args:
+        gpath (str): image path in UNIX-PATH format or image URI
+
+    Returns:
+        tuple: (gpath_, temp_filepath) - the local path to read the image from
+            and the temporary file it was downloaded to (None for local
+            images). ``gpath_`` is None if the download failed.
     """
-    # Try to open the image
     from PIL import Image
     import tempfile
     import requests
-    import cv2
-
     import urllib
 
-    if gpath is None:
-        return None, None
-    elif isinstance(gpath, dict) and len(gpath) == 0:
-        return None, None
-    else:
-        pass
-
     urlsplit = urllib.parse.urlsplit
     urlquote = urllib.parse.quote
     urlunquote = urllib.parse.unquote
 
-    gpath = gpath.strip()
-
-    url_protos = ['https://', 'http://']
-    s3_proto = ['s3://']
-    houston_proto = ['houston+']
-    valid_protos = s3_proto + url_protos + houston_proto
-
-    def isproto(gpath, valid_protos):
-        return any(gpath.startswith(proto) for proto in valid_protos)
-
-    def islocal(gpath):
-        return not (isabs(gpath) and isproto(gpath, valid_protos))
+    if not _isproto(gpath, REMOTE_PROTOS):
+        return gpath, None
 
+    temp_filepath = None
     with warnings.catch_warnings(record=True) as w:
         try:
-            if isproto(gpath, valid_protos):
-                # suffix = '.%s' % (basename(gpath), )
-                filename = basename(gpath)
-                _, ext = splitext(filename)
-                # base = filename
-                base = ut.random_nonce(16)
-                suffix = '.%s%s' % (base, ext)
-                temp_file, temp_filepath = tempfile.mkstemp(suffix=suffix)
-                args = (
-                    gpath,
-                    temp_filepath,
-                )
-                logger.info(
-                    '[preproc] Caching remote %s file to temporary file %r' % args
-                )
-
-                if isproto(gpath, s3_proto):
-                    s3_dict = ut.s3_str_decode_to_dict(gpath)
-                    ut.grab_s3_contents(temp_filepath, **s3_dict)
-                if isproto(gpath, url_protos):
-                    # Ensure that the Unicode string is properly encoded for web requests
-                    uri_ = urlunquote(gpath)
-                    uri_ = urlsplit(uri_, allow_fragments=False)
-                    uri_path = urlquote(uri_.path.encode('utf8'))
-                    uri_ = uri_._replace(path=uri_path)
-                    uri_ = uri_.geturl()
-                    try:
-                        response = requests.get(uri_, stream=True, allow_redirects=True)
-                        assert (
-                            response.status_code == 200
-                        ), '200 code not received on download'
-                    except Exception:
-                        parts = urlsplit(uri_, allow_fragments=False)
-                        uri_ = uri_[len('%s://' % (parts.scheme,)) :]
-                        hostname = urlquote(parts.hostname.encode('utf8'))
-                        if parts.port:
-                            hostname = f'{hostname}:{parts.port}'
-                        uri_ = '%s://%s%s' % (parts.scheme, hostname, parts.path)
-                        response = requests.get(uri_, stream=True, allow_redirects=True)
-                        assert (
-                            response.status_code == 200
-                        ), '200 code not received on download'
-
-                    # Save
-                    with open(temp_filepath, 'wb') as temp_file_:
-                        for chunk in response.iter_content(1024):
-                            temp_file_.write(chunk)
-                elif isproto(gpath, houston_proto):
-                    response = call_houston(gpath)
+            # suffix = '.%s' % (basename(gpath), )
+            filename = basename(gpath)
+            _, ext = splitext(filename)
+            # base = filename
+            base = ut.random_nonce(16)
+            suffix = '.%s%s' % (base, ext)
+            temp_file, temp_filepath = tempfile.mkstemp(suffix=suffix)
+            os.close(temp_file)
+            args = (
+                gpath,
+                temp_filepath,
+            )
+            logger.info('[preproc] Caching remote %s file to temporary file %r' % args)
+
+            if _isproto(gpath, S3_PROTOS):
+                s3_dict = ut.s3_str_decode_to_dict(gpath)
+                ut.grab_s3_contents(temp_filepath, **s3_dict)
+            if _isproto(gpath, URL_PROTOS):
+                # Ensure that the Unicode string is properly encoded for web requests
+                uri_ = urlunquote(gpath)
+                uri_ = urlsplit(uri_, allow_fragments=False)
+                uri_path = urlquote(uri_.path.encode('utf8'))
+                uri_ = uri_._replace(path=uri_path)
+                uri_ = uri_.geturl()
+                try:
+                    response = requests.get(uri_, stream=True, allow_redirects=True)
+                    assert (
+                        response.status_code == 200
+                    ), '200 code not received on download'
+                except Exception:
+                    parts = urlsplit(uri_, allow_fragments=False)
+                    uri_ = uri_[len('%s://' % (parts.scheme,)) :]
+                    hostname = urlquote(parts.hostname.encode('utf8'))
+                    if parts.port:
+                        hostname = f'{hostname}:{parts.port}'
+                    uri_ = '%s://%s%s' % (parts.scheme, hostname, parts.path)
+                    response = requests.get(uri_, stream=True, allow_redirects=True)
                     assert (
                         response.status_code == 200
-                    ), f'200 code not received on download: {gpath}'
-                    with open(temp_filepath, 'wb') as temp_file_:
-                        for chunk in response.iter_content(1024):
-                            temp_file_.write(chunk)
-                gpath_ = temp_filepath
-            else:
-                temp_file, temp_filepath = None, None
-                gpath_ = gpath
+                    ), '200 code not received on download'
+
+                # Save
+                with open(temp_filepath, 'wb') as temp_file_:
+                    for chunk in response.iter_content(1024):
+                        temp_file_.write(chunk)
+            elif _isproto(gpath, HOUSTON_PROTOS):
+                response = call_houston(gpath)
+                assert (
+                    response.status_code == 200
+                ), f'200 code not received on download: {gpath}'
+                with open(temp_filepath, 'wb') as temp_file_:
+                    for chunk in response.iter_content(1024):
+                        temp_file_.write(chunk)
         except (
             AssertionError,
             IOError,
@@ -160,7 +145,11 @@ def parse_imageinfo(gpath, cleanup=False):
         ) as ex:
             # ut.embed()
             logger.info('[preproc] IOError: %s' % (str(ex),))
+            _remove_temp_file(temp_filepath)
             return None, None
+        except Exception:
+            _remove_temp_file(temp_filepath)
+            raise
 
         if len(w) > 0:
             # for warn in w:
@@ -170,6 +159,21 @@ def parse_imageinfo(gpath, cleanup=False):
             #     warnstr = warnings.formatwarning
             #     logger.info(warnstr)
             logger.info('%d warnings issued by %r' % (len(w), gpath))
+    return temp_filepath, temp_filepath
+
+
+def parse_local_imageinfo(gpath, gpath_):
+    """Worker function: decodes and hashes an image that is on local disk
+
+    Args:
+        gpath (str): original image path or URI (stored as the image uri)
+        gpath_ (str): local path to read the image from
+
+    Returns:
+        tuple: param_tup - values for the SQL image columns or None on failure
+    """
+    from PIL import Image
+    import cv2
 
     try:
         # Open image with EXIF support to get time, GPS, and the original orientation
@@ -199,9 +203,9 @@ def parse_imageinfo(gpath, cleanup=False):
                 cv2.imwrite(gpath_, img)
                 orient = EXIF_NORMAL
             except AssertionError:
-                return None, None
+                return None
     except (FileNotFoundError):
-        return None, None
+        return None
 
     # Parse out the data
     height, width = img.shape[:2]  # Read width, height
@@ -229,15 +233,154 @@ def parse_imageinfo(gpath, cleanup=False):
         orient,
         notes,
     )
+    # logger.info('[ginfo] %r %r' % (image_uuid, orig_gname))
+    return param_tup
 
-    if temp_filepath is not None:
-        os.close(temp_file)
-        if cleanup:
-            os.unlink(temp_filepath)
 
-    # logger.info('[ginfo] %r %r' % (image_uuid, orig_gname))
+@profile
+def parse_imageinfo(gpath, cleanup=False, parse_pool=None):
+    """Worker function: gpath must be in UNIX-PATH format!
+
+    Args:
+        gpath (str): image path
+        cleanup (bool): removes the temporary file of a remote image
+        parse_pool (concurrent.futures.Executor): if specified the image is
+            decoded and hashed in this pool
+
+    Returns:
+        tuple: param_tup -
+            if successful returns a tuple of image parameters which are values
+            for SQL columns on else returns None
+
+    CommandLine:
+        python -m wbia.algo.preproc.preproc_image --exec-parse_imageinfo
+
+    Doctest:
+        >>> from wbia.algo.preproc.preproc_image import *  # NOQA
+        >>> gpath = ut.grab_test_imgpath('patsy.jpg')
+        >>> gpath_, param_tup = parse_imageinfo(gpath)
+        >>> result = ('param_tup = %s' % (str(param_tup),))
+        >>> print(result)
+        >>> uuid = param_tup[0]
+        >>> assert str(uuid) == '16008058-788c-2d48-cd50-f6029f726cbf'
+    """
+    if gpath is None:
+        return None, None
+    elif isinstance(gpath, dict) and len(gpath) == 0:
+        return None, None
+    else:
+        pass
+
+    gpath = gpath.strip()
+
+    gpath_, temp_filepath = fetch_image(gpath)
+    if gpath_ is None:
+        return None, None
+
+    param_tup = None
+    try:
+        if parse_pool is None:
+            param_tup = parse_local_imageinfo(gpath, gpath_)
+        else:
+            param_tup = parse_pool.submit(parse_local_imageinfo, gpath, gpath_).result()
+    finally:
+        # The caller only gets the temporary file of a parsed image
+        if param_tup is None or cleanup:
+            _remove_temp_file(temp_filepath)
+    if param_tup is None:
+        return None, None
     return temp_filepath, param_tup
 
 
+def parse_imageinfo_stream(
+    gpath_list,
+    fetch_workers=INGEST_FETCH_WORKERS,
+    parse_workers=INGEST_PARSE_WORKERS,
+    force_serial=False,
+):
+    r"""
+    Yields :func:`parse_imageinfo` of every image path in order.
+
+    Remote images are downloaded by a bounded pool of threads. Decoding and
+    hashing is CPU bound and runs in a pool of processes for large batches.
+    The processes are spawned instead of forked, so they do not inherit the
+    threads, locks and database connections of the (web server) parent, which
+    makes the pipeline safe to use in production. Only a bounded window of
+    images is in flight, so the results can be streamed to the database.
+
+    Args:
+        gpath_list (list): image paths in UNIX-PATH format or image URIs
+        fetch_workers (int): number of download threads
+        parse_workers (int): number of decoding processes (defaults to the
+            number of cpus)
+        force_serial (bool): parses the images one at a time
+
+    CommandLine:
+        python -m wbia.algo.preproc.preproc_image parse_imageinfo_stream
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.algo.preproc.preproc_image import *  # NOQA
+        >>> gpath_list = [ut.grab_test_imgpath(key) for key in ['patsy.jpg', 'carl.jpg']]
+        >>> gpath_list = gpath_list + ['doesnotexist.jpg'] + gpath_list
+        >>> result_list = list(parse_imageinfo_stream(gpath_list, fetch_workers=2))
+        >>> serial_list = list(parse_imageinfo_stream(gpath_list, force_serial=True))
+        >>> assert result_list == serial_list
+        >>> assert result_list[2] == (None, None)
+        >>> assert str(result_list[3][1][0]) == '16008058-788c-2d48-cd50-f6029f726cbf'
+    """
+    from concurrent import futures
+    from concurrent.futures.process import BrokenProcessPool
+    import collections
+
+    if force_serial:
+        for gpath in gpath_list:
+            yield parse_imageinfo(gpath)
+        return
+
+    if parse_workers is None:
+        parse_workers = ut.num_cpus()
+    parse_pool = None
+    if parse_workers > 1 and len(gpath_list) >= INGEST_PROCESS_MIN:
+        parse_pool = _get_parse_pool(parse_workers)
+    # Threads wait for their image to be parsed, so there needs to be at least
+    # one thread per parse worker to keep the processes busy
+    num_threads = max(fetch_workers, parse_workers, 1)
+    window = 2 * num_threads
+    try:
+        with futures.ThreadPoolExecutor(num_threads) as thread_pool:
+            pending = collections.deque()
+            for gpath in gpath_list:
+                pending.append(
+                    thread_pool.submit(parse_imageinfo, gpath, parse_pool=parse_pool)
+                )
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while len(pending) > 0:
+                yield pending.popleft().result()
+    except BrokenProcessPool:
+        _PARSE_POOLS.pop((os.getpid(), parse_workers), None)
+        raise
+
+
+# Parse process pools by (pid, num_workers). Starting the processes is
+# expensive, so the pools live as long as the (web server) process.
+_PARSE_POOLS = {}
+_PARSE_POOLS_LOCK = threading.Lock()
+
+
+def _get_parse_pool(num_workers):
+    from concurrent import futures
+    import multiprocessing
+
+    key = (os.getpid(), num_workers)
+    with _PARSE_POOLS_LOCK:
+        if key not in _PARSE_POOLS:
+            _PARSE_POOLS[key] = futures.ProcessPoolExecutor(
+                num_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _PARSE_POOLS[key]
+
+
 def on_delete(ibs, featweight_rowid_list, qreq_=None):
     logger.info('Warning: Not Implemented')
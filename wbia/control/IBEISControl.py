@@ -40,6 +40,7 @@ import weakref
 import utool as ut
 import ubelt as ub
 from os.path import join, split
+from wbia import LAZY_IMPORT
 from wbia.init import sysres
 from wbia import constants as const
 from wbia.control import accessor_decors, controller_inject
@@ -186,27 +187,44 @@ python -c "import wbia" --no-cnn
 UTOOL_NO_CNN=True python -c "import wbia"
 """
 
-for modname in ut.ProgIter(
-    AUTOLOAD_PLUGIN_MODNAMES,
-    'loading plugins',
-    enabled=ut.VERYVERBOSE,
-    adjust=False,
-    freq=1,
-):
-    if isinstance(modname, tuple):
-        flag, modname = modname
-        if ut.get_argflag(flag):
-            continue
-    try:
-        # ut.import_modname(modname)
-        ub.import_module_from_name(modname)
-    except ImportError:
-        if 'wbia_cnn' in modname:
-            import warnings
+_PLUGINS_LOADED = False
 
-            warnings.warn('Unable to load plugin: {!r}'.format(modname))
-        else:
-            raise
+
+def load_plugins():
+    """
+    Imports the modules that inject functions into the controller and
+    register the depcache preprocessors. Only the first call does any work.
+    """
+    global _PLUGINS_LOADED
+    if _PLUGINS_LOADED:
+        return
+    for modname in ut.ProgIter(
+        AUTOLOAD_PLUGIN_MODNAMES,
+        'loading plugins',
+        enabled=ut.VERYVERBOSE,
+        adjust=False,
+        freq=1,
+    ):
+        if isinstance(modname, tuple):
+            flag, modname = modname
+            if ut.get_argflag(flag):
+                continue
+        try:
+            # ut.import_modname(modname)
+            ub.import_module_from_name(modname)
+        except ImportError:
+            if 'wbia_cnn' in modname:
+                import warnings
+
+                warnings.warn('Unable to load plugin: {!r}'.format(modname))
+            else:
+                raise
+    _PLUGINS_LOADED = True
+
+
+# In lazy import mode the plugins are loaded by the first controller
+if not LAZY_IMPORT:
+    load_plugins()
 
 
 # NOTE: new plugin code needs to be hacked in here currently
@@ -387,6 +405,7 @@ class IBEISController(BASE_CLASS):
         self.observer_weakref_list = []
         # not completely working decorator cache
         self.table_cache = None
+        load_plugins()
         self._initialize_self()
         self._init_dirs(dbdir=dbdir, ensure=ensure)
 
@@ -433,8 +452,12 @@ class IBEISController(BASE_CLASS):
         - ``--db-uri`` is set to a Postgres URI on the commandline
         - only db-dir is set, and thus we assume a sqlite connection
 
+        Read-only replicas of a Postgres database are given by
+        ``--db-replica-uris``, which sets the ``_replica_uris`` attribute.
+
         """
         self._is_using_postgres_db = False
+        self._replica_uris = []
 
         uri = sysres.get_wbia_db_uri(self.dbdir)
         if uri:
@@ -445,6 +468,7 @@ class IBEISController(BASE_CLASS):
                 )
             # Capture that we are using postgres
             self._is_using_postgres_db = True
+            self._replica_uris = sysres.get_wbia_db_replica_uris(self.dbdir)
         else:
             # Assume a sqlite database
             uri = f'sqlite:///{self.get_ibsdir()}'
@@ -460,6 +484,11 @@ class IBEISController(BASE_CLASS):
         """Base database URI without a specific database name"""
         return self._base_uri
 
+    @property
+    def replica_uris(self):
+        """URIs of the read-only replicas of the database (Postgres only)"""
+        return self._replica_uris
+
     def make_cache_db_uri(self, name):
         """Given a name of the cache produce a database connection URI"""
         if self.is_using_postgres_db:
@@ -540,13 +569,13 @@ class IBEISController(BASE_CLASS):
         """
         Returns info about the underlying SQL cache memory
         """
-        total_size_str = ut.get_object_size_str(
-            self.table_cache, lbl='size(table_cache): '
+        total_size_str = '\nlen(table_cache) = %r, nbytes = %s' % (
+            len(self.table_cache),
+            ut.byte_str2(self.table_cache.nbytes),
         )
-        total_size_str = '\nlen(table_cache) = %r' % (len(self.table_cache))
         table_size_str_list = [
-            ut.get_object_size_str(val, lbl='size(table_cache[%s]): ' % (key,))
-            for key, val in self.table_cache.items()
+            'table_cache[%s]: %s' % (key, ut.repr2(stats, sorted_=True))
+            for key, stats in self.table_cache.stats().items()
         ]
         cachestats_str = total_size_str + ut.indentjoin(table_size_str_list, '\n  * ')
         return cachestats_str
@@ -700,7 +729,7 @@ class IBEISController(BASE_CLASS):
         else:
             uri = f'{self.base_uri}/{self.sqldb_fname}'
         fname = Path(self.sqldb_fname).stem  # filename without extension
-        self.db = dtool.SQLDatabaseController(uri, fname)
+        self.db = dtool.SQLDatabaseController(uri, fname, replica_uris=self.replica_uris)
 
         # BBB (12-Jan-12021) Disabled the ability to make the database read-only
         self.readonly = False
@@ -729,7 +758,9 @@ class IBEISController(BASE_CLASS):
         else:
             uri = f'{self.base_uri}/{self.sqlstaging_fname}'
         fname = Path(self.sqlstaging_fname).stem  # filename without extension
-        self.staging = dtool.SQLDatabaseController(uri, fname)
+        self.staging = dtool.SQLDatabaseController(
+            uri, fname, replica_uris=self.replica_uris
+        )
 
         # BBB (12-Jan-12021) Disabled the ability to make the database read-only
         self.readonly = False
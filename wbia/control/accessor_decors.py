@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
+import collections
 import logging
+import threading
 import utool as ut
 import builtins
 from utool._internal.meta_util_six import get_funcname
+from wbia.dtool.depcache_table import estimate_nbytes
 
 print, rrr, profile = ut.inject2(__name__)
 logger = logging.getLogger('wbia')
@@ -51,10 +54,206 @@ if ut.VERBOSE:
 # DECORATORS::ADDER
 
 
+# Default byte budget of the getter cache of each table
+TABLE_CACHE_NBYTES = int(
+    ut.get_argval('--table-cache-mb', type_=float, default=256) * 2 ** 20
+)
+
+
+class LRUTableCache(ut.NiceRepr):
+    r"""
+    Cached getter values of a single table, evicted in least-recently-used
+    order once they take more than ``max_nbytes``.
+
+    Values are keyed by (colname, kwargs_hash, rowid). An index from column
+    and getter kwargs to rowids keeps invalidation proportional to the
+    number of invalidated values.
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.control.accessor_decors import *  # NOQA
+        >>> cache = LRUTableCache('annotations', max_nbytes=250)
+        >>> cache.set_many('name', None, [1, 2], ['a' * 60, 'b' * 60])
+        >>> cache.get_many('name', None, [1, 3])
+        ['aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', None]
+        >>> cache.set_many('name', None, [3], ['c' * 60])
+        >>> # rowid 2 is the least recently used
+        >>> cache.get_many('name', None, [1, 2, 3])[1] is None
+        True
+        >>> cache.invalidate(['name'], [1])
+        >>> print(ut.repr2(cache.stats(), sorted_=True))
+        {'evictions': 1, 'hits': 3, 'misses': 2, 'nbytes': 109, 'num_values': 1}
+    """
+
+    def __init__(self, tblname, max_nbytes=None):
+        self.tblname = tblname
+        self.max_nbytes = max_nbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._index = collections.defaultdict(lambda: collections.defaultdict(set))
+        self._lock = threading.RLock()
+
+    def __nice__(self):
+        return '%s, n=%d, nbytes=%d' % (self.tblname, len(self), self.nbytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def colnames(self):
+        return list(self._index.keys())
+
+    def get_many(self, colname, kwargs_hash, rowid_list):
+        """Returns the cached values of ``rowid_list`` (None for misses)"""
+        entries = self._entries
+        vals_list = []
+        num_miss = 0
+        with self._lock:
+            for rowid in rowid_list:
+                key = (colname, kwargs_hash, rowid)
+                entry = entries.get(key, None)
+                if entry is None:
+                    vals_list.append(None)
+                    num_miss += 1
+                else:
+                    entries.move_to_end(key)
+                    vals_list.append(entry[0])
+            self.misses += num_miss
+            self.hits += len(vals_list) - num_miss
+        return vals_list
+
+    def set_many(self, colname, kwargs_hash, rowid_list, vals_list):
+        entries = self._entries
+        with self._lock:
+            rowid_index = self._index[colname][kwargs_hash]
+            for rowid, val in zip(rowid_list, vals_list):
+                nbytes = estimate_nbytes(val)
+                if self.max_nbytes is not None and nbytes > self.max_nbytes:
+                    # Never cache a value that does not fit
+                    continue
+                key = (colname, kwargs_hash, rowid)
+                old_entry = entries.pop(key, None)
+                if old_entry is not None:
+                    self.nbytes -= old_entry[1]
+                entries[key] = (val, nbytes)
+                self.nbytes += nbytes
+                rowid_index.add(rowid)
+            self._evict()
+
+    def _evict(self):
+        entries = self._entries
+        while self.max_nbytes is not None and self.nbytes > self.max_nbytes:
+            (colname, kwargs_hash, rowid), (_, nbytes) = entries.popitem(last=False)
+            self._index[colname][kwargs_hash].discard(rowid)
+            self.nbytes -= nbytes
+            self.evictions += 1
+
+    def invalidate(self, colnames=None, rowid_list=None):
+        """
+        Removes the values of ``rowid_list`` (or all values if None) in
+        ``colnames`` (or all columns if None) for every getter configuration.
+        """
+        with self._lock:
+            if colnames is None:
+                colnames = self.colnames()
+            if rowid_list is not None:
+                rowid_list = set(rowid_list)
+            for colname in colnames:
+                kwargs_index = self._index.get(colname, {})
+                for kwargs_hash, rowids in kwargs_index.items():
+                    if rowid_list is None:
+                        stale_rowids = list(rowids)
+                    else:
+                        stale_rowids = list(rowids.intersection(rowid_list))
+                    for rowid in stale_rowids:
+                        _, nbytes = self._entries.pop((colname, kwargs_hash, rowid))
+                        self.nbytes -= nbytes
+                    rowids.difference_update(stale_rowids)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'nbytes': self.nbytes,
+            'num_values': len(self),
+        }
+
+
+class TableCache(ut.NiceRepr):
+    r"""
+    Container of the getter caches of each table (see ``cache_getter``).
+
+    Args:
+        max_nbytes (int): default byte budget of each table (None is unbounded)
+        table_nbytes (dict): byte budgets of specific tables
+        backend (type): class of the per-table caches. It is constructed with
+            ``(tblname, max_nbytes)`` and must implement ``get_many``,
+            ``set_many``, ``invalidate``, ``colnames`` and ``stats`` like
+            ``LRUTableCache``.
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.control.accessor_decors import *  # NOQA
+        >>> table_cache = TableCache(max_nbytes=1024, table_nbytes={'images': 10})
+        >>> assert not table_cache
+        >>> table_cache['images'].set_many('uri', None, [1], ['a' * 100])
+        >>> print(table_cache['images'])
+        <LRUTableCache(images, n=0, nbytes=0)>
+        >>> table_cache['annotations'].max_nbytes
+        1024
+    """
+
+    def __init__(self, max_nbytes=TABLE_CACHE_NBYTES, table_nbytes=None, backend=None):
+        self.max_nbytes = max_nbytes
+        self.table_nbytes = {} if table_nbytes is None else table_nbytes
+        self.backend = LRUTableCache if backend is None else backend
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def __nice__(self):
+        return 'tables=%d, nbytes=%d' % (len(self), self.nbytes)
+
+    def __getitem__(self, tblname):
+        try:
+            return self._tables[tblname]
+        except KeyError:
+            with self._lock:
+                if tblname not in self._tables:
+                    max_nbytes = self.table_nbytes.get(tblname, self.max_nbytes)
+                    self._tables[tblname] = self.backend(tblname, max_nbytes)
+            return self._tables[tblname]
+
+    def __delitem__(self, tblname):
+        del self._tables[tblname]
+
+    def __len__(self):
+        return len(self._tables)
+
+    def __iter__(self):
+        return iter(self._tables)
+
+    def keys(self):
+        return self._tables.keys()
+
+    def items(self):
+        return self._tables.items()
+
+    @property
+    def nbytes(self):
+        return sum(table.nbytes for table in self._tables.values())
+
+    def stats(self):
+        """Returns a dictionary of the hit/miss/eviction counters of each table"""
+        return {tblname: table.stats() for tblname, table in self._tables.items()}
+
+
 def init_tablecache():
     r"""
     Returns:
-       defaultdict: tablecache
+       TableCache: tablecache
 
     CommandLine:
         python -m wbia.control.accessor_decors --test-init_tablecache
@@ -64,10 +263,10 @@ def init_tablecache():
         >>> from wbia.control.accessor_decors import *  # NOQA
         >>> result = init_tablecache()
         >>> print(result)
+        <TableCache(tables=0, nbytes=0)>
     """
-    # 4 levels of dictionaries
-    # tablename, colname, kwargs, and then rowids
-    tablecache = ut.ddict(lambda: ut.ddict(lambda: ut.ddict(dict)))
+    # tablename, and then (colname, kwargs, rowid) values with a byte budget
+    tablecache = TableCache()
     return tablecache
 
 
@@ -165,9 +364,10 @@ def cache_getter(tblname, colname=None, cfgkeys=None, force=False, debug=False):
 
         def assert_cache_hits(ibs, ismiss_list, rowid_list, kwargs_hash, **kwargs):
             cached_rowid_list = ut.filterfalse_items(rowid_list, ismiss_list)
-            cache_ = ibs.table_cache[tblname][colname][kwargs_hash]
             # Load cached values for each rowid
-            cache_vals_list = ut.dict_take_list(cache_, cached_rowid_list, None)
+            cache_vals_list = ibs.table_cache[tblname].get_many(
+                colname, kwargs_hash, cached_rowid_list
+            )
             db_vals_list = getter_func(ibs, cached_rowid_list, **kwargs)
             # Assert everything is valid
             msg_fmt = ut.codeblock(
@@ -183,117 +383,66 @@ def cache_getter(tblname, colname=None, cfgkeys=None, force=False, debug=False):
                 list1 = cache_vals_list
                 list2 = db_vals_list
                 assert ut.lists_eq(list1, list2), msg
-                # if isinstance(db_vals_list, list):
-                #    assert cache_vals_list == db_vals_list, msg
-                # else:
-                #    assert np.all(cache_vals_list == db_vals_list), msg
             except AssertionError as ex:
                 raise ex
             except Exception as ex2:
                 logger.info(type(cache_vals_list))
                 logger.info(type(db_vals_list))
                 ut.printex(ex2)
-                ut.embed()
                 raise
 
-        if False:
-            # @profile cannot profile this because it is alrady being profiled by
-            def wrp_getter_cacher(ibs, rowid_list, **kwargs):
-                """
-                Wrapper function that caches rowid values in a dictionary
-                """
-                # HACK TAKE OUT GETTING DEBUG OUT OF KWARGS
-                debug_ = kwargs.pop('debug', False)
-                if cfgkeys is not None:
-                    # kwargs_hash = ut.get_dict_hashid(ut.dict_take_list(kwargs, cfgkeys, None))
-                    kwargs_hash = ut.get_dict_hashid(
-                        [kwargs.get(key, None) for key in cfgkeys]
-                    )
-                    # ut.dict_take_list(kwargs, cfgkeys, None))
-                else:
-                    kwargs_hash = None
-                # +----------------------------
-                # There are 3 levels of caches
-                # +----------------------------
-                # All caches for this table
-                # colscache_ = ibs.table_cache[tblname]
-                # # All caches for the this column
-                # kwargs_cache_ = colscache_[colname]
-                # # All caches for this kwargs configuration
-                # cache_ = kwargs_cache_[kwargs_hash]
-                cache_ = ibs.table_cache[tblname][colname][kwargs_hash]
-                # L____________________________
-
-                # Load cached values for each rowid
-                # vals_list = ut.dict_take_list(cache_, rowid_list, None)
-                vals_list = [cache_.get(rowid, None) for rowid in rowid_list]
-                # Mark rowids with cache misses
-                ismiss_list = [val is None for val in vals_list]
-                if debug or debug_:
-                    debug_cache_hits(ismiss_list, rowid_list)
-                    # logger.info('[cache_getter] "debug_cache_hits" turned off')
-                # HACK !!! DEBUG THESE GETTERS BY ASSERTING INFORMATION IN CACHE IS CORRECT
-                if ASSERT_API_CACHE:
-                    assert_cache_hits(ibs, ismiss_list, rowid_list, kwargs_hash, **kwargs)
-                # END HACK
-                if any(ismiss_list):
-                    miss_indices = ut.list_where(ismiss_list)
-                    miss_rowids = ut.compress(rowid_list, ismiss_list)
-                    # call wrapped function
-                    miss_vals = getter_func(ibs, miss_rowids, **kwargs)
-                    # overwrite missed output
-                    for index, val in zip(miss_indices, miss_vals):
-                        vals_list[index] = val  # Output write
-                    # cache save
-                    for rowid, val in zip(miss_rowids, miss_vals):
-                        cache_[rowid] = val  # Cache write
-                return vals_list
-
-        else:
-
-            def handle_cache_misses(
-                ibs, getter_func, rowid_list, ismiss_list, vals_list, cache_, kwargs
-            ):
-                miss_indices = ut.list_where(ismiss_list)
-                miss_rowids = ut.compress(rowid_list, ismiss_list)
-                # call wrapped function
-                miss_vals = getter_func(ibs, miss_rowids, **kwargs)
-                # overwrite missed output
-                for index, val in zip(miss_indices, miss_vals):
-                    vals_list[index] = val  # Output write
-                # cache save
-                for rowid, val in zip(miss_rowids, miss_vals):
-                    cache_[rowid] = val  # Cache write
-
-            def wrp_getter_cacher(ibs, rowid_list, **kwargs):
-                """
-                Wrapper function that caches rowid values in a dictionary
-                """
-                kwargs.pop('debug', False)
-                kwargs_hash = (
-                    None
-                    if cfgkeys is None
-                    else ut.get_dict_hashid([kwargs.get(key, None) for key in cfgkeys])
+        def handle_cache_misses(
+            ibs,
+            getter_func,
+            rowid_list,
+            ismiss_list,
+            vals_list,
+            cache_,
+            kwargs_hash,
+            kwargs,
+        ):
+            miss_indices = ut.list_where(ismiss_list)
+            miss_rowids = ut.compress(rowid_list, ismiss_list)
+            # call wrapped function
+            miss_vals = getter_func(ibs, miss_rowids, **kwargs)
+            # overwrite missed output
+            for index, val in zip(miss_indices, miss_vals):
+                vals_list[index] = val  # Output write
+            # cache save
+            cache_.set_many(colname, kwargs_hash, miss_rowids, miss_vals)
+
+        def wrp_getter_cacher(ibs, rowid_list, **kwargs):
+            """
+            Wrapper function that caches rowid values in the table cache
+            """
+            debug_ = kwargs.pop('debug', False)
+            kwargs_hash = (
+                None
+                if cfgkeys is None
+                else ut.get_dict_hashid([kwargs.get(key, None) for key in cfgkeys])
+            )
+            # The cache of this table holds values for each column and kwargs configuration
+            cache_ = ibs.table_cache[tblname]
+            # Load cached values for each rowid
+            vals_list = cache_.get_many(colname, kwargs_hash, rowid_list)
+            # Mark rowids with cache misses
+            ismiss_list = [val is None for val in vals_list]
+            if debug or debug_:
+                debug_cache_hits(ismiss_list, rowid_list)
+            if ASSERT_API_CACHE:
+                assert_cache_hits(ibs, ismiss_list, rowid_list, kwargs_hash, **kwargs)
+            if any(ismiss_list):
+                handle_cache_misses(
+                    ibs,
+                    getter_func,
+                    rowid_list,
+                    ismiss_list,
+                    vals_list,
+                    cache_,
+                    kwargs_hash,
+                    kwargs,
                 )
-                # There are 3 levels of caches
-                # All caches for this table, caches for the this column, and caches for this kwargs configuration
-                cache_ = ibs.table_cache[tblname][colname][kwargs_hash]
-                # Load cached values for each rowid
-                vals_list = [cache_.get(rowid, None) for rowid in rowid_list]
-                # Mark rowids with cache misses
-                ismiss_list = [val is None for val in vals_list]
-                # END HACK
-                if any(ismiss_list):
-                    handle_cache_misses(
-                        ibs,
-                        getter_func,
-                        rowid_list,
-                        ismiss_list,
-                        vals_list,
-                        cache_,
-                        kwargs,
-                    )
-                return vals_list
+            return vals_list
 
         wrp_getter_cacher = ut.preserve_sig(wrp_getter_cacher, getter_func)
         return wrp_getter_cacher
@@ -324,8 +473,7 @@ def cache_invalidator(tblname, colnames=None, rowidx=None, force=False):
 
         def wrp_cache_invalidator(self, *args, **kwargs):
             # the class must have a table_cache property
-            colscache_ = self.table_cache[tblname]
-            colnames_ = list(colscache_.keys()) if colnames is None else colnames
+            cache_ = self.table_cache[tblname]
             if DEBUG_API_CACHE:
                 logger.info('+------')
                 logger.info(
@@ -335,29 +483,22 @@ def cache_invalidator(tblname, colnames=None, rowidx=None, force=False):
                 logger.info('self = %r' % (self,))
                 logger.info('args = %r' % (args,))
                 logger.info('kwargs = %r' % (kwargs,))
-                logger.info('colscache_ = ' + ut.repr2(colscache_, truncate=1))
+                logger.info('cache_ = %r' % (cache_,))
 
             # Clear the cache of any specified colname
             # when the invalidator is called
             if rowidx is None:
-                for colname in colnames_:
-                    kwargs_cache_ = colscache_[colname]
-                    # We dont know the rowsids so clear everything
-                    for cache_ in kwargs_cache_.values():
-                        cache_.clear()
+                # We dont know the rowsids so clear everything
+                cache_.invalidate(colnames)
             else:
+                # We know the rowids to delete for all getter kwargs values
                 rowid_list = args[rowidx]
-                for colname in colnames_:
-                    kwargs_cache_ = colscache_[colname]
-                    # We know the rowids to delete
-                    # iterate over all getter kwargs values
-                    for cache_ in kwargs_cache_.values():
-                        ut.delete_dict_keys(cache_, rowid_list)
+                cache_.invalidate(colnames, rowid_list)
 
             # Preform set/delete action
             if DEBUG_API_CACHE:
                 logger.info('After:')
-                logger.info('colscache_ = ' + ut.repr2(colscache_, truncate=1))
+                logger.info('cache_ = %r' % (cache_,))
                 logger.info('L__________')
 
             writer_result = writer_func(self, *args, **kwargs)
@@ -27,6 +27,8 @@ import os
 
 # import numpy as np
 import hmac
+import uuid
+import zlib
 from wbia import constants as const
 import string
 import random
@@ -57,6 +59,13 @@ except Exception:
     if ut.SUPER_STRICT:
         raise
 
+try:
+    # C-accelerated JSON library used to decode web requests and to encode
+    # streamed responses (see from_json and stream_json)
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     from flask_cas import CAS  # NOQA
     from flask_cas import login_required as login_required_cas
@@ -106,6 +115,14 @@ WEB_DEBUG_INCLUDE_TRACE = True
 
 CONTROLLER_CLASSNAME = 'IBEISController'
 
+# Number of list items encoded per chunk of a streamed JSON response
+WEB_STREAM_CHUNKSIZE = 4096
+# Streamed chunks are buffered up to this many bytes before being sent
+WEB_STREAM_BUFSIZE = 64 * 1024
+# Responses smaller than this are not compressed
+WEB_COMPRESS_MIN_SIZE = 1024
+WEB_COMPRESS_LEVEL = 6
+
 MICROSOFT_API_ENABLED = ut.get_argflag('--web') and ut.get_argflag(
     '--microsoft'
 )  # True == Microsoft Deployment (i.e., only allow MICROSOFT_API_PREFIX prefix below)
@@ -381,6 +398,22 @@ class WebRuntimeException(WebException):
         super(WebRuntimeException, self).__init__(message, rawreturn, code)
 
 
+class WebEngineOverloadedException(WebException):
+    def __init__(self, lane, queued, max_queue):
+        message = (
+            'The %s lane of the job engine already has %d of %d jobs waiting, '
+            'please try again later'
+        ) % (lane, queued, max_queue)
+        rawreturn = {
+            'lane': lane,
+            'queued': queued,
+            'max_queue': max_queue,
+            'message': message,
+        }
+        code = 503
+        super(WebEngineOverloadedException, self).__init__(message, rawreturn, code)
+
+
 def translate_wbia_webreturn(
     rawreturn,
     success=True,
@@ -389,7 +422,13 @@ def translate_wbia_webreturn(
     jQuery_callback=None,
     cache=None,
     __skip_microsoft_validation__=False,
+    stream=False,
 ):
+    """
+    Wraps the return value of an API call into the JSON response template.
+    If stream is True, an iterator of encoded chunks is returned instead of a
+    string (see stream_json).
+    """
     if MICROSOFT_API_ENABLED and not __skip_microsoft_validation__:
         if rawreturn is not None:
             assert isinstance(
@@ -413,14 +452,279 @@ def translate_wbia_webreturn(
             },
             'response': rawreturn,
         }
-    response = ut.to_json(template)
+    if stream:
+        response = stream_json(template)
+    else:
+        response = ut.to_json(template)
 
     if jQuery_callback is not None and isinstance(jQuery_callback, str):
         logger.info('[web] Including jQuery callback function: %r' % (jQuery_callback,))
-        response = '%s(%s)' % (jQuery_callback, response)
+        if stream:
+            response = ut.iflatten(
+                [[('%s(' % (jQuery_callback,)).encode('utf-8')], response, [b')']]
+            )
+        else:
+            response = '%s(%s)' % (jQuery_callback, response)
     return response
 
 
+_JSON_SCALAR_TYPES = {str, int, float, bool, type(None)}
+
+
+def _json_prepare(value):
+    # Tags the UUIDs, which orjson would otherwise encode as plain strings
+    if isinstance(value, uuid.UUID):
+        return {UUID_TAG: str(value)}
+    elif isinstance(value, (list, tuple)):
+        if all(type(item) in _JSON_SCALAR_TYPES for item in value):
+            return value
+        return [_json_prepare(item) for item in value]
+    elif isinstance(value, dict):
+        return {key: _json_prepare(item) for key, item in value.items()}
+    return value
+
+
+def _json_default(obj):
+    if isinstance(obj, slice):
+        parts = [
+            '' if part is None else str(part) for part in (obj.start, obj.stop, obj.step)
+        ]
+        return {SLICE_TAG: ':'.join(parts)}
+    elif isinstance(obj, bytes):
+        return obj.decode('utf-8')
+    elif isinstance(obj, (set, frozenset)):
+        return _json_prepare(list(obj))
+    elif hasattr(obj, 'tolist'):
+        # numpy arrays and scalars that orjson does not support natively
+        return _json_prepare(obj.tolist())
+    raise TypeError('Invalid serialization type=%r' % (type(obj),))
+
+
+def _to_json_bytes(value):
+    if orjson is None:
+        return ut.to_json(value).encode('utf-8')
+    if (
+        isinstance(value, (list, tuple))
+        and len(value) > 0
+        and all(type(item) is uuid.UUID for item in value)
+    ):
+        # orjson encodes UUIDs natively as strings, wrap them in their tags
+        raw = orjson.dumps(value)
+        tagged = raw[1:-1].replace(b'","', b'"},{"%s":"' % (UUID_TAG.encode(),))
+        return b'[{"%s":%s}]' % (UUID_TAG.encode(), tagged)
+    try:
+        return orjson.dumps(
+            _json_prepare(value),
+            default=_json_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    except (orjson.JSONEncodeError, TypeError):
+        # e.g. integers larger than 64 bits
+        return ut.to_json(value).encode('utf-8')
+
+
+def _iter_json(value, chunksize):
+    if isinstance(value, dict):
+        yield b'{'
+        for index, (key, item) in enumerate(value.items()):
+            if not isinstance(key, str):
+                key = ut.to_json(key) if isinstance(key, (bool, type(None))) else str(key)
+            yield (b',' if index > 0 else b'') + _to_json_bytes(key) + b':'
+            yield from _iter_json(item, chunksize)
+        yield b'}'
+    elif isinstance(value, (list, tuple)) and len(value) > chunksize:
+        yield b'['
+        for start in range(0, len(value), chunksize):
+            chunk = _to_json_bytes(value[start : start + chunksize])[1:-1]
+            yield chunk if start == 0 else b',' + chunk
+        yield b']'
+    else:
+        yield _to_json_bytes(value)
+
+
+def stream_json(value, chunksize=None, bufsize=None):
+    r"""
+    Encodes a value in the utool JSON convention (see ut.to_json) as an
+    iterator of byte chunks. Dictionaries are walked and long lists are encoded
+    a chunk of items at a time, so the whole response never has to be built in
+    memory. Uses orjson when it is installed, which encodes NaN as null.
+
+    Args:
+        value (object): the value to encode
+        chunksize (int): number of list items per chunk (default = WEB_STREAM_CHUNKSIZE)
+        bufsize (int): minimum number of bytes per yielded chunk (default = WEB_STREAM_BUFSIZE)
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.control.controller_inject import *  # NOQA
+        >>> import numpy as np
+        >>> import uuid
+        >>> val = {
+        >>>     'status': {'success': True, 'code': ''},
+        >>>     'response': {
+        >>>         'uuid_list': [uuid.uuid4() for _ in range(10)],
+        >>>         'bbox_list': [(1, 2, 3, 4)] * 10,
+        >>>         'mixed_list': [1, None, 'a', uuid.uuid4(), np.arange(3), {5}],
+        >>>     },
+        >>> }
+        >>> chunks = list(stream_json(val, chunksize=3, bufsize=0))
+        >>> assert len(chunks) > 10
+        >>> assert ut.from_json(b''.join(chunks)) == ut.from_json(ut.to_json(val))
+        >>> chunks = list(stream_json(val, chunksize=3))
+        >>> assert len(chunks) == 1
+        >>> assert ut.from_json(b''.join(chunks)) == ut.from_json(ut.to_json(val))
+    """
+    if chunksize is None:
+        chunksize = WEB_STREAM_CHUNKSIZE
+    if bufsize is None:
+        bufsize = WEB_STREAM_BUFSIZE
+    buf, buflen = [], 0
+    for chunk in _iter_json(value, chunksize):
+        buf.append(chunk)
+        buflen += len(chunk)
+        if buflen >= bufsize:
+            yield b''.join(buf)
+            buf, buflen = [], 0
+    if buf:
+        yield b''.join(buf)
+
+
+def get_accepted_encoding():
+    """
+    Returns the compression (gzip or deflate) accepted by the client of the
+    current request, or None
+    """
+    accept_encodings = flask.request.accept_encodings
+    for encoding in ['gzip', 'deflate']:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def _compressobj(encoding):
+    # gzip and zlib (HTTP deflate) containers
+    wbits = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}[encoding]
+    return zlib.compressobj(WEB_COMPRESS_LEVEL, zlib.DEFLATED, wbits)
+
+
+def _iter_compressed(chunks, encoding):
+    compressor = _compressobj(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def make_web_response(webreturn, code, encoding=None):
+    """
+    Makes the flask response of a web return, which is either a string or an
+    iterator of byte chunks (streamed as a chunked body). The body is
+    compressed if an encoding is given.
+    """
+    if isinstance(webreturn, str):
+        if encoding is not None and len(webreturn) >= WEB_COMPRESS_MIN_SIZE:
+            compressor = _compressobj(encoding)
+            webreturn = compressor.compress(webreturn.encode('utf-8'))
+            webreturn += compressor.flush()
+        else:
+            encoding = None
+        resp = flask.make_response(webreturn, code)
+    else:
+        if encoding is not None:
+            webreturn = _iter_compressed(webreturn, encoding)
+        resp = flask.Response(webreturn)
+    resp.status_code = code
+    resp.headers['Vary'] = 'Accept-Encoding'
+    if encoding is not None:
+        resp.headers['Content-Encoding'] = encoding
+    return resp
+
+
+UUID_TAG = '__UUID__'
+SLICE_TAG = '__SLICE__'
+
+
+def _new_uuid(int_, _new=object.__new__, _setattr=object.__setattr__):
+    # Bypasses the argument parsing of UUID.__init__
+    uuid_ = _new(uuid.UUID)
+    _setattr(uuid_, 'int', int_)
+    _setattr(uuid_, 'is_safe', uuid.SafeUUID.unknown)
+    return uuid_
+
+
+def _decode_uuid(text):
+    # Same as uuid.UUID(text)
+    hex_ = text.replace('urn:', '').replace('uuid:', '').strip('{}').replace('-', '')
+    if len(hex_) != 32:
+        raise ValueError('badly formed hexadecimal UUID string')
+    return _new_uuid(int(hex_, 16))
+
+
+_JSON_TAG_DECODERS = {
+    UUID_TAG: _decode_uuid,
+    SLICE_TAG: lambda text: ut.smart_cast(text, slice),
+}
+
+
+def _decode_uuid_list(value):
+    # Only handles canonical UUID strings, anything else raises and is decoded
+    # by the general path
+    if not all(len(item) == 1 for item in value):
+        raise ValueError('not a list of UUIDs')
+    hex_list = [item[UUID_TAG].replace('-', '') for item in value]
+    if not all(len(hex_) == 32 for hex_ in hex_list):
+        raise ValueError('badly formed hexadecimal UUID string')
+    return [_new_uuid(int(hex_, 16)) for hex_ in hex_list]
+
+
+def _decode_json_tags(value):
+    """Replaces the utool JSON tags (e.g. ``{"__UUID__": ...}``) by their objects"""
+    if isinstance(value, list):
+        if len(value) > 0 and isinstance(value[0], dict) and UUID_TAG in value[0]:
+            # Fast path for lists of UUIDs
+            try:
+                return _decode_uuid_list(value)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                pass
+        return [_decode_json_tags(item) for item in value]
+    elif isinstance(value, dict):
+        value = {key: _decode_json_tags(item) for key, item in value.items()}
+        if len(value) == 1:
+            tag, text = next(iter(value.items()))
+            if tag in _JSON_TAG_DECODERS:
+                return _JSON_TAG_DECODERS[tag](text)
+        return value
+    return value
+
+
+def from_json(json_str):
+    r"""
+    Fast equivalent of ``ut.from_json`` for decoding web requests. Parses with
+    orjson when it is installed and falls back to ``ut.from_json`` for input
+    that orjson rejects (e.g. NaN or integers larger than 64 bits).
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.control.controller_inject import *  # NOQA
+        >>> import uuid
+        >>> val = {'uuid_list': [uuid.uuid4() for _ in range(3)], 'x': [1.5, None]}
+        >>> val['uuid'] = uuid.uuid4()
+        >>> json_str = ut.to_json(val)
+        >>> assert from_json(json_str) == ut.from_json(json_str) == val
+        >>> json_str = '{"slice": {"__SLICE__": "1::2"}, "n": [{"a": 1, "__UUID__": 2}]}'
+        >>> assert from_json(json_str) == ut.from_json(json_str)
+        >>> assert from_json('[NaN]') == ut.from_json('[NaN]')
+    """
+    if orjson is None:
+        return ut.from_json(json_str)
+    try:
+        value = orjson.loads(json_str)
+    except orjson.JSONDecodeError:
+        return ut.from_json(json_str)
+    return _decode_json_tags(value)
+
+
 def _process_input(multidict=None):
     if multidict is None:
         return {}
@@ -445,12 +749,16 @@ def _process_input(multidict=None):
         if value in ['True', 'False']:
             value = value.lower()
         try:
-            converted = ut.from_json(value)
+            converted = from_json(value)
         except Exception:
             # try making string and try again...
             try:
-                value_ = '"%s"' % (value,)
-                converted = ut.from_json(value_)
+                if '"' in value or '\\' in value or not value.isprintable():
+                    value_ = '"%s"' % (value,)
+                    converted = from_json(value_)
+                else:
+                    # Quoting a plain string only makes a JSON string of it
+                    converted = value
             except Exception as ex:
                 logger.info('FAILED TO JSON CONVERT: %s' % (ex,))
                 logger.info(ut.repr3(value))
@@ -476,6 +784,23 @@ def _process_input(multidict=None):
     return kwargs2
 
 
+def _process_body():
+    """
+    Returns the parameters of the form and the JSON body of the request. JSON
+    bodies are decoded as they are, without the heuristics for form values.
+    """
+    if flask.request.is_json:
+        kwargs_form = {}
+    else:
+        kwargs_form = _process_input(flask.request.form)
+    try:
+        # kwargs4 = _process_input(flask.request.get_json())
+        kwargs_json = from_json(flask.request.data)
+    except Exception:
+        kwargs_json = {}
+    return kwargs_form, kwargs_json
+
+
 def translate_wbia_webcall(func, *args, **kwargs):
     r"""
     Called from flask request context
@@ -905,16 +1230,12 @@ def get_wbia_flask_api(__name__, DEBUG_PYTHON_STACK_TRACE_JSON_RESPONSE=False):
 
                     __format__ = False  # Default __format__ value
                     ignore_cookie_set = False
+                    __stream__ = False
                     try:
                         # logger.info('Processing: %r with args: %r and kwargs: %r' % (func, args, kwargs, ))
                         # Pipe web input into Python web call
                         kwargs2 = _process_input(flask.request.args)
-                        kwargs3 = _process_input(flask.request.form)
-                        try:
-                            # kwargs4 = _process_input(flask.request.get_json())
-                            kwargs4 = ut.from_json(flask.request.data)
-                        except Exception:
-                            kwargs4 = {}
+                        kwargs3, kwargs4 = _process_body()
                         kwargs.update(kwargs2)
                         kwargs.update(kwargs3)
                         kwargs.update(kwargs4)
@@ -936,6 +1257,10 @@ def get_wbia_flask_api(__name__, DEBUG_PYTHON_STACK_TRACE_JSON_RESPONSE=False):
                             ignore_cookie_set = __format__ in ['onetime', 'true']
                             __format__ = __format__ in ['true', 'enabled', 'enable']
 
+                        # Stream the JSON response as a chunked body
+                        __stream__ = kwargs.pop('__stream__', False)
+                        __stream__ = str(__stream__).lower() in ['true', '1']
+
                         from wbia.web.app import PROMETHEUS
 
                         if PROMETHEUS:
@@ -1022,14 +1347,22 @@ def get_wbia_flask_api(__name__, DEBUG_PYTHON_STACK_TRACE_JSON_RESPONSE=False):
                                 '<pre>Might also look into db_info: %s</pre>'
                                 % get_func_href('get_dbinfo')
                             )
+                    elif __stream__:
+                        webreturn = translate_wbia_webreturn(
+                            rawreturn,
+                            success,
+                            code,
+                            message,
+                            jQuery_callback,
+                            stream=True,
+                        )
                     else:
                         webreturn = translate_wbia_webreturn(
                             rawreturn, success, code, message, jQuery_callback
                         )
                         webreturn = ut.strip_ansi(webreturn)
 
-                    resp = flask.make_response(webreturn, code)
-                    resp.status_code = code
+                    resp = make_web_response(webreturn, code, get_accepted_encoding())
 
                     if not __format__:
                         resp.headers['Content-Type'] = 'application/json; charset=utf-8'
@@ -1169,12 +1502,7 @@ def get_wbia_flask_route(__name__):
                     try:
                         # Pipe web input into Python web call
                         kwargs2 = _process_input(flask.request.args)
-                        kwargs3 = _process_input(flask.request.form)
-                        try:
-                            # kwargs4 = _process_input(flask.request.get_json())
-                            kwargs4 = ut.from_json(flask.request.data)
-                        except Exception:
-                            kwargs4 = {}
+                        kwargs3, kwargs4 = _process_body()
                         kwargs.update(kwargs2)
                         kwargs.update(kwargs3)
                         kwargs.update(kwargs4)
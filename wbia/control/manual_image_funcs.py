@@ -36,6 +36,9 @@ logger = logging.getLogger('wbia')
 
 DEBUG_THUMB = False
 
+# Number of parsed images written to the database at once by add_images
+ADD_IMAGES_BATCH_SIZE = 1000
+
 CLASS_INJECT_KEY, register_ibs_method = make_ibs_register_decorator(__name__)
 
 
@@ -254,7 +257,18 @@ def get_num_images(ibs, **kwargs):
 
 
 @register_ibs_method
-def _compute_image_uuids(ibs, gpath_list, sanitize=True, ensure=True, **kwargs):
+def _compute_image_uuids(
+    ibs, gpath_list, sanitize=True, ensure=True, stream=False, **kwargs
+):
+    """
+    Parses the image parameters of every image path (see
+    :func:`wbia.algo.preproc.preproc_image.parse_imageinfo_stream`).
+
+    Args:
+        stream (bool): returns a generator over the ordered results, which
+            lets callers write them to the database while the remaining
+            images are still being parsed
+    """
     from wbia.algo.preproc import preproc_image
     from wbia.other import ibsfuncs
 
@@ -265,34 +279,27 @@ def _compute_image_uuids(ibs, gpath_list, sanitize=True, ensure=True, **kwargs):
 
     # Create param_iter
     # params_list = list(preproc_image.add_images_params_gen(gpath_list))
-    force_serial = ibs.force_serial or ibs.production
-    params_list = list(
-        ut.generate2(
-            preproc_image.parse_imageinfo,
-            list(zip(gpath_list)),
-            nTasks=len(gpath_list),
-            ordered=True,
-            force_serial=force_serial,
-            futures_threaded=True,
-        )
+    params_iter = preproc_image.parse_imageinfo_stream(
+        gpath_list, force_serial=ibs.force_serial
     )
+    params_iter = _report_failed_images(gpath_list, params_iter, ensure)
+    if stream:
+        return params_iter
+    return list(params_iter)
 
-    # Error reporting
-    failed_list = [
-        gpath
-        for (gpath, (gpath_, params_)) in zip(gpath_list, params_list)
-        if not params_
-    ]
 
-    logger.info(
-        '\n'.join([' ! Failed reading gpath=%r' % (gpath,) for gpath in failed_list])
-    )
+def _report_failed_images(gpath_list, params_iter, ensure):
+    # Error reporting
+    failed_list = []
+    for gpath, (gpath_, params_) in zip(gpath_list, params_iter):
+        if not params_:
+            logger.info(' ! Failed reading gpath=%r' % (gpath,))
+            failed_list.append(gpath)
+        yield gpath_, params_
 
     if ensure and len(failed_list) > 0:
         logger.info('Importing %d files failed: %r' % (len(failed_list), failed_list))
 
-    return params_list
-
 
 @register_ibs_method
 @register_api('/api/image/uuid/', methods=['POST'])
@@ -393,41 +400,32 @@ def add_images(
     compute_params = params_list is None
     cache_uri_dict = {}
     if compute_params:
-        params_list = ibs._compute_image_uuids(gpath_list, **kwargs)
-        for (gpath_, params_) in params_list:
-            if gpath_ is not None and params_ is not None:
-                uri_ = params_[1]
-                cache_uri_dict[uri_] = gpath_
-
-    logger.info('Using cache_uri_dict = %s' % (ut.repr3(cache_uri_dict),))
-
-    # <DEBUG>
-    debug = False
-    if debug:
-        uuid_colx = IMAGE_COLNAMES.index('image_uuid')
-        uuid_list = [
-            None if params_ is None else params_[uuid_colx]
-            for (gpath_, params_) in params_list
-        ]
-        gid_list_ = ibs.get_image_gids_from_uuid(uuid_list)
-        valid_gids = ibs.get_valid_gids()
-        valid_uuids = ibs.get_image_uuids(valid_gids)
-        logger.info('[preadd] uuid / gid_ = ' + ut.indentjoin(zip(uuid_list, gid_list_)))
-        logger.info(
-            '[preadd] valid uuid / gid = ' + ut.indentjoin(zip(valid_uuids, valid_gids))
-        )
-    # </DEBUG>
+        params_iter = ibs._compute_image_uuids(gpath_list, stream=True, **kwargs)
+    else:
+        params_iter = iter(params_list)
 
+    # Parsed images are added in batches while the rest are still being parsed
     colnames = IMAGE_COLNAMES + ('image_original_path', 'image_location_code')
-    params_list = [
-        tuple(params) + (gpath, location_for_names) if params is not None else None
-        for (gpath_, params), gpath in zip(params_list, gpath_list)
-    ]
-
-    logger.info('Adding %d image records to DB' % (len(params_list),))
-    all_gid_list = ibs.db.add_cleanly(
-        const.IMAGE_TABLE, colnames, params_list, ibs.get_image_gids_from_uuid
-    )
+    all_gid_list = []
+    for chunk in ut.ichunks(zip(params_iter, gpath_list), ADD_IMAGES_BATCH_SIZE):
+        chunk_params_list = []
+        for (gpath_, params), gpath in chunk:
+            if compute_params and gpath_ is not None and params is not None:
+                uri_ = params[1]
+                cache_uri_dict[uri_] = gpath_
+            chunk_params_list.append(
+                tuple(params) + (gpath, location_for_names)
+                if params is not None
+                else None
+            )
+        logger.info('Adding %d image records to DB' % (len(chunk_params_list),))
+        all_gid_list += ibs.db.add_cleanly(
+            const.IMAGE_TABLE,
+            colnames,
+            chunk_params_list,
+            ibs.get_image_gids_from_uuid,
+        )
+    logger.info('Using cache_uri_dict = %s' % (ut.repr3(cache_uri_dict),))
     logger.info(
         '\t...added %d image rows to DB (%d unique)'
         % (
@@ -66,6 +66,17 @@ derived_attribute = register_preprocs['annot']
 register_subprop = register_subprops['annot']
 # dtool.Config.register_func = derived_attribute
 
+# Pack feature keypoints and descriptors into shard files instead of SQL
+# blobs (an existing feature cache must be deleted when this is toggled)
+FEAT_SHARDS = ut.get_argflag('--feat-shards')
+# Opt in to computing chunks of chips and features with a pool of workers,
+# 'thread' or 'process' (by default they are computed serially)
+CHUNK_EXECUTOR = ut.get_argval('--chunk-executor', type_=str, default=None)
+# Bytes of computed features held at once while the feature table is filled
+FEAT_MEMORY_BUDGET = int(
+    ut.get_argval('--feat-memory-mb', type_=float, default=256) * 2 ** 20
+)
+
 
 def testdata_core(defaultdb='testdb1', size=2):
     import wbia
@@ -288,6 +299,7 @@ ChipImgType = dtool.ExternType(vt.imread, vt.imwrite, extkey='ext')
     fname='chipcache4',
     rm_extern_on_delete=True,
     chunksize=256,
+    executor=CHUNK_EXECUTOR,
 )
 def compute_chip(depc, aid_list, config=None):
     r"""
@@ -1087,11 +1099,17 @@ class FeatConfig(dtool.Config):
     tablename='feat',
     parents=['chips'],
     colnames=['num_feats', 'kpts', 'vecs'],
-    coltypes=[int, np.ndarray, np.ndarray],
+    coltypes=(
+        [int, dtool.ShardType(), dtool.ShardType()]
+        if FEAT_SHARDS
+        else [int, np.ndarray, np.ndarray]
+    ),
     configclass=FeatConfig,
     rm_extern_on_delete=True,
     fname='featcache',
     chunksize=1024,
+    executor=CHUNK_EXECUTOR,
+    memory_budget=FEAT_MEMORY_BUDGET,
 )
 def compute_feats(depc, cid_list, config=None):
     """
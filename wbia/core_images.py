@@ -985,7 +985,8 @@ def compute_localizations(depc, loc_orig_id_list, config=None):
     ibs = depc.controller
 
     zipped = zip(depc.get_native('localizations_original', loc_orig_id_list, None))
-    for loc_orig_id, detect in zip(loc_orig_id_list, zipped):
+    detect_list = []
+    for detect in zipped:
         score, bboxes, thetas, confs, classes = detect[0]
 
         # Apply Threshold
@@ -1018,12 +1019,36 @@ def compute_localizations(depc, loc_orig_id_list, config=None):
                         % (config['sensitivity'], count_old, count_new)
                     )
 
-        # Apply NMS
-        if config['nms']:
-            indices = np.array(list(range(len(bboxes))))
-            indices, bboxes, thetas, confs, classes = ibs.nms_boxes(
-                indices, bboxes, thetas, confs, classes, verbose=VERBOSE, **config
+        detect_list.append((score, bboxes, thetas, confs, classes))
+
+    # Apply NMS to the detections of all images at once
+    if config['nms']:
+        offsets = np.cumsum([0] + [len(detect[1]) for detect in detect_list])
+        nonempty_list = [detect for detect in detect_list if len(detect[1]) > 0]
+        if len(nonempty_list) > 0:
+            flags = ibs.nms_boxes_batched(
+                offsets,
+                np.vstack([detect[1] for detect in nonempty_list]),
+                np.hstack([detect[2] for detect in nonempty_list]),
+                np.hstack([detect[3] for detect in nonempty_list]),
+                np.hstack([detect[4] for detect in nonempty_list]),
+                verbose=VERBOSE,
+                **config,
             )
+            flags_list = np.split(flags, offsets[1:-1])
+            for index, flags_ in enumerate(flags_list):
+                if len(flags_) > 0:
+                    score, bboxes, thetas, confs, classes = detect_list[index]
+                    detect_list[index] = (
+                        score,
+                        bboxes[flags_],
+                        thetas[flags_],
+                        confs[flags_],
+                        classes[flags_],
+                    )
+
+    for loc_orig_id, detect in zip(loc_orig_id_list, detect_list):
+        score, bboxes, thetas, confs, classes = detect
 
         # Kill invalid images
         if config['invalid']:
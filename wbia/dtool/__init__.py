@@ -13,6 +13,7 @@ from wbia.dtool import base
 from wbia.dtool import sql_control
 from wbia.dtool import depcache_control
 from wbia.dtool import depcache_table
+from wbia.dtool import shards
 
 from wbia.dtool.depcache_control import DependencyCache, make_depcache_decors
 from wbia.dtool.base import (
@@ -22,7 +23,7 @@ from wbia.dtool.base import (
     VsManySimilarityRequest,
     VsOneSimilarityRequest,
 )
-from wbia.dtool.depcache_table import ExternalStorageException, ExternType
+from wbia.dtool.depcache_table import ExternalStorageException, ExternType, ShardType
 from wbia.dtool.base import *  # NOQA
 from wbia.dtool.sql_control import SQLDatabaseController
 from wbia.dtool.types import TYPE_TO_SQLTYPE
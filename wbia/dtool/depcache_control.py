@@ -2,6 +2,7 @@
 """
 implicit version of dependency cache from wbia/templates/template_generator
 """
+import contextlib
 import logging
 
 import utool as ut
@@ -9,6 +10,7 @@ import numpy as np
 from wbia.dtool import sql_control
 from wbia.dtool import depcache_table
 from wbia.dtool import base
+from wbia.dtool import shards
 from collections import defaultdict
 import time
 import random
@@ -30,6 +32,12 @@ Args:
     colnames (list): data returned by this table
     coltypes (list): types of data returned by this table
     chunksize (int): (default = None)
+    executor (str): 'thread' or 'process' to compute chunks of dirty rows
+        concurrently (default = None)
+    num_workers (int): number of concurrent chunk workers (default = None)
+    memory_budget (int): streams dirty rows holding about this many bytes of
+        computed data at once instead of whole chunks. With an executor the
+        chunks of all workers share the budget. (default = None)
     configclass (dtool.TableConfig): derivative of dtool.TableConfig.
         if None, a default class will be constructed for you. (default = None)
     docstr (str): (default = None)
@@ -247,7 +255,9 @@ class DependencyCache:
         return self._db_by_name[name]
 
     def close(self):
-        """Close all managed SQL databases"""
+        """Close all managed SQL databases and shard writers"""
+        for table in self.cachetable_dict.values():
+            shards.close_shard_writers(table.extern_dpath)
         for db_inst in self._db_by_name.values():
             db_inst.close()
 
@@ -273,7 +283,11 @@ class DependencyCache:
             #       Either fix the name or find a better normalizer/slugifier.
             normalized_name = name.replace('/', '__')
             uri = self.controller.make_cache_db_uri(normalized_name)
-            db = sql_control.SQLDatabaseController(uri, normalized_name)
+            # The caches share the database (and replicas) when using postgres
+            replica_uris = getattr(self.controller, 'replica_uris', None)
+            db = sql_control.SQLDatabaseController(
+                uri, normalized_name, replica_uris=replica_uris
+            )
             # ??? This seems out of place. Shouldn't this be within the depcachetable instance?
             depcache_table.ensure_config_table(db)
             self._db_by_name[name] = db
@@ -895,34 +909,40 @@ class DependencyCache:
 
         input_tuple = root_rowids
 
-        for trynum in range(1, num_retries + 1):
-            try:
+        # Rows computed here are read back right away, before a replica has them
+        if ensure or recompute or recompute_all:
+            reads = sql_control.primary_reads()
+        else:
+            reads = contextlib.nullcontext()
+        with reads:
+            for trynum in range(1, num_retries + 1):
                 try:
-                    table = self[tablename]
-                    # Vectorized get of properties
-                    tbl_rowids = self.get_rowids(tablename, input_tuple, **rowid_kw)
-                    logger.debug(
-                        '[depc.get] tbl_rowids = %s' % (ut.trunc_repr(tbl_rowids),)
-                    )
-                    prop_list = table.get_row_data(tbl_rowids, colnames, **rowdata_kw)
-                except KeyError:
-                    tablename_ = tablename.lower()
-                    table = self[tablename_]
-                    # Vectorized get of properties
-                    tbl_rowids = self.get_rowids(tablename_, input_tuple, **rowid_kw)
-                    logger.debug(
-                        '[depc.get] tbl_rowids = %s' % (ut.trunc_repr(tbl_rowids),)
-                    )
-                    prop_list = table.get_row_data(tbl_rowids, colnames, **rowdata_kw)
-            except Exception:
-                logger.warn('!!* Hit Exception in depc.get()')
-                if trynum == num_retries:
-                    raise
-                retry_delay = random.uniform(retry_delay_min, retry_delay_max)
-                print('\t WAITING %0.02f SECONDS THEN RETRYING' % (retry_delay,))
-                time.sleep(retry_delay)
-            else:
-                break
+                    try:
+                        table = self[tablename]
+                        # Vectorized get of properties
+                        tbl_rowids = self.get_rowids(tablename, input_tuple, **rowid_kw)
+                        logger.debug(
+                            '[depc.get] tbl_rowids = %s' % (ut.trunc_repr(tbl_rowids),)
+                        )
+                        prop_list = table.get_row_data(tbl_rowids, colnames, **rowdata_kw)
+                    except KeyError:
+                        tablename_ = tablename.lower()
+                        table = self[tablename_]
+                        # Vectorized get of properties
+                        tbl_rowids = self.get_rowids(tablename_, input_tuple, **rowid_kw)
+                        logger.debug(
+                            '[depc.get] tbl_rowids = %s' % (ut.trunc_repr(tbl_rowids),)
+                        )
+                        prop_list = table.get_row_data(tbl_rowids, colnames, **rowdata_kw)
+                except Exception:
+                    logger.warn('!!* Hit Exception in depc.get()')
+                    if trynum == num_retries:
+                        raise
+                    retry_delay = random.uniform(retry_delay_min, retry_delay_max)
+                    print('\t WAITING %0.02f SECONDS THEN RETRYING' % (retry_delay,))
+                    time.sleep(retry_delay)
+                else:
+                    break
         logger.debug('* return prop_list=%s' % (ut.trunc_repr(prop_list),))
         return prop_list
 
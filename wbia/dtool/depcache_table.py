@@ -20,8 +20,13 @@ FIXME:
 
 
 """
+import collections
+import contextlib
 import logging
+import os
 import re
+import sys
+import threading
 import itertools as it
 from os.path import join, exists
 
@@ -29,8 +34,13 @@ import networkx as nx
 import utool as ut
 import ubelt as ub
 
+from wbia.dtool import shards
 from wbia.dtool import sqlite3 as lite
-from wbia.dtool.sql_control import SQLDatabaseController, compare_coldef_lists
+from wbia.dtool.sql_control import (
+    SQLDatabaseController,
+    compare_coldef_lists,
+    primary_reads,
+)
 from wbia.dtool.types import TYPE_TO_SQLTYPE
 
 import time
@@ -57,6 +67,74 @@ CONFIG_DICT = 'config_dict'
 # else:
 GRACE_PERIOD = ut.get_argval('--grace', type_=int, default=0)
 
+# Threads that read external files concurrently (1 reads them serially)
+EXTERN_READ_WORKERS = ut.get_argval('--extern-read-workers', type_=int, default=8)
+# Rows whose external files are read ahead by non-eager getters
+EXTERN_READ_AHEAD = ut.get_argval('--extern-read-ahead', type_=int, default=32)
+# Chunks that a chunk executor computes ahead of the SQL writer, as a count and
+# as an estimate of the bytes they hold
+MAX_PENDING_CHUNKS = ut.get_argval('--max-pending-chunks', type_=int, default=8)
+MAX_PENDING_NBYTES = ut.get_argval(
+    '--max-pending-nbytes', type_=int, default=512 * 2 ** 20
+)
+
+# Extern read thread pools by pid, which are shared by all the tables
+_EXTERN_READ_POOLS = {}
+_EXTERN_READ_POOLS_LOCK = threading.Lock()
+
+
+def _get_extern_read_pool():
+    from concurrent import futures
+
+    pid = os.getpid()
+    with _EXTERN_READ_POOLS_LOCK:
+        if pid not in _EXTERN_READ_POOLS:
+            _EXTERN_READ_POOLS[pid] = futures.ThreadPoolExecutor(
+                EXTERN_READ_WORKERS, thread_name_prefix='extern_read'
+            )
+        return _EXTERN_READ_POOLS[pid]
+
+
+def _read_extern(read_func, uri_full, read_extern, ensure):
+    if read_extern:
+        return read_func(uri_full)
+    if ensure:
+        ut.assertpath(shards.shard_ref_fpath(uri_full))
+    return uri_full
+
+
+class _ExternReadResult(object):
+    # Stands in for a future when reading serially
+    def __init__(self, func, *args):
+        self._func = func
+        self._args = args
+
+    def result(self):
+        return self._func(*self._args)
+
+
+def _submit_extern_read(read_func, uri_full, read_extern, ensure):
+    """
+    Starts reading an external file (concurrently unless EXTERN_READ_WORKERS
+    is 1) and returns an object whose result() method returns its data
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.depcache_table import *  # NOQA
+        >>> from wbia.dtool.depcache_table import _submit_extern_read
+        >>> # Simulate a storage where the first files are the slowest to read
+        >>> read_func = lambda fpath: time.sleep(0.01 * (8 - int(fpath[1:]))) or fpath.upper()
+        >>> reads = [_submit_extern_read(read_func, 'f%d' % x, True, True) for x in range(8)]
+        >>> # The results are returned in the order the reads were submitted
+        >>> data_list = [read.result() for read in reads]
+        >>> print(data_list)
+        ['F0', 'F1', 'F2', 'F3', 'F4', 'F5', 'F6', 'F7']
+    """
+    if read_extern and EXTERN_READ_WORKERS > 1:
+        pool = _get_extern_read_pool()
+        return pool.submit(_read_extern, read_func, uri_full, read_extern, ensure)
+    return _ExternReadResult(_read_extern, read_func, uri_full, read_extern, ensure)
+
 
 class TableOutOfSyncError(Exception):
     """Raised when the code's table definition doesn't match the defition in the database"""
@@ -100,6 +178,21 @@ class ExternType(ub.NiceRepr):
         )
 
 
+class ShardType(ExternType):
+    """
+    Type to denote a numpy array packed into a shard file shared by many rows
+    (see :mod:`wbia.dtool.shards`) instead of being saved in an SQL table.
+    Reading the column returns read-only views of the shard.
+    """
+
+    def __init__(self):
+        super(ShardType, self).__init__(
+            shards.read_shard_array,
+            shards.write_shard_array,
+            extern_ext=shards.SHARD_EXT,
+        )
+
+
 class ExternalStorageException(Exception):
     """Indicates a missing external file"""
 
@@ -107,6 +200,116 @@ class ExternalStorageException(Exception):
         super(ExternalStorageException, self).__init__(*args, **kwargs)
 
 
+class RowAccountant(object):
+    """
+    Wraps the output of a ``preproc_func`` and checks that it generates
+    exactly one item per input row, without requiring it to be a list.
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.depcache_table import *  # NOQA
+        >>> assert list(RowAccountant(iter('abc'), 3)) == ['a', 'b', 'c']
+        >>> import pytest
+        >>> with pytest.raises(AssertionError):
+        >>>     list(RowAccountant(iter('ab'), 3))
+        >>> rows = RowAccountant(iter('abcd'), 3)
+        >>> _ = [next(rows) for _ in range(3)]
+        >>> with pytest.raises(AssertionError):
+        >>>     rows.assert_exhausted()
+    """
+
+    def __init__(self, iterable, num_input, tablename=None):
+        self._iter = iter(iterable)
+        self.num_input = num_input
+        self.num_output = 0
+        self.tablename = tablename
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            item = next(self._iter)
+        except StopIteration:
+            self._check(self.num_output == self.num_input)
+            raise
+        self.num_output += 1
+        self._check(self.num_output <= self.num_input)
+        return item
+
+    def _check(self, flag):
+        assert flag, (
+            'Input and output sizes do not agree. '
+            'num_output=%r, num_input=%r, tablename=%r'
+            % (self.num_output, self.num_input, self.tablename)
+        )
+
+    def assert_exhausted(self):
+        """Checks that consumers which stop at ``num_input`` missed nothing"""
+        if self.num_output == self.num_input:
+            for _ in self._iter:
+                self.num_output += 1
+        self._check(self.num_output == self.num_input)
+
+
+def estimate_nbytes(obj):
+    """
+    Cheap estimate of the memory held by a computed row or a cached value
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.depcache_table import *  # NOQA
+        >>> import numpy as np
+        >>> assert estimate_nbytes((1, np.zeros(100, dtype=np.uint8))) > 100
+        >>> assert estimate_nbytes({'a': np.zeros(100, dtype=np.uint8)}) > 100
+    """
+    if isinstance(obj, (tuple, list)):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(item) for item in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_nbytes(key) + estimate_nbytes(item) for key, item in obj.items()
+        )
+    nbytes = getattr(obj, 'nbytes', None)
+    if nbytes is not None:
+        return nbytes
+    return sys.getsizeof(obj)
+
+
+class BudgetChunker(object):
+    """
+    Slices items into chunks whose computed outputs take about ``nbytes``
+    bytes, as measured on the chunks computed so far
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.depcache_table import *  # NOQA
+        >>> chunker = BudgetChunker(list(range(10)), chunksize=2, nbytes=300)
+        >>> chunks = iter(chunker)
+        >>> print(next(chunks))
+        [0, 1]
+        >>> chunker.measure(2, nbytes=200)
+        >>> print(next(chunks))
+        [2, 3, 4]
+    """
+
+    def __init__(self, items, chunksize, nbytes):
+        self.items = items
+        self.chunksize = max(chunksize, 1)
+        self.nbytes = nbytes
+
+    def __iter__(self):
+        start = 0
+        while start < len(self.items):
+            stop = min(start + self.chunksize, len(self.items))
+            yield self.items[start:stop]
+            start = stop
+
+    def measure(self, num_items, nbytes):
+        nbytes_per_item = max(nbytes / max(num_items, 1), 1)
+        chunksize = int(self.nbytes // nbytes_per_item)
+        self.chunksize = min(max(chunksize, 1), max(len(self.items), 1))
+
+
 def predrop_grace_period(tablename, seconds=None):
     """Hack that gives the user some time to abort deleting everything"""
     global GRACE_PERIOD
@@ -525,6 +728,8 @@ class _TableDebugHelper(object):
         logger.info('self.tablename = %r' % (self.tablename,))
         logger.info('self.rm_extern_on_delete = %r' % (self.rm_extern_on_delete,))
         logger.info('self.chunksize = %r' % (self.chunksize,))
+        logger.info('self.executor = %r' % (self.executor,))
+        logger.info('self.memory_budget = %r' % (self.memory_budget,))
         logger.info('self.fname = %r' % (self.fname,))
         logger.info('self.docstr = %r' % (self.docstr,))
         logger.info('self.data_colnames = %r' % (self.data_colnames,))
@@ -719,6 +924,8 @@ class _TableInternalSetup(ub.NiceRepr):
                 if is_exttype:
                     read_func = coltype.read_func
                     write_func = coltype.write_func
+                    if isinstance(coltype, ShardType):
+                        colattr['is_shard'] = True
                     if coltype.extern_ext is not None:
                         colattr['extern_ext'] = coltype.extern_ext
                     if coltype.extkey is not None:
@@ -982,6 +1189,7 @@ class _TableInternalSetup(ub.NiceRepr):
                 colattr['colname'] = colname
                 if data_colattr.get('is_external', False):
                     colattr['is_external_pointer'] = True
+                    colattr['is_shard'] = data_colattr.get('is_shard', False)
                     colattr['write_func'] = data_colattr['write_func']
                     colattr['read_func'] = data_colattr['read_func']
                 internal_col_attrs.append(colattr)
@@ -1540,6 +1748,10 @@ class _TableComputeHelper(object):
         extern_colattrs = ut.compress(internal_data_col_attrs, writable_flags)
         # extern_colnames = ut.dict_take_column(extern_colattrs, 'colname')
         extern_writers = ut.dict_take_column(extern_colattrs, 'write_func')
+        extern_shard_flags = ut.dict_take_column(extern_colattrs, 'is_shard', False)
+        shard_prefixes = [
+            self.tablename + '_' + colattr['colname'] for colattr in extern_colattrs
+        ]
 
         nCols = len(internal_data_col_attrs)
         idxs1 = ut.where(writable_flags)
@@ -1573,18 +1785,30 @@ class _TableComputeHelper(object):
                 ut.printex(ex, 'Did you forget to return/yeild your data as a tuple?')
                 raise
             # Write external data to disk
+            extern_uris = []
             try:
-                _iter = zip(extern_data, extern_fpaths, extern_writers)
-                for obj, fpath, write_func in _iter:
-                    abs_fpath = join(extern_dpath, fpath)
-                    # logger.info('WRITE fpath = %r, abs_fpath = %r' % (fpath, abs_fpath, ))
-                    write_func(abs_fpath, obj)
-                    ut.assert_exists(abs_fpath, verbose=False)
+                _iter = zip(
+                    extern_data,
+                    extern_fpaths,
+                    extern_writers,
+                    extern_shard_flags,
+                    shard_prefixes,
+                )
+                for obj, fpath, write_func, is_shard, prefix in _iter:
+                    if is_shard:
+                        # Appended to a shard, which returns a reference
+                        fpath = write_func(extern_dpath, prefix, obj)
+                    else:
+                        abs_fpath = join(extern_dpath, fpath)
+                        # logger.info('WRITE fpath = %r, abs_fpath = %r' % (fpath, abs_fpath, ))
+                        write_func(abs_fpath, obj)
+                        ut.assert_exists(abs_fpath, verbose=False)
+                    extern_uris.append(fpath)
             except Exception as ex:
                 ut.printex(ex, 'external write', keys=['config_rowid', 'data'])
                 raise
             # Return path instead of data
-            grouped_items = [extern_fpaths, normal_data]
+            grouped_items = [extern_uris, normal_data]
             groupxs = [idxs1, idxs2]
             data_new = tuple(ut.ungroup(grouped_items, groupxs, nCols - 1))
             yield data_new
@@ -1666,18 +1890,11 @@ class _TableComputeHelper(object):
         ]
         return fname_list
 
-    def _compute_dirty_rows(
-        self, dirty_parent_ids, dirty_preproc_args, config_rowid, config, verbose=True
-    ):
+    def _call_preproc_func(self, dirty_preproc_args, config):
         """
-        dirty_preproc_args = preproc_args
-        dirty_parent_ids = parent_rowids
-        config_ = config
+        Calls the registered worker function on a chunk of preproc args and
+        returns its (possibly lazy) output.
         """
-        nInput = len(dirty_parent_ids)
-        # if verbose:
-        #     logger.info('[deptbl.compute] nInput = %r' % (nInput,))
-
         # Pack arguments into column-wise order to send to the func
         argsT = zip(*dirty_preproc_args)
         argsT = list(argsT)  # TODO: remove
@@ -1697,17 +1914,42 @@ class _TableComputeHelper(object):
                 self.preproc_func(self.depc, *argrow, config=config_)
                 for argrow in zip(*argsT)
             )
+        return proptup_gen
+
+    def _compute_dirty_rows(
+        self,
+        dirty_parent_ids,
+        dirty_preproc_args,
+        config_rowid,
+        config,
+        verbose=True,
+        proptup_gen=None,
+    ):
+        """
+        dirty_preproc_args = preproc_args
+        dirty_parent_ids = parent_rowids
+        config_ = config
+
+        Args:
+            proptup_gen (list): precomputed output of ``preproc_func`` for
+                these rows (e.g. from a process worker). If None the function
+                is called here.
+        """
+        nInput = len(dirty_parent_ids)
+        # if verbose:
+        #     logger.info('[deptbl.compute] nInput = %r' % (nInput,))
 
+        # HACK extract config if given a request
+        config_ = config.config if hasattr(config, 'config') else config
+
+        if proptup_gen is None:
+            proptup_gen = self._call_preproc_func(dirty_preproc_args, config)
+
+        # Checks that exactly one output is generated per input row
+        proptup_gen = RowAccountant(proptup_gen, nInput, self.tablename)
         DEBUG_LIST_MODE = True
         if DEBUG_LIST_MODE:
             proptup_gen = list(proptup_gen)
-            num_output = len(proptup_gen)
-            assert (
-                num_output == nInput
-            ), 'Input and output sizes do not agree. ' 'num_output=%r, num_input=%r' % (
-                num_output,
-                nInput,
-            )
         # Append rowids and rectify nested and external columns
         dirty_params_iter = self.prepare_storage(
             dirty_parent_ids, proptup_gen, dirty_preproc_args, config_rowid, config_
@@ -1718,6 +1960,201 @@ class _TableComputeHelper(object):
         # None data means that there was an error for a specific row
         return dirty_params_iter
 
+    def _compute_dirty_chunk(self, dirty_chunk, config_rowid, config, proptup_gen=None):
+        """
+        Computes one chunk of (parent_ids, preproc_args) pairs and returns the
+        SQL rows that are ready to be written.
+        """
+        nChunkInput = len(dirty_chunk)
+        dirty_parent_ids_chunk, dirty_preproc_args_chunk = zip(*dirty_chunk)
+
+        dirty_params_iter = self._compute_dirty_rows(
+            dirty_parent_ids_chunk,
+            dirty_preproc_args_chunk,
+            config_rowid,
+            config,
+            proptup_gen=proptup_gen,
+        )
+
+        DEBUG_LIST_MODE = True
+        if DEBUG_LIST_MODE:
+            dirty_params_iter = list(dirty_params_iter)
+            assert len(dirty_params_iter) == nChunkInput
+        # TODO: Separate into func which can be specified as a callback.
+        # None data means that there was an error for a specific row
+        dirty_params_iter = ut.filter_Nones(dirty_params_iter)
+        return dirty_params_iter
+
+    def _get_num_workers(self):
+        return ut.num_cpus() if self.num_workers is None else self.num_workers
+
+    def _concurrent_compute_dirty_chunks(
+        self, chunk_iter, config_rowid, config, max_nbytes=None, on_finish=None
+    ):
+        """
+        Computes chunks with a pool of ``self.num_workers`` workers and yields
+        the SQL rows of each chunk in submission order, so a single consumer
+        can write them while the next chunks are being computed.
+
+        The chunks computed ahead of the consumer take at most about
+        ``max_nbytes`` bytes (default ``MAX_PENDING_NBYTES``). If given,
+        ``on_finish(num_rows, nbytes)`` is called with the size of each
+        finished chunk.
+
+        The ``'thread'`` executor runs the full chunk computation (including
+        external writes) in the workers. The ``'process'`` executor forks the
+        workers (the table and its controller are inherited, not pickled),
+        only runs ``preproc_func`` in them and prepares the storage in this
+        process.
+        """
+        from concurrent import futures
+        import multiprocessing
+
+        num_workers = self._get_num_workers()
+        if max_nbytes is None:
+            max_nbytes = MAX_PENDING_NBYTES
+        if self.executor == 'thread':
+            executor = futures.ThreadPoolExecutor(num_workers)
+        elif self.executor == 'process':
+            executor = futures.ProcessPoolExecutor(
+                num_workers,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_chunk_process_worker,
+                initargs=(self,),
+            )
+        else:
+            raise ValueError(
+                'table=%r has unknown executor=%r' % (self.tablename, self.executor)
+            )
+
+        def _submit(dirty_chunk):
+            if self.executor == 'thread':
+                return executor.submit(
+                    self._compute_dirty_chunk, dirty_chunk, config_rowid, config
+                )
+            dirty_preproc_args_chunk = [args for _, args in dirty_chunk]
+            return executor.submit(
+                _chunk_process_worker, dirty_preproc_args_chunk, config
+            )
+
+        def _finish(dirty_chunk, future):
+            result = future.result()
+            if self.executor == 'thread':
+                return result
+            return self._compute_dirty_chunk(
+                dirty_chunk, config_rowid, config, proptup_gen=result
+            )
+
+        # Bound the computed chunks waiting to be written by their number and
+        # by the size of the largest chunk seen so far. The first chunk is
+        # computed alone to measure its size.
+        max_pending = max(min(2 * num_workers, MAX_PENDING_CHUNKS), 1)
+        chunk_nbytes = None
+        pending = collections.deque()
+
+        def _is_full():
+            num_pending = len(pending)
+            if chunk_nbytes is None:
+                return True
+            return num_pending >= max_pending or (
+                num_pending * chunk_nbytes >= max_nbytes
+            )
+
+        try:
+            for dirty_chunk in chunk_iter:
+                if len(dirty_chunk) == 0:
+                    break
+                pending.append((dirty_chunk, _submit(dirty_chunk)))
+                while pending and _is_full():
+                    dirty_params_iter = _finish(*pending.popleft())
+                    nbytes = estimate_nbytes(dirty_params_iter)
+                    chunk_nbytes = max(chunk_nbytes or 0, nbytes)
+                    if on_finish is not None:
+                        on_finish(len(dirty_params_iter), nbytes)
+                    yield dirty_params_iter
+            while pending:
+                yield _finish(*pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _stream_compute_dirty_rows(
+        self, dirty_parent_ids, dirty_preproc_args, config_rowid, config
+    ):
+        """
+        Lazily computes dirty rows and yields batches of SQL rows that are
+        about ``self.memory_budget`` bytes large.
+
+        Outputs of ``preproc_func`` are never gathered into lists. After each
+        call of ``preproc_func`` the number of inputs for the next call is
+        rescaled so that its outputs fit in the memory budget.
+
+        Example:
+            >>> # ENABLE_DOCTEST
+            >>> from wbia.dtool.depcache_table import *  # NOQA
+            >>> from wbia.dtool.example_depcache2 import *  # NOQA
+            >>> depc = testdata_depc3(in_memory=False)
+            >>> depc.clear_all()
+            >>> list_data = depc.get('labeler', list(range(1, 10)), 'data')
+            >>> depc.clear_all()
+            >>> table = depc['labeler']
+            >>> table.chunksize, table.memory_budget = 2, 256
+            >>> stream_data = depc.get('labeler', list(range(1, 10)), 'data')
+            >>> assert stream_data == list_data
+        """
+        budget = self.memory_budget
+        nInput = len(dirty_parent_ids)
+        # HACK extract config if given a request
+        config_ = config.config if hasattr(config, 'config') else config
+        chunksize = nInput if self.chunksize is None else self.chunksize
+        colnames = self.computable_colnames()
+
+        start = 0
+        while start < nInput:
+            stop = min(start + max(chunksize, 1), nInput)
+            dirty_parent_ids_chunk = dirty_parent_ids[start:stop]
+            dirty_preproc_args_chunk = dirty_preproc_args[start:stop]
+            proptup_gen = RowAccountant(
+                self._call_preproc_func(dirty_preproc_args_chunk, config),
+                stop - start,
+                self.tablename,
+            )
+            dirty_params_iter = self.prepare_storage(
+                dirty_parent_ids_chunk,
+                proptup_gen,
+                dirty_preproc_args_chunk,
+                config_rowid,
+                config_,
+            )
+            batch = []
+            batch_nbytes = 0
+            chunk_nbytes = 0
+            for params in dirty_params_iter:
+                # None data means that there was an error for a specific row
+                if params is None:
+                    continue
+                nbytes = estimate_nbytes(params)
+                batch.append(params)
+                batch_nbytes += nbytes
+                chunk_nbytes += nbytes
+                if batch_nbytes >= budget:
+                    yield colnames, batch, len(batch)
+                    batch = []
+                    batch_nbytes = 0
+            # prepare_storage stops with the inputs, make sure no outputs remain
+            proptup_gen.assert_exhausted()
+            if batch:
+                yield colnames, batch, len(batch)
+            # Shrink or grow the next chunk to fit in the memory budget
+            nbytes_per_row = max(chunk_nbytes / (stop - start), 1)
+            chunksize = int(min(max(budget // nbytes_per_row, 1), nInput))
+            logger.debug(
+                '[deptbl.stream] tbl=%s, nbytes_per_row=%.1f, chunksize=%d'
+                % (self.tablename, nbytes_per_row, chunksize)
+            )
+            start = stop
+
     def _chunk_compute_dirty_rows(
         self, dirty_parent_ids, dirty_preproc_args, config_rowid, config, verbose=True
     ):
@@ -1725,6 +2162,13 @@ class _TableComputeHelper(object):
         Executes registered functions, does external storage and yeilds results
         to be stored internally in SQL.
 
+        If the table specifies an ``executor`` the chunks are computed
+        concurrently, otherwise they are computed one after another. If the
+        table specifies a ``memory_budget`` the serial rows are streamed
+        instead (see ``_stream_compute_dirty_rows``), while the concurrent
+        chunks are sized so that the chunks held by the workers share the
+        budget.
+
         CommandLine:
             python -m dtool.depcache_table _chunk_compute_dirty_rows
 
@@ -1737,16 +2181,48 @@ class _TableComputeHelper(object):
             >>> data = depc.get('labeler', [1, 2, 3], 'data')
             >>> data = depc.get('indexer', [[1, 2, 3]], 'data')
             >>> depc.print_all_tables()
+
+        Example:
+            >>> # ENABLE_DOCTEST
+            >>> from wbia.dtool.depcache_table import *  # NOQA
+            >>> from wbia.dtool.example_depcache2 import *  # NOQA
+            >>> depc = testdata_depc3(in_memory=False)
+            >>> depc.clear_all()
+            >>> serial_data = depc.get('labeler', list(range(1, 10)), 'data')
+            >>> depc.clear_all()
+            >>> table = depc['labeler']
+            >>> table.chunksize, table.executor, table.num_workers = 2, 'thread', 3
+            >>> thread_data = depc.get('labeler', list(range(1, 10)), 'data')
+            >>> assert thread_data == serial_data
+            >>> depc.clear_all()
+            >>> table.memory_budget = 256
+            >>> budget_data = depc.get('labeler', list(range(1, 10)), 'data')
+            >>> assert budget_data == serial_data
         """
         nInput = len(dirty_parent_ids)
         chunksize = nInput if self.chunksize is None else self.chunksize
 
         logger.info(
-            '[deptbl.compute] nInput={}, chunksize={}, tbl={}'.format(
-                nInput, self.chunksize, self.tablename
+            '[deptbl.compute] nInput={}, chunksize={}, executor={}, tbl={}'.format(
+                nInput, self.chunksize, self.executor, self.tablename
             )
         )
 
+        if self.memory_budget is not None and self.executor is None:
+            try:
+                yield from self._stream_compute_dirty_rows(
+                    dirty_parent_ids, dirty_preproc_args, config_rowid, config
+                )
+            except Exception as ex:
+                ut.printex(
+                    ex,
+                    'error in streaming add_rowids',
+                    keys=['config', 'config_rowid', 'self.preproc_func'],
+                    tb=True,
+                )
+                raise
+            return
+
         # Report computation progress
         dirty_iter = list(zip(dirty_parent_ids, dirty_preproc_args))
         prog_iter = ut.ProgChunks(
@@ -1760,26 +2236,32 @@ class _TableComputeHelper(object):
         # CALL EXTERNAL PREPROCESSING / GENERATION FUNCTION
         try:
             # prog_iter = list(prog_iter)
-            for dirty_chunk in tqdm.tqdm(prog_iter):
-                nChunkInput = len(dirty_chunk)
-                if nChunkInput == 0:
-                    return
-                dirty_parent_ids_chunk, dirty_preproc_args_chunk = zip(*dirty_chunk)
-
-                dirty_params_iter = self._compute_dirty_rows(
-                    dirty_parent_ids_chunk,
-                    dirty_preproc_args_chunk,
+            if self.executor is None:
+                chunk_gen = (
+                    self._compute_dirty_chunk(dirty_chunk, config_rowid, config)
+                    for dirty_chunk in tqdm.tqdm(prog_iter)
+                    # An empty chunk means there is nothing left to compute
+                    if len(dirty_chunk) > 0
+                )
+            elif self.memory_budget is None:
+                chunk_gen = self._concurrent_compute_dirty_chunks(
+                    tqdm.tqdm(prog_iter), config_rowid, config
+                )
+            else:
+                # Each worker holds a chunk, so they share the memory budget
+                chunker = BudgetChunker(
+                    dirty_iter,
+                    chunksize,
+                    self.memory_budget // self._get_num_workers(),
+                )
+                chunk_gen = self._concurrent_compute_dirty_chunks(
+                    tqdm.tqdm(chunker),
                     config_rowid,
                     config,
+                    max_nbytes=self.memory_budget,
+                    on_finish=chunker.measure,
                 )
-
-                DEBUG_LIST_MODE = True
-                if DEBUG_LIST_MODE:
-                    dirty_params_iter = list(dirty_params_iter)
-                    assert len(dirty_params_iter) == nChunkInput
-                # TODO: Separate into func which can be specified as a callback.
-                # None data means that there was an error for a specific row
-                dirty_params_iter = ut.filter_Nones(dirty_params_iter)
+            for dirty_params_iter in chunk_gen:
                 nChunkInput = len(dirty_params_iter)
                 yield colnames, dirty_params_iter, nChunkInput
         except Exception as ex:
@@ -1800,6 +2282,28 @@ class _TableComputeHelper(object):
             raise
 
 
+# The table computed by a forked chunk worker (see ``_init_chunk_process_worker``)
+_CHUNK_PROCESS_TABLE = None
+
+
+def _init_chunk_process_worker(table):
+    """
+    Initializer of forked chunk workers. The table is inherited from the
+    parent process, but the SQL engines must not be shared with it.
+    """
+    global _CHUNK_PROCESS_TABLE
+    from wbia.dtool import sql_control
+
+    sql_control.reset_engines_after_fork()
+    _CHUNK_PROCESS_TABLE = table
+
+
+def _chunk_process_worker(dirty_preproc_args, config):
+    """Runs ``preproc_func`` on one chunk inside a forked chunk worker"""
+    table = _CHUNK_PROCESS_TABLE
+    return list(table._call_preproc_func(dirty_preproc_args, config))
+
+
 @ut.reloadable_class
 class DependencyCacheTable(
     _TableGeneralHelper,
@@ -1831,6 +2335,16 @@ class DependencyCacheTable(
             process multiple inputs at once.
         taggable (bool): specifies if a computed object can be disconected from
             its ancestors and accessed via a tag.
+        executor (str): if ``'thread'`` or ``'process'``, dirty chunks are
+            computed concurrently by a pool of ``num_workers`` and written to
+            SQL by a single writer. (default = None, i.e. serial)
+        num_workers (int): size of the chunk worker pool (default = num cpus)
+        memory_budget (int): if specified, dirty rows are streamed from
+            ``preproc_func`` to SQL without building lists, holding at most
+            about this many bytes of computed rows. The chunk size passed to
+            ``preproc_func`` adapts to the measured size of a row. With an
+            ``executor`` the chunks of all workers share the budget.
+            (default = None)
 
     CommandLine:
         python -m dtool.depcache_table --exec-DependencyCacheTable
@@ -1865,6 +2379,9 @@ class DependencyCacheTable(
         rm_extern_on_delete=False,
         vectorized=True,
         taggable=False,
+        executor=None,
+        num_workers=None,
+        memory_budget=None,
     ):
         """
         recieves kwargs from depc._register_prop
@@ -1900,6 +2417,9 @@ class DependencyCacheTable(
         # self.store_delete_time = True
 
         self.chunksize = chunksize
+        self.executor = executor
+        self.num_workers = num_workers
+        self.memory_budget = memory_budget
         # SQL Internals
         self.sqldb_fpath = None
         self.rm_extern_on_delete = rm_extern_on_delete
@@ -1932,6 +2452,9 @@ class DependencyCacheTable(
         rm_extern_on_delete=False,
         vectorized=True,
         taggable=False,
+        executor=None,
+        num_workers=None,
+        memory_budget=None,
     ):
         """Build the instance based on a database and table name."""
         self = cls.__new__(cls)
@@ -1954,6 +2477,13 @@ class DependencyCacheTable(
         self.preproc_func = preproc_func
         #: Optional specification of the amount of blobs to modify in one SQL operation
         self.chunksize = chunksize
+        #: Optional pool type (``'thread'`` or ``'process'``) used to compute chunks concurrently
+        self.executor = executor
+        #: Number of concurrent chunk workers (defaults to the number of cpus)
+        self.num_workers = num_workers
+        #: Optional number of bytes of computed rows to hold at once (enables streaming
+        #: or bounds the chunks of the executor)
+        self.memory_budget = memory_budget
 
         # FIXME (20-Oct-12020) This definition of behavior by external means is a scope issue
         #       Another object should not be directly manipulating this object.
@@ -2372,42 +2902,48 @@ class DependencyCacheTable(
         rectify_tup = self._rectify_ids(parent_rowids)
         (parent_ids_, preproc_args, idxs1, idxs2) = rectify_tup
         # Do the getting / adding work
-        if recompute:
-            logger.info('REQUESTED RECOMPUTE')
-            # get existing rowids, delete them, recompute the request
-            rowid_list_ = self._get_rowid(
-                parent_ids_,
-                config=config,
-                eager=True,
-                nInput=None,
-            )
-            rowid_list_ = list(rowid_list_)
-            needs_recompute_rowids = ut.filter_Nones(rowid_list_)
-            try:
-                self._recompute_and_store(needs_recompute_rowids)
-            except Exception:
-                # If the config changes, there is nothing we can do.
-                # We have to delete the rows.
-                self.delete_rows(rowid_list_)
+        # Computed rows are read back right away, before a replica has them
         if ensure or recompute:
-            # Compute properties if they do not exist
-            for try_num in range(num_retries):
-                try:
-                    rowid_list_ = self.ensure_rows(
-                        parent_ids_,
-                        preproc_args,
-                        config=config,
-                    )
-                except ExternalStorageException:
-                    if try_num == num_retries - 1:
-                        raise
+            reads = primary_reads()
         else:
-            rowid_list_ = self._get_rowid(
-                parent_ids_,
-                config=config,
-                eager=eager,
-                nInput=nInput,
-            )
+            reads = contextlib.nullcontext()
+        with reads:
+            if recompute:
+                logger.info('REQUESTED RECOMPUTE')
+                # get existing rowids, delete them, recompute the request
+                rowid_list_ = self._get_rowid(
+                    parent_ids_,
+                    config=config,
+                    eager=True,
+                    nInput=None,
+                )
+                rowid_list_ = list(rowid_list_)
+                needs_recompute_rowids = ut.filter_Nones(rowid_list_)
+                try:
+                    self._recompute_and_store(needs_recompute_rowids)
+                except Exception:
+                    # If the config changes, there is nothing we can do.
+                    # We have to delete the rows.
+                    self.delete_rows(rowid_list_)
+            if ensure or recompute:
+                # Compute properties if they do not exist
+                for try_num in range(num_retries):
+                    try:
+                        rowid_list_ = self.ensure_rows(
+                            parent_ids_,
+                            preproc_args,
+                            config=config,
+                        )
+                    except ExternalStorageException:
+                        if try_num == num_retries - 1:
+                            raise
+            else:
+                rowid_list_ = self._get_rowid(
+                    parent_ids_,
+                    config=config,
+                    eager=eager,
+                    nInput=nInput,
+                )
         # Map outputs to correspond with inputs
         rowid_list = self._unrectify_ids(rowid_list_, parent_rowids, idxs1, idxs2)
         return rowid_list
@@ -2451,6 +2987,56 @@ class DependencyCacheTable(
         logger.info('Clearing data in %r' % (self,))
         self.db.drop_table(self.tablename)
         self.db.add_table(**self._get_addtable_kw())
+        # New rows must not be appended to the shards of the cleared rows
+        shards.close_shard_writers(self.extern_dpath)
+
+    def compact_shards(self):
+        """
+        Rewrites the arrays of the shard columns into new shards and deletes
+        the old shard files. This reclaims the space of deleted and recomputed
+        rows, which the shards otherwise keep.
+
+        Other processes must not write to this table while it is compacted.
+        """
+        shard_colattrs = [
+            colattr
+            for colattr in self.internal_data_col_attrs
+            if colattr.get('is_shard', False)
+        ]
+        if len(shard_colattrs) == 0:
+            return
+        extern_dpath = self.extern_dpath
+        shard_dpath = join(extern_dpath, shards.SHARD_DNAME)
+        # Stop appending to the current shards, so all of them can be replaced
+        shards.close_shard_writers(extern_dpath)
+        old_fpaths = ut.ls(shard_dpath) if exists(shard_dpath) else []
+        logger.info('Compacting %d shards of %r' % (len(old_fpaths), self))
+        tbl_rowids = self._get_all_rowids()
+        for colattr in shard_colattrs:
+            colname = colattr['intern_colname']
+            prefix = self.tablename + '_' + colattr['colname']
+            uris = self.db.get(
+                self.tablename, (colname,), tbl_rowids, id_colname=self.rowid_colname
+            )
+            new_uris = [
+                shards.write_shard_array(
+                    extern_dpath,
+                    prefix,
+                    shards.read_shard_array(join(extern_dpath, uri)),
+                )
+                if shards.is_shard_ref(uri)
+                else uri
+                for uri in uris
+            ]
+            self.db.set(
+                self.tablename,
+                (colname,),
+                new_uris,
+                tbl_rowids,
+                id_colname=self.rowid_colname,
+            )
+        shards.close_shard_writers(extern_dpath)
+        ut.remove_fpaths(old_fpaths, verbose=False)
 
     # @profile
     def delete_rows(self, rowid_list, delete_extern=None, dry=False, verbose=None):
@@ -2524,6 +3110,9 @@ class DependencyCacheTable(
                 if not isinstance(uri, tuple):
                     uri = [uri]
                 for uri_ in uri:
+                    if shards.is_shard_ref(uri_):
+                        # Shard files are shared with other rows
+                        continue
                     absuris.append(join(self.extern_dpath, uri_))
             fpaths = [fpath for fpath in absuris if exists(fpath)]
             if delete_extern:
@@ -2762,28 +3351,40 @@ class DependencyCacheTable(
         # if len(raw_prop_list) > 0:
         if nInput > 0 and len(nonNone_tbl_rowids) > 0:
             if generator_version:
+                extern_dpath = self.extern_dpath
 
-                def _generator_resolve_all():
-                    extern_dpath = self.extern_dpath
-                    for rawprop in raw_prop_list:
-                        if rawprop is None:
-                            raise Exception(
-                                'raw prop was None, but it should always be a tuple. '
-                                'This may indicate that the cache needs to be cleared'
-                            )
+                def _submit_row_reads(rawprop):
+                    if rawprop is None:
+                        raise Exception(
+                            'raw prop was None, but it should always be a tuple. '
+                            'This may indicate that the cache needs to be cleared'
+                        )
+                    reads = [
+                        _submit_extern_read(
+                            read_func,
+                            join(extern_dpath, rawprop[extern_colx]),
+                            read_extern,
+                            ensure,
+                        )
+                        for extern_colx, read_func in extern_resolve_tups
+                    ]
+                    return rawprop, reads
 
+                def _generator_resolve_all():
+                    # The external data of the next EXTERN_READ_AHEAD rows is
+                    # read while the current row is being consumed
+                    rawprop_iter = iter(raw_prop_list)
+                    read_ahead = max(EXTERN_READ_AHEAD, 1)
+                    pending = collections.deque(
+                        map(_submit_row_reads, it.islice(rawprop_iter, read_ahead))
+                    )
+                    while pending:
+                        rawprop, reads = pending.popleft()
+                        pending.extend(map(_submit_row_reads, it.islice(rawprop_iter, 1)))
                         exprop = list(rawprop)
                         # Modify prop with external data
-                        for extern_colx, read_func in extern_resolve_tups:
-                            uri = exprop[extern_colx]
-                            uri_full = join(extern_dpath, uri)
-                            if read_extern:
-                                data = read_func(uri_full)
-                            else:
-                                data = uri_full
-                                if ensure:
-                                    ut.assertpath(uri_full)
-                            exprop[extern_colx] = data
+                        for (extern_colx, _), read in zip(extern_resolve_tups, reads):
+                            exprop[extern_colx] = read.result()
                         # nestprop = ut.unflat_take(exprop, nesting_xs)
                         nestprop = tup_unflat_take(exprop, nesting_xs)
                         yield nestprop
@@ -2812,6 +3413,15 @@ class DependencyCacheTable(
                     except ExternalStorageException:
                         if tries_left == 0:
                             raise
+                        # Recomputed rows may reference new files (e.g. shards)
+                        raw_prop_list = self.get_internal_columns(
+                            nonNone_tbl_rowids,
+                            flat_intern_colnames,
+                            eager=eager,
+                            nInput=nInput,
+                            unpack_scalars=True,
+                            keepwrap=True,
+                        )
                     else:
                         # Things worked, dont need to try again
                         break
@@ -2860,15 +3470,17 @@ class DependencyCacheTable(
             logger.debug('[deptbl.get_row_data] read_func = %r' % (read_func,))
             data_list = []
             failed_list = []
-            for uri in prop_listT[extern_colx]:
-                uri_full = join(extern_dpath, uri)
+            # Start all the reads, which run concurrently in a thread pool
+            read_list = [
+                _submit_extern_read(
+                    read_func, join(extern_dpath, uri), read_extern, ensure
+                )
+                for uri in prop_listT[extern_colx]
+            ]
+            for uri, read in zip(prop_listT[extern_colx], read_list):
+                uri_full = join(extern_dpath, uri)  # NOQA (used by printex)
                 try:
-                    if read_extern:
-                        data = read_func(uri_full)
-                    else:
-                        if ensure:
-                            ut.assertpath(uri_full)
-                        data = uri_full
+                    data = read.result()
                 except Exception as ex:
                     ut.printex(
                         ex,
@@ -2899,7 +3511,11 @@ class DependencyCacheTable(
                 )
                 failed_rowids = ut.compress(nonNone_tbl_rowids, failed_list)
                 if delete_on_fail:
-                    self._recompute_external_storage(failed_rowids)
+                    if any(map(shards.is_shard_ref, failed_uris)):
+                        # Rewritten arrays get new shard references
+                        self._recompute_and_store(failed_rowids)
+                    else:
+                        self._recompute_external_storage(failed_rowids)
                     # self.delete_rows(failed_rowids, delete_extern=None)
                 raise ExternalStorageException(
                     'Some cached filenames failed to read. '
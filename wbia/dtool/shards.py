@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Packed storage of numpy arrays in large append-only shard files
+
+Instead of writing one file (or one SQL blob) per row, arrays are appended to
+the end of a shard file owned by the writing process.  Each array is referenced
+by a string of the form ``shards/<fname>?<offset>&<dtype>&<shape>``, which the
+depcache keeps in the external uri column of the row.  Reading an array returns
+a zero-copy, read-only view into a memory map of its shard.
+
+Shards are shared by many rows, so deleting or recomputing rows leaves dead
+space in the shard files rather than deleting them.  The space is reclaimed by
+:meth:`wbia.dtool.depcache_table.DependencyCacheTable.compact_shards`, which
+rewrites the live arrays of a table into new shards.
+"""
+import logging
+import mmap
+import os
+import threading
+import uuid
+from os.path import join
+
+import numpy as np
+import utool as ut
+
+
+(print, rrr, profile) = ut.inject2(__name__, '[shards]')
+logger = logging.getLogger('wbia.dtool')
+
+
+SHARD_DNAME = 'shards'
+SHARD_EXT = '.shard'
+SHARD_REF_SEP = '?'
+
+# Arrays are aligned to this many bytes within a shard
+SHARD_ALIGN = 64
+# Size in bytes at which a writer starts a new shard file
+SHARD_MAX_BYTES = ut.get_argval('--shard-max-bytes', type_=int, default=2 ** 30)
+
+# Shard writers by (pid, dpath, prefix)
+_SHARD_WRITERS = {}
+_SHARD_WRITERS_LOCK = threading.Lock()
+# Read only memory maps of shard files by fpath
+_SHARD_MMAPS = {}
+_SHARD_MMAPS_LOCK = threading.Lock()
+
+
+def is_shard_ref(uri):
+    """
+    Returns True if the external uri references an array in a shard
+    """
+    return isinstance(uri, str) and SHARD_REF_SEP in uri
+
+
+def shard_ref_fpath(uri):
+    """
+    Returns the path of the shard file referenced by the uri
+    """
+    return uri.split(SHARD_REF_SEP, 1)[0]
+
+
+def format_shard_ref(shard_fpath, offset, dtype, shape):
+    shape_str = ','.join(map(str, shape))
+    return '%s%s%d&%s&%s' % (shard_fpath, SHARD_REF_SEP, offset, dtype.str, shape_str)
+
+
+def parse_shard_ref(uri):
+    """
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.shards import *  # NOQA
+        >>> uri = format_shard_ref('shards/a.shard', 128, np.dtype(np.float32), (3, 6))
+        >>> print(uri)
+        shards/a.shard?128&<f4&3,6
+        >>> print(parse_shard_ref(uri))
+        ('shards/a.shard', 128, dtype('float32'), (3, 6))
+    """
+    shard_fpath, ref = uri.split(SHARD_REF_SEP, 1)
+    offset, dtype, shape_str = ref.split('&')
+    shape = tuple(int(dim) for dim in shape_str.split(',') if dim)
+    return shard_fpath, int(offset), np.dtype(dtype), shape
+
+
+class ShardWriter(object):
+    """
+    Appends arrays to the shard files of a single process
+    """
+
+    def __init__(self, dpath, prefix):
+        self.dpath = dpath
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.fname = None
+        self.file = None
+        self.size = 0
+
+    @property
+    def fpath(self):
+        """Path of the current shard file"""
+        if self.fname is None:
+            return None
+        return join(self.dpath, SHARD_DNAME, self.fname)
+
+    def _is_deleted(self):
+        # The open file has no links left once the shard (or its directory)
+        # was deleted, e.g. when the cache is cleared
+        return os.fstat(self.file.fileno()).st_nlink == 0
+
+    def _open_next_shard(self):
+        if self.file is not None:
+            self.file.close()
+        shard_dpath = ut.ensuredir(join(self.dpath, SHARD_DNAME))
+        self.fname = '%s_%d_%s%s' % (
+            self.prefix,
+            os.getpid(),
+            uuid.uuid4().hex[:8],
+            SHARD_EXT,
+        )
+        self.file = open(join(shard_dpath, self.fname), 'xb')
+        self.size = 0
+
+    def append(self, arr):
+        """
+        Writes an array to the end of the current shard and returns its
+        reference relative to ``dpath``
+        """
+        arr = np.ascontiguousarray(arr)
+        if arr.dtype.hasobject:
+            raise TypeError('Cannot store object arrays in a shard')
+        with self.lock:
+            if self.file is not None and self._is_deleted():
+                # Arrays appended to a deleted shard could never be read back
+                logger.info(
+                    '[shards] shard %r was deleted, starting a new one' % (self.fname,)
+                )
+                drop_shard_mmaps([self.fpath])
+                self.file.close()
+                self.file = None
+            if self.file is None or self.size >= SHARD_MAX_BYTES:
+                self._open_next_shard()
+            padding = -self.size % SHARD_ALIGN
+            if padding:
+                self.file.write(b'\x00' * padding)
+            offset = self.size + padding
+            if arr.nbytes > 0:
+                self.file.write(arr.data)
+            # Flush so the array can be read back as soon as its row is stored
+            self.file.flush()
+            self.size = offset + arr.nbytes
+            shard_fpath = SHARD_DNAME + '/' + self.fname
+        return format_shard_ref(shard_fpath, offset, arr.dtype, arr.shape)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def get_shard_writer(dpath, prefix):
+    key = (os.getpid(), dpath, prefix)
+    with _SHARD_WRITERS_LOCK:
+        if key not in _SHARD_WRITERS:
+            _SHARD_WRITERS[key] = ShardWriter(dpath, prefix)
+        return _SHARD_WRITERS[key]
+
+
+def close_shard_writers(dpath, prefix=None):
+    """
+    Closes the shard writers of ``dpath`` (and ``prefix``) in this process and
+    drops the memory maps of its shards. Later writes start new shard files.
+    """
+    with _SHARD_WRITERS_LOCK:
+        keys = [
+            key
+            for key in _SHARD_WRITERS
+            if key[1] == dpath and (prefix is None or key[2] == prefix)
+        ]
+        writers = [_SHARD_WRITERS.pop(key) for key in keys]
+    for writer in writers:
+        writer.close()
+    shard_dpath = join(dpath, SHARD_DNAME)
+    with _SHARD_MMAPS_LOCK:
+        fpaths = [fpath for fpath in _SHARD_MMAPS if fpath.startswith(shard_dpath)]
+    drop_shard_mmaps(fpaths)
+
+
+def write_shard_array(dpath, prefix, arr):
+    """
+    Appends an array to a shard in ``dpath`` and returns its reference
+
+    Args:
+        dpath (str): directory the reference is relative to
+        prefix (str): prefix of the shard file names
+        arr (ndarray): array to store
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.shards import *  # NOQA
+        >>> dpath = ut.ensure_app_resource_dir('dtool', 'test_shards')
+        >>> kpts = np.random.rand(5, 6).astype(np.float32)
+        >>> vecs = (np.random.rand(5, 128) * 255).astype(np.uint8)
+        >>> empty = np.empty((0, 128), dtype=np.uint8)
+        >>> refs = [write_shard_array(dpath, 'feat', arr) for arr in [kpts, vecs, empty]]
+        >>> assert len(set(map(shard_ref_fpath, refs))) == 1
+        >>> arrs = [read_shard_array(join(dpath, ref)) for ref in refs]
+        >>> assert np.all(arrs[0] == kpts) and np.all(arrs[1] == vecs)
+        >>> assert arrs[2].shape == (0, 128)
+        >>> # Reads are zero-copy views of the shard
+        >>> assert not arrs[1].flags.writeable and not arrs[1].flags.owndata
+        >>> assert arrs[1].ctypes.data % SHARD_ALIGN == 0
+    """
+    writer = get_shard_writer(dpath, prefix)
+    return writer.append(arr)
+
+
+def drop_shard_mmaps(fpaths):
+    """
+    Forgets the memory maps of shard files, e.g. after they are deleted.
+    Arrays that were already read keep their map alive.
+    """
+    with _SHARD_MMAPS_LOCK:
+        for fpath in fpaths:
+            _SHARD_MMAPS.pop(fpath, None)
+
+
+def _get_shard_mmap(fpath, size):
+    with _SHARD_MMAPS_LOCK:
+        buf = _SHARD_MMAPS.get(fpath)
+        if buf is not None and not os.path.exists(fpath):
+            # The shard was deleted (e.g. the cache was cleared)
+            del _SHARD_MMAPS[fpath]
+            buf = None
+        if buf is None or len(buf) < size:
+            # Map (or remap) the shard, which may have grown since it was
+            # mapped.  Any old map stays alive until its views are released.
+            with open(fpath, 'rb') as file_:
+                buf = mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ)
+            _SHARD_MMAPS[fpath] = buf
+    if len(buf) < size:
+        raise IOError('Shard %r is truncated' % (fpath,))
+    return buf
+
+
+def read_shard_array(uri_full):
+    """
+    Returns a read-only view of the array referenced by an absolute shard uri
+    """
+    fpath, offset, dtype, shape = parse_shard_ref(uri_full)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if nbytes == 0:
+        return np.empty(shape, dtype=dtype)
+    buf = _get_shard_mmap(fpath, offset + nbytes)
+    return np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
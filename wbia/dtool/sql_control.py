@@ -6,12 +6,15 @@ TODO; need to use some sort of sticky bit so
 sql files are created with reasonable permissions.
 """
 import functools
+import itertools
 import logging
 import collections
 import os
 import parse
 import re
+import threading
 import uuid
+import weakref
 from collections.abc import Mapping, MutableMapping
 from contextlib import contextmanager
 from os.path import join, exists
@@ -51,7 +54,26 @@ VERYVERBOSE = ut.VERYVERBOSE
 
 TIMEOUT = 600  # Wait for up to 600 seconds for the database to return from a locked state
 
+# Connection pool of each PostgreSQL engine (see create_engine)
+POSTGRESQL_POOL_CONFIG = {
+    'pool_size': ut.get_argval('--db-pool-size', type_=int, default=20),
+    'max_overflow': ut.get_argval('--db-pool-max-overflow', type_=int, default=10),
+    'pool_timeout': ut.get_argval('--db-pool-timeout', type_=int, default=30),
+    # Replace connections after this many seconds (-1 keeps them forever)
+    'pool_recycle': ut.get_argval('--db-pool-recycle', type_=int, default=3600),
+    # Test connections on checkout, so dropped connections are replaced
+    'pool_pre_ping': not ut.get_argflag('--db-no-pool-pre-ping'),
+}
+# Number of compiled SQL statements cached by each engine
+QUERY_CACHE_SIZE = ut.get_argval('--db-query-cache-size', type_=int, default=1000)
+
 BATCH_SIZE = int(1e4)
+# Bound parameters per PostgreSQL statement (the protocol limit is 65535)
+POSTGRESQL_MAX_PARAMS = 32767
+# Largest rowid; once it is used SQLite hands out unused rowids at random
+SQLITE_MAX_ROWID = 2 ** 63 - 1
+# Rows fetched at a time when streaming the results of a key join
+FETCH_SIZE = int(1e4)
 
 SQLColumnRichInfo = collections.namedtuple(
     'SQLColumnRichInfo', ('column_id', 'name', 'type_', 'notnull', 'dflt_value', 'pk')
@@ -78,8 +100,42 @@ METADATA_TABLE_COLUMNS = {
 }
 METADATA_TABLE_COLUMN_NAMES = list(METADATA_TABLE_COLUMNS.keys())
 
+# Number of primary_reads contexts the current thread is in
+_PRIMARY_READS = threading.local()
+
+
+@contextmanager
+def primary_reads():
+    """
+    Makes the getters of all controllers read from the primary instead of a
+    replica while in this context on the current thread. Used by code that
+    reads back rows it has just written, which a replica may not have yet.
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.sql_control import *  # NOQA
+        >>> db = SQLDatabaseController('sqlite:///', 'testing')
+        >>> assert db._use_replica(None)
+        >>> with primary_reads():
+        >>>     with primary_reads():
+        >>>         assert not db._use_replica(None)
+        >>>     assert not db._use_replica(None)
+        >>> assert db._use_replica(None)
+    """
+    depth = getattr(_PRIMARY_READS, 'depth', 0)
+    _PRIMARY_READS.depth = depth + 1
+    try:
+        yield
+    finally:
+        _PRIMARY_READS.depth = depth
+
 
-def create_engine(uri, POSTGRESQL_POOL_SIZE=20, ENGINES={}, timeout=TIMEOUT):
+def create_engine(uri, POSTGRESQL_POOL_SIZE=None, ENGINES={}, timeout=TIMEOUT):
+    """
+    Returns the engine of a uri, which is shared by all the controllers of the
+    process. PostgreSQL engines are configured by POSTGRESQL_POOL_CONFIG,
+    POSTGRESQL_POOL_SIZE overrides its pool size.
+    """
     pid = os.getpid()
     if ENGINES.get('pid') != pid:
         # ENGINES contains engines from the parent process that the
@@ -92,14 +148,17 @@ def create_engine(uri, POSTGRESQL_POOL_SIZE=20, ENGINES={}, timeout=TIMEOUT):
         'connect_args': {
             'timeout': timeout,
         },
+        'query_cache_size': QUERY_CACHE_SIZE,
     }
     if uri.startswith('sqlite:') and ':memory:' in uri:
         # Don't share engines for in memory sqlite databases
         return sqlalchemy.create_engine(uri, **kw)
     if uri not in ENGINES:
         if uri.startswith('postgresql:'):
-            # pool_size is not available for sqlite
-            kw['pool_size'] = POSTGRESQL_POOL_SIZE
+            # The pool options are not available for sqlite
+            kw.update(POSTGRESQL_POOL_CONFIG)
+            if POSTGRESQL_POOL_SIZE is not None:
+                kw['pool_size'] = POSTGRESQL_POOL_SIZE
             kw['connect_args'] = {
                 'connect_timeout': timeout,
             }
@@ -107,6 +166,24 @@ def create_engine(uri, POSTGRESQL_POOL_SIZE=20, ENGINES={}, timeout=TIMEOUT):
     return ENGINES[uri]
 
 
+# All controllers created in this process (see ``reset_engines_after_fork``)
+_CONTROLLERS = weakref.WeakSet()
+
+
+def reset_engines_after_fork():
+    """
+    Replaces the engines inherited from a parent process with new ones.
+
+    Call this first thing in a forked child (e.g. as a pool initializer) so
+    the child never touches the pooled connections owned by its parent.
+    In-memory databases only exist in the inherited connection and are left
+    alone.
+    """
+    for ctrlr in list(_CONTROLLERS):
+        if ':memory:' not in ctrlr.uri:
+            ctrlr._init_engines()
+
+
 def compare_coldef_lists(coldef_list1, coldef_list2):
     def normalize(coldef_list):
         for name, coldef in coldef_list:
@@ -150,6 +227,38 @@ def _unpacker(results):
     return results
 
 
+def _is_bulk_write(operation):
+    """
+    True for UPDATE and DELETE statements, which return nothing per parameter
+    set and can be executed for many parameter sets at once
+    """
+    if isinstance(operation, sqlalchemy.sql.dml.UpdateBase):
+        is_write = not isinstance(operation, sqlalchemy.sql.dml.Insert)
+        return is_write and not operation._returning
+    if isinstance(operation, sqlalchemy.sql.elements.TextClause):
+        words = str(operation).split(None, 1)
+        is_write = len(words) > 0 and words[0].upper() in ('UPDATE', 'DELETE')
+        return is_write and 'RETURNING' not in str(operation).upper()
+    return False
+
+
+def _batch_result_processor(type_, dialect):
+    """
+    HELPER: Returns a function that processes a list of values of a column
+    (passing through None values), or None if the values need no processing
+    """
+    if hasattr(type_, 'batch_result_processor'):
+        return type_.batch_result_processor(dialect, None)
+    processor = type_.result_processor(dialect, None)
+    if processor is None:
+        return None
+
+    def process(values):
+        return [None if v is None else processor(v) for v in values]
+
+    return process
+
+
 def tuplize(list_):
     """Converts each scalar item in a list to a dimension-1 tuple"""
     tup_list = [item if ut.isiterable(item) else (item,) for item in list_]
@@ -497,11 +606,14 @@ class SQLDatabaseController(object):
         def __len__(self):
             return len(self.ctrlr.get_table_names()) + 1  # for 'database'
 
-    def __init_engine(self):
-        """Create the SQLAlchemy Engine"""
+    def _init_engines(self):
+        """Create the SQLAlchemy Engines of the primary and the replicas"""
         self._engine = create_engine(self.uri)
+        self._replica_engines = [create_engine(uri) for uri in self.replica_uris]
+        # Reads are spread over the replicas in turn
+        self._replica_cycle = itertools.cycle(self._replica_engines)
 
-    def __init__(self, uri, name, readonly=READ_ONLY, timeout=TIMEOUT):
+    def __init__(self, uri, name, readonly=READ_ONLY, timeout=TIMEOUT, replica_uris=None):
         """Creates a controller instance from a connection URI
 
         The name is primarily used with Postgres. In Postgres the the name
@@ -514,6 +626,11 @@ class SQLDatabaseController(object):
         Args:
             uri (str): connection string or uri
             name (str): name of the database (e.g. chips, _ibeis_database, staging)
+            replica_uris (list of str): uris of read-only replicas of the
+                database. The getters (e.g. ``get`` and ``get_where``) read
+                from the replicas, unless they are called with
+                ``replica=False`` or inside :func:`primary_reads`. Everything
+                else uses ``uri``.
 
         """
         self.uri = uri
@@ -521,8 +638,11 @@ class SQLDatabaseController(object):
         self.timeout = timeout
         self.metadata = self.Metadata(self)
         self.readonly = readonly
+        self.replica_uris = list(replica_uris or [])
+        self._postgresql_types_initialized = False
 
-        self.__init_engine()
+        self._init_engines()
+        _CONTROLLERS.add(self)
         # Create a _private_ SQLAlchemy metadata instance
         # TODO (27-Sept-12020) Develop API to expose elements of SQLAlchemy.
         #      The MetaData is unbound to ensure we don't accidentally misuse it.
@@ -564,33 +684,43 @@ class SQLDatabaseController(object):
             schema = None
         return schema
 
-    def ensure_postgresql_types(self, conn):
-        """Create a connection instance to wrap a SQL execution block as a context manager"""
+    def ensure_postgresql_types(self, conn, replica=False):
+        """Sets the schema of a connection, which is created along with the
+        custom types the first time the primary is connected to"""
         if not self.is_using_postgres:
             return
 
-        # global TYPE_INITIALIZED_CACHE
-
-        # type_cache_tag = (
-        #     self.uri,
-        #     self.schema_name,
-        # )
-        # type_cache_flag = True
-        # if type_cache_tag not in TYPE_INITIALIZED_CACHE:
-        conn.execute(f'CREATE SCHEMA IF NOT EXISTS {self.schema_name}')
-        conn.execute(text('SET SCHEMA :schema'), schema=self.schema_name)
-        initialize_postgresql_types(conn, self.schema_name)
-        # try:
-        # except Exception:
-        #     type_cache_flag = False
+        if not replica and not self._postgresql_types_initialized:
+            conn.execute(f'CREATE SCHEMA IF NOT EXISTS {self.schema_name}')
+            conn.execute(text('SET SCHEMA :schema'), schema=self.schema_name)
+            initialize_postgresql_types(conn, self.schema_name)
+            self._postgresql_types_initialized = True
+        else:
+            # The engines are shared by all the schemas of a database
+            conn.execute(text('SET SCHEMA :schema'), schema=self.schema_name)
 
-        # TYPE_INITIALIZED_CACHE[type_cache_tag] = type_cache_flag
+    def _use_replica(self, replica):
+        """
+        Resolves the ``replica`` argument of the getters, where None reads
+        from a replica unless in a :func:`primary_reads` context
+        """
+        if replica is None:
+            replica = getattr(_PRIMARY_READS, 'depth', 0) == 0
+        return replica
 
     @contextmanager
-    def connect(self):
-        """Create a connection instance to wrap a SQL execution block as a context manager"""
-        with self._engine.connect() as conn:
-            self.ensure_postgresql_types(conn)
+    def connect(self, replica=False):
+        """Create a connection instance to wrap a SQL execution block as a context manager
+
+        Args:
+            replica (bool): connect to one of the read-only replicas, if there
+                are any. None does so unless in a :func:`primary_reads`
+                context (default: False)
+        """
+        replica = self._use_replica(replica) and len(self._replica_engines) > 0
+        engine = next(self._replica_cycle) if replica else self._engine
+        with engine.connect() as conn:
+            self.ensure_postgresql_types(conn, replica=replica)
             yield conn
 
     @profile
@@ -841,42 +971,176 @@ class SQLDatabaseController(object):
         #     So we find and use the primary key instead.
         table = self._reflect_table(tablename)
         columns = tuple(c.name for c in table.primary_key.columns)
-        rowid_list1 = self.get(tablename, columns, rowid_iter)
+        rowid_list1 = self.get(tablename, columns, rowid_iter, replica=False)
         exists_list = [rowid is not None for rowid in rowid_list1]
         return exists_list
 
     def _add(self, tblname, colnames, params_iter, unpack_scalars=True, **kwargs):
-        """ADDER NOTE: use add_cleanly"""
-        parameterized_values = [
-            {col: val for col, val in zip(colnames, params)} for params in params_iter
-        ]
+        """ADDER NOTE: use add_cleanly
+
+        Rows are inserted in batches, one statement per batch, and the primary
+        keys are returned in input order. PostgreSQL uses a multi-row
+        ``INSERT ... RETURNING`` that also returns a superkey, because the
+        returned rows are not guaranteed to be in input order. SQLite cannot
+        return keys from a bulk insert, so it executes the batch with
+        ``executemany`` and recovers the rowids from ``last_insert_rowid()``
+        (SQLite hands out new rowids consecutively inside the write
+        transaction). Batches that can not be matched this way are inserted
+        row by row.
+
+        Example:
+            >>> # ENABLE_DOCTEST
+            >>> from wbia.dtool.sql_control import *  # NOQA
+            >>> db = SQLDatabaseController('sqlite:///:memory:', 'testing')
+            >>> db.add_table('dummy_table', (
+            >>>     ('dummy_rowid', 'INTEGER PRIMARY KEY'),
+            >>>     ('key',         'TEXT'),
+            >>>     ('val',         'INTEGER'),
+            >>> ), superkeys=[('key',)], docstr='')
+            >>> params_iter = (('k%d' % (x,), x) for x in range(25))
+            >>> rowids = db._add('dummy_table', ('key', 'val'), params_iter, batch_size=10)
+            >>> assert rowids == list(range(1, 26))
+            >>> db.delete_rowids('dummy_table', [3, 24])
+            >>> rowids = db._add('dummy_table', ('key', 'val'), [('a', 0), ('b', 1)])
+            >>> assert rowids == [26, 27]
+            >>> assert db.get('dummy_table', ('key',), rowids) == ['a', 'b']
+        """
+        colnames = list(colnames)
         if self.is_using_postgres:
             # postgresql column names are lowercase
-            parameterized_values = [
-                {col.lower(): val for col, val in params.items()}
-                for params in parameterized_values
-            ]
+            colnames = [col.lower() for col in colnames]
         table = self._reflect_table(tblname)
-
-        # It would be possible to do one insert,
-        # but SQLite is not capable of returning the primary key value after a multi-value insert.
-        # Thus, we are stuck doing several inserts... ineffecient.
         insert_stmt = sqlalchemy.insert(table)
+        batch_size = self._insert_batch_size(len(colnames), kwargs.get('batch_size'))
 
         primary_keys = []
         with self.connect() as conn:
             with conn.begin():  # new nested database transaction
-                for vals in parameterized_values:
-                    result = conn.execute(insert_stmt.values(vals))
+                for chunk in ut.ichunks(params_iter, batch_size):
+                    parameterized_values = [
+                        {col: val for col, val in zip(colnames, params)}
+                        for params in chunk
+                    ]
+                    primary_keys.extend(
+                        self._insert_batch(conn, table, insert_stmt, parameterized_values)
+                    )
+        if unpack_scalars:
+            # Assumption at the time of writing this is that the primary key is the SQLite rowid.
+            # Therefore, we can assume the primary key is a single column value.
+            primary_keys = [pk[0] for pk in primary_keys]
+        return primary_keys
 
-                    pk = result.inserted_primary_key
-                    if unpack_scalars:
-                        # Assumption at the time of writing this is that the primary key is the SQLite rowid.
-                        # Therefore, we can assume the primary key is a single column value.
-                        pk = pk[0]
-                    primary_keys.append(pk)
+    def _insert_batch_size(self, num_cols, batch_size=None):
+        """Number of rows to insert with one statement"""
+        if batch_size is None:
+            batch_size = BATCH_SIZE
+        if self.is_using_postgres:
+            # Every value of a multi-row VALUES is a bound parameter
+            batch_size = min(batch_size, POSTGRESQL_MAX_PARAMS // max(num_cols, 1))
+        return max(batch_size, 1)
+
+    def _insert_batch(self, conn, table, insert_stmt, parameterized_values):
+        """Inserts rows with one statement and returns their primary keys in order"""
+        if len(parameterized_values) == 0:
+            return []
+        pk_columns = list(table.primary_key.columns)
+        pk_names = [col.name for col in pk_columns]
+        given_pks = [
+            tuple(vals.get(name) for name in pk_names) for vals in parameterized_values
+        ]
+        if len(pk_names) > 0 and all(None not in pk for pk in given_pks):
+            # The caller specified the primary keys
+            conn.execute(insert_stmt, parameterized_values)
+            return given_pks
+
+        if self.is_using_postgres and len(pk_columns) > 0:
+            key_names = self._get_insert_key_colnames(table, parameterized_values)
+            if key_names is not None:
+                key_columns = [table.columns[name] for name in key_names]
+                result = conn.execute(
+                    insert_stmt.values(parameterized_values).returning(
+                        *(pk_columns + key_columns)
+                    )
+                )
+                num_pks = len(pk_columns)
+                key_to_pk = {tuple(row[num_pks:]): tuple(row[:num_pks]) for row in result}
+                keys = [
+                    tuple(vals[name] for name in key_names)
+                    for vals in parameterized_values
+                ]
+                if len(key_to_pk) != len(keys) or not all(
+                    key in key_to_pk for key in keys
+                ):
+                    # Rolls back the transaction of the whole insert
+                    raise RuntimeError(
+                        'rows returned by the insert into %s do not match the '
+                        'superkey %r of the inserted rows' % (table.name, key_names)
+                    )
+                return [key_to_pk[key] for key in keys]
+
+        is_rowid_alias = len(pk_columns) == 1 and str(pk_columns[0].type) == 'INTEGER'
+        num = len(parameterized_values)
+        if self.is_using_sqlite and is_rowid_alias:
+            max_rowid = conn.execute(
+                text(f'SELECT IFNULL(MAX(rowid), 0) FROM {table.name}')
+            ).scalar()
+        else:
+            max_rowid = None
+        # New rowids are consecutive unless they run past the largest rowid
+        if max_rowid is not None and max_rowid <= SQLITE_MAX_ROWID - num:
+            conn.execute(insert_stmt, parameterized_values)
+            last_rowid = conn.execute(text('SELECT last_insert_rowid()')).scalar()
+            first_rowid = last_rowid - num + 1
+            # The rows after max_rowid are the new rows (other writers are
+            # locked out by this transaction). They are the batch iff they are
+            # exactly the consecutive rowids ending with the last one.
+            new_rows = conn.execute(
+                text(
+                    f'SELECT COUNT(*), MIN(rowid), MAX(rowid) FROM {table.name} '
+                    'WHERE rowid > :max_rowid'
+                ),
+                {'max_rowid': max_rowid},
+            ).fetchone()
+            if tuple(new_rows) != (num, first_rowid, last_rowid):
+                # e.g. a trigger inserted into the table as well. This rolls
+                # back the transaction of the whole insert.
+                raise RuntimeError(
+                    'rowids of the bulk insert into %s are not consecutive'
+                    % (table.name,)
+                )
+            return [(rowid,) for rowid in range(first_rowid, last_rowid + 1)]
+
+        # The keys of the new rows can not be recovered from a bulk insert
+        primary_keys = []
+        for vals in parameterized_values:
+            result = conn.execute(insert_stmt.values(vals))
+            primary_keys.append(tuple(result.inserted_primary_key))
         return primary_keys
 
+    def _get_insert_key_colnames(self, table, parameterized_values):
+        """
+        Returns the names of a superkey whose values are given for every row
+        and distinct within the batch, or None if there is no such superkey
+        """
+        if table.name not in self.get_table_names(lazy=True):
+            return None
+        given_names = set(parameterized_values[0].keys())
+        for superkey in self.get_table_superkey_colnames(table.name):
+            key_names = [name.lower() for name in superkey]
+            if not set(key_names) <= given_names:
+                continue
+            try:
+                keys = {
+                    tuple(vals[name] for name in key_names)
+                    for vals in parameterized_values
+                }
+            except TypeError:
+                # unhashable values (e.g. arrays) can not be matched
+                continue
+            if len(keys) == len(parameterized_values):
+                return key_names
+        return None
+
     def add_cleanly(
         self,
         tblname,
@@ -959,7 +1223,10 @@ class SQLDatabaseController(object):
         # Check to see if this already exists in the database
         # superkey_params_iter = list(zip(*superkey_lists))
         # get_rowid_from_superkey functions take each list separately here
-        rowid_list_ = get_rowid_from_superkey(*superkey_lists)
+        # Both lookups read from the primary, because a replica may not have
+        # the rows that were just added (here or by a previous call)
+        with primary_reads():
+            rowid_list_ = get_rowid_from_superkey(*superkey_lists)
         isnew_list = [rowid is None for rowid in rowid_list_]
         if VERBOSE_SQL and not all(isunique_list):
             logger.info('[WARNING]: duplicate inputs to db.add_cleanly')
@@ -993,7 +1260,8 @@ class SQLDatabaseController(object):
             raise
         # TODO: We should only have to preform a subset of adds here
         # (at the positions where rowid_list was None in the getter check)
-        rowid_list = get_rowid_from_superkey(*superkey_lists)
+        with primary_reads():
+            rowid_list = get_rowid_from_superkey(*superkey_lists)
 
         # ADD_CLEANLY_4: SANITY CHECK AND RETURN
         assert len(rowid_list) == len(params_list), 'failed sanity check'
@@ -1016,6 +1284,7 @@ class SQLDatabaseController(object):
         unpack_scalars=True,
         op='AND',
         batch_size=BATCH_SIZE,
+        replica=None,
         **kwargs,
     ):
         """Executes a SQL select where the given parameters match/equal
@@ -1032,6 +1301,9 @@ class SQLDatabaseController(object):
             unpack_scalars (bool): [deprecated] use to unpack a single result from each query
                                    only use with operations that return a single result for each query
                                    (default: True)
+            replica (bool): read from a replica, which may lag behind the
+                primary. None does so unless in a :func:`primary_reads`
+                context (default: None)
 
         """
         if len(where_colnames) == 1:
@@ -1042,6 +1314,18 @@ class SQLDatabaseController(object):
                 id_colname=where_colnames[0],
                 unpack_scalars=unpack_scalars,
                 batch_size=batch_size,
+                replica=replica,
+                **kwargs,
+            )
+        if kwargs.pop('assume_unique', False) and op.lower() == 'and':
+            return self.get_bulk(
+                tblname,
+                colnames,
+                params_iter,
+                id_colnames=where_colnames,
+                unpack_scalars=unpack_scalars,
+                batch_size=batch_size,
+                replica=replica,
                 **kwargs,
             )
         params_iter = list(params_iter)
@@ -1062,6 +1346,7 @@ class SQLDatabaseController(object):
                 params,
                 where_clause,
                 unpack_scalars=unpack_scalars,
+                replica=replica,
                 **kwargs,
             )
 
@@ -1086,6 +1371,7 @@ class SQLDatabaseController(object):
                         batch * params_per_batch : (batch + 1) * params_per_batch
                     ]
                 },
+                replica=replica,
             )
             for val in val_list:
                 key = val[: len(params_iter[0])]
@@ -1194,6 +1480,7 @@ class SQLDatabaseController(object):
         where_clause,
         unpack_scalars=True,
         eager=True,
+        replica=None,
         **kwargs,
     ):
         """
@@ -1208,6 +1495,9 @@ class SQLDatabaseController(object):
             unpack_scalars (bool): [deprecated] use to unpack a single result from each query
                                    only use with operations that return a single result for each query
                                    (default: True)
+            replica (bool): read from a replica, which may lag behind the
+                primary. None does so unless in a :func:`primary_reads`
+                context (default: None)
 
         """
         if not isinstance(colnames, (tuple, list)):
@@ -1225,7 +1515,7 @@ class SQLDatabaseController(object):
         stmt = sqlalchemy.select([table.c[c] for c in colnames])
 
         if where_clause is None:
-            val_list = self.executeone(stmt, **kwargs)
+            val_list = self.executeone(stmt, replica=replica, **kwargs)
         else:
             stmt = stmt.where(where_clause)
             val_list = self.executemany(
@@ -1233,6 +1523,7 @@ class SQLDatabaseController(object):
                 params_iter,
                 unpack_scalars=unpack_scalars,
                 eager=eager,
+                replica=replica,
                 **kwargs,
             )
 
@@ -1298,10 +1589,244 @@ class SQLDatabaseController(object):
         # ??? Why can this be called with params_iter=None & superkey_colnames=None?
         table = self._reflect_table(tblname)
         columns = tuple(c.name for c in table.primary_key.columns)
+        # Older databases do not constrain every superkey to be unique
+        if superkey_colnames is not None:
+            kwargs.setdefault(
+                'assume_unique', self._is_unique_key(tblname, superkey_colnames)
+            )
         return self.get_where_eq(
             tblname, columns, params_iter, superkey_colnames, op='AND', **kwargs
         )
 
+    def _is_unique_id_colname(self, tblname, id_colname):
+        """Checks if ``id_colname`` is the rowid or the primary key"""
+        if id_colname == 'rowid':
+            return True
+        table = self._reflect_table(tblname)
+        primary_keys = tuple(c.name for c in table.primary_key.columns)
+        return primary_keys == (id_colname,)
+
+    def _is_unique_key(self, tblname, colnames):
+        """
+        Checks if the table declares a primary key or unique constraint on
+        (a subset of) ``colnames``, so that they match at most one row
+        """
+        colnames = {name.lower() for name in colnames}
+        table = self._reflect_table(tblname)
+        unique_keys = [
+            constraint.columns
+            for constraint in table.constraints
+            if isinstance(
+                constraint,
+                (sqlalchemy.PrimaryKeyConstraint, sqlalchemy.UniqueConstraint),
+            )
+        ]
+        unique_keys += [index.columns for index in table.indexes if index.unique]
+        return any(
+            len(columns) > 0 and {c.name.lower() for c in columns} <= colnames
+            for columns in unique_keys
+        )
+
+    def get_bulk(
+        self,
+        tblname,
+        colnames,
+        id_iter,
+        id_colnames=('rowid',),
+        unpack_scalars=True,
+        keepwrap=False,
+        as_numpy=False,
+        dtype=None,
+        batch_size=BATCH_SIZE,
+        replica=None,
+        **kwargs,
+    ):
+        """Get rows of data by a key that matches at most one row (e.g. the
+        rowid or a superkey)
+
+        The keys are bound as the rows of a ``VALUES`` table that is joined
+        against ``tblname`` and ordered by input position, so the results come
+        back from the database already aligned with ``id_iter``. No per-id
+        mapping or sorting is done in Python.
+
+        Args:
+            tblname (str): table name to get from
+            colnames (tuple of str): column names to grab from
+            id_iter (iterable): keys; scalars when there is a single key column,
+                otherwise tuples in the order of ``id_colnames``
+            id_colnames (tuple of str): columns that uniquely identify a row
+            unpack_scalars (bool): if False each result is wrapped in a list
+                that is empty for missing rows (default: True)
+            keepwrap (bool): return tuples even for a single column
+            as_numpy (bool): return a numpy array instead of a list
+            dtype (numpy.dtype): dtype of the returned array
+            replica (bool): read from a replica, which may lag behind the
+                primary. None does so unless in a :func:`primary_reads`
+                context (default: None)
+
+        Example:
+            >>> # ENABLE_DOCTEST
+            >>> from wbia.dtool.sql_control import *  # NOQA
+            >>> db = SQLDatabaseController('sqlite:///:memory:', 'testing')
+            >>> db.add_table('dummy_table', (
+            >>>     ('rowid',               'INTEGER PRIMARY KEY'),
+            >>>     ('key1',                'TEXT'),
+            >>>     ('key2',                'INTEGER'),
+            >>>     ('val',                 'REAL'),
+            >>> ), superkeys=[('key1', 'key2')], docstr='')
+            >>> colnames = ('key1', 'key2', 'val')
+            >>> rowids = db._add('dummy_table', colnames, [('a', 1, .5), ('b', 2, 1.5)])
+            >>> db.get_bulk('dummy_table', ('val',), [2, 3, 1, 2])
+            [1.5, None, 0.5, 1.5]
+            >>> db.get_bulk('dummy_table', ('rowid', 'val'), [('b', 2), ('a', 2)],
+            >>>             id_colnames=('key1', 'key2'))
+            [(2, 1.5), None]
+            >>> db.get_bulk('dummy_table', ('val',), [1, 2], as_numpy=True)
+            array([0.5, 1.5])
+        """
+        import numpy as np
+
+        if not isinstance(colnames, (tuple, list)):
+            raise TypeError('colnames must be a sequence type of strings')
+        id_colnames = tuple(id_colnames)
+        num_keys = len(id_colnames)
+        id_list = list(id_iter)
+        if num_keys == 1:
+            key_list = [(id_,) for id_ in id_list]
+        else:
+            key_list = [tuple(id_) for id_ in id_list]
+
+        table = self._reflect_table(tblname)
+        dialect = self._engine.dialect
+        preparer = dialect.identifier_preparer
+
+        def _column(colname):
+            if colname == 'rowid' and colname not in table.c:
+                # rowid isn't an actual column in sqlite
+                return sqlalchemy.sql.column('rowid', Integer)
+            return table.c[colname]
+
+        # Convert the keys to their database representation one column at a time
+        id_columns = [_column(c) for c in id_colnames]
+        keys_T = list(zip(*key_list)) if key_list else [[]] * num_keys
+        for x, column in enumerate(id_columns):
+            processor = column.type.bind_processor(dialect)
+            if processor is not None:
+                keys_T[x] = [None if k is None else processor(k) for k in keys_T[x]]
+        key_list = list(zip(*keys_T))
+
+        key_names = ['_key_%d' % (x,) for x in range(num_keys)]
+        join_clause = ' AND '.join(
+            '_tbl.{} = _keys.{}'.format(preparer.quote(c), k)
+            for c, k in zip(id_colnames, key_names)
+        )
+        # The first key column is selected to tell missing rows from NULL data
+        select_cols = [preparer.quote(id_colnames[0])] + [
+            preparer.quote(c) for c in colnames
+        ]
+        operation_fmt = ut.codeblock(
+            """
+            {with_keys}
+            SELECT {select_cols}
+            FROM {keys} LEFT JOIN {tblname} AS _tbl ON {join_clause}
+            ORDER BY _keys._key_idx
+            """
+        )
+        fmtdict = {
+            'with_keys': '',
+            'select_cols': ', '.join('_tbl.' + c for c in select_cols),
+            'tblname': preparer.format_table(table),
+            'join_clause': join_clause,
+        }
+
+        # Result processors of the requested columns (e.g. UUID and NDArray)
+        result_processors = [
+            _batch_result_processor(_column(c).type, dialect) for c in colnames
+        ]
+
+        rows_per_batch = max(int(batch_size / (num_keys + 1)), 1)
+        num_batches = int(np.ceil(len(key_list) / rows_per_batch))
+        rows = []
+        with self.connect(replica=replica) as conn:
+            if self.is_using_postgres and key_list:
+                # Bind each key column as a single array parameter, so all
+                # the keys are joined in one statement
+                unnest_args = ', '.join(
+                    'CAST(%s AS {}[])'.format(column.type.compile(dialect))
+                    for column in id_columns
+                )
+                keys_fmt = 'unnest({}) WITH ORDINALITY AS _keys({}, _key_idx)'
+                fmtdict['keys'] = keys_fmt.format(unnest_args, ', '.join(key_names))
+                operation = operation_fmt.format(**fmtdict)
+                params = tuple(list(keys) for keys in zip(*key_list))
+                result = conn.execution_options(stream_results=True).exec_driver_sql(
+                    operation, params
+                )
+                for partition in result.partitions(FETCH_SIZE):
+                    rows.extend(partition)
+            elif num_batches > 1:
+                # Load the keys into a temporary table once and join against it
+                keys_tblname = '_keys_%s' % (uuid.uuid4().hex,)
+                # The transaction is committed, so that the table is dropped
+                # before the connection is returned to the pool
+                with conn.begin():
+                    conn.exec_driver_sql(
+                        'CREATE TEMPORARY TABLE {} (_key_idx INTEGER PRIMARY KEY, {})'.format(
+                            keys_tblname, ', '.join(key_names)
+                        )
+                    )
+                    conn.exec_driver_sql(
+                        'INSERT INTO {} VALUES ({})'.format(
+                            keys_tblname, ', '.join(['?'] * (num_keys + 1))
+                        ),
+                        [(idx,) + key for idx, key in enumerate(key_list)],
+                    )
+                    fmtdict['keys'] = '{} AS _keys'.format(keys_tblname)
+                    operation = operation_fmt.format(**fmtdict)
+                    result = conn.exec_driver_sql(operation)
+                    for partition in result.partitions(FETCH_SIZE):
+                        rows.extend(partition)
+                    conn.exec_driver_sql('DROP TABLE {}'.format(keys_tblname))
+            else:
+                # Few keys are bound as the rows of a VALUES table
+                placeholder = '?' if dialect.paramstyle == 'qmark' else '%s'
+                row_fmt = '(' + ', '.join([placeholder] * (num_keys + 1)) + ')'
+                fmtdict['with_keys'] = 'WITH _keys(_key_idx, {}) AS (VALUES {})'.format(
+                    ', '.join(key_names), ', '.join([row_fmt] * len(key_list))
+                )
+                fmtdict['keys'] = '_keys'
+                operation = operation_fmt.format(**fmtdict)
+                params = tuple(
+                    ut.flatten((idx,) + key for idx, key in enumerate(key_list))
+                )
+                if key_list:
+                    rows = conn.exec_driver_sql(operation, params).fetchall()
+
+        if len(rows) != len(key_list):
+            raise ValueError(
+                'the keys %r do not identify unique rows of %r' % (id_colnames, tblname)
+            )
+
+        found_flags = [row[0] is not None for row in rows]
+        # Process the data column-wise
+        data_T = [[row[x] for row in rows] for x in range(1, len(colnames) + 1)]
+        for x, processor in enumerate(result_processors):
+            if processor is not None:
+                data_T[x] = processor(data_T[x])
+
+        if len(colnames) == 1 and not keepwrap:
+            values_list = data_T[0]
+        else:
+            values_list = list(zip(*data_T)) if rows else []
+
+        if as_numpy:
+            if not values_list and (len(colnames) > 1 or keepwrap):
+                return np.empty((0, len(colnames)), dtype=dtype)
+            return np.array(values_list, dtype=dtype)
+        if unpack_scalars:
+            return [v if flag else None for v, flag in zip(values_list, found_flags)]
+        return [[v] if flag else [] for v, flag in zip(values_list, found_flags)]
+
     def get(
         self,
         tblname,
@@ -1311,6 +1836,7 @@ class SQLDatabaseController(object):
         eager=True,
         assume_unique=False,
         batch_size=BATCH_SIZE,
+        replica=None,
         **kwargs,
     ):
         """Get rows of data by ID
@@ -1321,8 +1847,13 @@ class SQLDatabaseController(object):
             id_iter (iterable): iterable of search keys
             id_colname (str): column to be used as the search key (default: rowid)
             eager (bool): use eager evaluation
-            assume_unique (bool): default False. Experimental feature that could result in a 10x speedup
+            assume_unique (bool): default False. If True each id must match at
+                most one row. Lookups by rowid or primary key always make this
+                assumption. Such lookups are done by ``get_bulk``.
             unpack_scalars (bool): default True
+            replica (bool): read from a replica, which may lag behind the
+                primary. None does so unless in a :func:`primary_reads`
+                context (default: None)
 
         Example:
             >>> # ENABLE_DOCTEST
@@ -1346,37 +1877,31 @@ class SQLDatabaseController(object):
         if not isinstance(colnames, (tuple, list)):
             raise TypeError('colnames must be a sequence type of strings')
 
-        # ??? Getting a single column of unique values that is matched on rowid?
-        #     And sorts the results after the query?
-        # ??? This seems oddly specific for a generic method.
-        #     Perhaps the logic should be in its own method?
-        if (
-            assume_unique
-            and id_iter is not None
-            and id_colname == 'rowid'
-            and len(colnames) == 1
+        if id_iter is not None and (
+            assume_unique or self._is_unique_id_colname(tblname, id_colname)
         ):
-            id_iter = list(id_iter)
-            columns = ', '.join(colnames)
-            ids_listing = ', '.join(map(str, id_iter))
-            operation = f'SELECT {columns} FROM {tblname} WHERE rowid in ({ids_listing}) ORDER BY rowid ASC'
-            with self.connect() as conn:
-                results = conn.execute(operation).fetchall()
-            import numpy as np
-
-            # ??? Why order the results if they are going to be sorted here?
-            sortx = np.argsort(np.argsort(id_iter))
-            results = ut.take(results, sortx)
-            if kwargs.get('unpack_scalars', True):
-                results = ut.take_column(results, 0)
-            return results
+            return self.get_bulk(
+                tblname,
+                colnames,
+                id_iter,
+                id_colnames=(id_colname,),
+                batch_size=batch_size,
+                replica=replica,
+                **kwargs,
+            )
         else:
             if id_iter is None:
                 where_clause = None
                 params_iter = []
 
                 return self.get_where(
-                    tblname, colnames, params_iter, where_clause, eager=eager, **kwargs
+                    tblname,
+                    colnames,
+                    params_iter,
+                    where_clause,
+                    eager=eager,
+                    replica=replica,
+                    **kwargs,
                 )
 
             id_iter = list(id_iter)  # id_iter could be a set
@@ -1396,6 +1921,7 @@ class SQLDatabaseController(object):
                 val_list = self.executeone(
                     stmt,
                     {'value': id_iter[batch * batch_size : (batch + 1) * batch_size]},
+                    replica=replica,
                 )
 
                 for val in val_list:
@@ -1586,12 +2112,14 @@ class SQLDatabaseController(object):
                 bindparam(id_param_name, type_=id_column.type)
             )
         stmt = stmt.where(where_clause)
+        params_list = [
+            {id_param_name: id, **{f'e{e}': p for e, p in enumerate(val_list[i])}}
+            for i, id in enumerate(id_list)
+        ]
         with self.connect() as conn:
             with conn.begin():
-                for i, id in enumerate(id_list):
-                    params = {id_param_name: id}
-                    params.update({f'e{e}': p for e, p in enumerate(val_list[i])})
-                    conn.execute(stmt, **params)
+                for chunk in ut.ichunks(params_list, BATCH_SIZE):
+                    conn.execute(stmt, chunk)
 
     def delete(self, tblname, id_list, id_colname='rowid', **kwargs):
         """Deletes rows from a SQL table (``tblname``) by ID,
@@ -1613,10 +2141,11 @@ class SQLDatabaseController(object):
                 bindparam(id_param_name, type_=id_column.type)
             )
         stmt = stmt.where(where_clause)
+        params_list = [{id_param_name: id} for id in id_list]
         with self.connect() as conn:
             with conn.begin():
-                for id in id_list:
-                    conn.execute(stmt, {id_param_name: id})
+                for chunk in ut.ichunks(params_list, BATCH_SIZE):
+                    conn.execute(stmt, chunk)
 
     def delete_rowids(self, tblname, rowid_list, **kwargs):
         """deletes the the rows in rowid_list"""
@@ -1666,6 +2195,7 @@ class SQLDatabaseController(object):
         verbose=VERBOSE_SQL,
         use_fetchone_behavior=False,
         keepwrap=False,
+        replica=False,
     ):
         """Executes the given ``operation`` once with the given set of ``params``
 
@@ -1675,6 +2205,7 @@ class SQLDatabaseController(object):
             eager: [deprecated] no-op
             verbose: [deprecated] no-op
             use_fetchone_behavior (bool): Use DBAPI ``fetchone`` behavior when outputing no rows (i.e. None)
+            replica (bool): execute a read-only ``operation`` on a replica
 
         """
         if not isinstance(operation, ClauseElement):
@@ -1684,7 +2215,7 @@ class SQLDatabaseController(object):
                 f"'operation' is a '{type(operation)}'"
             )
         # FIXME (12-Sept-12020) Allows passing through '?' (question mark) parameters.
-        with self.connect() as conn:
+        with self.connect(replica=replica) as conn:
             results = conn.execute(operation, params)
 
             # BBB (12-Sept-12020) Retaining insertion rowid result
@@ -1731,7 +2262,13 @@ class SQLDatabaseController(object):
                 return values
 
     def executemany(
-        self, operation, params_iter, unpack_scalars=True, keepwrap=False, **kwargs
+        self,
+        operation,
+        params_iter,
+        unpack_scalars=True,
+        keepwrap=False,
+        replica=False,
+        **kwargs,
     ):
         """Executes the given ``operation`` once for each item in ``params_iter``
 
@@ -1742,6 +2279,7 @@ class SQLDatabaseController(object):
             unpack_scalars (bool): [deprecated] use to unpack a single result from each query
                                    only use with operations that return a single result for each query
                                    (default: True)
+            replica (bool): execute a read-only ``operation`` on a replica
 
         """
         if not isinstance(operation, ClauseElement):
@@ -1751,11 +2289,23 @@ class SQLDatabaseController(object):
                 f"'operation' is a '{type(operation)}'"
             )
 
+        if _is_bulk_write(operation):
+            # Statements that return nothing run as one DBAPI executemany per batch
+            num = 0
+            with self.connect() as conn:
+                with conn.begin():
+                    for chunk in ut.ichunks(params_iter, BATCH_SIZE):
+                        conn.execute(operation, chunk)
+                        num += len(chunk)
+            return [None] * num
+
         results = []
-        with self.connect() as conn:
+        with self.connect(replica=replica) as conn:
             with conn.begin():
                 for params in params_iter:
-                    value = self.executeone(operation, params, keepwrap=keepwrap)
+                    value = self.executeone(
+                        operation, params, keepwrap=keepwrap, replica=replica
+                    )
                     # Should only be used when the user wants back on value.
                     # Let the error bubble up if used wrong.
                     # Deprecated... Do not depend on the unpacking behavior.
@@ -1791,7 +2341,10 @@ class SQLDatabaseController(object):
         """
         metadata_rowids = self.get_all_rowids(METADATA_TABLE_NAME)
         metadata_items = self.get(
-            METADATA_TABLE_NAME, ('metadata_key', 'metadata_value'), metadata_rowids
+            METADATA_TABLE_NAME,
+            ('metadata_key', 'metadata_value'),
+            metadata_rowids,
+            replica=False,
         )
         return metadata_items
 
@@ -1830,7 +2383,7 @@ class SQLDatabaseController(object):
         colnames = ('metadata_value',)
         params_iter = [(key,)]
         vals = self.get_where_eq(
-            METADATA_TABLE_NAME, colnames, params_iter, ('metadata_key',)
+            METADATA_TABLE_NAME, colnames, params_iter, ('metadata_key',), replica=False
         )
         assert len(vals) == 1, 'duplicate keys in metadata table'
         val = vals[0]
@@ -2167,7 +2720,7 @@ class SQLDatabaseController(object):
                 dst_list.append(colname_dict[name])
 
         if len(src_list) > 0:
-            data_list_ = self.get(tablename, tuple(src_list))
+            data_list_ = self.get(tablename, tuple(src_list), replica=False)
         else:
             data_list_ = []
         # Run functions across all data for specified callums
@@ -2749,7 +3302,7 @@ class SQLDatabaseController(object):
             column_names = columns
         if rowids is not None:
             column_list = [
-                self.get(tablename, (name,), rowids, unpack_scalars=True)
+                self.get(tablename, (name,), rowids, unpack_scalars=True, replica=False)
                 for name in column_names
             ]
         else:
@@ -2995,7 +3548,10 @@ class SQLDatabaseController(object):
                 colx = ut.listfind(column_names, colname)
                 extern_rowids = column_list[colx]
                 superkey_column = self.get(
-                    extern_tablename, extern_superkey_colnames, extern_rowids
+                    extern_tablename,
+                    extern_superkey_colnames,
+                    extern_rowids,
+                    replica=False,
                 )
                 extern_colx_list.append(colx)
                 extern_superkey_colname_list.append(extern_superkey_colnames)
@@ -3258,6 +3814,7 @@ class SQLDatabaseController(object):
                         extern_tablename,
                         _params_iter,
                         superkey_colnames=extern_superkey_colname,
+                        replica=False,
                     )
                     num_Nones = sum(ut.flag_None_items(new_extern_rowids))
                     if verbose:
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Mapping of Python types to SQL types"""
 import io
+import struct
 import uuid
 
 import numpy as np
@@ -71,6 +72,136 @@ class JSONCodeableType(UserDefinedType):
         return process
 
 
+# Write arrays with the fast codec rather than with np.save (blobs written
+# with either are always readable)
+NDARRAY_FAST_CODEC = not ut.get_argflag('--no-fast-ndarray-codec')
+
+# Fast codec blobs are a magic string, a dtype code, the number of dimensions
+# and the shape, followed by the raw bytes of the array in C order.  np.save
+# blobs start with b'\x93NUMPY' instead.
+_CODEC_MAGIC = b'\x93WBA'
+_CODEC_HEADER = struct.Struct('<4sBB')
+_CODEC_DTYPES = [
+    np.dtype(dtype).newbyteorder('<')
+    for dtype in [
+        np.bool_,
+        np.int8,
+        np.int16,
+        np.int32,
+        np.int64,
+        np.uint8,
+        np.uint16,
+        np.uint32,
+        np.uint64,
+        np.float16,
+        np.float32,
+        np.float64,
+        np.complex64,
+        np.complex128,
+    ]
+]
+_CODEC_DTYPE_TO_CODE = {dtype: code for code, dtype in enumerate(_CODEC_DTYPES)}
+# Parsed headers (dtype, shape, header size) by header bytes
+_CODEC_HEADER_CACHE = {}
+_CODEC_HEADER_CACHE_SIZE = 4096
+
+
+def encode_ndarray(value):
+    """
+    Encodes an array (or a numpy scalar) as a blob.  Arrays of a dtype the
+    fast codec does not support (e.g. object arrays) are saved with np.save.
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.types import *  # NOQA
+        >>> from wbia.dtool.types import encode_ndarray, decode_ndarray
+        >>> arr = np.arange(6, dtype=np.float32).reshape(2, 3)
+        >>> blob = encode_ndarray(arr)
+        >>> print(len(blob) - arr.nbytes)
+        22
+        >>> print(decode_ndarray(blob))
+        [[0. 1. 2.]
+         [3. 4. 5.]]
+        >>> print(repr(decode_ndarray(encode_ndarray(np.uint8(7)))))
+        array(7, dtype=uint8)
+        >>> print(decode_ndarray(encode_ndarray(np.array([{'a': 1}]))))
+        [{'a': 1}]
+    """
+    arr = np.asarray(value)
+    code = _CODEC_DTYPE_TO_CODE.get(arr.dtype) if NDARRAY_FAST_CODEC else None
+    if code is None:
+        out = io.BytesIO()
+        np.save(out, arr)
+        return out.getvalue()
+    header = _CODEC_HEADER.pack(_CODEC_MAGIC, code, arr.ndim)
+    shape = struct.pack('<%dq' % arr.ndim, *arr.shape)
+    return b''.join([header, shape, np.ascontiguousarray(arr).data])
+
+
+def _parse_codec_header(blob):
+    ndim = blob[5]
+    header_size = _CODEC_HEADER.size + 8 * ndim
+    key = bytes(blob[:header_size])
+    parsed = _CODEC_HEADER_CACHE.get(key)
+    if parsed is None:
+        code = blob[4]
+        shape = struct.unpack_from('<%dq' % ndim, blob, _CODEC_HEADER.size)
+        parsed = (_CODEC_DTYPES[code], shape, header_size)
+        if len(_CODEC_HEADER_CACHE) < _CODEC_HEADER_CACHE_SIZE:
+            _CODEC_HEADER_CACHE[key] = parsed
+    return parsed
+
+
+def decode_ndarray(blob):
+    """
+    Decodes a blob written by :func:`encode_ndarray` or by np.save
+    """
+    if blob[:4] != _CODEC_MAGIC:
+        return np.load(io.BytesIO(blob), allow_pickle=True)
+    dtype, shape, header_size = _parse_codec_header(blob)
+    arr = np.frombuffer(blob, dtype=dtype, offset=header_size)
+    # Copy so the array is writable and does not keep the blob alive
+    return arr.reshape(shape).copy()
+
+
+def decode_ndarrays(blobs):
+    """
+    Decodes a column of blobs from a result set, passing through None values
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.dtool.types import *  # NOQA
+        >>> from wbia.dtool.types import encode_ndarray, decode_ndarrays
+        >>> import io
+        >>> arrs = [np.ones((x, 2), dtype=np.uint8) * x for x in range(4)]
+        >>> blobs = [encode_ndarray(arr) for arr in arrs] + [None]
+        >>> # Blobs written by np.save are still readable
+        >>> out = io.BytesIO()
+        >>> np.save(out, arrs[3])
+        >>> blobs.append(out.getvalue())
+        >>> decoded = decode_ndarrays(blobs)
+        >>> print([None if arr is None else arr.sum() for arr in decoded])
+        [0, 2, 8, 18, None, 18]
+    """
+    magic = _CODEC_MAGIC
+    header_cache = _CODEC_HEADER_CACHE
+    frombuffer = np.frombuffer
+    arrs = []
+    for blob in blobs:
+        if blob is None:
+            arrs.append(None)
+        elif blob[:4] != magic:
+            arrs.append(np.load(io.BytesIO(blob), allow_pickle=True))
+        else:
+            parsed = header_cache.get(bytes(blob[: _CODEC_HEADER.size + 8 * blob[5]]))
+            if parsed is None:
+                parsed = _parse_codec_header(blob)
+            dtype, shape, header_size = parsed
+            arr = frombuffer(blob, dtype=dtype, offset=header_size)
+            arrs.append(arr.reshape(shape).copy())
+    return arrs
+
+
 class NumPyPicklableType(UserDefinedType):
 
     # Abstract properties
@@ -88,10 +219,7 @@ class NumPyPicklableType(UserDefinedType):
                 return value
             else:
                 if isinstance(value, self.base_py_types):
-                    out = io.BytesIO()
-                    np.save(out, value)
-                    out.seek(0)
-                    return out.read()
+                    return encode_ndarray(value)
                 else:
                     return value
 
@@ -103,16 +231,16 @@ class NumPyPicklableType(UserDefinedType):
                 return value
             else:
                 if not isinstance(value, self.base_py_types):
-                    out = io.BytesIO(value)
-                    out.seek(0)
-                    arr = np.load(out, allow_pickle=True)
-                    out.close()
-                    return arr
+                    return decode_ndarray(value)
                 else:
                     return value
 
         return process
 
+    def batch_result_processor(self, dialect, coltype):
+        """Processes all the values of a column of a result set at once"""
+        return decode_ndarrays
+
 
 class Dict(JSONCodeableType):
     base_py_type = dict
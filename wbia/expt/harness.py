@@ -2,11 +2,13 @@
 """
 Runs many queries and keeps track of some results
 """
+import contextlib
 import logging
 import sys
 import textwrap
 import numpy as np  # NOQA
 import utool as ut
+from wbia.algo.hots import pipeline
 from wbia.expt import experiment_helpers
 from wbia.expt import test_result
 
@@ -26,6 +28,8 @@ TEST_INFO = True
 
 # dont actually query. Just print labels and stuff
 DRY_RUN = ut.get_argflag(('--dryrun', '--dry'))
+# Share the pipeline stages that pipeline configs have in common
+USE_STAGE_CACHE = not ut.get_argflag('--nocache-stages')
 
 
 def run_expt(
@@ -214,64 +218,75 @@ def make_single_testres(
         range(len(cfgx2_qreq_)), lbl='pipe config', freq=1, adjust=False
     )
     # Run each pipeline configuration
-    for cfgx in cfgiter:
-        qreq_ = cfgx2_qreq_[cfgx]
-        cprint = ut.colorprint
-        cprint('testnameid=%r' % (testnameid,), 'green')
-        cprint(
-            'annot_cfgstr = %s' % (qreq_.get_cfgstr(with_input=True, with_pipe=False),),
-            'yellow',
-        )
-        cprint('pipe_cfgstr= %s' % (qreq_.get_cfgstr(with_data=False),), 'brightcyan')
+    # Configs that only differ in later stages reuse the nearest neighbors and
+    # chip matches of the first one (see pipeline.stage_cache)
+    if USE_STAGE_CACHE and not DRY_RUN:
+        stage_cache = pipeline.stage_cache(cfgx2_qreq_)
+    else:
+        stage_cache = contextlib.nullcontext()
+    with stage_cache as cache:
+        for cfgx in cfgiter:
+            qreq_ = cfgx2_qreq_[cfgx]
+            cprint = ut.colorprint
+            cprint('testnameid=%r' % (testnameid,), 'green')
+            cprint(
+                'annot_cfgstr = %s'
+                % (qreq_.get_cfgstr(with_input=True, with_pipe=False),),
+                'yellow',
+            )
+            cprint('pipe_cfgstr= %s' % (qreq_.get_cfgstr(with_data=False),), 'brightcyan')
 
-        cprint('pipe_hashstr = %s' % (qreq_.get_pipe_hashid(),), 'cyan')
-        if DRY_RUN:
-            continue
+            cprint('pipe_hashstr = %s' % (qreq_.get_pipe_hashid(),), 'cyan')
+            if DRY_RUN:
+                continue
 
-        indent_prefix = '[%s cfg %d/%d]' % (
-            dbname,
-            # cfgiter.count (doesnt work when quiet)
-            (cfgiter.parent_index * cfgiter.length) + cfgx,
-            cfgiter.length * cfgiter.parent_length,
-        )
+            indent_prefix = '[%s cfg %d/%d]' % (
+                dbname,
+                # cfgiter.count (doesnt work when quiet)
+                (cfgiter.parent_index * cfgiter.length) + cfgx,
+                cfgiter.length * cfgiter.parent_length,
+            )
 
-        with ut.Indenter(indent_prefix):
-            # Run the test / read cache
-            _need_compute = True
-            if use_cache:
-                # smaller cache for individual configuration runs
-                st_cfgstr = qreq_.get_cfgstr(with_input=True)
-                st_cachedir = ut.unixjoin(bt_cachedir, 'small_tests')
-                st_cachename = 'smalltest'
-                ut.ensuredir(st_cachedir)
-                try:
-                    cmsinfo = ut.load_cache(st_cachedir, st_cachename, st_cfgstr)
-                except IOError:
-                    _need_compute = True
-                else:
-                    _need_compute = False
-            if _need_compute:
-                assert not ibs.table_cache
-                if ibs.table_cache:
-                    if len(
-                        prev_feat_cfgstr is not None
-                        and prev_feat_cfgstr != qreq_.qparams.feat_cfgstr
-                    ):
-                        # Clear features to preserve memory
-                        ibs.clear_table_cache()
-                        # qreq_.ibs.print_cachestats_str()
-                cm_list = qreq_.execute()
-                cmsinfo = test_result.build_cmsinfo(cm_list, qreq_)
-                # record previous feature configuration
-                if ibs.table_cache:
-                    prev_feat_cfgstr = qreq_.qparams.feat_cfgstr
+            with ut.Indenter(indent_prefix):
+                # Run the test / read cache
+                _need_compute = True
                 if use_cache:
-                    ut.save_cache(st_cachedir, st_cachename, st_cfgstr, cmsinfo)
-        if not NOMEMORY:
-            # Store the results
-            cfgx2_cmsinfo.append(cmsinfo)
-        else:
-            cfgx2_qreq_[cfgx] = None
+                    # smaller cache for individual configuration runs
+                    st_cfgstr = qreq_.get_cfgstr(with_input=True)
+                    st_cachedir = ut.unixjoin(bt_cachedir, 'small_tests')
+                    st_cachename = 'smalltest'
+                    ut.ensuredir(st_cachedir)
+                    try:
+                        cmsinfo = ut.load_cache(st_cachedir, st_cachename, st_cfgstr)
+                    except IOError:
+                        _need_compute = True
+                    else:
+                        _need_compute = False
+                if _need_compute:
+                    assert not ibs.table_cache
+                    if ibs.table_cache:
+                        if len(
+                            prev_feat_cfgstr is not None
+                            and prev_feat_cfgstr != qreq_.qparams.feat_cfgstr
+                        ):
+                            # Clear features to preserve memory
+                            ibs.clear_table_cache()
+                            # qreq_.ibs.print_cachestats_str()
+                    cm_list = qreq_.execute()
+                    cmsinfo = test_result.build_cmsinfo(cm_list, qreq_)
+                    # record previous feature configuration
+                    if ibs.table_cache:
+                        prev_feat_cfgstr = qreq_.qparams.feat_cfgstr
+                    if use_cache:
+                        ut.save_cache(st_cachedir, st_cachename, st_cfgstr, cmsinfo)
+            if cache is not None:
+                # Drop the stage outputs that no remaining config can use
+                cache.release(qreq_)
+            if not NOMEMORY:
+                # Store the results
+                cfgx2_cmsinfo.append(cmsinfo)
+            else:
+                cfgx2_qreq_[cfgx] = None
     if ut.NOT_QUIET:
         ut.colorprint('[harn] Completed running test configurations', 'white')
     if DRY_RUN:
@@ -69,6 +69,20 @@ def get_wbia_db_uri(db_dir: str = None):
     return ut.get_argval('--db-uri', default=None)
 
 
+def get_wbia_db_replica_uris(db_dir: str = None):
+    """Central location to acquire the URIs of the read-only database replicas.
+
+    Args:
+        db_dir (str): colloquial "dbdir" (default: None)
+
+    The replicas are given as a comma separated ``--db-replica-uris`` on the
+    commandline. See ``get_wbia_db_uri`` for the use of ``db_dir``.
+
+    """
+    uris = ut.get_argval('--db-replica-uris', type_=str, default='')
+    return [uri.strip() for uri in uris.split(',') if uri.strip()]
+
+
 # Specific cache getters / setters
 
 
@@ -393,14 +393,57 @@ def general_intersection_over_union(bbox1, bbox2):
     return intersection / union
 
 
-def general_overlap(gt_list, pred_list):
-    overlap = np.zeros((len(gt_list), len(pred_list)), dtype=np.float32)
-    for i, gt in enumerate(gt_list):
-        for j, pred in enumerate(pred_list):
-            overlap[i, j] = general_intersection_over_union(gt, pred)
+def general_bbox_arrays(bbox_list):
+    """Corners ``(N, 4)`` and areas ``(N,)`` of a list of bbox dicts"""
+    if len(bbox_list) == 0:
+        return np.empty((0, 4)), np.empty(0)
+    keys = ['xtl', 'ytl', 'xbr', 'ybr', 'width', 'height']
+    values = np.array(
+        [[bbox[key] for key in keys] for bbox in bbox_list], dtype=np.float64
+    )
+    return values[:, 0:4], values[:, 4] * values[:, 5]
+
+
+def general_overlap_arrays(corners1, areas1, corners2, areas2):
+    """
+    Vectorized :func:`general_intersection_over_union` that broadcasts over
+    the leading dimensions of the corners ``(..., 4)`` and areas
+    """
+    intersection_w = np.minimum(corners1[..., 2], corners2[..., 2]) - np.maximum(
+        corners1[..., 0], corners2[..., 0]
+    )
+    intersection_h = np.minimum(corners1[..., 3], corners2[..., 3]) - np.maximum(
+        corners1[..., 1], corners2[..., 1]
+    )
+    intersection = intersection_w * intersection_h
+    union = areas1 + areas2 - intersection
+    valid = (intersection_w > 0) & (intersection_h > 0)
+    overlap = np.zeros(intersection.shape)
+    np.divide(intersection, union, out=overlap, where=valid)
     return overlap
 
 
+def general_overlap(gt_list, pred_list):
+    r"""
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.other.detectfuncs import *  # NOQA
+        >>> def _bbox(xtl, ytl, width, height):
+        >>>     return dict(xtl=xtl, ytl=ytl, xbr=xtl + width, ybr=ytl + height,
+        >>>                 width=width, height=height)
+        >>> gt_list = [_bbox(0, 0, 10, 10), _bbox(20, 20, 5, 5)]
+        >>> pred_list = [_bbox(5, 0, 10, 10), _bbox(0, 0, 10, 10), _bbox(25, 20, 5, 5)]
+        >>> overlap = general_overlap(gt_list, pred_list)
+        >>> assert np.allclose(overlap, [[1 / 3, 1, 0], [0, 0, 0]])
+    """
+    gt_corners, gt_areas = general_bbox_arrays(gt_list)
+    pred_corners, pred_areas = general_bbox_arrays(pred_list)
+    overlap = general_overlap_arrays(
+        gt_corners[:, None], gt_areas[:, None], pred_corners[None, :], pred_areas[None, :]
+    )
+    return overlap.astype(np.float32)
+
+
 def general_tp_fp_fn(gt_list, pred_list, min_overlap, **kwargs):
     overlap = general_overlap(gt_list, pred_list)
     num_gt, num_pred = overlap.shape
@@ -840,36 +883,188 @@ def localizer_assign(gt_list, pred, min_overlap):
     return best_index, best_overlap
 
 
-def localizer_assignments(pred_list, gt_list, gt_list_=[], min_overlap=0.5):
-    pred_list = sorted(pred_list, key=lambda pred: pred['confidence'], reverse=True)
-
-    index_list = list(range(len(gt_list)))
-    match_list = []
-    for pred in pred_list:
-        flag = False
-
-        match_index, best_overlap = localizer_assign(gt_list, pred, min_overlap)
-        match_index_, best_overlap_ = localizer_assign(gt_list_, pred, min_overlap)
+def localizer_prepare_assignments(
+    image_pred_lists, image_gt_lists, image_ignore_lists, image_index_lists
+):
+    r"""
+    Precomputes the same class overlaps of the predictions and ground-truth of
+    many images so they can be matched for any ``min_overlap``
+
+    Args:
+        image_pred_lists (list): predictions of each image
+        image_gt_lists (list): ground-truth of each image
+        image_ignore_lists (list): flags of the ignored ground-truth
+        image_index_lists (list): index of each ground-truth that is reported
+            for its matches
+
+    Returns:
+        dict: flat arrays, the predictions are sorted by image and then by
+            decreasing confidence
+    """
+    pred_image = np.repeat(
+        np.arange(len(image_pred_lists)), list(map(len, image_pred_lists))
+    )
+    gt_image = np.repeat(np.arange(len(image_gt_lists)), list(map(len, image_gt_lists)))
+    pred_list = ut.flatten(image_pred_lists)
+    gt_list = ut.flatten(image_gt_lists)
+    gt_ignore = np.array(ut.flatten(image_ignore_lists), dtype=bool)
+    gt_index = np.array(ut.flatten(image_index_lists), dtype=np.int64)
+
+    pred_conf = np.array([pred['confidence'] for pred in pred_list], dtype=np.float64)
+    # Stable like sorted(..., reverse=True) within each image
+    sortx = np.lexsort((-pred_conf, pred_image))
+    pred_list = ut.take(pred_list, sortx)
+    pred_conf = pred_conf[sortx]
+    pred_image = pred_image[sortx]
+    pred_offset = np.r_[
+        0, np.cumsum(np.bincount(pred_image, minlength=len(image_pred_lists)))
+    ]
+    pred_rank = np.arange(len(pred_list)) - pred_offset[pred_image]
+
+    # All prediction and ground-truth pairs of the same image
+    gt_count = np.bincount(gt_image, minlength=len(image_gt_lists))
+    gt_offset = np.r_[0, np.cumsum(gt_count)]
+    counts = gt_count[pred_image]
+    pair_pred = np.repeat(np.arange(len(pred_list)), counts)
+    pair_start = np.repeat(np.cumsum(counts) - counts, counts)
+    pair_gt = gt_offset[pred_image[pair_pred]] + (np.arange(len(pair_pred)) - pair_start)
+
+    classes = [pred['class'] for pred in pred_list] + [gt['class'] for gt in gt_list]
+    class_ids = np.unique(np.array(classes, dtype=str), return_inverse=True)[1]
+    pred_class, gt_class = class_ids[: len(pred_list)], class_ids[len(pred_list) :]
+    flags = pred_class[pair_pred] == gt_class[pair_gt]
+    pair_pred, pair_gt = pair_pred[flags], pair_gt[flags]
+
+    pred_corners, pred_areas = general_bbox_arrays(pred_list)
+    gt_corners, gt_areas = general_bbox_arrays(gt_list)
+    pair_overlap = general_overlap_arrays(
+        pred_corners[pair_pred],
+        pred_areas[pair_pred],
+        gt_corners[pair_gt],
+        gt_areas[pair_gt],
+    )
+    prepared = {
+        'pred_conf': pred_conf,
+        'pred_rank': pred_rank,
+        'gt_ignore': gt_ignore,
+        'gt_index': gt_index,
+        'pair_pred': pair_pred,
+        'pair_gt': pair_gt,
+        'pair_overlap': pair_overlap,
+    }
+    return prepared
+
+
+def localizer_match_assignments(prepared, min_overlap=0.5):
+    r"""
+    Greedily matches the predictions of each image, from the most to the least
+    confident, to the remaining ground-truth they overlap the most. This is
+    the same as :func:`localizer_assign` with the matched ground-truth removed.
+
+    The images are independent, so the n-th predictions of all images are
+    matched at once.
+
+    Returns:
+        tuple: (conf_list, flag_list, index_list, overlap_list) of the
+            predictions that are not ignored. ``index_list`` is the matched
+            ground-truth index or -1 and ``overlap_list`` its overlap or nan.
+    """
+    pred_conf = prepared['pred_conf']
+    pred_rank = prepared['pred_rank']
+    gt_ignore = prepared['gt_ignore']
+    flags = prepared['pair_overlap'] >= min_overlap
+    pair_pred = prepared['pair_pred'][flags]
+    pair_gt = prepared['pair_gt'][flags]
+    pair_overlap = prepared['pair_overlap'][flags]
+
+    # Unmatched predictions of ignored ground-truth are not counted
+    flags = gt_ignore[pair_gt]
+    ignored = np.zeros(len(pred_conf), dtype=bool)
+    ignored[pair_pred[flags]] = True
+    pair_pred, pair_gt, pair_overlap = (
+        pair_pred[~flags],
+        pair_gt[~flags],
+        pair_overlap[~flags],
+    )
 
-        if match_index is not None:
-            flag = True
-            del gt_list[match_index]
-        elif match_index_ is not None:
-            flag = None
+    # The best pair of a prediction comes last, ties go to the last ground-truth
+    sortx = np.lexsort((pair_gt, pair_overlap, pair_pred, pred_rank[pair_pred]))
+    pair_pred, pair_gt, pair_overlap = (
+        pair_pred[sortx],
+        pair_gt[sortx],
+        pair_overlap[sortx],
+    )
+    pair_rank = pred_rank[pair_pred]
+    bounds = np.r_[0, np.where(np.diff(pair_rank) != 0)[0] + 1, len(pair_rank)]
+
+    match_gt = np.full(len(pred_conf), -1, dtype=np.int64)
+    match_overlap = np.full(len(pred_conf), np.nan)
+    available = np.ones(len(gt_ignore), dtype=bool)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        pred_ = pair_pred[start:stop]
+        gt_ = pair_gt[start:stop]
+        flags = available[gt_]
+        pred_, gt_, overlap_ = pred_[flags], gt_[flags], pair_overlap[start:stop][flags]
+        if len(pred_) == 0:
+            continue
+        is_last = np.r_[pred_[1:] != pred_[:-1], True]
+        pred_, gt_, overlap_ = pred_[is_last], gt_[is_last], overlap_[is_last]
+        match_gt[pred_] = gt_
+        match_overlap[pred_] = overlap_
+        available[gt_] = False
 
-        match_index_external = (
-            None if match_index is None else index_list.pop(match_index)
-        )
+    flag_list = match_gt >= 0
+    index_list = np.full(len(pred_conf), -1, dtype=np.int64)
+    index_list[flag_list] = prepared['gt_index'][match_gt[flag_list]]
+    keep = flag_list | ~ignored
+    return pred_conf[keep], flag_list[keep], index_list[keep], match_overlap[keep]
 
-        if flag is not None:
-            match_list += [(pred['confidence'], flag, match_index_external, best_overlap)]
 
+def localizer_assignments(pred_list, gt_list, gt_list_=[], min_overlap=0.5):
+    r"""
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.other.detectfuncs import *  # NOQA
+        >>> def _bbox(xtl, ytl, width, height, class_='zebra', confidence=None):
+        >>>     return dict(xtl=xtl, ytl=ytl, xbr=xtl + width, ybr=ytl + height,
+        >>>                 width=width, height=height, confidence=confidence,
+        >>>                 **{'class': class_})
+        >>> gt_list = [_bbox(0, 0, 10, 10), _bbox(20, 20, 10, 10)]
+        >>> gt_list_ = [_bbox(50, 50, 10, 10)]
+        >>> pred_list = [
+        >>>     _bbox(0, 0, 10, 10, confidence=0.5),
+        >>>     _bbox(1, 0, 10, 10, confidence=0.9),
+        >>>     _bbox(20, 20, 10, 10, 'giraffe', confidence=0.8),
+        >>>     _bbox(50, 50, 10, 10, confidence=0.7),
+        >>> ]
+        >>> match_list = localizer_assignments(pred_list, gt_list, gt_list_)
+        >>> print(match_list)
+        [(0.9, True, 0, 0.8181818181818182), (0.8, False, None, None), (0.5, False, None, None)]
+    """
+    prepared = localizer_prepare_assignments(
+        [pred_list],
+        [gt_list + gt_list_],
+        [[False] * len(gt_list) + [True] * len(gt_list_)],
+        [list(range(len(gt_list))) + list(range(len(gt_list_)))],
+    )
+    values = localizer_match_assignments(prepared, min_overlap)
+    match_list = []
+    for conf, flag, index, overlap in zip(*values):
+        if flag:
+            match_list.append((float(conf), True, int(index), float(overlap)))
+        else:
+            match_list.append((float(conf), False, None, None))
     return match_list
 
 
-def localizer_tp_fp(uuid_list, gt_dict, pred_dict, min_overlap=0.5, **kwargs):
-    total = 0.0
+def localizer_prepare_tp_fp(uuid_list, gt_dict, pred_dict, **kwargs):
+    r"""
+    Precomputes the overlaps of all images for :func:`localizer_tp_fp`, which
+    lets sweeps over ``min_overlap`` reuse them.
 
+    Returns:
+        tuple: (prepared, total)
+    """
     interest_species_set = set([])
     species_set = kwargs.get('species_set', None)
     if species_set is not None:
@@ -878,54 +1073,59 @@ def localizer_tp_fp(uuid_list, gt_dict, pred_dict, min_overlap=0.5, **kwargs):
                 species = species.lstrip('!')
                 interest_species_set.add(species)
 
-    match_list = []
+    image_ignore_lists = []
+    image_index_lists = []
     for image_uuid in uuid_list:
-        gt_list = []
-        gt_list_ = []
-        pred_list = pred_dict[image_uuid]
-
-        for gt in gt_dict[image_uuid]:
-            species = gt['class']
-            interest = gt['interest']
-            if species in interest_species_set and not interest:
-                gt_list_.append(gt)
-            else:
-                gt_list.append(gt)
+        ignore_list = [
+            gt['class'] in interest_species_set and not gt['interest']
+            for gt in gt_dict[image_uuid]
+        ]
+        counts = [0, 0]
+        index_list = []
+        for ignore in ignore_list:
+            index_list.append(counts[ignore])
+            counts[ignore] += 1
+        image_ignore_lists.append(ignore_list)
+        image_index_lists.append(index_list)
+
+    prepared = localizer_prepare_assignments(
+        [pred_dict[image_uuid] for image_uuid in uuid_list],
+        [gt_dict[image_uuid] for image_uuid in uuid_list],
+        image_ignore_lists,
+        image_index_lists,
+    )
+    total = float(np.sum(~prepared['gt_ignore']))
+    return prepared, total
 
-        total += len(gt_list)
 
-        # Match predictions
-        match_list_ = localizer_assignments(pred_list, gt_list, gt_list_, min_overlap)
-        for match_ in match_list_:
-            match_list.append(match_)
+def localizer_tp_fp(
+    uuid_list, gt_dict, pred_dict, min_overlap=0.5, prepared=None, **kwargs
+):
+    r"""
+    Cumulative true and false positives of the predictions of all images,
+    from the most to the least confident
 
-    # sort matches by confidence from high to low
-    match_list = sorted(match_list, key=lambda match: match[0], reverse=True)
+    Args:
+        prepared (tuple): result of :func:`localizer_prepare_tp_fp`
 
-    conf_list = []
-    tp_list = []
-    fp_list = []
+    Returns:
+        tuple: (conf_list, tp_list, fp_list, total)
+    """
+    if prepared is None:
+        prepared = localizer_prepare_tp_fp(uuid_list, gt_dict, pred_dict, **kwargs)
+    prepared, total = prepared
 
-    tp_counter = 0
-    fp_counter = 0
-    for conf, flag, index, overlap in match_list:
-        if flag:
-            tp_counter += 1
-        else:
-            fp_counter += 1
-        conf_list.append(conf)
-        tp_list.append(tp_counter)
-        fp_list.append(fp_counter)
+    # Match predictions
+    conf_list, flag_list, _, _ = localizer_match_assignments(prepared, min_overlap)
 
-    # logger.info('\t tps  [:10]     : %r' % (tp_list[:10], ))
-    # logger.info('\t fps  [:10]     : %r' % (fp_list[:10], ))
-    # logger.info('\t con  [:10]     : %r' % (conf_list[:10], ))
-    # logger.info('\t tps [-10:]     : %r' % (tp_list[-10:], ))
-    # logger.info('\t fps [-10:]     : %r' % (fp_list[-10:], ))
-    # logger.info('\t con [-10:]     : %r' % (conf_list[-10:], ))
-    # logger.info('\t num_annotations: %r' % (total, ))
+    # sort matches by confidence from high to low
+    sortx = np.argsort(-conf_list, kind='stable')
+    conf_list = conf_list[sortx]
+    flag_list = flag_list[sortx]
 
-    return conf_list, tp_list, fp_list, total
+    tp_list = np.cumsum(flag_list)
+    fp_list = np.cumsum(~flag_list)
+    return conf_list.tolist(), tp_list.tolist(), fp_list.tolist(), total
 
 
 def localizer_precision_recall_algo_plot(ibs, **kwargs):
@@ -981,13 +1181,19 @@ def localizer_iou_recall_algo(
 
     target = (1.0, 1.0)
     iou_list = [_ / float(samples) for _ in range(0, int(samples) + 1)]
+    prepared = localizer_prepare_tp_fp(test_uuid_list, gt_dict, pred_dict, **kwargs)
 
     conf_list_ = []
     iou_list_ = []
     recall_list = []
     for iou in tqdm.tqdm(iou_list):
         values = localizer_tp_fp(
-            test_uuid_list, gt_dict, pred_dict, min_overlap=iou, **kwargs
+            test_uuid_list,
+            gt_dict,
+            pred_dict,
+            min_overlap=iou,
+            prepared=prepared,
+            **kwargs,
         )
         conf_list, tp_list, fp_list, total = values
 
@@ -9767,10 +9767,25 @@ def export_ggr_folders(ibs, output_path=None):
         census_file.write(census_line_str)
 
 
+def _nms_groups(classes, nms_aware=None):
+    """Labels of the detections that may suppress each other"""
+    if nms_aware is not None:
+        try:
+            nms_aware = nms_aware.strip().lower().replace('_', '').replace('-', '')
+        except Exception:
+            pass
+    if nms_aware in ['byclass']:
+        return np.asarray(classes)
+    elif nms_aware in ['ispart']:
+        return np.array(['part' if '+' in class_ else 'body' for class_ in classes])
+    else:
+        return None
+
+
 @register_ibs_method
-def nms_boxes(
+def nms_boxes_batched(
     ibs,
-    indices,
+    offsets,
     bboxes,
     thetas,
     confs,
@@ -9780,157 +9795,86 @@ def nms_boxes(
     verbose=False,
     **kwargs
 ):
-    from wbia.other import detectcore
-
-    count_old = len(bboxes)
-    if count_old > 0:
+    r"""
+    Non-maximum suppression of the detections of many images at once
 
-        nms_dict = {}
-        nms_class_set = set(classes)
-        if nms_aware is not None:
-            try:
-                nms_aware = nms_aware.strip().lower().replace('_', '').replace('-', '')
-            except Exception:
-                pass
+    Args:
+        offsets (ndarray): the detections of image ``m`` are
+            ``offsets[m]:offsets[m + 1]`` of the flat arrays
+        bboxes (ndarray): (N, 4) flat boxes of all images
+        thetas (ndarray): (N,) flat rotations, rotated boxes are suppressed
+            by the overlap of their rotated rectangles
+        confs (ndarray): (N,) flat confidences
+        classes (ndarray): (N,) flat classes
+        nms_thresh (float): detections are kept if their overlap with a better
+            detection is at most ``1 - nms_thresh``
+        nms_aware (str): None suppresses across all classes, 'byclass' within
+            each class and 'ispart' within parts and bodies
 
-        for nms_class in nms_class_set:
-            flag_list = classes == nms_class
-            nms_values = {
-                'indices': np.compress(flag_list, indices, axis=0),
-                'bboxes': np.compress(flag_list, bboxes, axis=0),
-                'thetas': np.compress(flag_list, thetas, axis=0),
-                'confs': np.compress(flag_list, confs, axis=0),
-                'classes': np.compress(flag_list, classes, axis=0),
-            }
+    Returns:
+        ndarray: (N,) flags of the kept detections
 
-            if nms_aware in ['byclass']:
-                nms_key = nms_class
-            elif nms_aware in ['ispart']:
-                nms_key = 'part' if '+' in nms_class else 'body'
-            else:
-                nms_key = None
-
-            if nms_key not in nms_dict:
-                nms_dict[nms_key] = {}
-
-            for value_key in nms_values:
-                nms_value = nms_values[value_key]
-                if value_key not in nms_dict[nms_key]:
-                    nms_dict[nms_key][value_key] = []
-                nms_dict[nms_key][value_key].append(nms_value)
-
-        for nms_key in nms_dict:
-            nms_values = nms_dict[nms_key]
-
-            nms_indices = np.hstack(nms_values['indices'])
-            nms_bboxes = np.vstack(nms_values['bboxes'])
-            nms_thetas = np.hstack(nms_values['thetas'])
-            nms_confs = np.hstack(nms_values['confs'])
-            nms_classes = np.hstack(nms_values['classes'])
-
-            nms_values = {
-                'indices': nms_indices,
-                'bboxes': nms_bboxes,
-                'thetas': nms_thetas,
-                'confs': nms_confs,
-                'classes': nms_classes,
-            }
-            nms_dict[nms_key] = nms_values
-
-        for nms_key in nms_dict:
-            nms_values = nms_dict[nms_key]
-
-            nms_indices = nms_values['indices']
-            nms_bboxes = nms_values['bboxes']
-            nms_thetas = nms_values['thetas']
-            nms_confs = nms_values['confs']
-            nms_classes = nms_values['classes']
-
-            nms_count_old = len(nms_bboxes)
-            assert nms_count_old > 0
-
-            coord_list = []
-            for (xtl, ytl, width, height) in nms_bboxes:
-                xbr = xtl + width
-                ybr = ytl + height
-                coord_list.append([xtl, ytl, xbr, ybr])
-            coord_list = np.vstack(coord_list)
-            confs_list = np.array(nms_confs)
-
-            nms_thresh = 1.0 - nms_thresh
-            keep_indices_list = detectcore.nms(coord_list, confs_list, nms_thresh)
-            keep_list = np.array(keep_indices_list)
-
-            if len(keep_list) == 0:
-                nms_indices = np.array([])
-                nms_bboxes = np.array([])
-                nms_thetas = np.array([])
-                nms_confs = np.array([])
-                nms_classes = np.array([])
-            else:
-                nms_indices = nms_indices[keep_list]
-                nms_bboxes = nms_bboxes[keep_list]
-                nms_thetas = nms_thetas[keep_list]
-                nms_confs = nms_confs[keep_list]
-                nms_classes = nms_classes[keep_list]
-
-            nms_values = {
-                'indices': nms_indices,
-                'bboxes': nms_bboxes,
-                'thetas': nms_thetas,
-                'confs': nms_confs,
-                'classes': nms_classes,
-            }
-            nms_dict[nms_key] = nms_values
-
-            count_new = len(nms_bboxes)
-            if verbose:
-                nms_args = (
-                    nms_key,
-                    nms_thresh,
-                    nms_count_old,
-                    count_new,
-                )
-                logger.info(
-                    'Filtered nms_key = %r with nms_thresh = %0.02f (%d -> %d)' % nms_args
-                )
+    CommandLine:
+        python -m wbia.other.ibsfuncs --exec-nms_boxes_batched
 
-        indices = []
-        bboxes = []
-        thetas = []
-        confs = []
-        classes = []
-
-        for nms_key in nms_dict:
-            nms_values = nms_dict[nms_key]
-            nms_indices = nms_values['indices']
-            nms_bboxes = nms_values['bboxes']
-            nms_thetas = nms_values['thetas']
-            nms_confs = nms_values['confs']
-            nms_classes = nms_values['classes']
-
-            if len(nms_bboxes) > 0:
-                indices.append(nms_indices)
-                bboxes.append(nms_bboxes)
-                thetas.append(nms_thetas)
-                confs.append(nms_confs)
-                classes.append(nms_classes)
-
-        indices = np.hstack(indices)
-        bboxes = np.vstack(bboxes)
-        thetas = np.hstack(thetas)
-        confs = np.hstack(confs)
-        classes = np.hstack(classes)
-
-    count_new = len(bboxes)
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.other.ibsfuncs import *  # NOQA
+        >>> offsets = np.array([0, 2, 4])
+        >>> bboxes = np.array([[0, 0, 10, 10]] * 4)
+        >>> thetas = np.zeros(4)
+        >>> confs = np.array([0.9, 0.8, 0.7, 0.6])
+        >>> classes = np.array(['zebra', 'zebra', 'zebra', 'giraffe'])
+        >>> flags = nms_boxes_batched(None, offsets, bboxes, thetas, confs, classes)
+        >>> print(flags.tolist())
+        [True, False, True, False]
+        >>> flags = nms_boxes_batched(None, offsets, bboxes, thetas, confs, classes,
+        >>>                           nms_aware='byclass')
+        >>> print(flags.tolist())
+        [True, False, True, True]
+    """
+    from wbia.algo.detect.nms import batched_nms
+
+    groups = _nms_groups(classes, nms_aware)
+    flags = batched_nms.batched_nms(
+        bboxes, confs, 1.0 - nms_thresh, offsets=offsets, groups=groups, thetas=thetas
+    )
     if verbose:
-        nms_args = (
-            nms_thresh,
-            count_old,
-            count_new,
-        )
+        nms_args = (nms_thresh, len(flags), flags.sum())
         logger.info('Filtered with nms_thresh = %0.02f (%d -> %d)' % nms_args)
+    return flags
+
 
+@register_ibs_method
+def nms_boxes(
+    ibs,
+    indices,
+    bboxes,
+    thetas,
+    confs,
+    classes,
+    nms_thresh=0.2,
+    nms_aware=None,
+    verbose=False,
+    **kwargs
+):
+    if len(bboxes) > 0:
+        flags = nms_boxes_batched(
+            ibs,
+            None,
+            bboxes,
+            thetas,
+            confs,
+            classes,
+            nms_thresh=nms_thresh,
+            nms_aware=nms_aware,
+            verbose=verbose,
+        )
+        indices = np.compress(flags, indices, axis=0)
+        bboxes = np.compress(flags, bboxes, axis=0)
+        thetas = np.compress(flags, thetas, axis=0)
+        confs = np.compress(flags, confs, axis=0)
+        classes = np.compress(flags, classes, axis=0)
     return indices, bboxes, thetas, confs, classes
 
 
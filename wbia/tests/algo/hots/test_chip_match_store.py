@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from wbia.algo.hots import chip_match, chip_match_store
+from wbia.algo.hots.chip_match_store import ChipMatchStore
+
+
+def _testdata_cms(rng, qaids, num_daids=3):
+    cm_list = []
+    for qaid in qaids:
+        daids = list(range(100, 100 + num_daids))
+        fm_list = [
+            rng.randint(0, 50, size=(rng.randint(1, 10), 2)).astype(np.int32)
+            for daid in daids
+        ]
+        cm = chip_match.ChipMatch(
+            qaid,
+            daids,
+            fm_list,
+            [rng.rand(len(fm), 1) for fm in fm_list],
+            [np.zeros(len(fm), dtype=np.int32) for fm in fm_list],
+            fsv_col_lbls=['lnbnn'],
+            dnid_list=daids,
+            qnid=qaid,
+        )
+        cm_list.append(cm)
+    return cm_list
+
+
+def _assert_cms_equal(cm_list1, cm_list2):
+    assert len(cm_list1) == len(cm_list2)
+    for cm1, cm2 in zip(cm_list1, cm_list2):
+        assert cm1.qaid == cm2.qaid
+        assert np.all(cm1.daid_list == cm2.daid_list)
+        for key in ['fm_list', 'fsv_list', 'fk_list']:
+            for value1, value2 in zip(getattr(cm1, key), getattr(cm2, key)):
+                assert np.array_equal(value1, value2)
+
+
+def test_write_compacts_many_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(chip_match_store, 'MAX_SEGMENTS', 3)
+    rng = np.random.RandomState(0)
+    store = ChipMatchStore(str(tmp_path / 'cmstore'))
+    key_list, cm_list = [], []
+    for qaid in range(1, 4):
+        key_list.append('q%d' % qaid)
+        cm_list += _testdata_cms(rng, [qaid])
+        store.write(key_list[-1:], cm_list[-1:])
+    assert len(store.segments) == 3
+    key_list.append('q4')
+    cm_list += _testdata_cms(rng, [4])
+    store.write(key_list[-1:], cm_list[-1:])
+    assert len(store.segments) == 1
+    assert sorted(os.listdir(store.dpath)) == list(store.segments.keys())
+    _assert_cms_equal(store.load_many(key_list), cm_list)
+
+
+def test_write_compacts_shadowed_entries(tmp_path):
+    rng = np.random.RandomState(0)
+    store = ChipMatchStore(str(tmp_path / 'cmstore'))
+    key_list = ['q1', 'q2']
+    store.write(key_list, _testdata_cms(rng, [1, 2]))
+    store.write(key_list, _testdata_cms(rng, [1, 2]))
+    # Half of the entries are shadowed
+    assert len(store.segments) == 2
+    cm_list = _testdata_cms(rng, [1, 2])
+    store.write(key_list, cm_list)
+    assert len(store.segments) == 1 and store.num_entries == 2
+    _assert_cms_equal(store.load_many(key_list), cm_list)
+
+
+def test_compact_under_other_reader(tmp_path):
+    rng = np.random.RandomState(0)
+    dpath = str(tmp_path / 'cmstore')
+    store = ChipMatchStore(dpath)
+    cm_list = _testdata_cms(rng, [1, 2, 3])
+    store.write(['q1', 'q2'], cm_list[0:2])
+    store.write(['q3'], cm_list[2:3])
+
+    # Stands in for a store of another process that has not mapped the
+    # segments yet
+    other = ChipMatchStore(dpath)
+    lazy = other.lazy_load(['q1', 'q2', 'q3'])
+    store.compact()
+    assert len(store.segments) == 1 and len(os.listdir(dpath)) == 1
+    _assert_cms_equal([lazy['q1'], lazy['q2'], lazy['q3']], cm_list)
+    assert list(other.segments.keys()) == list(store.segments.keys())
+
+    # The compacted segment is shadowed by segments written after the ones it
+    # replaces
+    name = list(store.segments.keys())[0]
+    assert name < os.path.basename(store._new_segment_dpath(after=name))
+    assert os.path.basename(store._new_segment_dpath(after=name)) < os.path.basename(
+        store._new_segment_dpath()
+    )
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from wbia.algo.hots.incremental_index import DeltaNeighborIndex, brute_force_knn
+from wbia.algo.hots.neighbor_index import NeighborIndex, invert_index
+
+
+class _ExactFlann(object):
+    """Exact stand-in for the FLANN index of the main segment"""
+
+    def __init__(self, idx2_vec):
+        self.idx2_vec = idx2_vec
+
+    def nn_index(self, qfx2_vec, K, checks=None, cores=None):
+        return brute_force_knn(qfx2_vec, self.idx2_vec, K)
+
+
+def _make_vecs(rng, num_annots, num_vecs=5, dim=8):
+    return [rng.rand(num_vecs, dim).astype(np.float32) for _ in range(num_annots)]
+
+
+def _make_main(aids, vecs_list):
+    main = NeighborIndex(None, None)
+    fxs_list = [np.arange(len(vecs)) for vecs in vecs_list]
+    tup = invert_index(vecs_list, None, np.arange(len(aids)), fxs_list, verbose=False)
+    main.idx2_vec, main.idx2_fgw, main.idx2_ax, main.idx2_fx = tup
+    main.ax2_aid = np.array(aids)
+    main.num_indexed = len(main.idx2_vec)
+    main.flann = _ExactFlann(main.idx2_vec)
+    return main
+
+
+def _testdata_delta():
+    rng = np.random.RandomState(0)
+    main_vecs = _make_vecs(rng, 6)
+    main = _make_main([1, 2, 3, 4, 5, 6], main_vecs)
+    delta_vecs = _make_vecs(rng, 1)
+    support = (delta_vecs, None, [np.arange(5)])
+    delta = DeltaNeighborIndex(main, [7], support, removed_aids=[2, 3])
+    # Query with perturbed copies of the removed annotations
+    qfx2_vec = np.vstack(main_vecs[1:3]) + 0.01
+    return delta, qfx2_vec
+
+
+def test_knn_skips_removed_annots():
+    delta, qfx2_vec = _testdata_delta()
+    assert delta.num_live == 25
+    assert sorted(delta.get_indexed_aids()) == [1, 4, 5, 6, 7]
+
+    qfx2_idx, qfx2_dist = delta.knn(qfx2_vec, 4)
+    assert qfx2_idx.shape == (10, 4)
+    assert not np.any(np.isin(delta.get_nn_aids(qfx2_idx), [2, 3]))
+
+    # The result equals an exact search over the live vectors
+    live_idxs = np.where(~np.isin(delta.get_nn_aids(np.arange(35)), [2, 3]))[0]
+    live_vecs = delta.get_nn_vecs(live_idxs)
+    idxs, dists = brute_force_knn(qfx2_vec, live_vecs, 4)
+    assert np.all(qfx2_idx == live_idxs[idxs])
+    assert np.allclose(qfx2_dist, dists)
+
+    # Every live vector can be returned, but nothing more
+    qfx2_idx, _ = delta.knn(qfx2_vec, 25)
+    assert np.all(np.sort(qfx2_idx, axis=1) == live_idxs)
+    qfx2_idx, _ = delta.knn(qfx2_vec, 26)
+    assert qfx2_idx.size == 0
+
+
+def test_requery_knn_never_recovers_removed_annots():
+    delta, qfx2_vec = _testdata_delta()
+    # Only the 5 vectors of the delta annotation are possible, so the other
+    # neighbors are recovered from the impossible annotations
+    qfx2_idx, qfx2_dist = delta.requery_knn(
+        qfx2_vec, 8, 0, impossible_aids=[1, 4, 5, 6], recover=True
+    )
+    assert np.all(qfx2_idx >= 0)
+    qfx2_aid = delta.get_nn_aids(qfx2_idx)
+    assert not np.any(np.isin(qfx2_aid, [2, 3]))
+    assert np.all(np.isin(qfx2_aid, [1, 4, 5, 6]).sum(axis=1) > 0)
+    assert np.all(np.diff(qfx2_dist, axis=1) >= 0)
+
+    # Without recovery the unresolved queries are left empty
+    qfx2_idx, qfx2_dist = delta.requery_knn(
+        qfx2_vec, 8, 0, impossible_aids=[1, 4, 5, 6], recover=False
+    )
+    assert np.all(qfx2_idx == -1) and np.all(np.isnan(qfx2_dist))
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+import types
+
+import numpy as np
+import pytest
+
+from wbia.algo.hots import chip_match, pipeline
+from wbia.algo.hots.pipeline import _parallel_sver_chipmatches, sver_single_chipmatch
+from wbia.algo.hots.query_params import QueryParams
+
+
+class _IBEIS(object):
+    """Serves the per-annotation properties spatial verification reads"""
+
+    def __init__(self, aid2_kpts):
+        self.aid2_kpts = aid2_kpts
+
+    def get_annot_chip_dlensqrd(self, aids, config2_=None):
+        return [600.0 ** 2 + aid for aid in aids]
+
+    def get_annot_num_feats(self, aids, config2_=None):
+        return [len(self.aid2_kpts[aid]) for aid in aids]
+
+
+class _QueryRequest(object):
+    def __init__(self, aid2_kpts, sver_executor):
+        self.ibs = _IBEIS(aid2_kpts)
+        self.extern_query_config2 = {}
+        self.extern_data_config2 = {}
+        self.qparams = types.SimpleNamespace(
+            xy_thresh=0.01,
+            scale_thresh=2.0,
+            ori_thresh=np.pi / 2,
+            min_nInliers=4,
+            full_homog_checks=True,
+            refine_method='homog',
+            use_chip_extent=True,
+            weight_inliers=True,
+            sver_output_weighting=True,
+            sver_executor=sver_executor,
+            sver_workers=2,
+        )
+
+    def get_qreq_qannot_kpts(self, qaids):
+        if np.isscalar(qaids):
+            return self.ibs.aid2_kpts[qaids]
+        return [self.ibs.aid2_kpts[aid] for aid in qaids]
+
+    def get_qreq_dannot_kpts(self, daids):
+        return [self.ibs.aid2_kpts[aid] for aid in daids]
+
+
+def _make_kpts(rng, num):
+    xy = rng.rand(num, 2) * 500
+    shape = rng.rand(num, 1) * 15 + 5
+    return np.hstack([xy, shape, np.zeros((num, 1)), shape, np.zeros((num, 1))])
+
+
+def _testdata_sver(rng, num_queries=4, num_daids=5, num_kpts=40):
+    aid2_kpts = {}
+    cm_list = []
+    qaids = list(range(1, num_queries + 1))
+    daids = list(range(100, 100 + num_daids))
+    for aid in qaids + daids:
+        aid2_kpts[aid] = _make_kpts(rng, num_kpts)
+    for qaid in qaids:
+        # Each database annotation shares a transformed copy of some query
+        # keypoints and is matched to them among some random matches
+        fm_list = []
+        for daid in daids:
+            num_inliers = rng.randint(0, num_kpts // 2)
+            fx1 = rng.permutation(num_kpts)
+            fx2 = rng.permutation(num_kpts)
+            inliers = aid2_kpts[qaid][fx1[:num_inliers]].copy()
+            inliers[:, 0:2] = inliers[:, 0:2] * 1.1 + 20
+            inliers[:, 2:5] *= 1.1
+            aid2_kpts[daid][fx2[:num_inliers]] = inliers
+            num_matches = rng.randint(num_inliers, num_kpts)
+            fm_list.append(np.vstack([fx1[:num_matches], fx2[:num_matches]]).T)
+        fsv_list = [rng.rand(len(fm), 1) for fm in fm_list]
+        fk_list = [np.zeros(len(fm), dtype=np.int32) for fm in fm_list]
+        cm = chip_match.ChipMatch(
+            qaid,
+            daids,
+            fm_list,
+            fsv_list,
+            fk_list,
+            fsv_col_lbls=['lnbnn'],
+            dnid_list=daids,
+            qnid=qaid,
+        )
+        cm_list.append(cm)
+    return aid2_kpts, cm_list
+
+
+@pytest.mark.parametrize('sver_executor', ['thread', 'process'])
+def test_parallel_sver_matches_serial(sver_executor):
+    # Verification appends a score column to its input, so each run gets a copy
+    aid2_kpts, cm_list = _testdata_sver(np.random.RandomState(0))
+    qreq_ = _QueryRequest(aid2_kpts, sver_executor)
+    cm_list_serial = [sver_single_chipmatch(qreq_, cm) for cm in cm_list]
+
+    aid2_kpts, cm_list = _testdata_sver(np.random.RandomState(0))
+    qreq_ = _QueryRequest(aid2_kpts, sver_executor)
+    cm_list_pool = _parallel_sver_chipmatches(qreq_, cm_list, cm_list, sver_executor)
+
+    assert sum(cm.num_daids for cm in cm_list_serial) > 0
+    assert len(cm_list_pool) == len(cm_list_serial)
+    for cm1, cm2 in zip(cm_list_serial, cm_list_pool):
+        assert cm2.qaid == cm1.qaid
+        assert np.all(cm2.daid_list == cm1.daid_list)
+        assert cm2.fsv_col_lbls == cm1.fsv_col_lbls
+        for key in ['fm_list', 'fsv_list', 'fk_list', 'H_list']:
+            values1, values2 = getattr(cm1, key), getattr(cm2, key)
+            assert len(values2) == len(values1)
+            for value1, value2 in zip(values1, values2):
+                assert np.array_equal(value1, value2)
+
+
+def test_parallel_sver_unknown_executor():
+    aid2_kpts, cm_list = _testdata_sver(np.random.RandomState(0), num_queries=2)
+    qreq_ = _QueryRequest(aid2_kpts, 'gpu')
+    with pytest.raises(ValueError):
+        _parallel_sver_chipmatches(qreq_, cm_list, cm_list, 'gpu')
+
+
+class _StageQueryRequest(object):
+    """Serves what the stage cache keys are built from"""
+
+    def __init__(self, cfgdict, qaids=(1, 2), daids=(1, 2, 3, 4, 5)):
+        self.qparams = QueryParams(cfgdict=cfgdict)
+        self.ibs = types.SimpleNamespace(get_dbdir=lambda: '/data/testdb')
+        self.qaids = list(qaids)
+        self.daids = list(daids)
+
+    def get_internal_qaids(self):
+        return self.qaids
+
+    def get_internal_daids(self):
+        return self.daids
+
+    def get_qreq_annot_nids(self, aids):
+        return [aid % 3 for aid in aids]
+
+
+def test_stage_cachekey():
+    qreq1 = _StageQueryRequest({})
+    # Only spatial verification and scoring differ
+    qreq2 = _StageQueryRequest(dict(sv_on=False, score_method='csum'))
+    # The number of neighbors changes every stage
+    qreq3 = _StageQueryRequest(dict(K=7))
+    # The neighbor weighting only changes the chip matches
+    qreq4 = _StageQueryRequest(dict(lnbnn_on=False, ratio_thresh=0.8))
+    for stage in pipeline.STAGES:
+        key1 = pipeline._stage_groupkey(qreq1, stage)
+        assert pipeline._stage_groupkey(qreq2, stage) == key1
+        assert pipeline._stage_groupkey(qreq3, stage) != key1
+    assert pipeline._stage_groupkey(qreq4, 'nn') == pipeline._stage_groupkey(qreq1, 'nn')
+    key4 = pipeline._stage_groupkey(qreq4, 'chipmatch')
+    assert key4 != pipeline._stage_groupkey(qreq1, 'chipmatch')
+
+    # Query chunks share a group, different database annotations do not
+    qreq5 = _StageQueryRequest({}, qaids=[3])
+    qreq6 = _StageQueryRequest({}, daids=[1, 2, 3])
+    assert pipeline._stage_groupkey(qreq5, 'nn') == pipeline._stage_groupkey(qreq1, 'nn')
+    assert pipeline._stage_querykey(qreq5) != pipeline._stage_querykey(qreq1)
+    assert pipeline._stage_groupkey(qreq6, 'nn') != pipeline._stage_groupkey(qreq1, 'nn')
+
+
+def test_stage_cache_eviction():
+    qreq1 = _StageQueryRequest({})
+    qreq2 = _StageQueryRequest(dict(sv_on=False))
+    qreq3 = _StageQueryRequest(dict(K=7))
+    nn_ret1, nn_ret3 = ('nns1', 'nnvalid1', 'indexer1'), ('nns3', 'nnvalid3', 'indexer3')
+    assert pipeline._get_stage_cache(qreq1, 'nn') is None
+    with pipeline.stage_cache([qreq1, qreq2, qreq3]) as cache:
+        pipeline._set_stage_cache(qreq1, 'nn', nn_ret1)
+        # No other config can use the neighbors of the third one
+        pipeline._set_stage_cache(qreq3, 'nn', nn_ret3)
+        assert pipeline._get_stage_cache(qreq3, 'nn') is None
+        assert len(cache.groups) == 1
+
+        cache.release(qreq1)
+        assert pipeline._get_stage_cache(qreq2, 'nn') == nn_ret1
+        assert pipeline._get_stage_cache(_StageQueryRequest({}, qaids=[3]), 'nn') is None
+        cache.release(qreq2)
+        assert cache.groups == {}
+        assert pipeline._get_stage_cache(qreq2, 'nn') is None
+
+        # Nested contexts share the cache and keep unregistered outputs
+        with pipeline.stage_cache() as cache2:
+            assert cache2 is cache
+            pipeline._set_stage_cache(qreq1, 'nn', nn_ret1)
+        assert pipeline._get_stage_cache(qreq2, 'nn') == nn_ret1
+        cache.release(qreq1)
+        assert pipeline._get_stage_cache(qreq2, 'nn') == nn_ret1
+    assert pipeline._STAGE_CACHE is None
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import os
+import pathlib
+import tempfile
+from unittest import mock
+
+import pytest
+import requests
+
+from wbia.algo.preproc import preproc_image
+from wbia.algo.preproc.preproc_image import fetch_image, parse_imageinfo
+
+
+IMAGE_URI = 'http://houston/api/v1/assets/src/image.png'
+LOGO_FPATH = (
+    pathlib.Path(preproc_image.__file__).parents[2]
+    / 'web'
+    / 'static'
+    / 'images'
+    / 'logo-wildme.png'
+)
+
+
+@pytest.fixture
+def tempdir(tmp_path, monkeypatch):
+    """Directory the temporary files of downloads are made in"""
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    return tmp_path
+
+
+def _response(content, status_code=200):
+    response = mock.Mock(status_code=status_code)
+    response.iter_content.return_value = [content]
+    return response
+
+
+def test_fetch_image_failure(tempdir):
+    with mock.patch('requests.get', return_value=_response(b'', status_code=500)):
+        assert fetch_image(IMAGE_URI) == (None, None)
+    assert os.listdir(tempdir) == []
+
+    with mock.patch('requests.get', side_effect=requests.ConnectionError):
+        assert fetch_image(IMAGE_URI) == (None, None)
+    assert os.listdir(tempdir) == []
+
+    with mock.patch('requests.get', side_effect=RuntimeError):
+        with pytest.raises(RuntimeError):
+            fetch_image(IMAGE_URI)
+    assert os.listdir(tempdir) == []
+
+
+@pytest.mark.parametrize('cleanup', [False, True])
+def test_parse_imageinfo_temp_file(tempdir, monkeypatch, cleanup):
+    with open(LOGO_FPATH, 'rb') as file_:
+        content = file_.read()
+    with mock.patch('requests.get', return_value=_response(content)):
+        temp_filepath, param_tup = parse_imageinfo(IMAGE_URI, cleanup=cleanup)
+    assert param_tup is not None and param_tup[1] == IMAGE_URI
+    assert os.listdir(tempdir) == ([] if cleanup else [os.path.basename(temp_filepath)])
+    for path in os.listdir(tempdir):
+        os.unlink(os.path.join(tempdir, path))
+
+    # Images that download but do not parse leave no temporary file behind
+    monkeypatch.setattr(preproc_image, 'parse_local_imageinfo', lambda *args: None)
+    with mock.patch('requests.get', return_value=_response(content)):
+        assert parse_imageinfo(IMAGE_URI, cleanup=cleanup) == (None, None)
+    assert os.listdir(tempdir) == []
+
+    monkeypatch.setattr(
+        preproc_image, 'parse_local_imageinfo', mock.Mock(side_effect=OSError)
+    )
+    with mock.patch('requests.get', return_value=_response(content)):
+        with pytest.raises(OSError):
+            parse_imageinfo(IMAGE_URI, cleanup=cleanup)
+    assert os.listdir(tempdir) == []
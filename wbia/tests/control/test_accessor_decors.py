@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from wbia.control.accessor_decors import (
+    LRUTableCache,
+    TableCache,
+    cache_getter,
+    cache_invalidator,
+)
+from wbia.dtool.depcache_table import estimate_nbytes
+
+
+def _value(fill, nbytes=100):
+    return np.full(nbytes, fill, dtype=np.uint8)
+
+
+def test_lru_table_cache_eviction_order():
+    cache = LRUTableCache('annotations', max_nbytes=300)
+    cache.set_many('name', None, [1, 2, 3], [_value(1), _value(2), _value(3)])
+    assert len(cache) == 3 and cache.evictions == 0
+
+    # Reading rowid 1 makes rowid 2 the least recently used
+    cache.get_many('name', None, [1])
+    cache.set_many('name', None, [4], [_value(4)])
+    vals = cache.get_many('name', None, [1, 2, 3, 4])
+    assert vals[1] is None
+    assert [val[0] for val in vals if val is not None] == [1, 3, 4]
+
+    # Values of other columns and getter kwargs share the byte budget
+    cache.set_many('age', 'kwargs', [1, 2], [_value(5, 150), _value(6, 150)])
+    assert cache.get_many('name', None, [1, 3, 4]) == [None, None, None]
+    assert cache.get_many('age', 'kwargs', [1, 2])[0][0] == 5
+    assert cache.evictions == 4
+    assert cache.nbytes == 300 and len(cache) == 2
+
+
+def test_lru_table_cache_byte_accounting():
+    cache = LRUTableCache('annotations', max_nbytes=1000)
+    vals = [_value(1, 100), [1, 2, 3], 'text']
+    cache.set_many('name', None, [1, 2, 3], vals)
+    assert cache.nbytes == sum(map(estimate_nbytes, vals))
+
+    # Replacing a value releases the bytes of the old one
+    cache.set_many('name', None, [1], [_value(1, 200)])
+    assert cache.nbytes == 200 + estimate_nbytes([1, 2, 3]) + estimate_nbytes('text')
+
+    # A value larger than the whole budget is never cached
+    cache.set_many('name', None, [4], [_value(4, 2000)])
+    assert cache.get_many('name', None, [4]) == [None]
+    assert len(cache) == 3 and cache.evictions == 0
+
+    cache.invalidate()
+    assert cache.nbytes == 0 and len(cache) == 0
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (0, 1)
+
+    # The budget of each table can be configured separately
+    table_cache = TableCache(max_nbytes=1000, table_nbytes={'images': 150})
+    table_cache['images'].set_many('uri', None, [1, 2], [_value(1), _value(2)])
+    table_cache['annotations'].set_many('name', None, [1, 2], [_value(1), _value(2)])
+    assert table_cache['images'].nbytes == 100
+    assert table_cache.nbytes == 300
+
+
+class _Controller(object):
+    def __init__(self):
+        self.table_cache = TableCache(max_nbytes=10000)
+        self.names = {1: 'a', 2: 'b', 3: 'c'}
+        self.num_loaded = 0
+
+    @cache_getter('names', 'name_text', cfgkeys=['upper'], force=True)
+    def get_name_texts(self, rowid_list, upper=False):
+        self.num_loaded += len(rowid_list)
+        texts = [self.names[rowid] for rowid in rowid_list]
+        return [text.upper() for text in texts] if upper else texts
+
+    @cache_invalidator('names', ['name_text'], rowidx=0, force=True)
+    def set_name_texts(self, rowid_list, text_list):
+        self.names.update(zip(rowid_list, text_list))
+
+    @cache_invalidator('names', force=True)
+    def delete_all_names(self):
+        self.names = {}
+
+
+def test_cache_invalidated_on_write():
+    ibs = _Controller()
+    assert ibs.get_name_texts([1, 2, 3]) == ['a', 'b', 'c']
+    assert ibs.get_name_texts([1, 2, 3], upper=True) == ['A', 'B', 'C']
+    assert ibs.get_name_texts([3, 2, 1]) == ['c', 'b', 'a']
+    assert ibs.num_loaded == 6
+
+    # Only the written rowids are reloaded, for every getter configuration
+    ibs.set_name_texts([2], ['z'])
+    assert ibs.get_name_texts([1, 2, 3]) == ['a', 'z', 'c']
+    assert ibs.get_name_texts([1, 2, 3], upper=True) == ['A', 'Z', 'C']
+    assert ibs.num_loaded == 8
+
+    # Writers without rowids clear the whole column
+    ibs.delete_all_names()
+    ibs.names = {1: 'x', 2: 'y', 3: 'w'}
+    assert ibs.get_name_texts([1, 2, 3]) == ['x', 'y', 'w']
+    assert ibs.num_loaded == 11
+    assert ibs.table_cache['names'].stats()['num_values'] == 3
@@ -134,3 +134,54 @@ def test_localize_images(request):
     assert ibs.set_image_uris.call_args_list == [
         mock.call([1, 2], [f'{image_uuid}.png' for image_uuid in IMAGE_UUIDS]),
     ]
+
+
+def test_add_images_in_batches():
+    from wbia.control.manual_image_funcs import add_images, _compute_image_uuids
+
+    ibs = mock.Mock(force_serial=False)
+    ibs.cfg.other_cfg.auto_localize = False
+    ibs._compute_image_uuids.side_effect = lambda *args, **kwargs: _compute_image_uuids(
+        ibs, *args, **kwargs
+    )
+    ibs.db.add_cleanly.side_effect = [[1, 2], [3]]
+    ibs.get_image_paths.return_value = []
+    ibs.check_image_loadable.return_value = [], []
+
+    gpath_list = [
+        'wbia/web/static/images/logo-wildme.png',
+        'wbia/web/static/images/doesnotexist.png',
+        'wbia/web/static/images/logo-wildme.png',
+    ]
+    with mock.patch('wbia.control.manual_image_funcs.ADD_IMAGES_BATCH_SIZE', 2):
+        result_ids = add_images(ibs, gpath_list)
+
+    assert result_ids == [1, 2, 3]
+    # The parsed images are written in order in batches of two
+    (call1, call2) = ibs.db.add_cleanly.call_args_list
+    params_list1, params_list2 = call1[0][2], call2[0][2]
+    assert [params[1] for params in params_list1 if params] == gpath_list[0:1]
+    assert params_list1[1] is None
+    assert params_list2[0][0] == params_list1[0][0]
+
+
+def test_get_image_uris_reads_replica(tmp_path):
+    from wbia import constants as const
+    from wbia.control.manual_image_funcs import get_image_uris
+    from wbia.dtool.sql_control import SQLDatabaseController, primary_reads
+
+    # Stand-in replica, that is a copy of the primary at some point in time
+    uris = [f'sqlite:///{(tmp_path / name).resolve()}' for name in ('a.db', 'b.db')]
+    for uri, image_uri in zip(uris, IMAGE_URIS):
+        db = SQLDatabaseController(uri, 'testing')
+        db.add_table(
+            const.IMAGE_TABLE,
+            [('image_rowid', 'INTEGER PRIMARY KEY'), ('image_uri', 'TEXT')],
+        )
+        db._add(const.IMAGE_TABLE, ('image_uri',), [(image_uri,)])
+
+    ibs = mock.Mock()
+    ibs.db = SQLDatabaseController(uris[0], 'testing', replica_uris=uris[1:])
+    assert get_image_uris(ibs, [1]) == [IMAGE_URIS[1]]
+    with primary_reads():
+        assert get_image_uris(ibs, [1]) == [IMAGE_URIS[0]]
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import numpy as np
+import pytest
+import utool as ut
+
+from wbia import dtool
+from wbia.dtool import depcache_table
+from wbia.dtool.example_depcache import DummyController
+
+
+class _Running(object):
+    """Counts the preproc calls that run at the same time"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.num = 0
+        self.max_num = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.num += 1
+            self.max_num = max(self.max_num, self.num)
+
+    def __exit__(self, *args):
+        with self.lock:
+            self.num -= 1
+
+
+@pytest.fixture
+def depc(tmp_path):
+    controller = DummyController(tmp_path)
+    depc = dtool.DependencyCache(
+        controller,
+        'table_test',
+        lambda rowids: ut.lmap(ut.hashable_to_uuid, rowids),
+        table_name='dummy_annot',
+        root_getters=None,
+        use_globals=False,
+    )
+    depc.running = _Running()
+    depc.chunk_sizes = []
+
+    @depc.register_preproc(
+        tablename='arrays',
+        parents=['dummy_annot'],
+        colnames=['num', 'vecs'],
+        coltypes=[int, np.ndarray],
+        chunksize=2,
+    )
+    def compute_arrays(depc, aids, config=None):
+        depc.chunk_sizes.append(len(aids))
+        with depc.running:
+            for aid in aids:
+                time.sleep(0.005)
+                yield aid, np.full((aid, 16), aid, dtype=np.uint8)
+
+    depc.initialize()
+    return depc
+
+
+def test_concurrent_chunks_match_serial(depc):
+    aids = list(range(1, 21))
+    serial = depc.get('arrays', aids, 'vecs')
+    assert depc.running.max_num == 1
+    depc.clear_all()
+    table = depc['arrays']
+    table.executor, table.num_workers = 'thread', 3
+    concurrent = depc.get('arrays', aids, 'vecs')
+    assert len(concurrent) == len(serial)
+    for vecs1, vecs2 in zip(serial, concurrent):
+        assert np.all(vecs1 == vecs2)
+
+
+@pytest.mark.parametrize(
+    ('max_pending_chunks', 'max_pending_nbytes', 'max_running'),
+    [(2, 2 ** 30, 2), (8, 1, 1)],
+)
+def test_concurrent_chunks_pending_bound(
+    depc, monkeypatch, max_pending_chunks, max_pending_nbytes, max_running
+):
+    monkeypatch.setattr(depcache_table, 'MAX_PENDING_CHUNKS', max_pending_chunks)
+    monkeypatch.setattr(depcache_table, 'MAX_PENDING_NBYTES', max_pending_nbytes)
+    table = depc['arrays']
+    table.executor, table.num_workers = 'thread', 4
+    aids = list(range(1, 21))
+    vecs_list = depc.get('arrays', aids, 'vecs')
+    assert [len(vecs) for vecs in vecs_list] == aids
+    # Chunks are not computed further ahead of the writer than allowed
+    assert 1 <= depc.running.max_num <= max_running
+
+
+@pytest.mark.parametrize('executor', [None, 'thread'])
+def test_memory_budget_resizes_chunks(depc, executor):
+    aids = list(range(1, 21))
+    table = depc['arrays']
+    table.executor, table.num_workers = executor, 2
+    # The first chunk of 2 rows measures the size of a row, which is at least
+    # the 16 bytes of each vector row
+    table.memory_budget = 1
+    vecs_list = depc.get('arrays', aids, 'vecs')
+    assert [len(vecs) for vecs in vecs_list] == aids
+    assert depc.chunk_sizes == [2] + [1] * 18
+
+    depc.clear_all()
+    del depc.chunk_sizes[:]
+    table.memory_budget = 2 ** 30
+    vecs_list = depc.get('arrays', aids, 'vecs')
+    assert [len(vecs) for vecs in vecs_list] == aids
+    assert depc.chunk_sizes[0] == 2 and max(depc.chunk_sizes) > 2
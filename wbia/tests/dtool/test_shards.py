@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import os
+from os.path import join
+
+import numpy as np
+import pytest
+import utool as ut
+
+from wbia import dtool
+from wbia.dtool import shards
+from wbia.dtool.example_depcache import DummyController
+
+
+@pytest.fixture
+def depc(tmp_path):
+    controller = DummyController(tmp_path)
+    depc = dtool.DependencyCache(
+        controller,
+        'shard_test',
+        lambda rowids: ut.lmap(ut.hashable_to_uuid, rowids),
+        table_name='dummy_annot',
+        root_getters=None,
+        use_globals=False,
+    )
+
+    @depc.register_preproc(
+        tablename='packed',
+        parents=['dummy_annot'],
+        colnames=['num', 'kpts', 'vecs'],
+        coltypes=[int, dtool.ShardType(), dtool.ShardType()],
+        rm_extern_on_delete=True,
+    )
+    def compute_packed(depc, aids, config=None):
+        for aid in aids:
+            kpts = np.full((aid, 6), aid, dtype=np.float32)
+            vecs = np.full((aid, 128), aid, dtype=np.uint8)
+            yield aid, kpts, vecs
+
+    depc.initialize()
+    return depc
+
+
+def test_shard_storage(depc):
+    aids = [1, 2, 3, 0]
+    kpts_list = depc.get('packed', aids, 'kpts')
+    vecs_list = depc.get('packed', aids, 'vecs')
+    for aid, kpts, vecs in zip(aids, kpts_list, vecs_list):
+        assert kpts.shape == (aid, 6) and np.all(kpts == aid)
+        assert vecs.shape == (aid, 128) and np.all(vecs == aid)
+
+    # The rows reference arrays packed into one shard per column
+    table = depc['packed']
+    uris = table.get_internal_columns(
+        depc.get_rowids('packed', aids), ('vecs_extern_uri',), eager=True
+    )
+    assert all(map(shards.is_shard_ref, uris))
+    assert len(set(map(shards.shard_ref_fpath, uris))) == 1
+    shard_fpaths = os.listdir(join(table.extern_dpath, shards.SHARD_DNAME))
+    assert len(shard_fpaths) == 2
+
+    # Deleting rows leaves the shared shards alone
+    depc.delete_property('packed', aids[0:1])
+    assert os.listdir(join(table.extern_dpath, shards.SHARD_DNAME)) == shard_fpaths
+    assert np.all(depc.get('packed', aids[1:2], 'vecs')[0] == aids[1])
+
+
+def test_shard_storage_missing_shard(depc):
+    aids = [1, 2]
+    depc.get('packed', aids, 'vecs')
+    table = depc['packed']
+    ut.delete(join(table.extern_dpath, shards.SHARD_DNAME))
+    # The rows are recomputed into a new shard
+    vecs_list = depc.get('packed', aids, 'vecs')
+    assert [len(vecs) for vecs in vecs_list] == aids
+    assert len(os.listdir(join(table.extern_dpath, shards.SHARD_DNAME))) == 2
+    # and are read from it afterwards
+    vecs_list = depc.get('packed', [3] + aids, 'vecs')
+    assert [len(vecs) for vecs in vecs_list] == [3] + aids
+
+
+def test_shard_writers_closed(depc):
+    table = depc['packed']
+    depc.get('packed', [1, 2], 'vecs')
+    table.clear_table()
+    assert not any(key[1] == table.extern_dpath for key in shards._SHARD_WRITERS)
+    assert np.all(depc.get('packed', [3], 'vecs')[0] == 3)
+    shard_fpaths = os.listdir(join(table.extern_dpath, shards.SHARD_DNAME))
+    assert len(shard_fpaths) == 4
+    shards.close_shard_writers(table.extern_dpath)
+    assert not any(key[1] == table.extern_dpath for key in shards._SHARD_WRITERS)
+
+
+def test_compact_shards(depc):
+    aids = [1, 2, 3, 4]
+    depc.get('packed', aids, 'vecs')
+    depc.delete_property('packed', aids[0:2])
+    table = depc['packed']
+    shard_dpath = join(table.extern_dpath, shards.SHARD_DNAME)
+    old_fpaths = set(os.listdir(shard_dpath))
+    old_nbytes = sum(os.path.getsize(join(shard_dpath, f)) for f in old_fpaths)
+
+    table.compact_shards()
+    new_fpaths = set(os.listdir(shard_dpath))
+    new_nbytes = sum(os.path.getsize(join(shard_dpath, f)) for f in new_fpaths)
+    assert len(new_fpaths) == 2 and not (new_fpaths & old_fpaths)
+    assert new_nbytes < old_nbytes
+
+    kpts_list = depc.get('packed', aids, 'kpts')
+    vecs_list = depc.get('packed', aids, 'vecs')
+    for aid, kpts, vecs in zip(aids, kpts_list, vecs_list):
+        assert kpts.shape == (aid, 6) and np.all(kpts == aid)
+        assert vecs.shape == (aid, 128) and np.all(vecs == aid)
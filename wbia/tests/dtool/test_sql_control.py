@@ -11,6 +11,7 @@ from sqlalchemy.sql import select, text
 from wbia.dtool.sql_control import (
     METADATA_TABLE_COLUMNS,
     SQLDatabaseController,
+    primary_reads,
 )
 
 
@@ -70,6 +71,54 @@ def test_instantiation_with_table_reflection(tmp_path):
     # which will have been tested by SQLAlchemy.
 
 
+def test_read_replicas(tmp_path):
+    # Stand-in replica, that is a copy of the primary at some point in time
+    uris = [f'sqlite:///{(tmp_path / name).resolve()}' for name in ('a.db', 'b.db')]
+    for uri, values in zip(uris, [('primary',), ('replica',)]):
+        db = SQLDatabaseController(uri, 'testing')
+        db.add_table(**make_table_definition('table_a'))
+        colnames = ('meta_labeler_id', 'indexer_id', 'data')
+        db._add('table_a', colnames, [(1, 1, value) for value in values])
+
+    ctrlr = SQLDatabaseController(uris[0], 'testing', replica_uris=uris[1:])
+
+    # Writes go to the primary
+    ctrlr._add('table_a', ('meta_labeler_id', 'indexer_id', 'data'), [(2, 2, 'new')])
+    ctrlr.set('table_a', ('data',), ['changed'], [1], id_colname='table_a_id')
+    with ctrlr.connect() as conn:
+        results = conn.execute('SELECT data FROM table_a ORDER BY table_a_id')
+        assert [row[0] for row in results] == ['changed', 'new']
+
+    # The getters read from a replica unless the primary is asked for
+    assert ctrlr.get('table_a', ('data',), [1, 2]) == ['replica', None]
+    assert ctrlr.get('table_a', ('data',), [1, 2], replica=False) == ['changed', 'new']
+    with primary_reads():
+        assert ctrlr.get('table_a', ('data',), [1, 2]) == ['changed', 'new']
+        data = ctrlr.get('table_a', ('data',), [1, 2], replica=True)
+        assert data == ['replica', None]
+    data = ctrlr.get('table_a', ('data',), [1], id_colname='indexer_id')
+    assert data == ['replica']
+    data = ctrlr.get_where('table_a', ('data',), [{'x': 1}], 'indexer_id = :x')
+    assert data == ['replica']
+    data = ctrlr.get_where_eq(
+        'table_a', ('data',), [(1, 1)], ('meta_labeler_id', 'indexer_id')
+    )
+    assert data == ['replica']
+
+    # Rows are looked up by superkey on the primary right after being added
+    rowids = ctrlr.add_cleanly(
+        'table_a',
+        ('meta_labeler_id', 'indexer_id', 'data'),
+        [(3, 3, 'added')],
+        lambda *keys: ctrlr.get_rowid_from_superkey(
+            'table_a', list(zip(*keys)), ('meta_labeler_id', 'indexer_id')
+        ),
+        superkey_paramx=(0, 1),
+    )
+    assert rowids == [3]
+    assert ctrlr.get('table_a', ('data',), rowids, replica=False) == ['added']
+
+
 class TestSchemaModifiers:
     """Testing the API that creates, modifies or deletes schema elements"""
 
@@ -623,6 +672,23 @@ class TestExecutionAPI(BaseAPITestCase):
         results = self.ctrlr._engine.execute(f'select count(*) from {table_name}')
         assert results.fetchone()[0] == 0
 
+    def test_executemany_bulk_update(self):
+        table_name = 'test_executemany'
+        self.make_table(table_name)
+
+        # Create some dummy records
+        self.populate_table(table_name)
+
+        # Call the testing target
+        update = text(f'UPDATE {table_name} SET y = :y WHERE id = :id')
+        params = [dict(id=i + 1, y=i * 10) for i in range(0, 10)]
+        results = self.ctrlr.executemany(update, params)
+
+        # Update statements return nothing for each parameter set
+        assert results == [None] * 10
+        results = self.ctrlr._engine.execute(f'SELECT y FROM {table_name}')
+        assert [row[0] for row in results] == [i * 10 for i in range(0, 10)]
+
     def test_executeone_for_single_column(self):
         # Should unwrap the resulting query value (no tuple wrapping)
         table_name = 'test_executeone'
@@ -662,6 +728,100 @@ class TestAdditionAPI(BaseAPITestCase):
         expected = [(i + 1, x, y, z) for i, (x, y, z) in enumerate(parameter_values)]
         assert results.fetchall() == expected
 
+    def test_add_in_batches(self):
+        table_name = 'test_add'
+        self.make_table(table_name)
+
+        # Create some dummy records and remove some of them
+        self.populate_table(table_name)
+        self.ctrlr.delete_rowids(table_name, [2, 5])
+
+        # Call the testing target with a generator spanning several batches
+        parameter_values = (('odd', i, i * 2.01) for i in range(0, 25))
+        ids = self.ctrlr._add(
+            table_name, ['x', 'y', 'z'], parameter_values, batch_size=10
+        )
+
+        # Verify the resulting ids are in input order
+        assert ids == [i + 11 for i in range(0, 25)]
+        results = self.ctrlr._engine.execute(
+            f'SELECT id, y FROM {table_name} WHERE id > 10'
+        )
+        assert results.fetchall() == [(i + 11, i) for i in range(0, 25)]
+
+    def test_add_with_given_ids(self):
+        table_name = 'test_add'
+        self.make_table(table_name)
+
+        # Call the testing target
+        parameter_values = [(100, 'even', 0, 0.0), (50, 'odd', 1, 2.01)]
+        ids = self.ctrlr._add(table_name, ['id', 'x', 'y', 'z'], parameter_values)
+
+        # Verify the given ids are returned
+        assert ids == [100, 50]
+
+    def test_add_after_max_rowid(self):
+        table_name = 'test_add'
+        self.make_table(table_name)
+        max_rowid = 2 ** 63 - 1
+        self.ctrlr._add(table_name, ['id', 'x', 'y', 'z'], [(max_rowid, 'max', 0, 0.0)])
+
+        # SQLite picks the new rowids at random, so they are added one by one
+        parameter_values = [('odd', i, i * 2.01) for i in range(1, 6)]
+        ids = self.ctrlr._add(table_name, ['x', 'y', 'z'], parameter_values)
+
+        # Verify each id refers to its own record
+        assert len(set(ids)) == 5 and max_rowid not in ids
+        assert self.ctrlr.get(table_name, ('y',), ids) == [1, 2, 3, 4, 5]
+
+    def test_add_with_nonconsecutive_rowids(self):
+        table_name = 'test_add'
+        self.make_table(table_name)
+        self.populate_table(table_name)
+        # Every insert adds a second record, so the rowids of a batch interleave
+        self.ctrlr._engine.execute(
+            f'CREATE TRIGGER test_add_trigger AFTER INSERT ON {table_name} '
+            f'WHEN NEW.y >= 0 BEGIN INSERT INTO {table_name} (x, y, z) '
+            "VALUES ('trigger', -1, 0.0); END"
+        )
+
+        # Call the testing target
+        parameter_values = [('odd', i, i * 2.01) for i in range(10, 15)]
+        with pytest.raises(RuntimeError, match='not consecutive'):
+            self.ctrlr._add(table_name, ['x', 'y', 'z'], parameter_values)
+
+        # Verify nothing was added
+        results = self.ctrlr._engine.execute(f'SELECT COUNT(*) FROM {table_name}')
+        assert results.scalar() == 10
+
+    def test_get_insert_key_colnames(self):
+        table_name = 'test_add'
+        self.ctrlr.add_table(
+            table_name,
+            (
+                ('id', 'INTEGER PRIMARY KEY'),
+                ('x', 'TEXT'),
+                ('y', 'INTEGER'),
+                ('z', 'REAL'),
+            ),
+            superkeys=[('z',), ('x', 'y')],
+            docstr='',
+        )
+        table = self.ctrlr._reflect_table(table_name)
+
+        def key_colnames(rows):
+            values = [dict(zip(['x', 'y', 'z'], row)) for row in rows]
+            return self.ctrlr._get_insert_key_colnames(table, values)
+
+        # The first superkey with distinct values identifies the records
+        assert key_colnames([('a', 1, 0.5), ('a', 2, 1.5)]) == ['z']
+        assert key_colnames([('a', 1, 0.5), ('a', 2, 0.5)]) == ['x', 'y']
+        # Records that can not be told apart
+        assert key_colnames([('a', 1, 0.5), ('a', 1, 0.5)]) is None
+        assert key_colnames([('a', [1], 0.5), ('a', [2], 0.5)]) is None
+        values = [{'x': 'a'}, {'x': 'b'}]
+        assert self.ctrlr._get_insert_key_colnames(table, values) is None
+
 
 class TestGettingAPI(BaseAPITestCase):
     def test_get_where_without_where_condition(self):
@@ -850,6 +1010,117 @@ class TestGettingAPI(BaseAPITestCase):
         # Verify getting
         assert data == expected
 
+    def test_get_rowid_from_superkey(self, monkeypatch):
+        # A superkey declared UNIQUE and one of an older database that is not
+        self.ctrlr.add_table(
+            'test_superkey',
+            (('id', 'INTEGER PRIMARY KEY'), ('x', 'TEXT'), ('y', 'INTEGER')),
+            superkeys=[('x', 'y')],
+            docstr='',
+        )
+        self.make_table('test_getting')
+        insert_stmt = text('INSERT INTO {} (x, y) VALUES (:x, :y)')
+        with self.ctrlr.connect() as conn:
+            for table_name in ['test_superkey', 'test_getting']:
+                for x, y in [('a', 1), ('b', 2)]:
+                    conn.execute(insert_stmt.text.format(table_name), x=x, y=y)
+            conn.execute(insert_stmt.text.format('test_getting'), x='a', y=1)
+        assert self.ctrlr._is_unique_key('test_superkey', ('x', 'y'))
+        assert not self.ctrlr._is_unique_key('test_getting', ('x', 'y'))
+        assert self.ctrlr._is_unique_key('test_getting', ('id', 'x'))
+
+        bulk_calls = []
+        get_bulk = self.ctrlr.get_bulk
+        monkeypatch.setattr(
+            self.ctrlr,
+            'get_bulk',
+            lambda *args, **kwargs: bulk_calls.append(args) or get_bulk(*args, **kwargs),
+        )
+        keys = [('b', 2), ('a', 1), ('c', 3)]
+
+        # Call the testing target
+        ids = self.ctrlr.get_rowid_from_superkey('test_superkey', keys, ('x', 'y'))
+        # Verify the unique superkey is looked up in bulk
+        assert ids == [2, 1, None]
+        assert len(bulk_calls) == 1
+
+        # Call the testing target on the duplicated superkey
+        ids = self.ctrlr.get_rowid_from_superkey(
+            'test_getting', keys, ('x', 'y'), unpack_scalars=False
+        )
+        # Verify every matching row is returned
+        assert ids == [[2], [1, 3], []]
+        assert len(bulk_calls) == 1
+
+    def test_get_bulk(self):
+        table_name = 'test_get_bulk'
+        self.make_table(table_name)
+
+        # Create some dummy records
+        self.populate_table(table_name)
+
+        # Call the testing target
+        requested_ids = [4, 99, 2, 4]
+        data = self.ctrlr.get_bulk(table_name, ['x', 'y'], requested_ids)
+
+        # Verify getting, results are aligned with the requested ids
+        assert data == [('odd', 3), None, ('odd', 1), ('odd', 3)]
+
+        # Call the testing target with a multi-column key
+        data = self.ctrlr.get_bulk(
+            table_name,
+            ['id'],
+            [('even', 8), ('odd', 8), ('odd', 7)],
+            id_colnames=('x', 'y'),
+            unpack_scalars=False,
+        )
+
+        # Verify getting
+        assert data == [[9], [], [8]]
+
+    def test_get_bulk_many_keys(self):
+        table_name = 'test_get_bulk'
+        self.make_table(table_name)
+
+        # Create some dummy records
+        self.populate_table(table_name)
+
+        # Call the testing target with more keys than fit in one batch,
+        # which are loaded into a temporary table
+        requested_ids = [4, 99, 2, 4, 10, 1]
+        data = self.ctrlr.get_bulk(table_name, ['y'], requested_ids, batch_size=4)
+        assert data == [3, None, 1, 3, 9, 0]
+
+        data = self.ctrlr.get_bulk(
+            table_name,
+            ['id'],
+            [('even', 8), ('odd', 8), ('odd', 7), ('even', 0)],
+            id_colnames=('x', 'y'),
+            batch_size=4,
+        )
+        assert data == [9, None, 8, 1]
+
+        # Verify the temporary tables are dropped
+        with self.ctrlr.connect() as conn:
+            results = conn.execute('SELECT name FROM sqlite_temp_master')
+            assert results.fetchall() == []
+
+    def test_get_bulk_as_numpy(self):
+        table_name = 'test_get_bulk'
+        self.make_table(table_name)
+
+        # Create some dummy records
+        self.populate_table(table_name)
+
+        # Call the testing target
+        data = self.ctrlr.get_bulk(
+            table_name, ['y'], np.array([3, 1, 2]), as_numpy=True, dtype=np.int64
+        )
+
+        # Verify getting
+        assert isinstance(data, np.ndarray)
+        assert data.tolist() == [2, 0, 1]
+
 
 class TestSettingAPI(BaseAPITestCase):
     def test_setting(self):
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import io
 import uuid
 
 import numpy as np
@@ -8,6 +9,7 @@ from sqlalchemy.sql import text, bindparam
 from sqlalchemy.types import Float
 
 from wbia.dtool.types import Dict, Integer, List, NDArray, Number, UUID
+from wbia.dtool.types import decode_ndarray, decode_ndarrays, encode_ndarray
 
 
 @pytest.fixture(autouse=True)
@@ -140,6 +142,64 @@ def test_numpy_ndarray(db):
     assert (selected_value == insert_value).all()
 
 
+def test_numpy_ndarray_legacy_blob(db):
+    db.execute(text('CREATE TABLE test(x NDARRAY)'))
+
+    # Insert a value saved with np.save (the way arrays were stored before
+    # the fast codec)
+    insert_value = np.array([[1, 2, 3], [4, 5, 6]], np.int32)
+    out = io.BytesIO()
+    np.save(out, insert_value)
+    stmt = text('INSERT INTO test(x) VALUES (:x)')
+    db.execute(stmt, x=out.getvalue())
+
+    # Query for the value
+    stmt = text('SELECT x FROM test')
+    stmt = stmt.columns(x=NDArray)
+    results = db.execute(stmt)
+    selected_value = results.fetchone()[0]
+    assert (selected_value == insert_value).all()
+
+
+@pytest.mark.parametrize(
+    'value',
+    (
+        np.zeros((0, 128), np.uint8),
+        np.arange(12, dtype=np.float64).reshape(3, 4)[:, ::2],
+        np.asfortranarray(np.ones((3, 2), np.float32)),
+        np.array([True, False]),
+        np.array([1 + 2j], np.complex64),
+        np.array(3.5, np.float16),
+        np.arange(3, dtype='>i4'),
+        np.array(['a', 'b']),
+        np.array([{'a': 1}, None], dtype=object),
+    ),
+)
+def test_ndarray_codec(value):
+    decoded = decode_ndarray(encode_ndarray(value))
+    assert decoded.dtype == value.dtype and decoded.shape == value.shape
+    assert (decoded == value).all()
+    assert decoded.flags.writeable
+
+
+def test_decode_ndarrays():
+    """Decodes a column of feature keypoint arrays in both blob formats"""
+    rng = np.random.RandomState(0)
+    arrs = [rng.rand(rng.randint(100, 1000), 6).astype(np.float32) for _ in range(100)]
+    blobs = [encode_ndarray(arr) for arr in arrs]
+    npy_blobs = []
+    for arr in arrs:
+        out = io.BytesIO()
+        np.save(out, arr)
+        npy_blobs.append(out.getvalue())
+    for blobs_ in [blobs, npy_blobs]:
+        decoded = decode_ndarrays(blobs_)
+        assert len(decoded) == len(arrs)
+        for arr, decoded_arr in zip(arrs, decoded):
+            assert decoded_arr.dtype == arr.dtype
+            assert (decoded_arr == arr).all()
+
+
 np_numbers = (
     np.int8(120),
     np.int16(32767),
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Import time benchmark of the lazy import mode of the wbia package
+"""
+import json
+import os
+import subprocess
+import sys
+
+
+# Seconds ``import wbia`` may take in lazy import mode
+LAZY_IMPORT_BUDGET = 0.5
+
+# Modules that must not be imported by ``import wbia`` in lazy import mode
+HEAVY_MODULES = [
+    'torch',
+    'sklearn',
+    'networkx',
+    'utool',
+    'wbia.dtool',
+    'wbia.control',
+    'wbia.core_annots',
+    'wbia.core_images',
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import wbia
+duration = time.perf_counter() - start
+print(json.dumps({'duration': duration, 'modules': sorted(sys.modules)}))
+"""
+
+
+def _run_lazy(script):
+    env = dict(os.environ, WBIA_LAZY_IMPORT='1')
+    output = subprocess.check_output([sys.executable, '-c', script], env=env)
+    return output.decode('utf8').strip().splitlines()[-1]
+
+
+def test_lazy_import_time():
+    # Best of three to be robust against a busy machine
+    result_list = [json.loads(_run_lazy(IMPORT_SCRIPT)) for _ in range(3)]
+    duration = min(result['duration'] for result in result_list)
+    assert duration < LAZY_IMPORT_BUDGET, 'import wbia took %.3fs' % (duration,)
+    imported = set(result_list[0]['modules']) & set(HEAVY_MODULES)
+    assert not imported, 'import wbia imported %r' % (sorted(imported),)
+
+
+def test_lazy_import_attribute_access():
+    script = '\n'.join(
+        [
+            'import sys',
+            'import wbia',
+            'assert wbia.LAZY_IMPORT',
+            'assert "wbia.constants" not in sys.modules',
+            'assert wbia.const is wbia.constants is sys.modules["wbia.constants"]',
+            'assert "const" in dir(wbia)',
+            'print(wbia.const.ANNOTATION_TABLE)',
+        ]
+    )
+    assert _run_lazy(script) == 'annotations'
+
+
+def test_lazy_import_injected_names():
+    script = '\n'.join(
+        [
+            'import sys',
+            'import wbia',
+            'assert "utool" not in sys.modules',
+            'assert "rrr" in dir(wbia)',
+            'assert callable(wbia.profile) and callable(wbia.rrr)',
+            'assert wbia.rrr is vars(wbia)["rrr"]',
+            'print("utool" in sys.modules)',
+        ]
+    )
+    assert _run_lazy(script) == 'True'
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import uuid
+
+import pytest
+import utool as ut
+from werkzeug.datastructures import MultiDict
+
+from wbia.control import controller_inject
+from wbia.control.controller_inject import _process_input, from_json
+
+
+def test_process_input_values():
+    uuid_list = [uuid.uuid4() for _ in range(5)]
+    multidict = MultiDict(
+        [
+            ('aid_list', '1,2,3'),
+            ('flag', 'True'),
+            ('name', 'hello world'),
+            ('quoted', 'a "quoted" name'),
+            ('number', '1.5'),
+            ('uuid_list', ut.to_json(uuid_list)),
+            ('note_list', '["note 1", "note 2"]'),
+        ]
+    )
+    kwargs = _process_input(multidict)
+    assert kwargs == {
+        'aid_list': [1, 2, 3],
+        'flag': True,
+        'name': 'hello world',
+        'quoted': 'a "quoted" name',
+        'number': 1.5,
+        'uuid_list': uuid_list,
+        'note_list': ['note 1', 'note 2'],
+    }
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_from_json_matches_utool(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(controller_inject, 'orjson', None)
+    uuid_list = [uuid.uuid4() for _ in range(10000)]
+    json_list = [
+        ut.to_json({'annot_uuid_list': uuid_list, 'aid_list': list(range(100))}),
+        ut.to_json({'uuid': uuid_list[0], 'nested': [{'uuid_list': uuid_list[:3]}]}),
+        # Lists that start with a UUID but are not all canonical UUID strings
+        '[{"__UUID__": "%s"}, 1]' % (uuid_list[0],),
+        '[{"__UUID__": "%s"}, {"__UUID__": "{%s}"}]' % (uuid_list[0], uuid_list[1]),
+        '{"slice": {"__SLICE__": "1::2"}, "n": [{"a": 1, "__UUID__": 2}]}',
+        '{"big": %d, "x": [1.5, null, true, "text"]}' % (2 ** 70,),
+    ]
+    for json_str in json_list:
+        assert from_json(json_str) == ut.from_json(json_str)
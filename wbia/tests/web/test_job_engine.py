@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import uuid
+from collections import deque
+
+import pytest
+import requests
+import utool as ut
+import zmq
+
+from wbia.web import job_engine
+from wbia.web.job_engine import (
+    URL,
+    _dispatch_lane_jobs,
+    _get_random_open_port,
+    get_engine_lane_config,
+)
+from wbia.web.job_store import JobStore
+
+
+class _FakeSocket(object):
+    def __init__(self, dead=()):
+        self.dead = set(dead)
+        self.sent = []
+
+    def send_multipart(self, msg):
+        if msg[0] in self.dead:
+            raise zmq.error.ZMQError(zmq.EHOSTUNREACH)
+        self.sent.append(msg)
+
+
+def test_dispatch_lane_jobs():
+    engine_lanes = ['fast', 'slow']
+    socket_dict = {'fast': _FakeSocket(dead=[b'fast1']), 'slow': _FakeSocket()}
+    jobs_dict = {
+        'fast': deque([([b'client1'], {'jobid': 'a'}), ([b'client2'], {'jobid': 'b'})]),
+        'slow': deque([([b'client3'], {'jobid': 'c'})]),
+    }
+    workers_dict = {'fast': deque([b'fast1', b'fast2']), 'slow': deque()}
+    _dispatch_lane_jobs(socket_dict, jobs_dict, workers_dict, engine_lanes)
+
+    # The unreachable worker is dropped and its job goes to the next idle one
+    sent = socket_dict['fast'].sent
+    assert [msg[:2] for msg in sent] == [[b'fast2', b'client1']]
+    assert ut.from_json(sent[0][2]) == {'jobid': 'a'}
+    assert len(workers_dict['fast']) == 0
+    assert [request['jobid'] for _, request in jobs_dict['fast']] == ['b']
+
+    # Jobs wait until a worker of their own lane is ready
+    assert socket_dict['slow'].sent == []
+    workers_dict['slow'].append(b'slow1')
+    _dispatch_lane_jobs(socket_dict, jobs_dict, workers_dict, engine_lanes)
+    assert [msg[:2] for msg in socket_dict['slow'].sent] == [[b'slow1', b'client3']]
+    assert len(jobs_dict['slow']) == 0 and len(jobs_dict['fast']) == 1
+
+
+RESULT = {
+    'annot_uuid': uuid.UUID('e3b0c442-98fc-1c14-9afb-f4c8996fb924'),
+    'scores': [0.5] * 1000,
+}
+
+
+def test_collector_job_result(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    json_result = ut.to_json(RESULT)
+    store.set_result('job1', {'exec_status': 'completed', 'json_result': json_result})
+    collector_data = {'job1': {'status': 'completed'}}
+    reply = job_engine.on_collect_request(
+        None, {'action': 'job_result', 'jobid': 'job1'}, collector_data, store
+    )
+    assert reply['status'] == 'completed'
+
+    # The stored result is copied into the reply as is
+    sock = _FakeSocket()
+    job_engine.send_multipart_json(sock, [b'client1'], reply)
+    assert sock.sent[0][0] == b'client1'
+    assert json_result.encode('utf-8') in sock.sent[0][1]
+    reply = ut.from_json(sock.sent[0][1].decode('utf-8'))
+    assert reply == {'status': 'completed', 'jobid': 'job1', 'json_result': RESULT}
+
+    reply = job_engine.on_collect_request(
+        None, {'action': 'job_result', 'jobid': 'job2'}, collector_data, store
+    )
+    assert reply['status'] is None and reply['json_result'] is None
+
+
+@pytest.mark.parametrize('callback_url', ['houston+http://houston/', 'http://houston/'])
+def test_collector_result_callback(tmp_path, monkeypatch, callback_url):
+    calls = []
+    monkeypatch.setattr(
+        job_engine, 'call_houston', lambda *args, **kwargs: calls.append(kwargs)
+    )
+    monkeypatch.setattr(requests, 'post', lambda *args, **kwargs: calls.append(kwargs))
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    collect_request = {
+        'action': 'store',
+        'jobid': 'job1',
+        'engine_result': {
+            'exec_status': 'completed',
+            'json_result': ut.to_json(RESULT),
+            'jobid': 'job1',
+        },
+        'callback_url': callback_url,
+        'callback_detailed': True,
+    }
+    collector_data = {'job1': {'status': 'completed'}}
+    job_engine.on_collect_request(None, collect_request, collector_data, store)
+    assert len(calls) == 1
+    data = calls[0]['data']
+    if isinstance(data, bytes):
+        data = ut.from_json(data.decode('utf-8'))
+    assert data == {'jobid': 'job1', 'status': 'completed', 'json_result': RESULT}
+
+
+def _run_engine_queue_loop(port_dict, lane_config):
+    # Sockets of the parent's context must not be used after a fork
+    job_engine.ctx = zmq.Context()
+    job_engine.engine_queue_loop(port_dict, lane_config)
+
+
+def _make_request(**kwargs):
+    request = {
+        'action': 'helloworld',
+        'args': [],
+        'kwargs': {},
+        'callback_url': None,
+        'callback_method': None,
+        'request': {'endpoint': '/api/test/'},
+        'lane': 'fast',
+    }
+    request.update(kwargs)
+    return request
+
+
+@pytest.fixture
+def engine_queue():
+    keys = ['collect_pull_url', 'engine_pull_url']
+    keys += ['engine_fast_push_url', 'engine_slow_push_url']
+    port_dict = {key: '%s:%d' % (URL, _get_random_open_port()) for key in keys}
+    lane_config = get_engine_lane_config(['fast', 'slow'], {'fast': {'max_queue': 1}})
+
+    ctx = zmq.Context()
+    sockets = {}
+    sockets['collect'] = ctx.socket(zmq.ROUTER)
+    sockets['collect'].bind(port_dict['collect_pull_url'])
+    proc = multiprocessing.get_context('fork').Process(
+        target=_run_engine_queue_loop, args=(port_dict, lane_config)
+    )
+    proc.start()
+
+    sockets['client'] = ctx.socket(zmq.DEALER)
+    sockets['client'].connect(port_dict['engine_pull_url'])
+    for lane in ['fast', 'slow']:
+        worker = ctx.socket(zmq.DEALER)
+        worker.setsockopt_string(zmq.IDENTITY, 'worker.%s' % (lane,))
+        worker.connect(port_dict['engine_%s_push_url' % (lane,)])
+        sockets[lane] = worker
+    for sock in sockets.values():
+        sock.setsockopt(zmq.RCVTIMEO, 10000)
+        sock.setsockopt(zmq.LINGER, 0)
+    try:
+        yield sockets
+    finally:
+        proc.terminate()
+        proc.join()
+        for sock in sockets.values():
+            sock.close()
+        ctx.term()
+
+
+def test_engine_queue_loop(engine_queue):
+    client = engine_queue['client']
+    worker = engine_queue['fast']
+
+    client.send_json(_make_request(args=[1]))
+    reply = client.recv_json()
+    assert reply['status'] == 'received'
+    jobid = reply['jobid']
+
+    # The fast lane has no idle worker and only room for one waiting job
+    client.send_json(_make_request(args=[2]))
+    reply = client.recv_json()
+    assert reply['status'] == 'rejected'
+    assert reply['jobid'] is None
+    assert (reply['queued'], reply['max_queue']) == (1, 1)
+
+    # Restarted jobs are queued even when the lane is full
+    client.send_json(_make_request(args=[3], restart_jobid='restarted'))
+    reply = client.recv_json()
+    assert reply['status'] == 'rejected'
+    client.send_json(
+        _make_request(args=[3], restart_jobid='restarted', restart_jobcounter=100)
+    )
+    assert client.recv_json()['jobid'] == 'restarted'
+
+    # An idle worker receives the waiting jobs in order, one per ready message
+    for expected in [jobid, 'restarted']:
+        worker.send_json({'action': 'ready'})
+        idents_and_request = worker.recv_multipart()
+        assert len(idents_and_request) == 2
+        request = ut.from_json(idents_and_request[1])
+        assert request['jobid'] == expected
+        assert request['lane'] == 'fast'
+
+    # The queue is empty again, so new jobs are accepted and go to the idle worker
+    worker.send_json({'action': 'ready'})
+    client.send_json(_make_request(args=[4]))
+    reply = client.recv_json()
+    assert reply['status'] == 'received'
+    request = ut.from_json(worker.recv_multipart()[1])
+    assert request['jobid'] == reply['jobid']
+    assert request['args'] == [4]
+
+    # Jobs of the slow lane only go to slow workers
+    client.send_json(_make_request(args=[5], lane='slow'))
+    reply = client.recv_json()
+    engine_queue['slow'].send_json({'action': 'ready'})
+    request = ut.from_json(engine_queue['slow'].recv_multipart()[1])
+    assert request['jobid'] == reply['jobid']
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import shelve
+import threading
+from os.path import exists, join
+
+import utool as ut
+
+from wbia.web.job_store import JobStore, migrate_shelves
+
+
+def _make_metadata(jobcounter, lane='fast'):
+    return {
+        'jobcounter': jobcounter,
+        'action': 'helloworld',
+        'lane': lane,
+        'request': {'endpoint': '/api/test/', 'function': 'helloworld'},
+        'times': {'received': jobcounter},
+    }
+
+
+def test_job_store(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    for jobcounter, jobid in enumerate(['job1', 'job2', 'job3']):
+        store.add_job(jobid, {'action': 'helloworld', 'args': [jobcounter]})
+        store.set_metadata(jobid, _make_metadata(jobcounter))
+    store.set_status_many([('job1', 'completed'), ('job2', 'working')])
+    store.set_result('job1', {'exec_status': 'completed', 'json_result': '[1, 2]'})
+    store.mark_completed('job1', completed_at=100.0)
+
+    # A second store on the same file sees the same jobs
+    store2 = JobStore(store.fpath)
+    assert store2.get_request('job2') == {'action': 'helloworld', 'args': [1]}
+    assert store2.get_metadata('job3')['lane'] == 'fast'
+    assert store2.get_status('job1') == 'completed'
+    assert store2.get_result('job1') == {
+        'exec_status': 'completed',
+        'json_result': '[1, 2]',
+        'jobid': 'job1',
+    }
+    assert store2.get_result('job2') is None
+    assert store2.has_job('job3') and not store2.has_job('job4')
+
+    rows = store2.get_job_rows()
+    assert [row['jobid'] for row in rows] == ['job1', 'job2', 'job3']
+    assert [row['has_result'] for row in rows] == [True, False, False]
+    rows = store2.get_status_rows()
+    assert {row['jobid']: row['endpoint'] for row in rows} == {
+        'job1': '/api/test/',
+        'job2': '/api/test/',
+        'job3': '/api/test/',
+    }
+
+    metadata = store2.update_metadata('job2', lambda m: dict(m, lane='slow'))
+    assert metadata['lane'] == 'slow' == store.get_metadata('job2')['lane']
+    assert store2.update_metadata('job4', lambda m: m) is None
+    assert store.increment_attempts('job2') == 1
+    assert store2.increment_attempts('job2') == 2
+
+    # Archived jobs are kept, but no longer listed
+    assert store.archive_completed(before=50.0) == 0
+    assert store.archive_completed(before=150.0) == 1
+    assert [row['jobid'] for row in store.get_job_rows()] == ['job2', 'job3']
+    assert len(store.get_job_rows(include_archived=True)) == 3
+    assert store.get_result('job1')['json_result'] == '[1, 2]'
+    store.close()
+    store2.close()
+
+
+def _write_jobs(fpath, prefix, num):
+    store = JobStore(fpath)
+    for x in range(num):
+        jobid = '%s-%d' % (prefix, x)
+        store.add_job(jobid, {'action': 'helloworld', 'args': [x]})
+        store.set_metadata(jobid, _make_metadata(x))
+        store.update_metadata(jobid, lambda m: dict(m, lane='slow'))
+        store.set_status(jobid, 'completed')
+        store.set_result(jobid, {'exec_status': 'completed', 'json_result': str(x)})
+        store.increment_attempts('shared')
+    store.close()
+
+
+def test_job_store_concurrent_writers(tmp_path):
+    fpath = str(tmp_path / 'jobs.sqlite3')
+    store = JobStore(fpath)
+    store.add_job('shared', {})
+    num = 20
+
+    # Writers in other processes and in other threads of this process
+    ctx = multiprocessing.get_context('fork')
+    procs = [
+        ctx.Process(target=_write_jobs, args=(fpath, 'proc%d' % (x,), num))
+        for x in range(3)
+    ]
+    threads = [
+        threading.Thread(target=_write_jobs, args=(fpath, 'thread%d' % (x,), num))
+        for x in range(3)
+    ]
+    for worker in procs + threads:
+        worker.start()
+    for worker in procs + threads:
+        worker.join()
+    assert all(proc.exitcode == 0 for proc in procs)
+
+    rows = store.get_job_rows()
+    assert len(rows) == 6 * num + 1
+    assert sum(row['has_result'] for row in rows) == 6 * num
+    assert all(row['status'] == 'completed' for row in rows if row['jobid'] != 'shared')
+    assert store.get_metadata('proc2-7')['lane'] == 'slow'
+    assert store.get_result('thread1-3')['json_result'] == '3'
+    # No increment was lost
+    assert store.increment_attempts('shared') == 6 * num + 1
+
+
+def test_migrate_shelves(tmp_path):
+    shelve_path = str(tmp_path / 'engine_shelves')
+    ut.ensuredir(shelve_path)
+    request = {'action': 'helloworld', 'args': [1], 'kwargs': {}}
+    for x, completed in enumerate([True, False]):
+        jobid = 'job%d' % (x,)
+        record = {'request': request, 'attempts': x, 'completed': completed}
+        ut.save_cPkl(join(shelve_path, jobid + '.pkl'), record, verbose=False)
+        with shelve.open(join(shelve_path, jobid + '.input.shelve')) as shelf:
+            metadata = _make_metadata(x)
+            metadata['times']['completed'] = '1970-01-01 00:01:40'
+            shelf['metadata'] = metadata
+    with shelve.open(join(shelve_path, 'job0.output.shelve')) as shelf:
+        shelf['result'] = {'exec_status': 'completed', 'json_result': '"HI"'}
+    # Unreadable records are skipped and lock files are removed
+    ut.writeto(join(shelve_path, 'broken.pkl'), 'not a pickle')
+    ut.writeto(join(shelve_path, 'job0.lock'), '')
+
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    num = migrate_shelves(store, shelve_path, timestamp_to_epoch=lambda t: 100.0)
+    assert num == 2
+    assert not exists(join(shelve_path, 'job0.lock'))
+    assert exists(join(shelve_path, 'job0.pkl'))
+
+    rows = {row['jobid']: row for row in store.get_job_rows()}
+    assert set(rows) == {'job0', 'job1'}
+    assert rows['job0']['completed'] and not rows['job1']['completed']
+    assert rows['job1']['attempts'] == 1
+    assert rows['job0']['has_result'] and not rows['job1']['has_result']
+    assert store.get_request('job1') == request
+    assert store.get_metadata('job1')['jobcounter'] == 1
+    assert store.get_result('job0')['json_result'] == '"HI"'
+    # The migrated completion time is used for archiving
+    assert store.archive_completed(before=150.0) == 1
+
+    # Migration only runs once, unless forced
+    assert migrate_shelves(store, shelve_path) == 0
+    assert migrate_shelves(store, shelve_path, force=True) == 2
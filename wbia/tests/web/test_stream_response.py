@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import gzip
+import uuid
+import zlib
+
+import flask
+import utool as ut
+
+from wbia.control.controller_inject import (
+    get_accepted_encoding,
+    make_web_response,
+    translate_wbia_webreturn,
+)
+
+
+def _get_body(resp):
+    data = b''.join(resp.response)
+    encoding = resp.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        data = gzip.decompress(data)
+    elif encoding == 'deflate':
+        data = zlib.decompress(data)
+    return data
+
+
+def _make_response(rawreturn, headers, stream, jQuery_callback=None):
+    app = flask.Flask(__name__)
+    with app.test_request_context('/', headers=headers):
+        webreturn = translate_wbia_webreturn(
+            rawreturn, jQuery_callback=jQuery_callback, stream=stream
+        )
+        resp = make_web_response(webreturn, 200, get_accepted_encoding())
+        return resp, _get_body(resp)
+
+
+def test_stream_response():
+    rawreturn = {
+        'annot_uuid_list': [uuid.uuid4() for _ in range(10000)],
+        'aid_list': list(range(10000)),
+    }
+    expected = translate_wbia_webreturn(rawreturn)
+
+    resp, body = _make_response(rawreturn, {}, stream=False)
+    assert 'Content-Encoding' not in resp.headers
+    assert body.decode('utf-8') == expected
+
+    for encoding in ['gzip', 'deflate']:
+        headers = {'Accept-Encoding': encoding}
+        resp, body = _make_response(rawreturn, headers, stream=False)
+        assert resp.headers['Content-Encoding'] == encoding
+        assert body.decode('utf-8') == expected
+
+        resp, body = _make_response(rawreturn, headers, stream=True)
+        assert resp.is_streamed
+        assert resp.headers['Content-Encoding'] == encoding
+        assert ut.from_json(body) == ut.from_json(expected)
+
+
+def test_stream_response_small():
+    headers = {'Accept-Encoding': 'gzip;q=0, deflate'}
+    resp, body = _make_response([1, 2, 3], headers, stream=True, jQuery_callback='cb')
+    assert resp.headers['Content-Encoding'] == 'deflate'
+    assert body.startswith(b'cb(') and body.endswith(b')')
+    assert ut.from_json(body[3:-1])['response'] == [1, 2, 3]
+
+    resp, body = _make_response([1, 2, 3], headers, stream=False)
+    assert 'Content-Encoding' not in resp.headers
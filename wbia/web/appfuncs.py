@@ -222,12 +222,12 @@ def template(template_directory=None, template_filename=None, **kwargs):
 
 
 def send_csv_file(string, filename):
-    response = flask.make_response(str(string))
+    encoding = controller_inject.get_accepted_encoding()
+    response = controller_inject.make_web_response(str(string), 200, encoding)
     response.headers['Content-Description'] = 'File Transfer'
     response.headers['Cache-Control'] = 'no-cache'
     response.headers['Content-Type'] = 'text/csv'
     response.headers['Content-Disposition'] = 'attachment; filename=%s' % filename
-    response.headers['Content-Length'] = len(string)
     return response
 
 
@@ -18,6 +18,8 @@ Engine:
     the engine sends a message to the collector saying that something will be ready.
     the engine then executes a task.
     The engine is given direct access to the data.
+    Each lane has its own pool of engines, forked from one preloaded controller.
+    The queue hands jobs to idle engines and rejects jobs when a lane is full.
 
 Collector:
     The collector accepts requests
@@ -54,20 +56,22 @@ Notes:
 #    import os
 #    os.environ['UTOOL_NOCNN'] = 'True'
 # import logging
+import io
 import utool as ut
 import time
 import zmq
 import uuid  # NOQA
 import numpy as np
-import shelve
 import random
 from datetime import datetime, timedelta
 import pytz
 import flask
-from os.path import join, exists, abspath, splitext, basename
+from os.path import join
 from functools import partial
+from collections import deque
 from wbia.control import controller_inject
 from wbia.utils import call_houston
+from wbia.web import job_store
 import multiprocessing
 import re
 
@@ -91,17 +95,34 @@ NUM_ENGINES = {
     'slow': NUM_SLOW_ENGINES,
     'fast': NUM_FAST_ENGINES,
 }
+# Lanes with a higher priority are dispatched first and their workers are not reniced
+ENGINE_PRIORITY = {
+    'slow': ut.get_argval('--engine-slow-lane-priority', int, 0),
+    'fast': ut.get_argval('--engine-fast-lane-priority', int, 0),
+}
+# Maximum number of jobs waiting for a worker in each lane, None is unbounded
+ENGINE_MAX_QUEUE = {
+    'slow': ut.get_argval('--engine-slow-lane-max-queue', int, None),
+    'fast': ut.get_argval('--engine-fast-lane-max-queue', int, None),
+}
+# Controller methods called by each lane pool before it forks its workers
+ENGINE_PRELOAD = ut.get_argval('--engine-preload', type_=list, default=[])
+# Lightnet model tags whose weights each lane pool loads before forking
+ENGINE_PRELOAD_LIGHTNET = ut.get_argval(
+    '--engine-preload-lightnet', type_=list, default=[]
+)
 VERBOSE_JOBS = ut.get_argflag('--verbose-jobs')
 
 
-GLOBAL_SHELVE_LOCK = multiprocessing.Lock()
-
-
 TIMESTAMP_FMTSTR = '%Y-%m-%d %H:%M:%S %Z'
 TIMESTAMP_TIMEZONE = 'US/Pacific'
 
 
-JOB_STATUS_CACHE = {}
+# Job stores opened by this process, keyed by their file path
+_JOB_STORES = {}
+
+# Functions that load shared state (models, indexers) into a lane pool controller
+ENGINE_PRELOAD_FUNCS = []
 
 
 def update_proctitle(procname, dbname=None):
@@ -119,34 +140,40 @@ def update_proctitle(procname, dbname=None):
         print('pip install setproctitle')
 
 
-def _get_engine_job_paths(ibs):
-    shelve_path = ibs.get_shelves_path()
+def _open_job_store(shelve_path):
     ut.ensuredir(shelve_path)
-    record_filepath_list = list(ut.iglob(join(shelve_path, '*.pkl')))
-    return record_filepath_list
+    fpath = join(shelve_path, job_store.JOB_STORE_FNAME)
+    store = _JOB_STORES.get(fpath, None)
+    if store is None:
+        store = job_store.JobStore(fpath)
+        _JOB_STORES[fpath] = store
+    return store
 
 
-def _get_engine_lock_paths(ibs):
-    shelve_path = ibs.get_shelves_path()
-    ut.ensuredir(shelve_path)
-    lock_filepath_list = list(ut.iglob(join(shelve_path, '*.lock')))
-    return lock_filepath_list
+@register_ibs_method
+def get_job_store(ibs):
+    """
+    Returns:
+        wbia.web.job_store.JobStore: the store with the requests, metadata,
+            status and results of every engine job
+    """
+    return _open_job_store(ibs.get_shelves_path())
 
 
-@register_ibs_method
-def fetch_job(ibs, jobid):
-    from os.path import exists
+def _timestamp_to_epoch(timestamp):
+    timezone = pytz.timezone(TIMESTAMP_TIMEZONE)
+    timestamp_date = timezone.localize(convert_to_date(timestamp))
+    return timestamp_date.timestamp()
 
-    shelve_path = ibs.get_shelves_path()
-    job_record_filename = '%s.pkl' % (jobid,)
-    job_record_filepath = join(shelve_path, job_record_filename)
-    assert exists(job_record_filepath)
 
-    job_record = ut.load_cPkl(job_record_filepath)
+@register_ibs_method
+def fetch_job(ibs, jobid):
+    job_request = ibs.get_job_store().get_request(jobid)
+    assert job_request is not None
 
-    job_action = job_record['request']['action']
-    job_args = job_record['request']['args']
-    job_kwargs = job_record['request']['kwargs']
+    job_action = job_request['action']
+    job_args = job_request['args']
+    job_kwargs = job_request['kwargs']
 
     job_func = getattr(ibs, job_action, None)
 
@@ -205,12 +232,6 @@ def initialize_job_manager(ibs):
             dbdir=ibs.get_dbdir(), containerized=ibs.containerized
         )
 
-    # Delete any leftover locks from before
-    lock_filepath_list = _get_engine_lock_paths(ibs)
-    print('Deleting %d leftover engine locks' % (len(lock_filepath_list),))
-    for lock_filepath in lock_filepath_list:
-        ut.delete(lock_filepath)
-
     ibs.job_manager.jobiface = JobInterface(
         0, ibs.job_manager.reciever.port_dict, ibs=ibs
     )
@@ -487,16 +508,79 @@ def spawn_background_process(func, *args, **kwargs):
     return proc_obj
 
 
+def register_engine_preload(func):
+    """
+    Registers ``func(ibs)`` to be called by every lane pool after it opens its
+    controller and before it forks its workers.
+
+    Anything the function loads onto the controller (e.g. detection models or
+    neighbor indexers) is shared copy-on-write by all workers of the lane.
+    """
+    ENGINE_PRELOAD_FUNCS.append(func)
+    return func
+
+
+@register_engine_preload
+def _preload_lightnet_networks(ibs):
+    if len(ENGINE_PRELOAD_LIGHTNET) > 0:
+        from wbia.algo.detect import lightnet
+
+        for model_tag in ENGINE_PRELOAD_LIGHTNET:
+            lightnet.preload_network(model_tag)
+
+
+def preload_engine(ibs, lane=None):
+    for func in ENGINE_PRELOAD_FUNCS:
+        print('Preloading %s for lane %r' % (ut.get_funcname(func), lane))
+        func(ibs)
+    for funcname in ENGINE_PRELOAD:
+        print('Preloading ibs.%s for lane %r' % (funcname, lane))
+        getattr(ibs, funcname)()
+
+
+def get_engine_lane_config(engine_lanes, lane_config=None):
+    """
+    Args:
+        engine_lanes (list): names of the lanes
+        lane_config (dict): overrides of the command line config keyed by lane
+
+    Returns:
+        dict: maps each lane to its number of ``workers``, its ``priority`` and
+            the ``max_queue`` depth after which new jobs are rejected
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.web.job_engine import *  # NOQA
+        >>> lane_config = {'fast': {'workers': 4, 'max_queue': 10}}
+        >>> config = get_engine_lane_config(['fast', 'slow'], lane_config)
+        >>> print(ut.repr2(config['fast'], sorted_=True))
+        {'max_queue': 10, 'priority': 0, 'workers': 4}
+    """
+    if lane_config is None:
+        lane_config = {}
+    config = {}
+    for lane in engine_lanes:
+        config[lane] = {
+            'workers': NUM_ENGINES.get(lane, NUM_DEFAULT_ENGINES),
+            'priority': ENGINE_PRIORITY.get(lane, 0),
+            'max_queue': ENGINE_MAX_QUEUE.get(lane, None),
+        }
+        config[lane].update(lane_config.get(lane, {}))
+    return config
+
+
 class JobBackend(object):
-    def __init__(self, **kwargs):
-        # self.num_engines = 3
+    def __init__(self, lane_config=None, **kwargs):
         self.engine_queue_proc = None
         self.engine_lanes = ['fast', 'slow']
 
         self.engine_lanes = [lane.lower() for lane in self.engine_lanes]
         assert 'slow' in self.engine_lanes
 
-        self.num_engines = {lane: NUM_ENGINES[lane] for lane in self.engine_lanes}
+        self.lane_config = get_engine_lane_config(self.engine_lanes, lane_config)
+        self.num_engines = {
+            lane: self.lane_config[lane]['workers'] for lane in self.engine_lanes
+        }
         self.engine_procs = None
         self.collect_queue_proc = None
         self.collect_proc = None
@@ -588,7 +672,7 @@ class JobBackend(object):
 
         if self.spawn_queue:
             self.engine_queue_proc = _spawner(
-                engine_queue_loop, self.port_dict, self.engine_lanes
+                engine_queue_loop, self.port_dict, self.lane_config
             )
             self.collect_queue_proc = _spawner(collect_queue_loop, self.port_dict)
 
@@ -601,22 +685,33 @@ class JobBackend(object):
             if self.fg_engine:
                 print('ENGINE IS IN DEBUG FOREGROUND MODE')
                 # Spawn engine in foreground process
-                assert self.num_engines == 1, 'fg engine only works with one engine'
-                engine_loop(0, self.port_dict, dbdir)
+                engine_loop(0, self.port_dict, dbdir, containerized, 'slow')
                 assert False, 'should never see this'
             else:
-                # Normal case
+                # Normal case, one pool of workers per lane
                 if self.engine_procs is None:
                     self.engine_procs = {}
 
+                max_priority = max(
+                    config['priority'] for config in self.lane_config.values()
+                )
                 for lane in self.engine_lanes:
                     if lane not in self.engine_procs:
                         self.engine_procs[lane] = []
-                    for i in range(self.num_engines[lane]):
-                        proc = _spawner(
-                            engine_loop, i, self.port_dict, dbdir, containerized, lane
-                        )
-                        self.engine_procs[lane].append(proc)
+                    config = self.lane_config[lane]
+                    if config['workers'] < 1:
+                        continue
+                    niceness = min(max_priority - config['priority'], 19)
+                    proc = _spawner(
+                        engine_pool_loop,
+                        self.port_dict,
+                        dbdir,
+                        containerized,
+                        lane,
+                        config['workers'],
+                        niceness,
+                    )
+                    self.engine_procs[lane].append(proc)
 
         # Check if online
         # wait for processes to spin up
@@ -644,204 +739,67 @@ class JobBackend(object):
 
         if self.spawn_engine:
             for lane in self.engine_procs:
-                for id_, engine in enumerate(self.engine_procs[lane]):
-                    engine_str = 'engine.%s.%s' % (lane, id_)
+                for engine in self.engine_procs[lane]:
+                    engine_str = 'engine.%s.pool' % (lane,)
                     status_dict[engine_str] = engine.is_alive()
 
         return status_dict
 
 
-def get_shelve_lock_filepath(shelve_filepath):
-    shelve_lock_filepath = '%s.lock' % (shelve_filepath,)
-    return shelve_lock_filepath
-
-
-def touch_shelve_lock_file(shelve_filepath):
-    shelve_lock_filepath = get_shelve_lock_filepath(shelve_filepath)
-    assert not exists(shelve_lock_filepath)
-    ut.touch(shelve_lock_filepath, verbose=False)
-    assert exists(shelve_lock_filepath)
-
-
-def delete_shelve_lock_file(shelve_filepath):
-    shelve_lock_filepath = get_shelve_lock_filepath(shelve_filepath)
-    assert exists(shelve_lock_filepath)
-    ut.delete(shelve_lock_filepath, verbose=False)
-    assert not exists(shelve_lock_filepath)
-
-
-def wait_for_shelve_lock_file(shelve_filepath, timeout=600):
-    shelve_lock_filepath = get_shelve_lock_filepath(shelve_filepath)
-    start_time = time.time()
-    while exists(shelve_lock_filepath):
-        current_time = time.time()
-        elapsed = current_time - start_time
-        if elapsed >= timeout:
-            return False
-        time.sleep(1)
-        if int(elapsed) % 5 == 0:
-            print('Waiting for %0.02f seconds for lock so far' % (elapsed,))
-    return True
-
-
-def get_shelve_value(shelve_filepath, key):
-    if shelve_filepath in [None, 'None', 'None.lock']:
-        return None
-    wait_for_shelve_lock_file(shelve_filepath)
-    with GLOBAL_SHELVE_LOCK:
-        wait_for_shelve_lock_file(shelve_filepath)
-        touch_shelve_lock_file(shelve_filepath)
-    value = None
-    try:
-        with shelve.open(shelve_filepath, 'r') as shelf:
-            value = shelf.get(key)
-    except Exception:
-        pass
-    delete_shelve_lock_file(shelve_filepath)
-    return value
-
-
-def set_shelve_value(shelve_filepath, key, value):
-    if shelve_filepath in [None, 'None', 'None.lock']:
-        return False
-    wait_for_shelve_lock_file(shelve_filepath)
-    with GLOBAL_SHELVE_LOCK:
-        wait_for_shelve_lock_file(shelve_filepath)
-        touch_shelve_lock_file(shelve_filepath)
-    flag = False
-    try:
-        with shelve.open(shelve_filepath) as shelf:
-            shelf[key] = value
-        flag = True
-    except Exception:
-        pass
-    delete_shelve_lock_file(shelve_filepath)
-    return flag
-
-
-def get_shelve_filepaths(ibs, jobid):
-    shelve_path = ibs.get_shelves_path()
-    shelve_input_filepath = abspath(join(shelve_path, '%s.input.shelve' % (jobid,)))
-    shelve_output_filepath = abspath(join(shelve_path, '%s.output.shelve' % (jobid,)))
-    return shelve_input_filepath, shelve_output_filepath
+def initialize_job_record(store, row):
+    """
+    Decides what to do with a job of the store when the engine is restarted
 
+    Args:
+        store (JobStore):
+        row (dict): the job summary from JobStore.get_job_rows
 
-def initialize_process_record(
-    record_filepath,
-    shelve_input_filepath,
-    shelve_output_filepath,
-    shelve_path,
-    shelve_archive_path,
-    jobiface_id,
-):
+    Returns:
+        tuple: (jobcounter, jobid, engine_request, completed, suppressed, corrupted)
+            where engine_request is only given for jobs that need to be restarted
+    """
     MAX_ATTEMPTS = 20
-    ARCHIVE_DAYS = 3
-
-    timezone = pytz.timezone(TIMESTAMP_TIMEZONE)
-    now = datetime.now(timezone)
-    now = now.replace(microsecond=0)
-    now = now.replace(second=0)
-    now = now.replace(minute=0)
-    now = now.replace(hour=0)
 
-    archive_delta = timedelta(days=ARCHIVE_DAYS)
-    archive_date = now - archive_delta
-    archive_timestamp = archive_date.strftime(TIMESTAMP_FMTSTR)
-
-    jobid = splitext(basename(record_filepath))[0]
-    jobcounter = None
-
-    # Load the engine record
-    record = ut.load_cPkl(record_filepath, verbose=False)
-
-    # Load the record info
-    engine_request = record.get('request', None)
-    attempts = record.get('attempts', 0)
-    completed = record.get('completed', False)
+    jobid = row['jobid']
+    jobcounter = row['jobcounter']
+    attempts = row['attempts']
+    completed = row['completed']
 
     # Check status
     suppressed = attempts >= MAX_ATTEMPTS
-    corrupted = engine_request is None
-
-    # Load metadata
-    metadata = get_shelve_value(shelve_input_filepath, 'metadata')
+    corrupted = not row['has_request']
 
-    if metadata is None:
+    if not row['has_metadata']:
         print('Missing metadata...corrupted')
         corrupted = True
+    elif jobcounter is None:
+        print('Missing jobcounter...corrupted')
+        corrupted = True
 
-    archived = False
-    if not corrupted:
-        jobcounter = metadata.get('jobcounter', None)
-        times = metadata.get('times', {})
-
-        if jobcounter is None:
-            print('Missing jobcounter...corrupted')
-            corrupted = True
-
-        job_age = None
-        if not corrupted and completed:
-            completed_timestamp = times.get('completed', None)
-            if completed_timestamp is not None:
-                try:
-                    archive_elapsed = calculate_timedelta(
-                        completed_timestamp, archive_timestamp
-                    )
-                    job_age = archive_elapsed[-1]
-                    archived = job_age > 0
-                except Exception:
-                    args = (
-                        completed_timestamp,
-                        archive_timestamp,
-                    )
-                    print(
-                        '[job_engine] Could not determine archive status!\n\tCompleted: %r\n\tArchive: %r'
-                        % args
-                    )
-
-            if archived:
-                color = 'brightmagenta'
-                print_ = partial(ut.colorprint, color=color)
-                print_('ARCHIVING JOB (AGE: %d SECONDS)' % (job_age,))
-                job_scr_filepath_list = list(
-                    ut.iglob(join(shelve_path, '%s*' % (jobid,)))
-                )
-                for job_scr_filepath in job_scr_filepath_list:
-                    job_dst_filepath = job_scr_filepath.replace(
-                        shelve_path, shelve_archive_path
-                    )
-                    ut.copy(
-                        job_scr_filepath, job_dst_filepath, overwrite=True
-                    )  # ut.copy allows for overwrite, ut.move does not
-                    ut.delete(job_scr_filepath)
-
-    if archived:
-        # We have archived the job, don't bother registering it
-        engine_request = None
-    else:
-        if completed or suppressed or corrupted:
-            # Register the job, pass the jobcounter and jobid only
-            engine_request = None
-        else:
-            # We have a pending job, restart with the original request
-            color = 'brightblue' if attempts == 0 else 'brightred'
-            print_ = partial(ut.colorprint, color=color)
+    if completed and not row['has_result']:
+        # Ensure we can read the data we expect out of a completed job
+        corrupted = True
 
-            print_('RESTARTING FAILED JOB FROM RESTART (ATTEMPT %d)' % (attempts + 1,))
-            print_(ut.repr3(record_filepath))
-            # print_(ut.repr3(record))
+    engine_request = None
+    if not (completed or suppressed or corrupted):
+        # We have a pending job, restart with the original request
+        color = 'brightblue' if attempts == 0 else 'brightred'
+        print_ = partial(ut.colorprint, color=color)
 
-            times = metadata.get('times', {})
-            received = times['received']
+        print_('RESTARTING FAILED JOB FROM RESTART (ATTEMPT %d)' % (attempts + 1,))
+        print_(ut.repr3(jobid))
 
-            engine_request['restart_jobid'] = jobid
-            engine_request['restart_jobcounter'] = jobcounter
-            engine_request['restart_received'] = received
-            record['attempts'] = attempts + 1
+        engine_request = store.get_request(jobid)
+        metadata = store.get_metadata(jobid)
+        times = metadata.get('times', {})
+        received = times['received']
 
-            ut.save_cPkl(record_filepath, record, verbose=False)
+        engine_request['restart_jobid'] = jobid
+        engine_request['restart_jobcounter'] = jobcounter
+        engine_request['restart_received'] = received
+        store.increment_attempts(jobid)
 
-    values = jobcounter, jobid, engine_request, archived, completed, suppressed, corrupted
+    values = jobcounter, jobid, engine_request, completed, suppressed, corrupted
     return values
 
 
@@ -907,44 +865,24 @@ class JobInterface(object):
         ibs = jobiface.ibs
 
         if ibs is not None:
-            shelve_path = ibs.get_shelves_path()
-            shelve_path = shelve_path.rstrip('/')
-            shelve_archive_path = '%s_ARCHIVE' % (shelve_path,)
-            ut.ensuredir(shelve_archive_path)
+            ARCHIVE_DAYS = 3
 
-            record_filepath_list = _get_engine_job_paths(ibs)
-
-            num_records = len(record_filepath_list)
-            print('Reloading %d engine jobs...' % (num_records,))
-
-            shelve_input_filepath_list = []
-            shelve_output_filepath_list = []
-            for record_filepath in record_filepath_list:
-                jobid = splitext(basename(record_filepath))[0]
-                shelve_input_filepath, shelve_output_filepath = get_shelve_filepaths(
-                    ibs, jobid
-                )
-                shelve_input_filepath_list.append(shelve_input_filepath)
-                shelve_output_filepath_list.append(shelve_output_filepath)
-
-            arg_iter = list(
-                zip(
-                    record_filepath_list,
-                    shelve_input_filepath_list,
-                    shelve_output_filepath_list,
-                    [shelve_path] * num_records,
-                    [shelve_archive_path] * num_records,
-                    [jobiface.id_] * num_records,
-                )
+            store = ibs.get_job_store()
+            shelve_path = ibs.get_shelves_path()
+            job_store.migrate_shelves(
+                store, shelve_path, timestamp_to_epoch=_timestamp_to_epoch
             )
-            if len(arg_iter) > 0:
-                values_list = ut.util_parallel.generate2(
-                    initialize_process_record, arg_iter
-                )
-                values_list = list(values_list)
-            else:
-                values_list = []
 
+            # Completed jobs older than a few days are no longer registered
+            timezone = pytz.timezone(TIMESTAMP_TIMEZONE)
+            now = datetime.now(timezone)
+            now = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            archive_date = now - timedelta(days=ARCHIVE_DAYS)
+            num_archived = store.archive_completed(archive_date.timestamp())
+
+            row_list = store.get_job_rows()
+            print('Reloading %d engine jobs...' % (len(row_list),))
+            values_list = [initialize_job_record(store, row) for row in row_list]
             print('Processed %d records' % (len(values_list),))
 
             restart_jobcounter_list = []
@@ -953,30 +891,24 @@ class JobInterface(object):
 
             global_jobcounter = 0
             num_registered, num_restarted = 0, 0
-            num_completed, num_archived, num_suppressed, num_corrupted = 0, 0, 0, 0
+            num_completed, num_suppressed, num_corrupted = 0, 0, 0
+            register_list = []
 
             for values in tqdm.tqdm(values_list):
                 (
                     jobcounter,
                     jobid,
                     engine_request,
-                    archived,
                     completed,
                     suppressed,
                     corrupted,
                 ) = values
 
-                if archived:
-                    assert engine_request is None
-                    num_archived += 1
-                    continue
-
                 if jobcounter is not None:
                     global_jobcounter = max(global_jobcounter, jobcounter)
 
                 if engine_request is None:
-                    assert not archived
-                    if completed:
+                    if completed and not corrupted:
                         status = 'completed'
                         num_completed += 1
                     elif suppressed:
@@ -985,17 +917,7 @@ class JobInterface(object):
                     else:
                         status = 'corrupted'
                         num_corrupted += 1
-
-                    reply_notify = {
-                        'jobid': jobid,
-                        'status': status,
-                        'action': 'register',
-                    }
-                    print('Sending register: %r' % (reply_notify,))
-                    jobiface.collect_recieve_socket.send_json(reply_notify)
-                    reply = jobiface.collect_recieve_socket.recv_json()
-                    jobid_ = reply['jobid']
-                    assert jobid_ == jobid
+                    register_list.append((jobid, status))
                 else:
                     num_restarted += 1
                     restart_jobcounter_list.append(jobcounter)
@@ -1006,6 +928,14 @@ class JobInterface(object):
 
             assert num_restarted == len(restart_jobcounter_list)
 
+            # Register all finished jobs with a single store transaction
+            store.set_status_many(register_list)
+            reload_notify = {'action': 'reload'}
+            print('Sending reload of %d registered jobs' % (len(register_list),))
+            jobiface.collect_recieve_socket.send_json(reload_notify)
+            reply = jobiface.collect_recieve_socket.recv_json()
+            assert reply['status'] == 'ok'
+
             print('Registered %d jobs...' % (num_registered,))
             print('\t %d completed jobs' % (num_completed,))
             print('\t %d restarted jobs' % (num_restarted,))
@@ -1116,6 +1046,10 @@ class JobInterface(object):
         jobiface.engine_recieve_socket.send_json(engine_request)
         reply_notify = jobiface.engine_recieve_socket.recv_json()
         print('reply_notify = %r' % (reply_notify,))
+        if reply_notify['status'] == 'rejected':
+            raise controller_inject.WebEngineOverloadedException(
+                reply_notify['lane'], reply_notify['queued'], reply_notify['max_queue']
+            )
         jobid_ = reply_notify['jobid']
 
         if jobid is not None:
@@ -1124,17 +1058,7 @@ class JobInterface(object):
 
         ibs = jobiface.ibs
         if ibs is not None:
-            shelve_path = ibs.get_shelves_path()
-            ut.ensuredir(shelve_path)
-
-            record_filename = '%s.pkl' % (jobid,)
-            record_filepath = join(shelve_path, record_filename)
-            record = {
-                'request': engine_request,
-                'attempts': 0,
-                'completed': False,
-            }
-            ut.save_cPkl(record_filepath, record, verbose=False)
+            ibs.get_job_store().add_job(jobid, engine_request)
 
         # Release memory
         action = None
@@ -1278,9 +1202,14 @@ def collect_queue_loop(port_dict):
         print('Exiting %s' % (loop_name,))
 
 
-def engine_queue_loop(port_dict, engine_lanes):
+def engine_queue_loop(port_dict, lane_config):
     """
     Specialized queue loop
+
+    Keeps a queue of waiting jobs for each lane and hands them out to the idle
+    workers of that lane, lanes with a higher priority first.  Workers announce
+    themselves as idle by sending a ``ready`` message.  A new job is rejected
+    when its lane already has ``max_queue`` jobs waiting.
     """
     # Flow of information tags:
     # NAME: engine_queue
@@ -1291,6 +1220,9 @@ def engine_queue_loop(port_dict, engine_lanes):
 
     print = partial(ut.colorprint, color='red')
 
+    engine_lanes = sorted(
+        lane_config, key=lambda lane: lane_config[lane]['priority'], reverse=True
+    )
     interface_engine_pull = port_dict['engine_pull_url']
     interface_engine_push_dict = {
         lane: port_dict['engine_%s_push_url' % (lane,)] for lane in engine_lanes
@@ -1308,13 +1240,17 @@ def engine_queue_loop(port_dict, engine_lanes):
     if VERBOSE_JOBS:
         print('bind %s_url2 = %r' % (name, interface_engine_pull))
 
-    # bind the server router to the queue dealer
+    # bind the server router to the lane workers
     engine_send_socket_dict = {}
     for lane in interface_engine_push_dict:
-        engine_send_socket = ctx.socket(zmq.DEALER)  # CHECKED - DEALER
+        engine_send_socket = ctx.socket(zmq.ROUTER)  # CHECKED - ROUTER
         engine_send_socket.setsockopt_string(
-            zmq.IDENTITY, 'special_queue.' + lane + '.' + name + '.' + 'DEALER'
+            zmq.IDENTITY, 'special_queue.' + lane + '.' + name + '.' + 'ROUTER'
         )
+        # Fail loudly when sending to a dead worker, and let a restarted worker
+        # take over the identity of the one it replaces
+        engine_send_socket.setsockopt(zmq.ROUTER_MANDATORY, 1)
+        engine_send_socket.setsockopt(zmq.ROUTER_HANDOVER, 1)
         engine_send_socket.bind(interface_engine_push_dict[lane])
         if VERBOSE_JOBS:
             print('bind %s %s_url2 = %r' % (name, lane, interface_engine_push_dict[lane]))
@@ -1336,9 +1272,31 @@ def engine_queue_loop(port_dict, engine_lanes):
     # always start at 0
     global_jobcounter = 0
 
+    # jobs waiting for a worker and the idle workers of each lane
+    lane_jobs_dict = {lane: deque() for lane in engine_lanes}
+    lane_workers_dict = {lane: deque() for lane in engine_lanes}
+
     try:
         while True:
             evts = dict(poller.poll())
+            for lane in engine_lanes:
+                engine_send_socket = engine_send_socket_dict[lane]
+                if engine_send_socket in evts:
+                    # CALLER: engine_
+                    worker_idents, engine_reply = rcv_multipart_json(
+                        engine_send_socket, num=1, print=print
+                    )
+                    if engine_reply['action'] == 'ready':
+                        worker_ident = worker_idents[0]
+                        if worker_ident not in lane_workers_dict[lane]:
+                            lane_workers_dict[lane].append(worker_ident)
+
+            # Hand out waiting jobs before a new request is handled, which may
+            # skip the rest of this iteration and also needs the freed queue slots
+            _dispatch_lane_jobs(
+                engine_send_socket_dict, lane_jobs_dict, lane_workers_dict, engine_lanes
+            )
+
             if engine_receive_socket in evts:
                 # CALLER: job_client
                 idents, engine_request = rcv_multipart_json(
@@ -1386,6 +1344,27 @@ def engine_queue_loop(port_dict, engine_lanes):
 
                 engine_request['lane'] = lane
 
+                # Interrupted jobs are always put back, new jobs can be turned away
+                max_queue = lane_config[lane]['max_queue']
+                num_queued = len(lane_jobs_dict[lane])
+                overloaded = max_queue is not None and num_queued >= max_queue
+                if overloaded and restart_jobcounter is None:
+                    print(
+                        'Rejecting job, lane %r has %d of %d jobs queued'
+                        % (lane, num_queued, max_queue)
+                    )
+                    reply_notify = {
+                        'jobid': None,
+                        'status': 'rejected',
+                        'action': 'notification',
+                        'lane': lane,
+                        'queued': num_queued,
+                        'max_queue': max_queue,
+                    }
+                    # RETURNS: job_client_return
+                    send_multipart_json(engine_receive_socket, idents, reply_notify)
+                    continue
+
                 if restart_jobid is not None:
                     '[RESTARTING] Replacing jobid=%s with previous restart_jobid=%s' % (
                         jobid,
@@ -1488,10 +1467,8 @@ def engine_queue_loop(port_dict, engine_lanes):
                 engine_request['jobid'] = jobid
 
                 if VERBOSE_JOBS:
-                    print('... notifying backend engine to start')
-                # CALL: engine_
-                engine_send_socket = engine_send_socket_dict[lane]
-                send_multipart_json(engine_send_socket, idents, engine_request)
+                    print('... queueing job for the %s lane' % (lane,))
+                lane_jobs_dict[lane].append((idents, engine_request))
 
                 # Release
                 idents = None
@@ -1509,6 +1486,10 @@ def engine_queue_loop(port_dict, engine_lanes):
                     print('...notifying collector that job was queued')
                 # CALLS: collector_notify
                 collect_recieve_socket.send_json(queued_notify)
+
+            _dispatch_lane_jobs(
+                engine_send_socket_dict, lane_jobs_dict, lane_workers_dict, engine_lanes
+            )
     except KeyboardInterrupt:
         print('Caught ctrl+c in %s queue. Gracefully exiting' % (loop_name,))
 
@@ -1532,11 +1513,101 @@ def engine_queue_loop(port_dict, engine_lanes):
         print('Exiting %s queue' % (loop_name,))
 
 
-def engine_loop(id_, port_dict, dbdir, containerized, lane):
+def _dispatch_lane_jobs(
+    engine_send_socket_dict, lane_jobs_dict, lane_workers_dict, engine_lanes
+):
+    """
+    Sends waiting jobs to idle workers, visiting the lanes in priority order
+    """
+    for lane in engine_lanes:
+        engine_send_socket = engine_send_socket_dict[lane]
+        lane_jobs = lane_jobs_dict[lane]
+        lane_workers = lane_workers_dict[lane]
+        while len(lane_jobs) > 0 and len(lane_workers) > 0:
+            worker_ident = lane_workers.popleft()
+            idents, engine_request = lane_jobs[0]
+            try:
+                # CALL: engine_
+                send_multipart_json(
+                    engine_send_socket, [worker_ident] + idents, engine_request
+                )
+            except zmq.error.ZMQError:
+                # The worker went away, try the next idle one
+                print('Dropping unreachable worker %r' % (worker_ident,))
+                continue
+            lane_jobs.popleft()
+
+
+def engine_pool_loop(port_dict, dbdir, containerized, lane, num_workers, niceness=0):
+    """
+    Opens one controller for a lane, preloads the shared models and forks the
+    workers of the lane from it.
+
+    The workers share the controller and everything loaded by
+    :func:`preload_engine` copy-on-write.  A worker that dies is replaced by a
+    new fork of the same preloaded state.
+    """
+    import os
+    import signal
+    import wbia
+
+    print = partial(ut.colorprint, color='brightgreen')
+
+    assert dbdir is not None
+    if niceness > 0:
+        os.nice(niceness)
+
+    ibs = wbia.opendb(dbdir=dbdir, use_cache=False, web=False, daily_backup=False)
+    update_proctitle('engine_pool.%s' % (lane,), dbname=ibs.dbname)
+    preload_engine(ibs, lane=lane)
+
+    worker_pid_dict = {}
+
+    def _fork_worker(id_):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            status = 0
+            try:
+                engine_loop(id_, port_dict, dbdir, containerized, lane, ibs=ibs)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+        worker_pid_dict[pid] = id_
+
+    def _on_terminate(signal_, frame):
+        for pid in worker_pid_dict:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, _on_terminate)
+
+    print('Starting %d workers for the %s lane' % (num_workers, lane))
+    for id_ in range(num_workers):
+        _fork_worker(id_)
+
+    try:
+        while True:
+            pid, status = os.wait()
+            id_ = worker_pid_dict.pop(pid, None)
+            if id_ is not None:
+                print('Engine %s.%s exited (%r), restarting' % (lane, id_, status))
+                time.sleep(1.0)
+                _fork_worker(id_)
+    except KeyboardInterrupt:
+        print('Caught ctrl+c in engine pool. Gracefully exiting')
+        _on_terminate(None, None)
+
+
+def engine_loop(id_, port_dict, dbdir, containerized, lane, ibs=None):
     r"""
     IBEIS:
         This will be part of a worker process with its own IBEISController
-        instance.
+        instance, or the preloaded one of its lane pool when ``ibs`` is given.
 
         Needs to send where the results will go and then publish the results there.
 
@@ -1569,7 +1640,13 @@ def engine_loop(id_, port_dict, dbdir, containerized, lane):
 
     assert dbdir is not None
 
-    engine_send_sock = ctx.socket(zmq.ROUTER)  # CHECKED - ROUTER
+    if ibs is not None:
+        # Forked from a lane pool, do not use the connections of the parent
+        from wbia.dtool import sql_control
+
+        sql_control.reset_engines_after_fork()
+
+    engine_send_sock = ctx.socket(zmq.DEALER)  # CHECKED - DEALER
     engine_send_sock.setsockopt_string(
         zmq.IDENTITY,
         'engine.%s.%s' % (lane, id_),
@@ -1587,13 +1664,20 @@ def engine_loop(id_, port_dict, dbdir, containerized, lane):
         print('connect collect_pull_url = %r' % (interface_collect_pull,))
         print('engine is initialized')
 
-    ibs = wbia.opendb(dbdir=dbdir, use_cache=False, web=False, daily_backup=False)
+    if ibs is None:
+        ibs = wbia.opendb(dbdir=dbdir, use_cache=False, web=False, daily_backup=False)
     update_proctitle('engine_loop.%s.%s' % (lane, id_), dbname=ibs.dbname)
 
+    ready_notify = {'action': 'ready'}
+
     try:
         while True:
             try:
-                idents, engine_request = rcv_multipart_json(engine_send_sock, print=print)
+                # Tell the queue that this worker can take a job
+                send_multipart_json(engine_send_sock, [], ready_notify)
+                idents, engine_request = rcv_multipart_json(
+                    engine_send_sock, num=1, print=print
+                )
 
                 action = engine_request['action']
                 jobid = engine_request['jobid']
@@ -1792,10 +1876,8 @@ def collector_loop(port_dict, dbdir, containerized):
     ibs = wbia.opendb(dbdir=dbdir, use_cache=False, web=False, daily_backup=False)
     update_proctitle('collector_loop', dbname=ibs.dbname)
 
-    shelve_path = ibs.get_shelves_path()
-    ut.ensuredir(shelve_path)
-
-    collector_data = {}
+    store = ibs.get_job_store()
+    collector_data = load_collector_data(store)
 
     try:
         while True:
@@ -1811,7 +1893,7 @@ def collector_loop(port_dict, dbdir, containerized):
                     ibs,
                     collect_request,
                     collector_data,
-                    shelve_path,
+                    store,
                     containerized=containerized,
                 )
             except Exception as ex:
@@ -1851,17 +1933,14 @@ def _timestamp():
     return timestamp
 
 
-def invalidate_global_cache(jobid):
-    global JOB_STATUS_CACHE
-    JOB_STATUS_CACHE.pop(jobid, None)
-
-
-def get_collector_shelve_filepaths(collector_data, jobid):
-    if jobid is None:
-        return None, None
-    shelve_input_filepath = collector_data.get(jobid, {}).get('input', None)
-    shelve_output_filepath = collector_data.get(jobid, {}).get('output', None)
-    return shelve_input_filepath, shelve_output_filepath
+def load_collector_data(store):
+    """
+    Loads the status of every job that is not archived from the store
+    """
+    collector_data = {
+        row['jobid']: {'status': row['status']} for row in store.get_status_rows()
+    }
+    return collector_data
 
 
 def convert_to_date(timestamp):
@@ -1888,9 +1967,7 @@ def calculate_timedelta(start, end):
     return hours, minutes, seconds, total_seconds
 
 
-def on_collect_request(
-    ibs, collect_request, collector_data, shelve_path, containerized=False
-):
+def on_collect_request(ibs, collect_request, collector_data, store, containerized=False):
     """Run whenever the collector recieves a message"""
     import requests
 
@@ -1922,15 +1999,7 @@ def on_collect_request(
         if jobid not in collector_data:
             collector_data[jobid] = {
                 'status': None,
-                'input': None,
-                'output': None,
             }
-        runtime_lock_filepath = join(shelve_path, '%s.lock' % (jobid,))
-    else:
-        runtime_lock_filepath = None
-
-    args = get_collector_shelve_filepaths(collector_data, jobid)
-    collector_shelve_input_filepath, collector_shelve_output_filepath = args
 
     if jobid is not None:
         print(
@@ -1943,7 +2012,7 @@ def on_collect_request(
         )
 
     if action == 'notification':
-        assert None not in [jobid, runtime_lock_filepath]
+        assert None not in [jobid]
 
         # received
         # accepted
@@ -1960,30 +2029,14 @@ def on_collect_request(
         collector_data[jobid]['status'] = status
 
         print('Notify %s' % ut.repr3(collector_data[jobid]))
-        invalidate_global_cache(jobid)
-
-        if status == 'received':
-            ut.touch(runtime_lock_filepath)
+        store.set_status(jobid, status)
 
         if status == 'completed':
-            if exists(runtime_lock_filepath):
-                ut.delete(runtime_lock_filepath)
-
             # Mark the engine request as finished
-            record_filename = '%s.pkl' % (jobid,)
-            record_filepath = join(shelve_path, record_filename)
-            record = ut.load_cPkl(record_filepath, verbose=False)
-            record['completed'] = True
-            ut.save_cPkl(record_filepath, record, verbose=False)
-            record = None
-
-        # Update relevant times in the shelf
-        if collector_shelve_input_filepath is None:
-            metadata = None
-        else:
-            metadata = get_shelve_value(collector_shelve_input_filepath, 'metadata')
+            store.mark_completed(jobid)
 
-        if metadata is not None:
+        # Update relevant times in the metadata
+        def _update_times(metadata):
             times = metadata.get('times', {})
             times['updated'] = _timestamp()
 
@@ -2027,51 +2080,27 @@ def on_collect_request(
                 times['turnaround_sec'] = total_seconds
 
             metadata['times'] = times
-            set_shelve_value(collector_shelve_input_filepath, 'metadata', metadata)
+            return metadata
 
-            metadata = None  # Release memory
-
-    elif action == 'register':
-        assert None not in [jobid]
+        store.update_metadata(jobid, _update_times)
 
-        invalidate_global_cache(jobid)
-
-        shelve_input_filepath, shelve_output_filepath = get_shelve_filepaths(ibs, jobid)
-        metadata = get_shelve_value(shelve_input_filepath, 'metadata')
-        engine_result = get_shelve_value(shelve_output_filepath, 'result')
-
-        if status == 'completed':
-            # Ensure we can read the data we expect out of a completed job
-            if None in [metadata, engine_result]:
-                status = 'corrupted'
-
-        collector_data[jobid] = {
-            'status': status,
-            'input': shelve_input_filepath,
-            'output': shelve_output_filepath,
-        }
-        print('Register %s' % ut.repr3(collector_data[jobid]))
-
-        metadata, engine_result = None, None  # Release memory
+    elif action == 'reload':
+        # The finished jobs were registered in the store, reload their status
+        collector_data.clear()
+        collector_data.update(load_collector_data(store))
+        print('Reloaded %d jobs' % (len(collector_data),))
 
     elif action == 'metadata':
-        invalidate_global_cache(jobid)
-
         # From the Engine
         metadata = collect_request.get('metadata', None)
 
-        shelve_input_filepath, shelve_output_filepath = get_shelve_filepaths(ibs, jobid)
-        collector_data[jobid]['input'] = shelve_input_filepath
-
-        set_shelve_value(shelve_input_filepath, 'metadata', metadata)
+        store.set_metadata(jobid, metadata)
 
         print('Stored Metadata %s' % ut.repr3(collector_data[jobid]))
 
         metadata = None  # Release memory
 
     elif action == 'store':
-        invalidate_global_cache(jobid)
-
         # From the Engine
         engine_result = collect_request.get('engine_result', None)
         callback_url = collect_request.get('callback_url', None)
@@ -2082,10 +2111,7 @@ def on_collect_request(
         jobid = engine_result.get('jobid', jobid)
         assert jobid in collector_data
 
-        shelve_input_filepath, shelve_output_filepath = get_shelve_filepaths(ibs, jobid)
-        collector_data[jobid]['output'] = shelve_output_filepath
-
-        set_shelve_value(shelve_output_filepath, 'result', engine_result)
+        store.set_result(jobid, engine_result)
 
         print('Stored Result %s' % ut.repr3(collector_data[jobid]))
 
@@ -2108,12 +2134,29 @@ def on_collect_request(
 
             try:
                 data_dict = {'jobid': jobid}
+                result_file = None
 
                 if callback_detailed:
-                    shelve_value = get_shelve_value(shelve_output_filepath, 'result')
-                    data_dict['status'] = shelve_value['exec_status']
-                    data_dict['json_result'] = ut.from_json(shelve_value['json_result'])
-                    shelve_value = None  # Release memory
+                    stored_result = store.get_result(jobid, load_json=False)
+                    data_dict['status'] = stored_result['exec_status']
+                    data_dict['json_result'] = None
+                    result_file = store.open_result(jobid)
+                    stored_result = None  # Release memory
+
+                json_body = callback_url.startswith('houston+') and callback_method in [
+                    'POST',
+                    'PUT',
+                ]
+                if result_file is None:
+                    json_data = ut.to_json(data_dict)
+                elif json_body:
+                    # The stored result is copied into the body as is
+                    json_data = _to_json_with_result(data_dict, result_file)
+                else:
+                    with result_file:
+                        json_result = result_file.read().decode('utf-8')
+                    data_dict['json_result'] = ut.from_json(json_result)
+                    json_result = None  # Release memory
 
                 args = (
                     callback_url,
@@ -2132,7 +2175,7 @@ def on_collect_request(
                         call_houston(
                             callback_url[8:],
                             method='POST',
-                            data=ut.to_json(data_dict),
+                            data=json_data,
                             headers={'Content-Type': 'application/json'},
                         )
                     else:
@@ -2149,7 +2192,7 @@ def on_collect_request(
                         call_houston(
                             callback_url[8:],
                             method='PUT',
-                            data=ut.to_json(data_dict),
+                            data=json_data,
                             headers={'Content-Type': 'application/json'},
                         )
                     else:
@@ -2177,64 +2220,41 @@ def on_collect_request(
     elif action == 'job_status_dict':
         json_result = {}
 
-        for jobid in collector_data:
-
-            if jobid in JOB_STATUS_CACHE:
-                job_status_data = JOB_STATUS_CACHE.get(jobid, None)
-            else:
-                status = collector_data[jobid]['status']
-
-                shelve_input_filepath, shelve_output_filepath = get_shelve_filepaths(
-                    ibs, jobid
-                )
-                metadata = get_shelve_value(shelve_input_filepath, 'metadata')
-
-                cache = True
-                if metadata is None:
-                    if status in ['corrupted']:
-                        status = 'corrupted'
-                    elif status in ['suppressed']:
-                        status = 'suppressed'
-                    elif status in ['completed']:
-                        status = 'corrupted'
-                    else:
-                        # status = 'pending'
-                        cache = False
-                    metadata = {
-                        'jobcounter': -1,
-                    }
+        # One query for the status columns of every job, metadata is not loaded
+        status_row_dict = {row['jobid']: row for row in store.get_status_rows()}
 
-                times = metadata.get('times', {})
-                request = metadata.get('request', {})
-
-                # Support legacy jobs
-                if request is None:
-                    request = {}
-
-                job_status_data = {
-                    'status': status,
-                    'jobcounter': metadata.get('jobcounter', None),
-                    'action': metadata.get('action', None),
-                    'endpoint': request.get('endpoint', None),
-                    'function': request.get('function', None),
-                    'time_received': times.get('received', None),
-                    'time_started': times.get('started', None),
-                    'time_runtime': times.get('runtime', None),
-                    'time_updated': times.get('updated', None),
-                    'time_completed': times.get('completed', None),
-                    'time_turnaround': times.get('turnaround', None),
-                    'time_runtime_sec': times.get('runtime_sec', None),
-                    'time_turnaround_sec': times.get('turnaround_sec', None),
-                    'lane': metadata.get('lane', None),
-                }
-                if cache:
-                    JOB_STATUS_CACHE[jobid] = job_status_data
+        for jobid in collector_data:
+            status = collector_data[jobid]['status']
+            row = status_row_dict.get(jobid, None)
 
+            if row is None or row['jobcounter'] is None:
+                if status in ['completed']:
+                    status = 'corrupted'
+                row = {'jobcounter': -1}
+
+            times = row.get('times', None) or {}
+
+            job_status_data = {
+                'status': status,
+                'jobcounter': row.get('jobcounter', None),
+                'action': row.get('action', None),
+                'endpoint': row.get('endpoint', None),
+                'function': row.get('function', None),
+                'time_received': times.get('received', None),
+                'time_started': times.get('started', None),
+                'time_runtime': times.get('runtime', None),
+                'time_updated': times.get('updated', None),
+                'time_completed': times.get('completed', None),
+                'time_turnaround': times.get('turnaround', None),
+                'time_runtime_sec': times.get('runtime_sec', None),
+                'time_turnaround_sec': times.get('turnaround_sec', None),
+                'lane': row.get('lane', None),
+            }
             json_result[jobid] = job_status_data
 
         reply['json_result'] = json_result
 
-        metadata = None  # Release memory
+        status_row_dict = None  # Release memory
 
     elif action == 'job_id_list':
         reply['jobid_list'] = sorted(list(collector_data.keys()))
@@ -2244,7 +2264,7 @@ def on_collect_request(
             reply['status'] = 'invalid'
             metadata = None
         else:
-            metadata = get_shelve_value(collector_shelve_input_filepath, 'metadata')
+            metadata = store.get_metadata(jobid)
             if metadata is None:
                 reply['status'] = 'corrupted'
 
@@ -2259,7 +2279,7 @@ def on_collect_request(
         else:
             status = collector_data[jobid]['status']
 
-            engine_result = get_shelve_value(collector_shelve_output_filepath, 'result')
+            engine_result = store.get_result(jobid, load_json=False)
 
             if engine_result is None:
                 if status in ['corrupted']:
@@ -2276,8 +2296,9 @@ def on_collect_request(
             else:
                 reply['status'] = engine_result['exec_status']
 
-                json_result = engine_result['json_result']
-                result = ut.from_json(json_result)
+                # Copied into the reply by send_multipart_json in chunks,
+                # instead of being decoded here and encoded again
+                result = store.open_result(jobid)
 
         reply['json_result'] = result
 
@@ -2290,9 +2311,43 @@ def on_collect_request(
     return reply
 
 
+def _to_json_with_result(data_dict, result_file):
+    """
+    Encodes ``data_dict`` as JSON with the stored JSON result of a job (see
+    :func:`wbia.web.job_store.JobStore.open_result`) as its ``json_result``.
+    The result is copied in chunks, without decoding it.
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.web.job_engine import *  # NOQA
+        >>> store = job_store.JobStore(':memory:')
+        >>> result = {'uuid': uuid.UUID('e3b0c442-98fc-1c14-9afb-f4c8996fb924')}
+        >>> store.set_result('job1', {'exec_status': 'completed',
+        >>>                           'json_result': ut.to_json(result)})
+        >>> data_dict = {'jobid': 'job1', 'json_result': None}
+        >>> reply_json = _to_json_with_result(data_dict, store.open_result('job1'))
+        >>> reply = ut.from_json(reply_json.decode('utf-8'))
+        >>> assert reply == {'jobid': 'job1', 'json_result': result}
+    """
+    placeholder = '"__JSON_RESULT_%s__"' % (uuid.uuid4().hex,)
+    data_dict = dict(data_dict, json_result=placeholder[1:-1])
+    data_json = ut.to_json(data_dict).encode('utf-8')
+    head, tail = data_json.split(placeholder.encode('utf-8'))
+    chunks = [head]
+    with result_file:
+        read_chunk = partial(result_file.read, job_store.RESULT_CHUNKSIZE)
+        chunks.extend(iter(read_chunk, b''))
+    chunks.append(tail)
+    return b''.join(chunks)
+
+
 def send_multipart_json(sock, idents, reply):
     """helper"""
-    reply_json = ut.to_json(reply).encode('utf-8')
+    if isinstance(reply.get('json_result', None), io.IOBase):
+        # A stored job result opened by on_collect_request
+        reply_json = _to_json_with_result(reply, reply['json_result'])
+    else:
+        reply_json = ut.to_json(reply).encode('utf-8')
     reply = None
     multi_reply = idents + [reply_json]
     sock.send_multipart(multi_reply)
@@ -2335,8 +2390,6 @@ if __name__ == '__main__':
         python -m ibeis.web.job_engine --allexamples
         python -m ibeis.web.job_engine --allexamples --noface --nosrc
     """
-    import multiprocessing
-
     multiprocessing.freeze_support()  # for win32
     import utool as ut  # NOQA
 
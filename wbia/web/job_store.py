@@ -0,0 +1,626 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent storage for the job engine.
+
+Every job is a row of a single SQLite database (in WAL mode) that lives in the
+engine shelves directory. The job request, its metadata and the status are
+stored in the ``jobs`` table, which is indexed by jobid and by status. The
+(potentially large) results are stored as blobs in a separate
+``job_results`` table, so listing and status queries never touch them, and
+can be read back in chunks with :func:`JobStore.open_result`.
+
+Readers never block the writer in WAL mode and each update is done in its
+own transaction, so no lock files are needed between the web server, the
+engine queue and the collector processes.
+
+Previous versions stored each job in a ``<jobid>.pkl`` record and two
+``<jobid>.input.shelve`` / ``<jobid>.output.shelve`` files. These are copied
+into the store once by :func:`migrate_shelves`.
+"""
+import contextlib
+import io
+import logging
+import os
+import shelve
+import threading
+import time
+from os.path import basename, exists, join, splitext
+import utool as ut
+
+(print, rrr, profile) = ut.inject2(__name__)
+logger = logging.getLogger('wbia')
+
+
+JOB_STORE_FNAME = 'jobs.sqlite3'
+
+# Size of the pieces read by JobResultReader
+RESULT_CHUNKSIZE = 2 ** 20
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        jobid TEXT PRIMARY KEY NOT NULL,
+        jobcounter INTEGER,
+        status TEXT,
+        lane TEXT,
+        action TEXT,
+        endpoint TEXT,
+        function TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0,
+        completed_at REAL,
+        archived INTEGER NOT NULL DEFAULT 0,
+        request TEXT,
+        metadata TEXT,
+        times TEXT
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status)',
+    """
+    CREATE INDEX IF NOT EXISTS jobs_archive_idx
+        ON jobs (archived, completed, completed_at)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS job_results (
+        jobid TEXT PRIMARY KEY NOT NULL,
+        exec_status TEXT,
+        json_result BLOB
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS store_info (
+        key TEXT PRIMARY KEY NOT NULL,
+        value TEXT
+    )
+    """,
+]
+
+# Columns returned by JobStore.get_job_rows
+JOB_ROW_COLUMNS = (
+    'jobid',
+    'jobcounter',
+    'status',
+    'attempts',
+    'completed',
+    'has_request',
+    'has_metadata',
+    'has_result',
+)
+
+# Columns returned by JobStore.get_status_rows
+STATUS_ROW_COLUMNS = (
+    'jobid',
+    'status',
+    'jobcounter',
+    'action',
+    'endpoint',
+    'function',
+    'lane',
+    'times',
+)
+
+
+def _dumps(value):
+    return None if value is None else ut.to_json(value)
+
+
+def _loads(text):
+    return None if text is None else ut.from_json(text)
+
+
+class JobStore(ut.NiceRepr):
+    """
+    SQLite (WAL) backed storage of job requests, metadata, status and results
+
+    Each process and thread opens its own connection the first time it uses
+    the store, so a store object can be created before the job engine
+    processes are forked.
+
+    Args:
+        fpath (str): path to the database file
+        timeout (float): seconds to wait for another writer to finish
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.web.job_store import *  # NOQA
+        >>> store = JobStore(':memory:')
+        >>> store.add_job('job1', {'action': 'helloworld', 'args': [1]})
+        >>> store.set_metadata('job1', {'jobcounter': 1, 'action': 'helloworld',
+        >>>                             'lane': 'fast', 'times': {'received': 'now'}})
+        >>> store.set_status('job1', 'working')
+        >>> store.set_result('job1', {'exec_status': 'completed',
+        >>>                           'json_result': '"HELLO"', 'jobid': 'job1'})
+        >>> store.mark_completed('job1')
+        >>> print(store.get_request('job1')['args'])
+        [1]
+        >>> print(store.get_result('job1')['json_result'])
+        "HELLO"
+        >>> row = store.get_job_rows()[0]
+        >>> print(ut.repr2(ut.dict_subset(row, ['jobid', 'status', 'completed'])))
+        {'jobid': 'job1', 'status': 'working', 'completed': True}
+    """
+
+    def __init__(store, fpath, timeout=60.0):
+        store.fpath = fpath
+        store.timeout = timeout
+        store._local = threading.local()
+        if fpath == ':memory:':
+            # An in-memory database only exists on a single connection
+            store._shared_lock = threading.RLock()
+            store._shared_conn = store._connect()
+        else:
+            store._shared_lock = None
+            store._shared_conn = None
+
+    def __nice__(store):
+        return store.fpath
+
+    def _connect(store):
+        import sqlite3
+
+        conn = sqlite3.connect(
+            store.fpath,
+            timeout=store.timeout,
+            isolation_level=None,
+            check_same_thread=store.fpath != ':memory:',
+        )
+        if store.fpath != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    @property
+    def connection(store):
+        """The connection of the current process and thread"""
+        if store._shared_conn is not None:
+            return store._shared_conn
+        pid = os.getpid()
+        conn = getattr(store._local, 'conn', None)
+        if conn is None or store._local.pid != pid:
+            conn = store._connect()
+            store._local.conn = conn
+            store._local.pid = pid
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(store):
+        """Runs the body as one atomic write transaction"""
+        lock = store._shared_lock or contextlib.suppress()
+        with lock:
+            conn = store.connection
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            else:
+                conn.execute('COMMIT')
+
+    def _query(store, sql, params=()):
+        lock = store._shared_lock or contextlib.suppress()
+        with lock:
+            return store.connection.execute(sql, params).fetchall()
+
+    def close(store):
+        conn = getattr(store._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            store._local.conn = None
+
+    # --- jobs ---
+
+    def add_job(store, jobid, request):
+        """
+        Stores the engine request of a job. The collector may already have
+        recorded the status of the job, which is kept.
+        """
+        with store._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (jobid, request) VALUES (?, ?)
+                ON CONFLICT (jobid) DO UPDATE SET request = excluded.request
+                """,
+                (jobid, _dumps(request)),
+            )
+
+    def get_request(store, jobid):
+        rows = store._query('SELECT request FROM jobs WHERE jobid = ?', (jobid,))
+        return _loads(rows[0][0]) if rows else None
+
+    def has_job(store, jobid):
+        rows = store._query('SELECT 1 FROM jobs WHERE jobid = ?', (jobid,))
+        return len(rows) > 0
+
+    def set_metadata(store, jobid, metadata):
+        with store._transaction() as conn:
+            store._set_metadata(conn, jobid, metadata)
+
+    def _set_metadata(store, conn, jobid, metadata):
+        metadata_ = {} if metadata is None else metadata
+        request = metadata_.get('request', None) or {}
+        conn.execute(
+            """
+            INSERT INTO jobs (jobid, jobcounter, lane, action, endpoint,
+                              function, metadata, times)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (jobid) DO UPDATE SET
+                jobcounter = excluded.jobcounter, lane = excluded.lane,
+                action = excluded.action, endpoint = excluded.endpoint,
+                function = excluded.function, metadata = excluded.metadata,
+                times = excluded.times
+            """,
+            (
+                jobid,
+                metadata_.get('jobcounter', None),
+                metadata_.get('lane', None),
+                metadata_.get('action', None),
+                request.get('endpoint', None),
+                request.get('function', None),
+                _dumps(metadata),
+                _dumps(metadata_.get('times', None)),
+            ),
+        )
+
+    def get_metadata(store, jobid):
+        rows = store._query('SELECT metadata FROM jobs WHERE jobid = ?', (jobid,))
+        return _loads(rows[0][0]) if rows else None
+
+    def update_metadata(store, jobid, func):
+        """
+        Atomically replaces the metadata of a job with ``func(metadata)``.
+        Nothing is written if the job has no metadata.
+
+        Returns:
+            dict: the new metadata or None
+        """
+        with store._transaction() as conn:
+            rows = conn.execute(
+                'SELECT metadata FROM jobs WHERE jobid = ?', (jobid,)
+            ).fetchall()
+            metadata = _loads(rows[0][0]) if rows else None
+            if metadata is None:
+                return None
+            metadata = func(metadata)
+            store._set_metadata(conn, jobid, metadata)
+        return metadata
+
+    def set_status(store, jobid, status):
+        store.set_status_many([(jobid, status)])
+
+    def set_status_many(store, jobid_status_list):
+        with store._transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO jobs (jobid, status) VALUES (?, ?)
+                ON CONFLICT (jobid) DO UPDATE SET status = excluded.status
+                """,
+                list(jobid_status_list),
+            )
+
+    def get_status(store, jobid):
+        rows = store._query('SELECT status FROM jobs WHERE jobid = ?', (jobid,))
+        return rows[0][0] if rows else None
+
+    def mark_completed(store, jobid, completed_at=None):
+        if completed_at is None:
+            completed_at = time.time()
+        with store._transaction() as conn:
+            conn.execute(
+                'UPDATE jobs SET completed = 1, completed_at = ? WHERE jobid = ?',
+                (completed_at, jobid),
+            )
+
+    def increment_attempts(store, jobid):
+        """
+        Returns:
+            int: the number of attempts after the increment
+        """
+        with store._transaction() as conn:
+            conn.execute(
+                'UPDATE jobs SET attempts = attempts + 1 WHERE jobid = ?', (jobid,)
+            )
+            rows = conn.execute(
+                'SELECT attempts FROM jobs WHERE jobid = ?', (jobid,)
+            ).fetchall()
+        return rows[0][0] if rows else None
+
+    def archive_completed(store, before):
+        """
+        Archives the jobs that were completed before the ``before`` unix time.
+        Archived jobs are kept in the store, but are no longer listed.
+
+        Returns:
+            int: number of newly archived jobs
+        """
+        with store._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET archived = 1
+                WHERE archived = 0 AND completed = 1 AND completed_at < ?
+                """,
+                (before,),
+            )
+            num = cursor.rowcount
+        return num
+
+    def get_job_rows(store, include_archived=False):
+        """
+        Summary of every job, used when the job engine is restarted
+
+        Returns:
+            list: a dict with the JOB_ROW_COLUMNS of each job, ordered by jobcounter
+        """
+        where = '' if include_archived else 'WHERE jobs.archived = 0'
+        rows = store._query(
+            """
+            SELECT jobs.jobid, jobs.jobcounter, jobs.status, jobs.attempts,
+                   jobs.completed, jobs.request IS NOT NULL,
+                   jobs.metadata IS NOT NULL, job_results.jobid IS NOT NULL
+            FROM jobs LEFT JOIN job_results ON jobs.jobid = job_results.jobid
+            %s
+            ORDER BY jobs.jobcounter
+            """
+            % (where,)
+        )
+        row_list = []
+        for row in rows:
+            row = dict(zip(JOB_ROW_COLUMNS, row))
+            for key in ['completed', 'has_request', 'has_metadata', 'has_result']:
+                row[key] = bool(row[key])
+            row_list.append(row)
+        return row_list
+
+    def get_status_rows(store, include_archived=False):
+        """
+        The small status columns of every job, without loading their metadata
+
+        Returns:
+            list: a dict with the STATUS_ROW_COLUMNS of each job
+        """
+        where = '' if include_archived else 'WHERE archived = 0'
+        rows = store._query(
+            'SELECT %s FROM jobs %s' % (', '.join(STATUS_ROW_COLUMNS), where)
+        )
+        row_list = []
+        for row in rows:
+            row = dict(zip(STATUS_ROW_COLUMNS, row))
+            row['times'] = _loads(row['times'])
+            row_list.append(row)
+        return row_list
+
+    # --- results ---
+
+    def set_result(store, jobid, engine_result):
+        json_result = engine_result.get('json_result', None)
+        if isinstance(json_result, str):
+            json_result = json_result.encode('utf-8')
+        with store._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO job_results (jobid, exec_status, json_result)
+                VALUES (?, ?, ?)
+                ON CONFLICT (jobid) DO UPDATE SET
+                    exec_status = excluded.exec_status,
+                    json_result = excluded.json_result
+                """,
+                (jobid, engine_result.get('exec_status', None), json_result),
+            )
+
+    def get_result(store, jobid, load_json=True):
+        """
+        Args:
+            jobid (str):
+            load_json (bool): read the JSON result too, otherwise it is None
+                and can be read in chunks with :func:`open_result`
+                (default: True)
+
+        Returns:
+            dict: the engine result (exec_status, json_result, jobid) or None
+        """
+        column = 'json_result' if load_json else 'NULL'
+        rows = store._query(
+            'SELECT exec_status, %s FROM job_results WHERE jobid = ?' % (column,),
+            (jobid,),
+        )
+        if not rows:
+            return None
+        exec_status, json_result = rows[0]
+        if json_result is not None:
+            json_result = bytes(json_result).decode('utf-8')
+        engine_result = {
+            'exec_status': exec_status,
+            'json_result': json_result,
+            'jobid': jobid,
+        }
+        return engine_result
+
+    def get_result_nbytes(store, jobid):
+        rows = store._query(
+            'SELECT length(json_result) FROM job_results WHERE jobid = ?', (jobid,)
+        )
+        return rows[0][0] if rows else None
+
+    def open_result(store, jobid, chunksize=RESULT_CHUNKSIZE):
+        """
+        Opens the JSON result of a job as a binary file that is read from the
+        database in chunks, so large results are never loaded at once.
+
+        Example:
+            >>> # ENABLE_DOCTEST
+            >>> from wbia.web.job_store import *  # NOQA
+            >>> store = JobStore(':memory:')
+            >>> json_result = ut.to_json(list(range(1000)))
+            >>> store.set_result('job1', {'exec_status': 'completed',
+            >>>                           'json_result': json_result})
+            >>> with store.open_result('job1', chunksize=100) as file_:
+            >>>     chunks = list(iter(lambda: file_.read(100), b''))
+            >>> assert b''.join(chunks).decode('utf-8') == json_result
+            >>> print(len(chunks))
+            49
+            >>> assert store.open_result('missing') is None
+        """
+        nbytes = store.get_result_nbytes(jobid)
+        if nbytes is None:
+            return None
+        raw = JobResultReader(store, jobid, nbytes)
+        return io.BufferedReader(raw, buffer_size=chunksize)
+
+    # --- store info ---
+
+    def get_info(store, key, default=None):
+        rows = store._query('SELECT value FROM store_info WHERE key = ?', (key,))
+        return rows[0][0] if rows else default
+
+    def set_info(store, key, value):
+        with store._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO store_info (key, value) VALUES (?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value
+                """,
+                (key, value),
+            )
+
+
+class JobResultReader(io.RawIOBase):
+    """Reads the result blob of a job with SQL substr calls"""
+
+    def __init__(self, store, jobid, nbytes):
+        self.store = store
+        self.jobid = jobid
+        self.nbytes = nbytes
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.nbytes - self.offset)
+        if size <= 0:
+            return 0
+        # SQL substr is one-indexed
+        rows = self.store._query(
+            'SELECT substr(json_result, ?, ?) FROM job_results WHERE jobid = ?',
+            (self.offset + 1, size, self.jobid),
+        )
+        data = bytes(rows[0][0]) if rows else b''
+        buffer[: len(data)] = data
+        self.offset += len(data)
+        return len(data)
+
+
+def _load_shelve_value(shelve_filepath, key):
+    if not exists(shelve_filepath) and not any(
+        exists(shelve_filepath + ext) for ext in ['.db', '.dat']
+    ):
+        return None
+    try:
+        with shelve.open(shelve_filepath, 'r') as shelf:
+            return shelf.get(key)
+    except Exception:
+        return None
+
+
+def migrate_shelves(store, shelve_path, timestamp_to_epoch=None, force=False):
+    """
+    Copies the jobs stored by previous versions (a ``<jobid>.pkl`` record and
+    the ``<jobid>.input.shelve`` / ``<jobid>.output.shelve`` files) into the
+    store. This only runs once per store, the legacy files are left in place.
+
+    Args:
+        store (JobStore):
+        shelve_path (str): the legacy engine shelves directory
+        timestamp_to_epoch (func): converts the legacy completed timestamp of a
+            job into a unix time, used to archive the migrated jobs
+        force (bool): migrate even if the store was already migrated
+
+    Returns:
+        int: number of migrated jobs
+
+    Example:
+        >>> # ENABLE_DOCTEST
+        >>> from wbia.web.job_store import *  # NOQA
+        >>> shelve_path = ut.ensure_app_resource_dir('wbia', 'tests', 'job_store_shelves')
+        >>> ut.delete(shelve_path)
+        >>> ut.ensuredir(shelve_path)
+        >>> request = {'action': 'helloworld', 'args': [1], 'kwargs': {}}
+        >>> ut.save_cPkl(join(shelve_path, 'job1.pkl'),
+        >>>              {'request': request, 'attempts': 2, 'completed': True})
+        >>> with shelve.open(join(shelve_path, 'job1.input.shelve')) as shelf:
+        >>>     shelf['metadata'] = {'jobcounter': 7, 'action': 'helloworld', 'times': {}}
+        >>> with shelve.open(join(shelve_path, 'job1.output.shelve')) as shelf:
+        >>>     shelf['result'] = {'exec_status': 'completed', 'json_result': '"HI"'}
+        >>> store = JobStore(':memory:')
+        >>> num = migrate_shelves(store, shelve_path)
+        >>> assert migrate_shelves(store, shelve_path) == 0, 'should only migrate once'
+        >>> row = store.get_job_rows()[0]
+        >>> print(ut.repr2(ut.dict_subset(row, ['jobid', 'jobcounter', 'attempts', 'completed', 'has_result'])))
+        {'jobid': 'job1', 'jobcounter': 7, 'attempts': 2, 'completed': True, 'has_result': True}
+        >>> print(store.get_result('job1')['json_result'])
+        "HI"
+    """
+    migrated_key = 'migrated_shelves'
+    if not force and store.get_info(migrated_key) is not None:
+        return 0
+    num_migrated = 0
+    if exists(shelve_path):
+        record_filepath_list = sorted(ut.iglob(join(shelve_path, '*.pkl')))
+        logger.info(
+            'Migrating %d engine jobs from %r into %r'
+            % (len(record_filepath_list), shelve_path, store)
+        )
+        for record_filepath in ut.ProgIter(record_filepath_list, lbl='migrate jobs'):
+            jobid = splitext(basename(record_filepath))[0]
+            try:
+                record = ut.load_cPkl(record_filepath, verbose=False)
+            except Exception:
+                logger.info('Could not load job record %r' % (record_filepath,))
+                continue
+            input_filepath = join(shelve_path, '%s.input.shelve' % (jobid,))
+            output_filepath = join(shelve_path, '%s.output.shelve' % (jobid,))
+            metadata = _load_shelve_value(input_filepath, 'metadata')
+            engine_result = _load_shelve_value(output_filepath, 'result')
+
+            completed = bool(record.get('completed', False))
+            completed_at = None
+            if completed and metadata is not None and timestamp_to_epoch is not None:
+                timestamp = metadata.get('times', {}).get('completed', None)
+                if timestamp is not None:
+                    try:
+                        completed_at = timestamp_to_epoch(timestamp)
+                    except Exception:
+                        completed_at = None
+
+            with store._transaction() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO jobs (jobid, request, attempts, completed,
+                                      completed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (jobid) DO UPDATE SET
+                        request = excluded.request,
+                        attempts = excluded.attempts,
+                        completed = excluded.completed,
+                        completed_at = excluded.completed_at
+                    """,
+                    (
+                        jobid,
+                        _dumps(record.get('request', None)),
+                        record.get('attempts', 0),
+                        int(completed),
+                        completed_at,
+                    ),
+                )
+                if metadata is not None:
+                    store._set_metadata(conn, jobid, metadata)
+            if engine_result is not None:
+                store.set_result(jobid, engine_result)
+            num_migrated += 1
+        # Legacy runtime locks are not used by the store
+        for lock_filepath in ut.iglob(join(shelve_path, '*.lock')):
+            ut.delete(lock_filepath, verbose=False)
+    store.set_info(migrated_key, str(num_migrated))
+    return num_migrated
@@ -104,6 +104,11 @@ PROMETHEUS_DATA = {
         'Number of web exceptions',
         ['name', 'tag'],
     ),
+    'table_cache': Gauge(
+        'wbia_table_cache',
+        'Getter cache counters (hits, misses, evictions, nbytes, num_values) per table',
+        ['name', 'table', 'counter'],
+    ),
 }
 
 
@@ -383,6 +388,16 @@ def prometheus_update(ibs, *args, **kwargs):
                 except Exception:
                     pass
 
+                try:
+                    table_cache_stats = ibs.table_cache.stats()
+                    for table in table_cache_stats:
+                        for counter, number in table_cache_stats[table].items():
+                            PROMETHEUS_DATA['table_cache'].labels(
+                                name=container_name, table=table, counter=counter
+                            ).set(number)
+                except Exception:
+                    pass
+
                 try:
                     # logger.info(ut.repr3(status_dict))
                     process_status_dict = ibs.get_process_alive_status()